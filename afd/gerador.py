@@ -25,6 +25,7 @@ from datetime import datetime
 
 from django.conf import settings
 
+from ponto.arquivamento import com_relacionados, marcacoes_arquivadas
 from ponto.models import RegistroPonto
 from .models import EventoFuncionarioAFD, EventoServicoAFD
 
@@ -80,12 +81,25 @@ def crc16_kermit(data: bytes) -> str:
 # Construtores de cada tipo de registro
 # ---------------------------------------------------------------------------
 
+def dados_empregador():
+    """Identificação do empregador e do REP-P — a mesma no AFD e no Espelho
+    de Ponto (ponto/espelho.py)."""
+    cnpj = getattr(settings, 'AFD_CNPJ_EMPREGADOR', '00000000000000')
+    return {
+        'cnpj': cnpj,
+        'razao_social': getattr(settings, 'AFD_RAZAO_SOCIAL', 'RAZAO SOCIAL NAO CONFIGURADA'),
+        'numero_inpi': getattr(settings, 'AFD_NUMERO_REGISTRO_INPI', '99999999999999999'),
+        'cnpj_desenvolvedor': getattr(settings, 'AFD_CNPJ_DESENVOLVEDOR', cnpj),
+    }
+
+
 def _registro_tipo_1(data_inicial, data_final):
     """Cabeçalho — um único registro no começo do arquivo."""
-    cnpj = getattr(settings, 'AFD_CNPJ_EMPREGADOR', '00000000000000')
-    razao_social = getattr(settings, 'AFD_RAZAO_SOCIAL', 'RAZAO SOCIAL NAO CONFIGURADA')
-    numero_inpi = getattr(settings, 'AFD_NUMERO_REGISTRO_INPI', '99999999999999999')
-    cnpj_dev = getattr(settings, 'AFD_CNPJ_DESENVOLVEDOR', cnpj)
+    empregador = dados_empregador()
+    cnpj = empregador['cnpj']
+    razao_social = empregador['razao_social']
+    numero_inpi = empregador['numero_inpi']
+    cnpj_dev = empregador['cnpj_desenvolvedor']
 
     corpo = (
         _n('0', 9) +
@@ -178,6 +192,8 @@ def gerar_afd(data_inicial, data_final):
     Retorna (nome_arquivo, conteudo_texto) do AFD do período informado.
     conteudo_texto já vem pronto para ser salvo/baixado como .txt
     (ISO-8859-1, linhas terminadas em CRLF, ordenado por NSR).
+    Marcações de meses arquivados (ponto/arquivamento.py) entram também —
+    o AFD do período é o mesmo antes e depois do arquivamento.
     """
     eventos_funcionario = EventoFuncionarioAFD.objects.filter(
         data_hora__date__gte=data_inicial, data_hora__date__lte=data_final
@@ -185,9 +201,12 @@ def gerar_afd(data_inicial, data_final):
     eventos_servico = EventoServicoAFD.objects.filter(
         data_hora__date__gte=data_inicial, data_hora__date__lte=data_final
     )
-    marcacoes = RegistroPonto.objects.filter(
+    marcacoes = list(RegistroPonto.objects.filter(
         data__gte=data_inicial, data__lte=data_final, nsr__isnull=False
-    ).select_related('profissional')
+    ).select_related('profissional'))
+    marcacoes += com_relacionados(
+        marcacoes_arquivadas(data_inicial, data_final, apenas_com_nsr=True), 'profissional'
+    )
 
     linhas = [_registro_tipo_1(data_inicial, data_final)]
 
@@ -205,14 +224,13 @@ def gerar_afd(data_inicial, data_final):
         qtd_tipo4=0,
         qtd_tipo5=eventos_funcionario.count(),
         qtd_tipo6=eventos_servico.count(),
-        qtd_tipo7=marcacoes.count(),
+        qtd_tipo7=len(marcacoes),
     ))
     linhas.append(_linha_assinatura())
 
     conteudo = '\r\n'.join(linhas) + '\r\n'
 
-    cnpj = getattr(settings, 'AFD_CNPJ_EMPREGADOR', '00000000000000')
-    numero_inpi = getattr(settings, 'AFD_NUMERO_REGISTRO_INPI', '99999999999999999')
-    nome_arquivo = f"AFD{numero_inpi}{cnpj}REP_P.txt"
+    empregador = dados_empregador()
+    nome_arquivo = f"AFD{empregador['numero_inpi']}{empregador['cnpj']}REP_P.txt"
 
     return nome_arquivo, conteudo
@@ -0,0 +1,200 @@
+# afd/gerador_aej.py
+"""
+Gera o Arquivo Eletrônico de Jornada (AEJ) — Anexo V da Portaria MTP
+671/2021 —, o arquivo que o PTRP (programa de tratamento de registro de
+ponto) entrega junto com o AFD: vínculos, horários contratuais, marcações
+tratadas (originais e incluídas manualmente) e a jornada apurada
+(faltas e movimentos do banco de horas).
+
+Diferente do AFD, o AEJ é delimitado por "|" (sem largura fixa, sem CRC):
+
+    01 cabeçalho          |tpIdtEmpregador|idtEmpregador|caepf|cno|razaoOuNome|dataInicialAej|dataFinalAej|dataHoraGerAej|versaoAej
+    02 REP utilizado      |idRepAej|tpRep|nrRep
+    03 vínculo            |idtVinculoAej|cpf|nomeEmp
+    04 horário contratual |codHorContratual|durJornada|hrEntrada01|hrSaida01
+    05 marcação           |idtVinculoAej|dataHoraMarc|idRepAej|tpMarc|seqEntSaida|fonteMarc|codHorContratual|motivo
+    07 ausência/banco     |idtVinculoAej|tipoAusenOuComp|data|qtMinutos|tipoMovBH
+    08 PTRP               |nomeProg|versaoProg|tpIdtDesenv|idtDesenv|razaoNomeDesenv|emailDesenv
+    99 trailer            |quantidade de registros de cada tipo, 01 a 08
+
+⚠️ Conferir contra o texto oficial do Anexo V antes de entregar a uma
+fiscalização — como no AFD (afd/gerador.py), a assinatura é um .p7s
+separado, fora do Django. O registro 06 (matrícula eSocial) fica de fora:
+o cadastro do profissional ainda não tem esse campo.
+
+Pra caber um AEJ anual de um empregador grande em memória constante:
+
+- os vínculos (03) saem em lotes de profissionais por pk
+  (ponto/espelho.py -> lotes_do_quadro), nunca uma consulta do quadro
+  inteiro (o driver do MySQL traria tudo pra memória);
+- as marcações (05) e a jornada (07) saem de ponto/espelho.py ->
+  espelhos(): pra cada lote de profissionais, as marcações e os ajustes
+  só deles, com a jornada calculada numa passada por profissional (o
+  mesmo extrato do banco de horas);
+- os 07 são escritos num arquivo temporário (SpooledTemporaryFile: memória
+  até 1 MB, disco depois) durante a passada e copiados no fim, porque no
+  leiaute vêm depois de todos os 05.
+
+gerar_aej() é um gerador de pedaços de texto: vai direto num
+StreamingHttpResponse ou, pela fila (tarefas/tipos.py), num arquivo.
+"""
+import tempfile
+from datetime import datetime
+
+from django.conf import settings
+
+from ponto.espelho import espelhos, lotes_do_quadro, quadro_profissionais
+from .gerador import _a, _d, _dh, _n, dados_empregador
+
+VERSAO_AEJ = '001'
+ID_REP = 1           # único REP do arquivo: o próprio TimeFlow (REP-P)
+TIPO_REP_P = 3
+
+# Registro 07, tipoAusenOuComp / tipoMovBH
+FALTA_NAO_JUSTIFICADA = 2
+MOVIMENTO_BANCO_HORAS = 3
+BH_INCLUSAO = 1
+BH_COMPENSACAO = 2
+
+TAMANHO_MEMORIA_07 = 1024 * 1024
+
+
+def _linha(*campos):
+    return '|'.join(str(campo) for campo in campos) + '\r\n'
+
+
+def _texto(valor, largura):
+    """Alfanumérico do AEJ: sem preenchimento, só cortado na largura (e sem '|')."""
+    return _a((valor or '').replace('|', ' '), largura).rstrip()
+
+
+def _hora(valor):
+    return valor.strftime('%H:%M') if valor else ''
+
+
+def _cpf(cpf):
+    return _n(''.join(filter(str.isdigit, cpf or '')) or '0', 11)
+
+
+def _minutos(duracao):
+    return int(duracao.total_seconds()) // 60 if duracao else 0
+
+
+def _chave_horario(profissional):
+    if profissional.escala_id:
+        duracao = profissional.escala.horas_plantao
+    else:
+        duracao = profissional.carga_horaria_diaria
+    return _minutos(duracao), _hora(profissional.horario_entrada), _hora(profissional.horario_saida)
+
+
+def _registro_01(data_inicial, data_final, empregador):
+    return _linha(
+        '01', 1, _n(empregador['cnpj'], 14), '', '',
+        _texto(empregador['razao_social'], 150),
+        _d(data_inicial), _d(data_final), _dh(datetime.now()), VERSAO_AEJ,
+    )
+
+
+def _registro_02(empregador):
+    return _linha('02', ID_REP, TIPO_REP_P, _n(empregador['numero_inpi'], 17))
+
+
+def _registro_08(empregador):
+    return _linha(
+        '08', 'TimeFlow', getattr(settings, 'AEJ_VERSAO_PROGRAMA', '1.0'), 1,
+        _n(empregador['cnpj_desenvolvedor'], 14),
+        _texto(getattr(settings, 'AEJ_RAZAO_SOCIAL_DESENVOLVEDOR', empregador['razao_social']), 150),
+        _texto(getattr(settings, 'AEJ_EMAIL_DESENVOLVEDOR', ''), 50),
+    )
+
+
+def _registros_05(espelho, cod_horario):
+    vinculo = espelho['profissional'].pk
+    for dia in espelho['dias']:
+        par = 0
+        for marcacao in dia['marcacoes']:
+            if marcacao['tipo'] == 'ENTRADA':
+                par += 1
+            manual = marcacao['ajuste_manual']
+            yield _linha(
+                '05', vinculo,
+                _dh(datetime.combine(dia['data'], marcacao['horario'])),
+                ID_REP,
+                'E' if marcacao['tipo'] == 'ENTRADA' else 'S',
+                max(par, 1),
+                'I' if manual else 'O',       # I = incluída manualmente, O = original do coletor
+                cod_horario,
+                _texto(marcacao['justificativa'] or 'Ajuste manual', 150) if manual else '',
+            )
+
+
+def _registros_07(espelho):
+    vinculo = espelho['profissional'].pk
+    for dia in espelho['dias']:
+        if dia['ocorrencia'] == 'Falta':
+            yield _linha('07', vinculo, FALTA_NAO_JUSTIFICADA, _d(dia['data']), dia['minutos_previstos'], '')
+        elif dia['saldo_minutos']:
+            yield _linha(
+                '07', vinculo, MOVIMENTO_BANCO_HORAS, _d(dia['data']), abs(dia['saldo_minutos']),
+                BH_INCLUSAO if dia['saldo_minutos'] > 0 else BH_COMPENSACAO,
+            )
+
+
+def gerar_aej(data_inicial, data_final, estabelecimento_id=None):
+    """Gerador dos pedaços de texto do AEJ do período (CRLF; a view/tarefa codifica)."""
+    empregador = dados_empregador()
+    quadro = quadro_profissionais(
+        data_inicial, data_final, estabelecimento_id=estabelecimento_id, com_marcacao_no_periodo=True,
+    )
+    quantidades = dict.fromkeys(['01', '02', '03', '04', '05', '06', '07', '08'], 0)
+
+    yield _registro_01(data_inicial, data_final, empregador)
+    yield _registro_02(empregador)
+    quantidades['01'] = quantidades['02'] = 1
+
+    horarios = {}
+    for lote in lotes_do_quadro(quadro.select_related(None).only('pk', 'cpf', 'nome'), tamanho=5000):
+        yield ''.join(
+            _linha('03', profissional.pk, _cpf(profissional.cpf), _texto(profissional.nome, 150))
+            for profissional in lote
+        )
+        quantidades['03'] += len(lote)
+
+    combinacoes = quadro.order_by().values_list(
+        'carga_horaria_diaria', 'horario_entrada', 'horario_saida', 'escala__horas_plantao', 'escala_id',
+    ).distinct()
+    for carga, entrada, saida, horas_plantao, escala_id in combinacoes:
+        chave = (_minutos(horas_plantao if escala_id else carga), _hora(entrada), _hora(saida))
+        if chave not in horarios:
+            horarios[chave] = len(horarios) + 1
+            yield _linha('04', horarios[chave], *chave)
+            quantidades['04'] += 1
+
+    with tempfile.SpooledTemporaryFile(max_size=TAMANHO_MEMORIA_07, mode='w+', encoding='utf-8', newline='') as jornada:
+        for espelho in espelhos(data_inicial, data_final, quadro=quadro):
+            cod_horario = horarios[_chave_horario(espelho['profissional'])]
+            bloco = list(_registros_05(espelho, cod_horario))
+            quantidades['05'] += len(bloco)
+            if bloco:
+                yield ''.join(bloco)
+            for linha in _registros_07(espelho):
+                jornada.write(linha)
+                quantidades['07'] += 1
+
+        jornada.seek(0)
+        while True:
+            pedaco = jornada.read(64 * 1024)
+            if not pedaco:
+                break
+            yield pedaco
+
+    yield _registro_08(empregador)
+    quantidades['08'] = 1
+    yield _linha('99', *quantidades.values())
+
+
+def nome_arquivo_aej(estabelecimento_id=None):
+    empregador = dados_empregador()
+    sufixo = f'_{estabelecimento_id}' if estabelecimento_id else ''
+    return f"AEJ{empregador['numero_inpi']}{empregador['cnpj']}{sufixo}.txt"
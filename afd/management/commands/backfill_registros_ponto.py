@@ -61,11 +61,12 @@ class Command(BaseCommand):
         with transaction.atomic():
             hash_anterior = (
                 RegistroPonto.objects
-                .exclude(hash_registro='')
+                .filter(hash_binario__isnull=False)
                 .order_by('-nsr')
-                .values_list('hash_registro', flat=True)
+                .values_list('hash_binario', flat=True)
                 .first()
-            ) or ''
+            )
+            hash_anterior = bytes(hash_anterior).hex() if hash_anterior else ''
 
             for registro in candidatos.iterator():
                 nsr = SequenciaNSR.proximo()
@@ -87,7 +88,7 @@ class Command(BaseCommand):
 
                 registro.nsr = nsr
                 registro.hash_registro = hash_novo
-                registro.save(update_fields=['nsr', 'hash_registro'])
+                registro.save(update_fields=['nsr', 'hash_binario'])
 
                 hash_anterior = hash_novo
                 processados += 1
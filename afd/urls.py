@@ -6,6 +6,7 @@ app_name = 'afd'
 
 urlpatterns = [
     path('gerar/', views.download_afd, name='download_afd'),
+    path('aej/', views.download_aej, name='download_aej'),
 ]
 
 # No urls.py principal do projeto, adicione:
@@ -1,23 +1,45 @@
 # afd/views.py
 from datetime import datetime
 
+from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import HttpResponse
-from django.shortcuts import render
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import redirect, render
+from django.utils import timezone
 
+from ponto.models import RegistroPonto
+from tarefas.fila import enfileirar
+from timeflow.db_router import ler_da_replica
 from .gerador import gerar_afd
+from .gerador_aej import gerar_aej, nome_arquivo_aej
 
 
 @staff_member_required
+@ler_da_replica
 def download_afd(request):
     """
     Tela simples pra escolher o período e baixar o AFD (.txt).
     Restrita a staff — é um arquivo fiscal, não deve ficar público.
+
+    Período com mais de settings.TAREFAS_LIMITE_REGISTROS_AFD marcações
+    (ou ?fila=1) é gerado pelo worker da fila (tarefas/) em vez de dentro
+    do request.
     """
     if request.method == 'POST' or request.GET.get('data_inicio'):
         data_inicio = datetime.strptime(request.GET['data_inicio'], '%Y-%m-%d').date()
         data_fim = datetime.strptime(request.GET['data_fim'], '%Y-%m-%d').date()
 
+        limite = getattr(settings, 'TAREFAS_LIMITE_REGISTROS_AFD', 20000)
+        marcacoes = RegistroPonto.objects.filter(data__gte=data_inicio, data__lte=data_fim, nsr__isnull=False)
+        if request.GET.get('fila') or marcacoes[limite:limite + 1].exists():
+            tarefa = enfileirar(
+                'afd',
+                {'data_inicio': data_inicio.isoformat(), 'data_fim': data_fim.isoformat()},
+                usuario=request.user,
+                reaproveitar_concluida=data_fim < timezone.now().date(),
+            )
+            return redirect('tarefas:acompanhar_tarefa', tarefa_id=tarefa.pk)
+
         nome_arquivo, conteudo = gerar_afd(data_inicio, data_fim)
 
         response = HttpResponse(
@@ -28,3 +50,37 @@ def download_afd(request):
         return response
 
     return render(request, 'afd/download_afd.html')
+
+
+@staff_member_required
+@ler_da_replica
+def download_aej(request):
+    """
+    AEJ (Arquivo Eletrônico de Jornada) do período, ao lado do AFD. Sai em
+    streaming (afd/gerador_aej.py); com mais de
+    settings.TAREFAS_LIMITE_REGISTROS_AFD marcações (ou ?fila=1) vai pro
+    worker da fila, como o AFD.
+    """
+    if not request.GET.get('data_inicio'):
+        return redirect('afd:download_afd')
+
+    data_inicio = datetime.strptime(request.GET['data_inicio'], '%Y-%m-%d').date()
+    data_fim = datetime.strptime(request.GET['data_fim'], '%Y-%m-%d').date()
+
+    limite = getattr(settings, 'TAREFAS_LIMITE_REGISTROS_AFD', 20000)
+    marcacoes = RegistroPonto.objects.filter(data__gte=data_inicio, data__lte=data_fim)
+    if request.GET.get('fila') or marcacoes[limite:limite + 1].exists():
+        tarefa = enfileirar(
+            'aej',
+            {'data_inicio': data_inicio.isoformat(), 'data_fim': data_fim.isoformat()},
+            usuario=request.user,
+            reaproveitar_concluida=data_fim < timezone.now().date(),
+        )
+        return redirect('tarefas:acompanhar_tarefa', tarefa_id=tarefa.pk)
+
+    response = StreamingHttpResponse(
+        (pedaco.encode('iso-8859-1', errors='replace') for pedaco in gerar_aej(data_inicio, data_fim)),
+        content_type='text/plain; charset=iso-8859-1'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo_aej()}"'
+    return response
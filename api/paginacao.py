@@ -0,0 +1,69 @@
+# api/paginacao.py
+"""
+Paginação por cursor das listas de marcações da API (core/paginacao.py):
+(data, horário, id) decrescente, sem OFFSET e sem COUNT(*).
+
+    GET /api/registros/?por_pagina=50
+    {"next": ".../api/registros/?cursor=...", "previous": null, "results": [...]}
+
+O cursor é opaco — o cliente só segue os links next/previous.
+
+Opcional: só pagina quando o pedido traz ?cursor ou ?por_pagina. Sem
+eles a lista continua saindo como array simples, como antes — os apps
+que já consomem /api/registros/ não quebram.
+"""
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from core.paginacao import decodificar_cursor, paginar_por_cursor
+
+
+class PaginacaoCursorRegistros(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'por_pagina'
+    page_size = 50
+    max_page_size = 200
+
+    def _por_pagina(self, request):
+        try:
+            por_pagina = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            por_pagina = self.page_size
+        return max(1, min(por_pagina, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not any(parametro in request.query_params
+                   for parametro in (self.cursor_query_param, self.page_size_query_param)):
+            return None
+        self.request = request
+        cursor = request.query_params.get(self.cursor_query_param)
+        posicao = decodificar_cursor(cursor)
+        if cursor and posicao is None:
+            raise NotFound('Cursor inválido.')
+        self.pagina = paginar_por_cursor(queryset, por_pagina=self._por_pagina(request), posicao=posicao)
+        return self.pagina.object_list
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self._link(self.pagina.proximo_cursor),
+            'previous': self._link(self.pagina.cursor_anterior),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
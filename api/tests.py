@@ -1,3 +1,71 @@
+from datetime import date, time
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.paginacao import ANTERIOR, codificar_cursor
+from core.testing import criar_estabelecimento, criar_profissional, registrar
+
+
+class PaginacaoCursorRegistrosTests(TestCase):
+    """api/paginacao.py — cursor só quando pedido, keyset em (data, horário, id)."""
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('joana', password='senha')
+        estabelecimentos = [criar_estabelecimento() for _ in range(3)]
+        self.profissional = criar_profissional(estabelecimentos[0], usuario=self.usuario)
+        # Empates de propósito: entradas no mesmo dia e horário, em estabelecimentos diferentes.
+        self.registros = [
+            registrar(self.profissional, dia, horario, tipo, estabelecimento=estabelecimento)
+            for dia in (date(2026, 3, 2), date(2026, 3, 3))
+            for horario, tipo, estabelecimento in (
+                (time(8), 'ENTRADA', estabelecimentos[0]),
+                (time(8), 'ENTRADA', estabelecimentos[1]),
+                (time(8), 'ENTRADA', estabelecimentos[2]),
+                (time(17), 'SAIDA', estabelecimentos[0]),
+            )
+        ]
+        self.esperado = [
+            r.pk for r in sorted(self.registros, key=lambda r: (r.data, r.horario, r.pk), reverse=True)
+        ]
+        self.url = reverse('registros-list')
+        self.cabecalho = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.usuario)}'}
+
+    def get(self, url, **parametros):
+        return self.client.get(url, parametros, **self.cabecalho)
+
+    def test_sem_parametros_a_lista_continua_um_array(self):
+        resposta = self.get(self.url)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIsInstance(resposta.json(), list)
+        self.assertEqual([r['id'] for r in resposta.json()], self.esperado)
+
+    def test_paginas_seguem_a_ordem_sem_repetir_nem_pular_nos_empates(self):
+        vistos = []
+        pagina = self.get(self.url, por_pagina=3).json()
+        while True:
+            vistos.extend(r['id'] for r in pagina['results'])
+            if not pagina['next']:
+                break
+            pagina = self.get(pagina['next']).json()
+        self.assertEqual(vistos, self.esperado)
+
+    def test_previous_volta_pra_pagina_anterior(self):
+        primeira = self.get(self.url, por_pagina=3).json()
+        self.assertIsNone(primeira['previous'])
+        segunda = self.get(primeira['next']).json()
+        de_volta = self.get(segunda['previous']).json()
+        self.assertEqual([r['id'] for r in de_volta['results']], self.esperado[:3])
+
+    def test_cursor_anterior_no_meio_de_um_empate(self):
+        # Anterior a partir da 3ª marcação (mesmo dia e horário da 2ª e da 4ª): só as 2 antes dela.
+        terceira = next(r for r in self.registros if r.pk == self.esperado[2])
+        resposta = self.get(self.url, cursor=codificar_cursor(terceira, ANTERIOR), por_pagina=10).json()
+        self.assertEqual([r['id'] for r in resposta['results']], self.esperado[:2])
+        self.assertIsNone(resposta['previous'])
 
-# Create your tests here.
+    def test_cursor_invalido_da_404(self):
+        for cursor in ('lixo', 'eyJ4IjoxfQ', codificar_cursor(self.registros[0], 'x')):
+            self.assertEqual(self.get(self.url, cursor=cursor).status_code, 404)
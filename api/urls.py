@@ -9,7 +9,9 @@ from .views import (
     RegistroPontoViewSet, 
     verificar_cpf_mobile, 
     registrar_ponto_por_cpf,
-    buscar_registros_historico
+    buscar_registros_historico,
+    ocupacao_estabelecimentos,
+    matriz_ausencias_profissionais
 )
 
 from .views_comprovantes import (
@@ -36,6 +38,12 @@ urlpatterns = [
     # ENDPOINT DE HISTÓRICO
     path('buscar-registros-historico/', buscar_registros_historico, name='buscar_registros_historico'),
     
+    # QUADRO DE OCUPAÇÃO (quem está dentro agora)
+    path('ocupacao/', ocupacao_estabelecimentos, name='ocupacao_estabelecimentos'),
+    
+    # MATRIZ DE FALTAS (mapas de presença)
+    path('ausencias/', matriz_ausencias_profissionais, name='matriz_ausencias'),
+    
     # COMPROVANTES (PORTARIA 671)
     # ⚠️ CORRIGIDO: <int:registro_id> -> <uuid:codigo>, para não expor IDs sequenciais
     path('comprovante/<uuid:codigo>/', comprovante_completo, name='comprovante_completo'),
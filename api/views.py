@@ -7,15 +7,20 @@ from django.db.models import Q
 from django.utils import timezone
 import pytz
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, permission_classes, throttle_classes, action
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, throttle_classes, action
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.throttling import AnonRateThrottle
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from estabelecimentos.models import Estabelecimento
 from ponto.models import RegistroPonto
+from ponto.ocupacao import quadro_ocupacao
+from ponto.presenca import matriz_ausencias
 from usuarios.models import Profissional
+from timeflow.db_router import ler_da_replica
+from .paginacao import PaginacaoCursorRegistros
 from .serializers import (
     ProfissionalSerializer, EstabelecimentoSerializer,
     RegistroPontoSerializer, RegistroPontoCreateSerializer
@@ -71,13 +76,16 @@ class RegistroPontoViewSet(viewsets.ModelViewSet):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = RegistroPontoSerializer
+    # Cursor em (data, horário, id): o histórico de anos pagina no índice
+    # (profissional, data), sem OFFSET nem COUNT(*)
+    pagination_class = PaginacaoCursorRegistros
     
     def get_queryset(self):
         if hasattr(self.request.user, 'profissional'):
             profissional = self.request.user.profissional
             return RegistroPonto.objects.filter(
                 profissional=profissional
-            ).order_by('-data', '-horario')
+            ).select_related('profissional', 'estabelecimento').order_by('-data', '-horario', '-id')
         return RegistroPonto.objects.none()
     
     @action(detail=False, methods=['get'])
@@ -95,7 +103,7 @@ class RegistroPontoViewSet(viewsets.ModelViewSet):
             registros = RegistroPonto.objects.filter(
                 profissional=profissional,
                 data=hoje
-            ).order_by('horario')
+            ).select_related('profissional', 'estabelecimento').order_by('horario')
             
             serializer = RegistroPontoSerializer(registros, many=True)
             return Response({
@@ -392,7 +400,7 @@ def registrar_ponto_por_cpf(request):
             )
         
         atraso_minutos, dentro_tolerancia = calcular_tolerancia(
-            profissional, horario_atual, tipo
+            profissional, horario_atual, tipo, hoje
         )
         
         registro = RegistroPonto(
@@ -403,10 +411,8 @@ def registrar_ponto_por_cpf(request):
             tipo=tipo,
             latitude=latitude,
             longitude=longitude,
-            atraso_minutos=atraso_minutos if tipo == 'ENTRADA' else 0,
-            saida_antecipada_minutos=atraso_minutos if tipo == 'SAIDA' else 0,
-            dentro_tolerancia=dentro_tolerancia
         )
+        registro.definir_tolerancia(atraso_minutos, dentro_tolerancia)
         
         registro.save()
         
@@ -532,7 +538,7 @@ def buscar_registros_historico(request):
         profissional = Profissional.objects.filter(
             Q(cpf=cpf_limpo) | Q(cpf=cpf_formatado),
             ativo=True
-        ).first()
+        ).select_related('profissao', 'estabelecimento').first()
         
         if not profissional:
             return Response({
@@ -542,7 +548,7 @@ def buscar_registros_historico(request):
         
         registros = RegistroPonto.objects.filter(
             profissional=profissional
-        ).order_by('-data', '-horario')
+        ).select_related('profissional', 'estabelecimento').order_by('-data', '-horario')
         
         if data_inicio_str:
             try:
@@ -627,4 +633,106 @@ def buscar_registros_historico(request):
         return Response({
             'sucesso': False,
             'erro': 'Erro interno no servidor'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication, SessionAuthentication])
+@permission_classes([IsAdminUser])
+def ocupacao_estabelecimentos(request):
+    """
+    Quem está dentro agora (ou às ?horario=HH:MM de hoje), por
+    estabelecimento (?estabelecimento=<id>) ou no município todo.
+    Lido do índice em memória de ponto/ocupacao.py.
+    """
+    estabelecimento_id = request.GET.get('estabelecimento')
+    horario_str = request.GET.get('horario')
+    
+    horario = None
+    if horario_str:
+        try:
+            horario = datetime.strptime(horario_str, '%H:%M').time()
+        except ValueError:
+            return Response({
+                'sucesso': False,
+                'erro': 'Formato de horario inválido. Use HH:MM'
+            }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if estabelecimento_id:
+        if not estabelecimento_id.isdigit() or not Estabelecimento.objects.filter(id=estabelecimento_id).exists():
+            return Response({
+                'sucesso': False,
+                'erro': 'Estabelecimento não encontrado'
+            }, status=status.HTTP_404_NOT_FOUND)
+        estabelecimento_ids = [int(estabelecimento_id)]
+    else:
+        estabelecimento_ids = list(Estabelecimento.objects.values_list('id', flat=True))
+    
+    quadro = quadro_ocupacao(estabelecimento_ids, horario)
+    return Response({
+        'sucesso': True,
+        'estabelecimento_id': int(estabelecimento_id) if estabelecimento_id else None,
+        'data': timezone.now().date().isoformat(),
+        'horario': horario.strftime('%H:%M') if horario else None,
+        'total': quadro['total'],
+        'por_profissao': quadro['por_profissao'],
+        'presentes': [
+            {**presente, 'desde': presente['desde'].strftime('%Y-%m-%d %H:%M')}
+            for presente in quadro['presentes']
+        ],
+    })
+
+
+PERIODO_MAXIMO_AUSENCIAS = 366
+
+
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication, SessionAuthentication])
+@permission_classes([IsAdminUser])
+@ler_da_replica
+def matriz_ausencias_profissionais(request):
+    """
+    Matriz de faltas dos profissionais ativos (?estabelecimento=<id> ou
+    todos) entre ?data_inicio e ?data_fim (AAAA-MM-DD; padrão: mês atual até
+    hoje, no máximo 366 dias). Lida dos mapas de presença de
+    ponto/presenca.py — não percorre marcações.
+    Em mapa_faltas/mapa_presenca, o caractere i é o dia data_inicio + i.
+    """
+    hoje = timezone.now().date()
+    try:
+        data_inicio = datetime.strptime(request.GET['data_inicio'], '%Y-%m-%d').date() \
+            if request.GET.get('data_inicio') else hoje.replace(day=1)
+        data_fim = datetime.strptime(request.GET['data_fim'], '%Y-%m-%d').date() \
+            if request.GET.get('data_fim') else hoje
+    except ValueError:
+        return Response({
+            'sucesso': False,
+            'erro': 'Formato de data inválido. Use AAAA-MM-DD'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if data_fim < data_inicio or (data_fim - data_inicio).days + 1 > PERIODO_MAXIMO_AUSENCIAS:
+        return Response({
+            'sucesso': False,
+            'erro': f'Período inválido (data_fim >= data_inicio, no máximo {PERIODO_MAXIMO_AUSENCIAS} dias)'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    profissionais = Profissional.objects.filter(ativo=True).select_related('escala', 'estabelecimento')
+    estabelecimento_id = request.GET.get('estabelecimento')
+    if estabelecimento_id:
+        if not estabelecimento_id.isdigit() or not Estabelecimento.objects.filter(id=estabelecimento_id).exists():
+            return Response({
+                'sucesso': False,
+                'erro': 'Estabelecimento não encontrado'
+            }, status=status.HTTP_404_NOT_FOUND)
+        profissionais = profissionais.filter(estabelecimento_id=estabelecimento_id)
+    
+    linhas = matriz_ausencias(profissionais.order_by('nome'), data_inicio, data_fim)
+    return Response({
+        'sucesso': True,
+        'estabelecimento_id': int(estabelecimento_id) if estabelecimento_id else None,
+        'data_inicio': data_inicio.isoformat(),
+        'data_fim': data_fim.isoformat(),
+        'total_profissionais': len(linhas),
+        'total_faltas': sum(linha['faltas'] for linha in linhas),
+        'profissionais': linhas,
+    })
@@ -6,11 +6,11 @@ from io import BytesIO
 from datetime import datetime
 
 from django.http import JsonResponse
-from django.shortcuts import get_object_or_404
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from django.utils import timezone
 
+from ponto.arquivamento import primeiro_dia_nao_arquivado
 from ponto.models import RegistroPonto
 from usuarios.models import Profissional
 
@@ -21,14 +21,32 @@ from usuarios.models import Profissional
 # (o funcionário vê o comprovante na hora, sem precisar logar de novo no
 # totem/celular), mas agora só quem TEM o código específico do registro
 # consegue acessar os dados dele.
+#
+# Marcações de meses arquivados (ponto/arquivamento.py) não estão mais no
+# banco e o arquivo não é indexado por código: o comprovante delas responde
+# 404 dizendo isso, em vez de um "não encontrado" que parece fraude.
+
+
+def _nao_encontrado():
+    limite = primeiro_dia_nao_arquivado()
+    erro = 'Comprovante não encontrado.'
+    if limite:
+        erro += (
+            f' Marcações anteriores a {limite:%d/%m/%Y} foram arquivadas e não são'
+            ' consultadas por aqui: peça a conferência ao RH (espelho ou AFD do mês).'
+        )
+    return JsonResponse({'sucesso': False, 'valido': False, 'erro': erro}, status=404)
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def comprovante_completo(request, codigo):
     """Retorna comprovante completo com QR Code incluído"""
     
+    registro = RegistroPonto.objects.filter(codigo_validacao=codigo).first()
+    if registro is None:
+        return _nao_encontrado()
     try:
-        registro = get_object_or_404(RegistroPonto, codigo_validacao=codigo)
         profissional = registro.profissional
         
         hora_entrada_cadastrada = None
@@ -112,8 +130,10 @@ def comprovante_completo(request, codigo):
 @permission_classes([AllowAny])
 def gerar_comprovante_pdf(request, codigo):
     """Gera JSON do comprovante (pode ser convertido para PDF depois)"""
+    registro = RegistroPonto.objects.filter(codigo_validacao=codigo).first()
+    if registro is None:
+        return _nao_encontrado()
     try:
-        registro = get_object_or_404(RegistroPonto, codigo_validacao=codigo)
         profissional = registro.profissional
         
         hora_entrada_cadastrada = None
@@ -169,8 +189,10 @@ def gerar_comprovante_pdf(request, codigo):
 @permission_classes([AllowAny])
 def gerar_qr_code(request, codigo):
     """Gera QR Code com dados do registro"""
+    registro = RegistroPonto.objects.filter(codigo_validacao=codigo).first()
+    if registro is None:
+        return _nao_encontrado()
     try:
-        registro = get_object_or_404(RegistroPonto, codigo_validacao=codigo)
         profissional = registro.profissional
         
         hora_entrada_cadastrada = None
@@ -234,8 +256,10 @@ def gerar_qr_code(request, codigo):
 @permission_classes([AllowAny])
 def validar_registro(request, codigo):
     """API para validar um registro via QR Code"""
+    registro = RegistroPonto.objects.filter(codigo_validacao=codigo).first()
+    if registro is None:
+        return _nao_encontrado()
     try:
-        registro = get_object_or_404(RegistroPonto, codigo_validacao=codigo)
         profissional = registro.profissional
         
         hora_entrada_cadastrada = None
@@ -0,0 +1,160 @@
+# core/cache_painel.py
+"""
+Cache por seção do dashboard administrativo.
+
+O dashboard é recarregado o tempo todo pelos coordenadores e quase sempre
+nada mudou desde a última visita. Cada seção (contagens, rankings, painel
+do dia, últimos registros, lista de estabelecimentos...) fica no cache do
+Django com uma chave que inclui:
+
+- o nome da seção e os parâmetros dela (período, estabelecimento, data);
+- a versão de cada "fonte" de que ela depende.
+
+As fontes são contadores no cache, incrementados pelos signals de
+core/signals.py:
+
+- 'registros_hoje':    marcação gravada/excluída com data de hoje (ou futura);
+- 'registros_passado': marcação de dia anterior — só ajuste manual,
+                       recálculo de tolerância, reconstrução do resumo;
+- 'cadastro':          profissional ou estabelecimento alterado.
+
+Incrementar a versão não apaga nada: as chaves antigas deixam de ser lidas
+e expiram sozinhas. Período todo no passado não depende de
+'registros_hoje', então não é invalidado pelas batidas do dia. E como a
+data de hoje entra na chave, a virada do dia também troca as chaves.
+
+Seção calculada na réplica de leitura (timeflow/db_router.py) fica no cache
+só por REPLICA_JANELA_POS_ESCRITA segundos.
+
+Com mais de um processo (gunicorn com vários workers) o cache precisa ser
+compartilhado — ver CACHES em timeflow/settings.py. Com o LocMemCache
+padrão, a versão trocada por um worker não chega aos outros: aí cada seção
+fica no cache só por CACHE_VALIDADE_LOCAL segundos (timeflow/cache.py).
+
+Acertos e faltas de cada seção são contados no próprio cache
+(estatisticas_cache()), expostos em /painel/cache/.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from timeflow.cache import validade_local
+from timeflow.db_router import janela_pos_escrita, usando_replica
+
+PREFIXO = 'painel'
+
+REGISTROS_HOJE = 'registros_hoje'
+REGISTROS_PASSADO = 'registros_passado'
+CADASTRO = 'cadastro'
+FONTES = (REGISTROS_HOJE, REGISTROS_PASSADO, CADASTRO)
+
+SECOES = (
+    'estabelecimentos',
+    'totais',
+    'contagens_hoje',
+    'periodo',
+    'painel_dia',
+    'ultimos_registros',
+)
+
+
+def _timeout():
+    timeout = getattr(settings, 'PAINEL_CACHE_TIMEOUT', 3600)
+    local = validade_local()
+    return timeout if local is None else min(timeout, local)
+
+
+def _chave_versao(fonte):
+    return f'{PREFIXO}:versao:{fonte}'
+
+
+def _incrementar(chave):
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.add(chave, 0, timeout=None)
+        cache.incr(chave)
+
+
+def versoes(fontes):
+    """Versões atuais das fontes, na ordem pedida (uma ida ao cache)."""
+    chaves = [_chave_versao(fonte) for fonte in fontes]
+    atuais = cache.get_many(chaves)
+    faltando = {chave: 1 for chave in chaves if chave not in atuais}
+    if faltando:
+        for chave in faltando:
+            cache.add(chave, 1, timeout=None)
+        atuais.update(cache.get_many(list(faltando)))
+    return [atuais.get(chave, 1) for chave in chaves]
+
+
+def invalidar(*fontes):
+    for fonte in fontes:
+        _incrementar(_chave_versao(fonte))
+
+
+def invalidar_datas(datas, hoje):
+    """Invalida as fontes de registros conforme as datas afetadas por uma escrita."""
+    fontes = set()
+    for data in datas:
+        if data is None:
+            continue
+        fontes.add(REGISTROS_HOJE if data >= hoje else REGISTROS_PASSADO)
+    invalidar(*sorted(fontes))
+
+
+def fontes_periodo(data_inicio, data_fim, hoje):
+    """Fontes de registros de que um período depende."""
+    fontes = []
+    if data_inicio < hoje:
+        fontes.append(REGISTROS_PASSADO)
+    if data_fim >= hoje:
+        fontes.append(REGISTROS_HOJE)
+    return tuple(fontes)
+
+
+def secao(nome, partes, fontes, calcular):
+    """
+    Valor da seção `nome` pros parâmetros `partes`, calculado por
+    `calcular()` só se não estiver no cache com as versões atuais de
+    `fontes`. O valor precisa ser serializável — listas/dicts, não
+    querysets preguiçosos.
+    """
+    assinatura = '.'.join(f'{fonte}{versao}' for fonte, versao in zip(fontes, versoes(fontes)))
+    parametros = ':'.join(str(parte) for parte in partes)
+    chave = f'{PREFIXO}:{nome}:{assinatura}:{parametros}'
+
+    valor = cache.get(chave)
+    if valor is not None:
+        _incrementar(f'{PREFIXO}:acertos:{nome}')
+        return valor
+
+    _incrementar(f'{PREFIXO}:faltas:{nome}')
+    timeout = _timeout()
+    if usando_replica():
+        # A réplica pode ainda não ter a marcação que acabou de trocar a
+        # versão: o valor lido dela vale só pela janela de atraso.
+        timeout = min(timeout, janela_pos_escrita())
+    valor = calcular()
+    cache.set(chave, valor, timeout)
+    return valor
+
+
+def estatisticas_cache():
+    """{'secoes': {nome: {'acertos', 'faltas', 'taxa_acerto'}}, 'versoes': {...}}"""
+    chaves = [f'{PREFIXO}:{tipo}:{nome}' for nome in SECOES for tipo in ('acertos', 'faltas')]
+    contadores = cache.get_many(chaves)
+
+    secoes = {}
+    for nome in SECOES:
+        acertos = contadores.get(f'{PREFIXO}:acertos:{nome}', 0)
+        faltas = contadores.get(f'{PREFIXO}:faltas:{nome}', 0)
+        total = acertos + faltas
+        secoes[nome] = {
+            'acertos': acertos,
+            'faltas': faltas,
+            'taxa_acerto': round(acertos / total * 100, 1) if total else None,
+        }
+    return {
+        'secoes': secoes,
+        'versoes': dict(zip(FONTES, versoes(FONTES))),
+    }
@@ -0,0 +1,316 @@
+# core/cache_pdf.py
+"""
+Cache em disco dos PDFs de relatório de períodos fechados.
+
+O mesmo relatório de um mês que já passou é baixado várias vezes (o
+profissional, o coordenador, o RH) e a cada download o WeasyPrint gerava
+tudo de novo. Aqui o PDF gerado fica em settings.PDF_CACHE_DIRETORIO, com
+o nome derivado do que ele é e do conteúdo de que ele depende:
+
+- o que ele é (o prefixo do nome): tipo, período, a versão do template
+  (hash do código-fonte do HTML/CSS + VERSAO_FORMATO, que deve ser
+  incrementada quando o contexto montado em core/documentos.py mudar) e
+  quem pediu (o nome sai impresso no PDF);
+- a versão dos dados: o cadastro do profissional e da escala, os feriados
+  do período e os contadores do resumo diário (ponto/resumo_diario.py) do
+  profissional no período ± 1 dia — quantas linhas e o maior atualizado_em,
+  com o updated_at do estabelecimento de cada uma. Toda marcação gravada ou
+  excluída regrava a linha do dia (mesmo um ajuste que só mexe na
+  justificativa), então a versão muda sem ler marcação nenhuma: um acerto
+  ou um 304 custa uma consulta agregada, não o período inteiro.
+
+O `gerado_em` fica de fora: o PDF servido do cache mostra quando foi gerado
+de fato. Qualquer mudança nos dados vira outra chave — nada é servido
+velho. Quando a versão nova do PDF é gravada, as antigas do mesmo prefixo
+saem na hora; e a edição retroativa de uma marcação (core/signals.py) apaga
+os arquivos do profissional cujo período contém a data — a batida do dia,
+que não cai em período fechado nenhum, não mexe no disco.
+
+Só entra no cache período todo no passado (data_fim < hoje): o mês corrente
+muda a cada batida.
+
+Tamanho: settings.PDF_CACHE_LIMITE_MB. Cada acerto atualiza o mtime do
+arquivo; o processo soma o que grava numa estimativa e só percorre a pasta
+quando ela passa do limite (ou a cada RESSINCRONIZAR_A_CADA gravações, pra
+contar o que os outros processos gravaram) — aí os arquivos com mtime mais
+antigo saem até sobrar 90% do limite (LRU).
+
+A chave também é o ETag da resposta: download repetido com If-None-Match
+recebe 304 sem nem abrir o arquivo.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import FileResponse, HttpResponse
+from django.template.loader import get_template
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from ponto.models import ResumoDiarioPonto
+
+logger = logging.getLogger(__name__)
+
+VERSAO_FORMATO = 1
+RESSINCRONIZAR_A_CADA = 100
+
+TEMPLATES = {
+    'profissional': ('core/relatorio_profissional_pdf.html', 'core/relatorio_profissional_pdf.css'),
+    'consolidado': ('core/relatorio_consolidado_pdf.html',),
+}
+
+_versoes_template = {}
+# Bytes no disco segundo este processo (None: ainda não contou) e gravações
+# desde a última contagem.
+_uso = {'bytes': None, 'gravacoes': 0}
+
+
+def diretorio():
+    return getattr(settings, 'PDF_CACHE_DIRETORIO', os.path.join(settings.BASE_DIR, 'cache_pdf'))
+
+
+def limite_bytes():
+    return getattr(settings, 'PDF_CACHE_LIMITE_MB', 500) * 1024 * 1024
+
+
+def cacheavel(data_fim, hoje):
+    return data_fim is not None and data_fim < hoje and limite_bytes() > 0
+
+
+def versao_template(tipo):
+    """Hash do código-fonte dos templates do tipo (calculado uma vez por processo)."""
+    if tipo not in _versoes_template:
+        resumo = hashlib.sha256(str(VERSAO_FORMATO).encode())
+        for nome in TEMPLATES[tipo]:
+            resumo.update(get_template(nome).template.source.encode('utf-8'))
+        _versoes_template[tipo] = resumo.hexdigest()
+    return _versoes_template[tipo]
+
+
+def _valores(instancia):
+    if instancia is None:
+        return None
+    return [getattr(instancia, campo.attname) for campo in instancia._meta.concrete_fields]
+
+
+def _hash(*partes):
+    resumo = hashlib.sha256()
+    for parte in partes:
+        resumo.update(repr(parte).encode('utf-8'))
+        resumo.update(b'\0')
+    return resumo.hexdigest()
+
+
+def versao_resumos(profissional_id, data_inicio, data_fim, estabelecimento_id=None):
+    """(linhas, maior atualizado_em, maior updated_at do estabelecimento) do
+    resumo diário no período ± 1 dia — o mesmo recorte das marcações do
+    relatório. Uma consulta agregada."""
+    resumos = ResumoDiarioPonto.objects.filter(
+        profissional_id=profissional_id,
+        data__gte=data_inicio - timedelta(days=1),
+        data__lte=data_fim + timedelta(days=1),
+    )
+    if estabelecimento_id:
+        resumos = resumos.filter(estabelecimento_id=estabelecimento_id)
+    agregado = resumos.aggregate(
+        linhas=Count('pk'), atualizado=Max('atualizado_em'), estabelecimento=Max('estabelecimento__updated_at'),
+    )
+    return agregado['linhas'], agregado['atualizado'], agregado['estabelecimento']
+
+
+def prefixo_relatorio(tipo, relatorio, usuario):
+    """Começo do nome do arquivo: o que o PDF é, sem a versão dos dados."""
+    identidade = _hash(versao_template(tipo), relatorio.estabelecimento_id, usuario)[:16]
+    return f'{tipo}_{relatorio.data_inicio:%Y%m%d}_{relatorio.data_fim:%Y%m%d}_{identidade}_'
+
+
+def chave_relatorio(tipo, relatorio, usuario):
+    """Chave do PDF do RelatorioProfissional — muda com qualquer dado que entra
+    nele, sem carregar as marcações."""
+    profissional = relatorio.profissional
+    return prefixo_relatorio(tipo, relatorio, usuario) + _hash(
+        _valores(profissional),
+        _valores(profissional.escala),
+        sorted(relatorio.feriados),
+        versao_resumos(profissional.pk, relatorio.data_inicio, relatorio.data_fim, relatorio.estabelecimento_id),
+    )
+
+
+def _pasta(profissional_id):
+    return os.path.join(diretorio(), str(profissional_id))
+
+
+def caminho(profissional_id, chave):
+    return os.path.join(_pasta(profissional_id), f'{chave}.pdf')
+
+
+def obter(arquivo):
+    """True se o PDF está no cache (e marca o uso pro LRU)."""
+    try:
+        os.utime(arquivo)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _remover(arquivo):
+    """Tamanho do arquivo removido (0 se já não estava lá)."""
+    try:
+        tamanho = os.path.getsize(arquivo)
+        os.remove(arquivo)
+    except FileNotFoundError:
+        return 0
+    return tamanho
+
+
+def _remover_versoes_antigas(arquivo):
+    """Apaga as outras versões do mesmo PDF (mesmo prefixo, outros dados).
+    Retorna os bytes liberados."""
+    pasta, nome = os.path.split(arquivo)
+    prefixo = nome[:nome.rindex('_') + 1]
+    liberados = 0
+    for outro in os.listdir(pasta):
+        if outro != nome and outro.startswith(prefixo) and outro.endswith('.pdf'):
+            liberados += _remover(os.path.join(pasta, outro))
+    return liberados
+
+
+def gravar(arquivo, conteudo):
+    """Grava o PDF (troca atômica: quem estiver lendo nunca vê arquivo pela metade)
+    no lugar das versões antigas dele.
+    False se não deu pra gravar — aí o PDF é entregue direto, sem cache."""
+    pasta = os.path.dirname(arquivo)
+    os.makedirs(pasta, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'wb') as saida:
+            saida.write(conteudo)
+        os.replace(temporario, arquivo)
+    except OSError:
+        logger.exception('Não foi possível gravar %s no cache de PDF', arquivo)
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        return False
+    _contabilizar(len(conteudo) - _remover_versoes_antigas(arquivo))
+    return True
+
+
+def _contabilizar(diferenca):
+    """Soma a gravação na estimativa do processo; percorre a pasta (e aplica o
+    limite) só quando ela passa do limite ou já está velha demais."""
+    _uso['gravacoes'] += 1
+    if _uso['bytes'] is None or _uso['gravacoes'] >= RESSINCRONIZAR_A_CADA:
+        aplicar_limite()
+        return
+    _uso['bytes'] += diferenca
+    if _uso['bytes'] > limite_bytes():
+        aplicar_limite()
+
+
+def _arquivos():
+    for raiz, _pastas, nomes in os.walk(diretorio()):
+        for nome in nomes:
+            if not nome.endswith('.pdf'):
+                continue
+            arquivo = os.path.join(raiz, nome)
+            try:
+                estado = os.stat(arquivo)
+            except FileNotFoundError:
+                continue
+            yield arquivo, estado.st_size, estado.st_mtime
+
+
+def aplicar_limite(limite=None):
+    """Remove os PDFs usados há mais tempo até caber no limite. Retorna quantos
+    saíram. Recomeça a estimativa de uso do processo com o total contado."""
+    limite = limite_bytes() if limite is None else limite
+    arquivos = list(_arquivos())
+    total = sum(tamanho for _arquivo, tamanho, _uso_arquivo in arquivos)
+    removidos = 0
+    if total > limite:
+        alvo = limite * 0.9
+        for arquivo, tamanho, _uso_arquivo in sorted(arquivos, key=lambda item: item[2]):
+            if total <= alvo:
+                break
+            _remover(arquivo)
+            total -= tamanho
+            removidos += 1
+    _uso['bytes'], _uso['gravacoes'] = total, 0
+    return removidos
+
+
+def _periodo(nome):
+    """(início, fim) do nome do arquivo, ou None se não for um PDF do cache."""
+    partes = nome.split('_')
+    if len(partes) != 5:
+        return None
+    try:
+        return (
+            date(int(partes[1][:4]), int(partes[1][4:6]), int(partes[1][6:])),
+            date(int(partes[2][:4]), int(partes[2][4:6]), int(partes[2][6:])),
+        )
+    except ValueError:
+        return None
+
+
+def invalidar_profissional(profissional_id, datas):
+    """Apaga os PDFs do profissional cujo período (± 1 dia, como as marcações
+    do relatório) contém alguma das datas."""
+    pasta = _pasta(profissional_id)
+    try:
+        nomes = os.listdir(pasta)
+    except FileNotFoundError:
+        return 0
+    datas = [data for data in datas if data is not None]
+    removidos = 0
+    for nome in nomes:
+        periodo = _periodo(nome)
+        if periodo is None:
+            continue
+        inicio, fim = periodo
+        if any(inicio - timedelta(days=1) <= data <= fim + timedelta(days=1) for data in datas):
+            if _remover(os.path.join(pasta, nome)):
+                removidos += 1
+    return removidos
+
+
+def resposta_nao_modificada(request, chave):
+    """304 se o navegador já tem esta versão (If-None-Match), senão None."""
+    return get_conditional_response(request, etag=quote_etag(chave))
+
+
+def resposta_arquivo(arquivo, chave, nome_arquivo):
+    response = FileResponse(open(arquivo, 'rb'), content_type='application/pdf',
+                            as_attachment=True, filename=nome_arquivo)
+    response['ETag'] = quote_etag(chave)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def pdf_em_cache(request, tipo, relatorio, usuario, gerar, nome_arquivo):
+    """
+    Resposta do PDF do relatório, servida do cache quando possível.
+
+    `gerar()` devolve (nome_arquivo, bytes) e só é chamada numa falta;
+    `nome_arquivo` é o nome do download quando o PDF vem do cache.
+    """
+    chave = chave_relatorio(tipo, relatorio, usuario)
+    nao_modificada = resposta_nao_modificada(request, chave)
+    if nao_modificada is not None:
+        return nao_modificada
+
+    arquivo = caminho(relatorio.profissional.pk, chave)
+    if obter(arquivo):
+        return resposta_arquivo(arquivo, chave, nome_arquivo)
+
+    nome_arquivo, conteudo = gerar()
+    if not gravar(arquivo, conteudo):
+        response = HttpResponse(conteudo, content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
+        response['ETag'] = quote_etag(chave)
+        return response
+    return resposta_arquivo(arquivo, chave, nome_arquivo)
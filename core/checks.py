@@ -0,0 +1,31 @@
+# core/checks.py
+"""
+Checagens do `manage.py check` (e do runserver/migrate, que rodam as
+mesmas) pra configuração que funciona num processo só e quebra em produção.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from timeflow.cache import cache_por_processo
+
+
+@register(Tags.caches, Tags.database)
+def cache_compartilhado_com_replicas(app_configs, **kwargs):
+    """
+    Com réplica de leitura, a janela pós-escrita (timeflow/db_router.py) é
+    uma marca no cache `default`: gravada pelo processo que atendeu o POST
+    e lida por qualquer outro. Num cache por processo o próximo request cai
+    em outro worker, não vê a marca e lê da réplica atrasada — o usuário
+    não enxerga o que acabou de gravar.
+    """
+    if not getattr(settings, 'REPLICAS_LEITURA', []):
+        return []
+    if not cache_por_processo():
+        return []
+    backend = settings.CACHES['default']['BACKEND']
+    return [Error(
+        f'DB_REPLICAS configurado com o cache default em {backend}.',
+        hint='Use um cache compartilhado entre os processos, ex.: '
+             'CACHE_BACKEND=django.core.cache.backends.redis.RedisCache.',
+        id='core.E001',
+    )]
@@ -0,0 +1,124 @@
+# core/consultas.py
+"""
+Contagem das consultas SQL de um request (ou de um bloco de código):
+quantas, quanto tempo no banco e quantas de cada "forma" — o SQL com os
+valores trocados por `?` e listas de IN/VALUES reduzidas a `(...)`. A mesma
+forma repetida várias vezes num request é o sinal de N+1 (um FK lido por
+linha dentro de um loop ou template).
+
+Usada pelo OrcamentoConsultasMiddleware (core/middleware.py), que registra
+cada request no log, e pelos testes (core/testing.py), que falham quando
+uma URL passa do orçamento de ORCAMENTOS.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+# Consultas por request, pelo nome da URL (`app:nome` quando a URL tem
+# namespace), contando sessão e usuário. Valem pra qualquer volume de
+# dados: view que cresce com o número de linhas é N+1, não orçamento
+# apertado. Ao mudar uma view, ajuste o número junto — de preferência pra
+# baixo. core/tests_orcamentos.py confere todas; URL nova aqui ganha caso lá.
+ORCAMENTOS = {
+    # core
+    'core:dashboard': 20,
+    'core:relatorios_gerais': 9,
+    'core:exportar_registros_csv': 4,
+    'core:exportar_registros_xlsx': 4,
+    'core:relatorio_profissional': 10,
+    'core:relatorio_profissional_pdf': 9,
+    'core:relatorios_estabelecimento_pdf': 8,
+    'core:historico_pontos': 9,
+    'core:horas_trabalhadas': 9,
+    'core:analise_frequencia': 8,
+    'core:relatorio_consolidado': 10,
+    'core:meu_perfil': 8,
+    'core:estatisticas_cache_painel': 3,
+    # ponto
+    'lista_ajustes_manuais': 4,
+    'meus_ajustes': 5,
+    'espelho_ponto': 7,
+    'api_dias_incompletos_batch': 5,
+    'registroponto-list': 4,
+    # api
+    'registros-list': 5,
+    'profissionais-list': 4,
+    'estabelecimentos-list': 4,
+    'buscar_registros_historico': 7,
+    'ocupacao_estabelecimentos': 5,
+    'matriz_ausencias': 7,
+    # usuarios
+    'usuarios:listar_profissionais': 8,
+    'usuarios:detalhar_profissional': 6,
+}
+
+_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_NUMERO = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LISTA = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_LISTAS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+# Controle de transação não conta como repetição.
+_CONTROLE = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT', 'BEGIN', 'COMMIT')
+
+
+def forma_sql(sql):
+    """SQL sem os valores: consultas que só diferem nos parâmetros ficam iguais."""
+    forma = _TEXTO.sub('?', sql)
+    forma = _NUMERO.sub('?', forma)
+    forma = _LISTA.sub('(...)', forma)
+    forma = _LISTAS.sub('(...)', forma)
+    return ' '.join(forma.split())
+
+
+def minimo_repeticoes():
+    return getattr(settings, 'CONSULTAS_REPETICOES_ALERTA', 3)
+
+
+class Consultas:
+    """
+    Wrapper de execução (connection.execute_wrapper) que conta as
+    consultas de todos os bancos (default e réplicas). Use com
+    `with consultas.gravando():`.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.tempo = 0.0
+        self.formas = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo += time.perf_counter() - inicio
+            self.total += 1
+            self.formas[forma_sql(sql)] += 1
+
+    @contextmanager
+    def gravando(self):
+        with ExitStack() as pilha:
+            for conexao in connections.all():
+                pilha.enter_context(conexao.execute_wrapper(self))
+            yield self
+
+    def repetidas(self, minimo=None):
+        """[(forma, vezes)] das formas executadas `minimo` vezes ou mais, da mais repetida."""
+        minimo = minimo or minimo_repeticoes()
+        return [
+            (forma, vezes) for forma, vezes in self.formas.most_common()
+            if vezes >= minimo and not forma.startswith(_CONTROLE)
+        ]
+
+    def resumo(self):
+        return f'{self.total} consulta(s), {self.tempo * 1000:.1f} ms no banco'
+
+    def relatorio(self, minimo=None):
+        """Resumo + formas repetidas, uma por linha (pro log e pros testes)."""
+        linhas = [self.resumo()]
+        for forma, vezes in self.repetidas(minimo):
+            linhas.append(f'  {vezes}x {forma[:300]}')
+        return '\n'.join(linhas)
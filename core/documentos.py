@@ -0,0 +1,108 @@
+# core/documentos.py
+"""
+Geração dos PDFs de relatório como funções puras: recebem o profissional, o
+período e o nome de quem pediu, e devolvem (nome_arquivo, bytes) — sem
+request, sem HttpResponse.
+
+As views chamam direto para períodos curtos; períodos longos viram tarefa
+na fila (tarefas/), e o worker chama as mesmas funções fora do request.
+
+`progresso`, quando informado, é chamado com (percentual, mensagem) nas
+etapas da geração — é como a tarefa mostra o andamento na tela.
+"""
+from django.template.loader import render_to_string
+from django.utils import timezone
+from weasyprint import HTML
+
+from ponto.presenca import frequencia_periodo
+from .relatorios import (
+    RelatorioProfissional, formatar_horas, obter_carga_horaria_timedelta,
+)
+
+
+def _sem_progresso(percentual, mensagem=''):
+    pass
+
+
+def contexto_relatorio_profissional_pdf(profissional, data_inicio, data_fim, usuario, relatorio=None):
+    """Contexto do template core/relatorio_profissional_pdf.html."""
+    relatorio = relatorio or RelatorioProfissional(profissional, data_inicio, data_fim)
+    carga_diaria = obter_carga_horaria_timedelta(profissional.carga_horaria_diaria)
+
+    horas_trabalhadas = relatorio.horas_trabalhadas
+    horas_previstas = relatorio.horas_previstas
+    classificacao_horas = relatorio.classificacao(carga_diaria=carga_diaria)
+
+    horas_por_dia = []
+    for data_dia, horas_dia in sorted(relatorio.horas_por_data.items()):
+        horas_por_dia.append({
+            'data': data_dia.strftime('%d/%m/%Y'),
+            'dia_semana': data_dia.strftime('%A'),
+            'horas': formatar_horas(horas_dia),
+            'horas_decimal': round(horas_dia.total_seconds() / 3600, 2),
+        })
+
+    return {
+        'profissional': profissional,
+        'registros': relatorio.registros,
+        'horas_por_dia': horas_por_dia,
+        'horas_trabalhadas': formatar_horas(horas_trabalhadas),
+        'horas_trabalhadas_decimal': round(horas_trabalhadas.total_seconds() / 3600, 2),
+        'carga_horaria_diaria': formatar_horas(carga_diaria),
+        'carga_horaria_semanal': formatar_horas(obter_carga_horaria_timedelta(profissional.carga_horaria_semanal)) if profissional.carga_horaria_semanal else '40:00',
+        'carga_horaria_esperada': formatar_horas(horas_previstas),
+        'diferenca_horas_decimal': round((horas_trabalhadas.total_seconds() - horas_previstas.total_seconds()) / 3600, 2),
+        'classificacao_horas': classificacao_horas['totais'],
+        'classificacao_por_dia': classificacao_horas['dias'],
+        'total_registros': relatorio.total_registros,
+        'entradas': relatorio.entradas,
+        'saidas': relatorio.saidas,
+        'data_inicio': data_inicio.strftime('%d/%m/%Y'),
+        'data_fim': data_fim.strftime('%d/%m/%Y'),
+        'gerado_em': timezone.now(),
+        'usuario': usuario,
+    }
+
+
+def pdf_relatorio_profissional(profissional, data_inicio, data_fim, usuario, relatorio=None,
+                               base_url=None, progresso=_sem_progresso):
+    """(nome_arquivo, bytes) do PDF do relatório do profissional."""
+    progresso(10, 'Buscando marcações')
+    contexto = contexto_relatorio_profissional_pdf(profissional, data_inicio, data_fim, usuario, relatorio)
+    progresso(40, 'Montando o relatório')
+    html_string = render_to_string('core/relatorio_profissional_pdf.html', contexto)
+    progresso(60, 'Gerando o PDF')
+    conteudo = HTML(string=html_string, base_url=base_url).write_pdf()
+    nome_arquivo = f"relatorio_{profissional.cpf}_{timezone.now().strftime('%Y%m%d_%H%M')}.pdf"
+    return nome_arquivo, conteudo
+
+
+def contexto_relatorio_consolidado(profissional, data_inicio, data_fim, mes=None, ano=None, relatorio=None):
+    """Contexto do relatório consolidado (tela e PDF)."""
+    relatorio = relatorio or RelatorioProfissional(profissional, data_inicio, data_fim)
+    frequencia = frequencia_periodo(profissional, data_inicio, data_fim, relatorio.calendario)
+    return {
+        'profissional': profissional,
+        'data_inicio': data_inicio,
+        'data_fim': data_fim,
+        'horas_trabalhadas': relatorio.horas_trabalhadas,
+        'dias_uteis': frequencia['dias_previstos'],
+        'dias_trabalhados': frequencia['dias_trabalhados'],
+        'faltas': frequencia['faltas'],
+        'total_registros': relatorio.total_registros,
+        'entradas': relatorio.entradas,
+        'saidas': relatorio.saidas,
+        'mes': mes,
+        'ano': ano,
+    }
+
+
+def pdf_relatorio_consolidado(contexto, usuario, base_url=None, progresso=_sem_progresso):
+    """(nome_arquivo, bytes) do PDF do relatório consolidado."""
+    contexto = {**contexto, 'gerado_em': timezone.now(), 'usuario_gerador': usuario}
+    progresso(40, 'Montando o relatório')
+    html_string = render_to_string('core/relatorio_consolidado_pdf.html', contexto)
+    progresso(60, 'Gerando o PDF')
+    conteudo = HTML(string=html_string, base_url=base_url).write_pdf()
+    nome_arquivo = f"relatorio_consolidado_{contexto['profissional'].cpf}_{timezone.now().strftime('%Y%m%d_%H%M')}.pdf"
+    return nome_arquivo, conteudo
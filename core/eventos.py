@@ -0,0 +1,262 @@
+# core/eventos.py
+"""
+Eventos ao vivo do dashboard.
+
+Em vez de cada coordenador recarregar o dashboard inteiro a cada dois
+minutos, a página recebe um evento curto por marcação gravada e atualiza
+contadores e últimos registros no lugar. A recarga de dois minutos
+continua como rede de segurança.
+
+Canal entre processos: a tabela EventoPainel (core/models.py).
+publicar_registro() é chamado pelos signals de core/signals.py DEPOIS do
+commit e grava lá UMA linha por marcação, qualquer que seja o processo (ou
+servidor) que atendeu a batida. Quem lê expande a linha nos eventos que a
+tela recebe (expandir()). A leitura depende do servidor:
+
+- ASGI (ex.: `uvicorn timeflow.asgi:application`): /painel/eventos/ é um
+  stream SSE. Cada processo tem um `broker` com as telas conectadas a ele
+  (uma asyncio.Queue por tela) e UMA tarefa no event loop que, enquanto
+  houver tela conectada, lê a tabela a cada INTERVALO_CONSULTA segundos e
+  distribui pras filas — uma consulta por processo, não por tela. Quem
+  assina sem estabelecimento recebe tudo;
+- WSGI: um stream infinito prenderia um worker por tela aberta. A view
+  responde 204 ao EventSource (o navegador não reconecta) e a página passa
+  a consultar /painel/eventos/?desde=<id> a cada 15 segundos, que devolve
+  em JSON os eventos depois daquele id.
+
+Com os eventos chegando (stream aberto ou polling respondendo), a página
+não recarrega mais sozinha; a recarga de dois minutos fica só pra quando
+nenhum dos dois funciona.
+
+Fila cheia (tela parada, rede lenta) não segura o broker: a fila é
+esvaziada e o cliente recebe 'recarregar'. Eventos com mais de
+RETENCAO_EVENTOS são apagados por publicar_registro de tempos em tempos.
+
+Eventos enviados (campo `event:` do SSE, JSON no `data:`):
+- registro: marcação nova de hoje;
+- atraso:   entrada com atraso acima de ATRASO_GRAVE_MINUTOS;
+- situacao: o profissional ficou com turno aberto ('incompleto') ou
+            fechado ('completo') no dia — no estabelecimento, pra tela
+            filtrada, ou no dia todo, pra tela geral.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import threading
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.db.models import Max
+from django.utils import timezone
+
+ATRASO_GRAVE_MINUTOS = 30
+TAMANHO_FILA = 100
+INTERVALO_PING = 15
+INTERVALO_CONSULTA = 2
+RETENCAO_EVENTOS = timedelta(minutes=10)
+# Limpeza dos eventos antigos a cada tantos eventos gravados.
+LIMPEZA_A_CADA = 200
+LIMITE_POR_CONSULTA = 500
+
+logger = logging.getLogger(__name__)
+
+
+def formatar_evento(nome, dados, identificador=None):
+    linhas = [f'event: {nome}']
+    if identificador is not None:
+        linhas.append(f'id: {identificador}')
+    linhas.append(f'data: {json.dumps(dados, separators=(",", ":"), ensure_ascii=False)}')
+    return '\n'.join(linhas) + '\n\n'
+
+
+def ultimo_evento():
+    from .models import EventoPainel
+
+    return EventoPainel.objects.aggregate(ultimo=Max('pk'))['ultimo'] or 0
+
+
+def eventos_desde(ultimo, estabelecimento_id=None):
+    """
+    Linhas gravadas depois do id `ultimo`, em ordem: todas, ou só as do
+    estabelecimento (tela filtrada).
+    """
+    from .models import EventoPainel
+
+    eventos = EventoPainel.objects.filter(pk__gt=ultimo)
+    if estabelecimento_id:
+        eventos = eventos.filter(estabelecimento_id=estabelecimento_id)
+    return list(eventos.order_by('pk')[:LIMITE_POR_CONSULTA])
+
+
+def expandir(evento, filtrada):
+    """
+    [(nome, dados)] dos eventos de uma linha, pra tela filtrada pelo
+    estabelecimento da marcação (`filtrada`) ou pra tela geral.
+    """
+    dados = evento.dados
+    expandidos = []
+    registro = dados.get('registro')
+    if registro:
+        expandidos.append(('registro', registro))
+        if registro['tipo'] == 'ENTRADA' and registro['atraso'] > ATRASO_GRAVE_MINUTOS:
+            expandidos.append(('atraso', registro))
+    expandidos.append(('situacao', {
+        'profissional_id': dados['profissional_id'],
+        'estabelecimento_id': evento.estabelecimento_id,
+        'situacao': dados['situacao'] if filtrada else dados['situacao_geral'],
+    }))
+    return expandidos
+
+
+class Assinatura:
+    __slots__ = ('chave', 'fila')
+
+    def __init__(self, chave):
+        self.chave = chave
+        self.fila = asyncio.Queue(maxsize=TAMANHO_FILA)
+
+    def entregar(self, mensagem):
+        if self.fila.full():
+            while not self.fila.empty():
+                self.fila.get_nowait()
+            mensagem = formatar_evento('recarregar', {})
+        self.fila.put_nowait(mensagem)
+
+
+class Broker:
+    """Telas conectadas a este processo. Tudo roda no event loop do servidor ASGI."""
+
+    def __init__(self):
+        self._assinaturas = {}
+        self._lock = threading.Lock()
+        self._tarefa = None
+
+    def assinar(self, estabelecimento_id=None):
+        """Chamado dentro do event loop (view async). Liga a leitura da tabela se estiver parada."""
+        loop = asyncio.get_running_loop()
+        assinatura = Assinatura(estabelecimento_id)
+        with self._lock:
+            self._assinaturas.setdefault(estabelecimento_id, set()).add(assinatura)
+        if self._tarefa is None or self._tarefa.done() or self._tarefa.get_loop() is not loop:
+            # Contexto vazio: a tarefa vive mais que o request que a criou e
+            # não pode herdar o executor nem o roteamento de banco dele.
+            self._tarefa = contextvars.Context().run(loop.create_task, self._acompanhar())
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            assinaturas = self._assinaturas.get(assinatura.chave)
+            if assinaturas:
+                assinaturas.discard(assinatura)
+                if not assinaturas:
+                    del self._assinaturas[assinatura.chave]
+
+    def conexoes(self):
+        with self._lock:
+            return sum(len(assinaturas) for assinaturas in self._assinaturas.values())
+
+    def distribuir(self, evento):
+        """Entrega um EventoPainel, já expandido, pra quem assina o
+        estabelecimento dele e pra quem assina tudo."""
+        with self._lock:
+            filtradas = list(self._assinaturas.get(evento.estabelecimento_id, ()))
+            gerais = list(self._assinaturas.get(None, ()))
+        for destinos, filtrada in ((filtradas, True), (gerais, False)):
+            if not destinos:
+                continue
+            mensagem = ''.join(
+                formatar_evento(nome, dados, evento.pk) for nome, dados in expandir(evento, filtrada)
+            )
+            for assinatura in destinos:
+                assinatura.entregar(mensagem)
+
+    async def _acompanhar(self):
+        # Termina sozinha quando a última tela do processo desconecta.
+        ultimo = await sync_to_async(ultimo_evento)()
+        while self.conexoes():
+            await asyncio.sleep(INTERVALO_CONSULTA)
+            try:
+                eventos = await sync_to_async(eventos_desde)(ultimo)
+            except Exception:
+                # banco fora do ar: tenta de novo na próxima volta
+                logger.exception('Erro ao ler os eventos do painel')
+                continue
+            for evento in eventos:
+                self.distribuir(evento)
+                ultimo = evento.pk
+
+
+broker = Broker()
+
+
+async def fluxo_eventos(assinatura):
+    """Gerador do StreamingHttpResponse: eventos da fila + ping periódico."""
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                mensagem = await asyncio.wait_for(assinatura.fila.get(), timeout=INTERVALO_PING)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            yield mensagem
+    finally:
+        broker.cancelar(assinatura)
+
+
+def _situacao(resumos):
+    entradas = sum(resumo.entradas for resumo in resumos)
+    saidas = sum(resumo.saidas for resumo in resumos)
+    return 'incompleto' if entradas and not saidas else 'completo'
+
+
+def _situacoes(registro, criado):
+    """(no estabelecimento, no dia todo). Saída nova fecha os dois sem consultar nada."""
+    from ponto.models import ResumoDiarioPonto
+
+    if criado and registro.tipo == 'SAIDA':
+        return 'completo', 'completo'
+    # O dashboard filtrado olha só o estabelecimento; o geral, o dia todo.
+    resumos = list(ResumoDiarioPonto.objects.filter(
+        data=registro.data, profissional_id=registro.profissional_id
+    ).only('estabelecimento_id', 'entradas', 'saidas'))
+    do_estabelecimento = [r for r in resumos if r.estabelecimento_id == registro.estabelecimento_id]
+    return _situacao(do_estabelecimento), _situacao(resumos)
+
+
+def publicar_registro(registro, criado):
+    """
+    Uma linha de EventoPainel por marcação de hoje já commitada: os dados
+    da marcação (se é nova) e a situação do profissional, que sai do resumo
+    diário (ponto/resumo_diario.py) — no máximo uma consulta por marcação,
+    independente de quantas telas estão abertas.
+    """
+    from .models import EventoPainel
+
+    registro_dados = None
+    if criado:
+        registro_dados = {
+            'id': registro.pk,
+            'profissional_id': registro.profissional_id,
+            'profissional': registro.profissional.nome,
+            'estabelecimento_id': registro.estabelecimento_id,
+            'estabelecimento': registro.estabelecimento.nome,
+            'tipo': registro.tipo,
+            'data': registro.data.isoformat(),
+            'horario': registro.horario.strftime('%H:%M'),
+            'atraso': registro.atraso_minutos or 0,
+            'antecipacao': registro.saida_antecipada_minutos or 0,
+        }
+    situacao, situacao_geral = _situacoes(registro, criado)
+
+    evento = EventoPainel.objects.create(
+        nome='marcacao', estabelecimento_id=registro.estabelecimento_id, dados={
+            'profissional_id': registro.profissional_id,
+            'registro': registro_dados,
+            'situacao': situacao,
+            'situacao_geral': situacao_geral,
+        },
+    )
+    if evento.pk % LIMPEZA_A_CADA == 0:
+        EventoPainel.objects.filter(criado_em__lt=timezone.now() - RETENCAO_EVENTOS).delete()
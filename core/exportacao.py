@@ -0,0 +1,246 @@
+# core/exportacao.py
+"""
+Exportação das marcações (RegistroPonto) em CSV ou XLSX pra auditoria e
+folha de pagamento — o dump cru que relatorios_gerais, paginado de 20 em
+20, não dá.
+
+Filtros (todos opcionais, combináveis): data_inicio, data_fim,
+estabelecimento_id, profissional_id.
+
+Memória constante, seja qual for o tamanho do período:
+
+- as marcações são lidas em lotes de LOTE linhas, do menor pk pro maior
+  (pk > último pk do lote anterior), cada lote com iterator(chunk_size=...)
+  e os JOINs de profissional/estabelecimento/ajustado_por na mesma
+  consulta — nada de cache do queryset. Os lotes por pk existem
+  porque o iterator() sozinho só é streaming de verdade no SQLite e no
+  PostgreSQL; o driver do MySQL (mysqlclient) traz o resultado inteiro pra
+  memória antes do primeiro fetchmany;
+- CSV: gerador de texto, vai direto num StreamingHttpResponse;
+- XLSX: openpyxl em modo write-only (as linhas vão pra um arquivo
+  temporário do openpyxl, não ficam em memória), gravado num arquivo
+  temporário que a view devolve com FileResponse. Cada aba tem no máximo
+  LINHAS_POR_ABA linhas (limite do Excel: 1.048.576); passou disso, abre
+  outra aba.
+
+Meses arquivados (ponto/arquivamento.py): marcacoes_arquivadas_filtradas()
+lê do arquivo as marcações do período, com os mesmos filtros, e linhas()
+as escreve antes das do banco — elas são as mais antigas. Sem período que
+toque um mês arquivado, o arquivo nem é aberto.
+
+openpyxl é importado só na hora de gerar o XLSX — sem ele instalado, o
+CSV continua funcionando.
+"""
+import csv
+import io
+import tempfile
+from datetime import datetime
+from itertools import chain
+
+from ponto.arquivamento import com_relacionados, marcacoes_arquivadas
+from ponto.models import ESCALA_GPS, RegistroPonto
+
+LOTE = 2000
+LINHAS_POR_ABA = 1_000_000
+
+COLUNAS = [
+    'ID', 'NSR', 'Data', 'Horário', 'Tipo', 'CPF', 'Profissional', 'Estabelecimento',
+    'Latitude', 'Longitude', 'Dentro da tolerância', 'Atraso (min)', 'Saída antecipada (min)',
+    'Ajuste manual', 'Justificativa do ajuste', 'Ajustado por', 'Coletor', 'Offline',
+    'Hash', 'Criado em',
+]
+
+# Mesma ordem de COLUNAS. values_list (com os JOINs do select_related) em
+# vez de instâncias do modelo: montar 1 milhão de RegistroPonto custa mais
+# que a consulta. GPS e hash saem crus (inteiros e bytes) e são convertidos
+# em linhas() — ver RegistroPonto.latitude/.hash_registro.
+CAMPOS = (
+    'pk', 'nsr', 'data', 'horario', 'tipo', 'profissional__cpf', 'profissional__nome',
+    'estabelecimento__nome', 'latitude_e7', 'longitude_e7', 'dentro_tolerancia', 'atraso_minutos',
+    'saida_antecipada_minutos', 'ajuste_manual', 'ajuste__justificativa', 'ajustado_por__username',
+    'identificador_coletor', 'offline', 'hash_binario', 'created_at',
+)
+TIPOS = dict(RegistroPonto.TIPO_REGISTRO)
+COLETORES = dict(RegistroPonto.IDENTIFICADOR_COLETOR_CHOICES)
+
+
+def _data(valor):
+    try:
+        return datetime.strptime(valor or '', '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def _id(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def filtros_da_requisicao(parametros):
+    """Filtros da exportação a partir de request.GET (valores inválidos são ignorados)."""
+    return {
+        'data_inicio': _data(parametros.get('data_inicio')),
+        'data_fim': _data(parametros.get('data_fim')),
+        'estabelecimento_id': _id(parametros.get('estabelecimento_id')),
+        'profissional_id': _id(parametros.get('profissional_id')),
+    }
+
+
+def registros_filtrados(data_inicio=None, data_fim=None, estabelecimento_id=None, profissional_id=None):
+    registros = RegistroPonto.objects.all()
+    if data_inicio:
+        registros = registros.filter(data__gte=data_inicio)
+    if data_fim:
+        registros = registros.filter(data__lte=data_fim)
+    if estabelecimento_id:
+        registros = registros.filter(estabelecimento_id=estabelecimento_id)
+    if profissional_id:
+        registros = registros.filter(profissional_id=profissional_id)
+    return registros
+
+
+def marcacoes_arquivadas_filtradas(data_inicio=None, data_fim=None, estabelecimento_id=None, profissional_id=None):
+    """As marcações arquivadas com os filtros de registros_filtrados (gerador)."""
+    return marcacoes_arquivadas(
+        data_inicio, data_fim, estabelecimento_id=estabelecimento_id,
+        profissionais=[profissional_id] if profissional_id else None,
+    )
+
+
+def _do_arquivo(arquivadas):
+    """Tuplas (CAMPOS) das marcações arquivadas, com os relacionados em LOTE por consulta."""
+    for registro in com_relacionados(arquivadas, 'profissional', 'estabelecimento', 'ajustado_por'):
+        yield (
+            registro.pk, registro.nsr, registro.data, registro.horario, registro.tipo,
+            registro.profissional.cpf, registro.profissional.nome, registro.estabelecimento.nome,
+            registro.latitude_e7, registro.longitude_e7, registro.dentro_tolerancia, registro.atraso_minutos,
+            registro.saida_antecipada_minutos, registro.ajuste_manual, registro.justificativa_ajuste,
+            registro.ajustado_por.username if registro.ajustado_por else None,
+            registro.identificador_coletor, registro.offline, registro.hash_binario, registro.created_at,
+        )
+
+
+def _em_lotes(registros):
+    """Tuplas (CAMPOS) do queryset, em ordem de pk, LOTE por consulta."""
+    registros = registros.order_by('pk').values_list(*CAMPOS)
+    ultimo = 0
+    while True:
+        lote = 0
+        for valores in registros.filter(pk__gt=ultimo)[:LOTE].iterator(chunk_size=LOTE):
+            lote += 1
+            ultimo = valores[0]
+            yield valores
+        if lote < LOTE:
+            return
+
+
+def _sim_nao(valor):
+    return 'Sim' if valor else 'Não'
+
+
+def linhas(registros, arquivadas=()):
+    """
+    Gerador das linhas (listas de valores, na ordem de COLUNAS) da
+    exportação, sem cabeçalho: as `arquivadas` (marcacoes_arquivadas_filtradas)
+    e depois as do banco.
+    """
+    for (pk, nsr, data, horario, tipo, cpf, nome, estabelecimento, latitude, longitude,
+         dentro_tolerancia, atraso, saida_antecipada, ajuste_manual, justificativa, ajustado_por,
+         coletor, offline, hash_binario, criado_em) in chain(_do_arquivo(arquivadas), _em_lotes(registros)):
+        yield [
+            pk, nsr or '', data, horario, TIPOS.get(tipo, tipo), cpf, nome, estabelecimento,
+            latitude / ESCALA_GPS, longitude / ESCALA_GPS, _sim_nao(dentro_tolerancia), atraso,
+            saida_antecipada, _sim_nao(ajuste_manual), justificativa or '', ajustado_por or '',
+            COLETORES.get(coletor, coletor), _sim_nao(offline),
+            bytes(hash_binario).hex() if hash_binario else '', criado_em,
+        ]
+
+
+def csv_registros(registros, arquivadas=()):
+    """Gerador dos pedaços de texto do CSV (;), um pedaço por lote de marcações."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=';', lineterminator='\r\n')
+
+    def texto():
+        valor = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return valor
+
+    # BOM: o Excel só abre o CSV em UTF-8 (acentos) se ele vier no começo
+    buffer.write('\ufeff')
+    escritor.writerow(COLUNAS)
+    yield texto()
+
+    pendentes = 0
+    for valores in linhas(registros, arquivadas):
+        valores[2] = valores[2].strftime('%d/%m/%Y')
+        valores[3] = valores[3].strftime('%H:%M:%S')
+        valores[19] = valores[19].strftime('%d/%m/%Y %H:%M:%S')
+        escritor.writerow(valores)
+        pendentes += 1
+        if pendentes == LOTE:
+            yield texto()
+            pendentes = 0
+    if pendentes:
+        yield texto()
+
+
+def xlsx_registros(registros, arquivadas=()):
+    """
+    Grava o XLSX num arquivo temporário e devolve o arquivo (aberto, no
+    início). O arquivo some quando for fechado — o FileResponse fecha no fim
+    da resposta.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    planilha = Workbook(write_only=True)
+    negrito = Font(bold=True)
+    formatos = [(2, 'DD/MM/YYYY'), (3, 'HH:MM:SS'), (19, 'DD/MM/YYYY HH:MM:SS')]
+
+    def nova_aba(numero):
+        aba = planilha.create_sheet(title=f'Marcações {numero}' if numero > 1 else 'Marcações')
+        cabecalho = []
+        for titulo in COLUNAS:
+            celula = WriteOnlyCell(aba, value=titulo)
+            celula.font = negrito
+            cabecalho.append(celula)
+        aba.append(cabecalho)
+        return aba
+
+    abas = 1
+    aba = nova_aba(abas)
+    na_aba = 0
+    for valores in linhas(registros, arquivadas):
+        if na_aba == LINHAS_POR_ABA:
+            abas += 1
+            aba = nova_aba(abas)
+            na_aba = 0
+        for indice, formato in formatos:
+            celula = WriteOnlyCell(aba, value=valores[indice])
+            celula.number_format = formato
+            valores[indice] = celula
+        aba.append(valores)
+        na_aba += 1
+
+    arquivo = tempfile.TemporaryFile()
+    planilha.save(arquivo)
+    arquivo.seek(0)
+    return arquivo
+
+
+def nome_arquivo_exportacao(formato, data_inicio=None, data_fim=None, estabelecimento_id=None, profissional_id=None):
+    partes = ['marcacoes']
+    if data_inicio:
+        partes.append(f'{data_inicio:%Y%m%d}')
+    if data_fim:
+        partes.append(f'{data_fim:%Y%m%d}')
+    if estabelecimento_id:
+        partes.append(f'estab{estabelecimento_id}')
+    if profissional_id:
+        partes.append(f'prof{profissional_id}')
+    return '_'.join(partes) + f'.{formato}'
@@ -0,0 +1,160 @@
+# core/lote_pdf.py
+"""
+Relatórios em PDF de um estabelecimento inteiro, num zip.
+
+No fechamento do mês o RH imprime o relatório de cada profissional da
+unidade — centenas de requests seguidos, cada um pagando a inicialização
+do WeasyPrint, o parse do CSS e as suas próprias consultas. Aqui:
+
+1. os dados vêm de uma vez pro lote todo (relatorios_em_lote: UMA consulta
+   de marcações pra todos os profissionais);
+2. o HTML de cada relatório é montado neste processo (templates do Django),
+   sem o <style> — a folha de estilo vai uma vez pra cada worker;
+3. o HTML -> PDF, que é o que pesa, roda num ProcessPoolExecutor com
+   processos quentes (core/pdf_processos.py). No máximo 2 PDFs por processo
+   ficam em voo, então a memória não cresce com o tamanho do lote;
+4. cada PDF pronto entra no zip e os bytes do zip saem na hora
+   (zip_lote é um gerador — serve pro arquivo da tarefa e pro do comando
+   `gerar_pdfs_estabelecimento`).
+
+Roda só fora do request: na tarefa 'relatorios_estabelecimento_zip'
+(tarefas/tipos.py), que a view enfileira, ou no comando.
+
+Processos: settings.PDF_LOTE_PROCESSOS (0 = um por CPU).
+"""
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.text import slugify
+
+from usuarios.models import Profissional
+from .documentos import contexto_relatorio_profissional_pdf
+from .pdf_processos import iniciar_processo, renderizar
+from .relatorios import relatorios_em_lote
+
+TEMPLATE = 'core/relatorio_profissional_pdf.html'
+FOLHA_ESTILO = 'core/relatorio_profissional_pdf.css'
+
+
+def processos_padrao():
+    return getattr(settings, 'PDF_LOTE_PROCESSOS', 0) or os.cpu_count() or 1
+
+
+def profissionais_do_estabelecimento(estabelecimento_id):
+    return (
+        Profissional.objects
+        .filter(estabelecimento_id=estabelecimento_id, ativo=True)
+        .select_related('escala', 'estabelecimento__municipio')
+        .order_by('nome')
+    )
+
+
+def nome_arquivo_lote(profissional):
+    return f"relatorio_{profissional.cpf}_{slugify(profissional.nome)}.pdf"
+
+
+def nome_arquivo_zip_lote(estabelecimento, data_inicio, data_fim):
+    return f"relatorios_{slugify(estabelecimento.nome)}_{data_inicio:%Y%m%d}_{data_fim:%Y%m%d}.zip"
+
+
+def documentos_lote(profissionais, data_inicio, data_fim, usuario):
+    """Gerador de (nome_arquivo, html) — dados buscados uma vez pro lote."""
+    profissionais = list(profissionais)
+    relatorios = relatorios_em_lote(profissionais, data_inicio, data_fim)
+    for profissional in profissionais:
+        contexto = contexto_relatorio_profissional_pdf(
+            profissional, data_inicio, data_fim, usuario, relatorios[profissional.pk]
+        )
+        contexto['css_externo'] = True
+        yield nome_arquivo_lote(profissional), render_to_string(TEMPLATE, contexto)
+
+
+class EstatisticasLote:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.documentos = 0
+        self.paginas = 0
+        self.bytes = 0
+
+    @property
+    def segundos(self):
+        return time.perf_counter() - self.inicio
+
+    @property
+    def paginas_por_segundo(self):
+        segundos = self.segundos
+        return self.paginas / segundos if segundos else 0
+
+
+def renderizar_lote(profissionais, data_inicio, data_fim, usuario, processos=None, base_url=None,
+                    estatisticas=None):
+    """Gerador de (nome_arquivo, pdf, paginas), na ordem em que ficam prontos."""
+    processos = processos or processos_padrao()
+    # spawn: os processos não herdam conexões de banco nem threads do servidor.
+    contexto_mp = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(
+        max_workers=processos,
+        mp_context=contexto_mp,
+        initializer=iniciar_processo,
+        initargs=(render_to_string(FOLHA_ESTILO),),
+    ) as executor:
+        em_voo = set()
+
+        def prontos(quando):
+            nonlocal em_voo
+            feitos, em_voo = wait(em_voo, return_when=quando)
+            for futuro in feitos:
+                resultado = futuro.result()
+                if estatisticas is not None:
+                    estatisticas.documentos += 1
+                    estatisticas.paginas += resultado[2]
+                    estatisticas.bytes += len(resultado[1])
+                yield resultado
+
+        for nome_arquivo, html in documentos_lote(profissionais, data_inicio, data_fim, usuario):
+            em_voo.add(executor.submit(renderizar, nome_arquivo, html, base_url))
+            if len(em_voo) >= processos * 2:
+                yield from prontos(FIRST_COMPLETED)
+        while em_voo:
+            yield from prontos(FIRST_COMPLETED)
+
+
+class _SaidaZip:
+    """Destino do ZipFile sem seek: o zipfile grava com descritores de dados
+    e os bytes podem ser entregues assim que cada arquivo entra."""
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def flush(self):
+        pass
+
+    def esvaziar(self):
+        dados = b''.join(self._partes)
+        self._partes = []
+        return dados
+
+
+def zip_lote(documentos):
+    """Gerador dos bytes de um zip com os (nome_arquivo, pdf, paginas)."""
+    saida = _SaidaZip()
+    # PDF já vem comprimido: ZIP_STORED não gasta CPU à toa.
+    with zipfile.ZipFile(saida, 'w', compression=zipfile.ZIP_STORED) as arquivo_zip:
+        for nome_arquivo, pdf, _paginas in documentos:
+            arquivo_zip.writestr(nome_arquivo, pdf)
+            yield saida.esvaziar()
+    yield saida.esvaziar()
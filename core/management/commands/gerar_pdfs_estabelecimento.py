@@ -0,0 +1,95 @@
+# core/management/commands/gerar_pdfs_estabelecimento.py
+"""
+Gera o PDF do relatório de cada profissional ativo de um estabelecimento
+num zip só, com os PDFs feitos em paralelo (core/lote_pdf.py). No fim
+mostra PDFs, páginas, tempo e páginas por segundo.
+
+Sem datas, usa o mês anterior inteiro (fechamento).
+
+Uso:
+    python manage.py gerar_pdfs_estabelecimento --estabelecimento 3
+    python manage.py gerar_pdfs_estabelecimento --estabelecimento 3 --data-inicio 2025-01-01 --data-fim 2025-01-31
+    python manage.py gerar_pdfs_estabelecimento --estabelecimento 3 --processos 4 --saida /tmp/jan.zip
+    python manage.py gerar_pdfs_estabelecimento --estabelecimento 3 --dry-run
+"""
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.lote_pdf import (
+    EstatisticasLote, nome_arquivo_zip_lote, processos_padrao, profissionais_do_estabelecimento, renderizar_lote,
+    zip_lote,
+)
+from estabelecimentos.models import Estabelecimento
+
+
+def _data(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Data inválida: {valor} (use AAAA-MM-DD).')
+
+
+class Command(BaseCommand):
+    help = 'Gera num zip os relatórios em PDF de todos os profissionais ativos de um estabelecimento.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estabelecimento', type=int, required=True, help='ID do estabelecimento.')
+        parser.add_argument('--data-inicio', type=_data, help='AAAA-MM-DD (padrão: início do mês anterior).')
+        parser.add_argument('--data-fim', type=_data, help='AAAA-MM-DD (padrão: fim do mês anterior).')
+        parser.add_argument('--saida', help='Caminho do zip (padrão: relatorios_<estabelecimento>_<período>.zip).')
+        parser.add_argument(
+            '--processos',
+            type=int,
+            help='Processos gerando PDF em paralelo (padrão: settings.PDF_LOTE_PROCESSOS ou um por CPU).',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Só mostra quantos PDFs seriam gerados.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            estabelecimento = Estabelecimento.objects.get(pk=options['estabelecimento'])
+        except Estabelecimento.DoesNotExist:
+            raise CommandError(f"Estabelecimento {options['estabelecimento']} não encontrado.")
+
+        fim_mes_anterior = timezone.now().date().replace(day=1) - timedelta(days=1)
+        data_inicio = options['data_inicio'] or fim_mes_anterior.replace(day=1)
+        data_fim = options['data_fim'] or fim_mes_anterior
+        if data_inicio > data_fim:
+            raise CommandError('--data-inicio não pode ser depois de --data-fim.')
+
+        processos = options['processos'] or processos_padrao()
+        if processos < 1:
+            raise CommandError('--processos precisa ser pelo menos 1.')
+
+        profissionais = list(profissionais_do_estabelecimento(estabelecimento.pk))
+        saida = options['saida'] or nome_arquivo_zip_lote(estabelecimento, data_inicio, data_fim)
+        self.stdout.write(
+            f'{estabelecimento.nome}: {len(profissionais)} profissional(is) ativo(s), '
+            f'{data_inicio:%d/%m/%Y} a {data_fim:%d/%m/%Y}, {processos} processo(s) -> {saida}'
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Nenhum PDF gerado (--dry-run).'))
+            return
+        if not profissionais:
+            self.stdout.write(self.style.WARNING('Nenhum profissional ativo, nada a gerar.'))
+            return
+
+        estatisticas = EstatisticasLote()
+        documentos = renderizar_lote(
+            profissionais, data_inicio, data_fim, 'Sistema TimeFlow',
+            processos=processos, estatisticas=estatisticas,
+        )
+        with open(saida, 'wb') as arquivo:
+            for parte in zip_lote(documentos):
+                arquivo.write(parte)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{estatisticas.documentos} PDF(s), {estatisticas.paginas} página(s), '
+            f'{estatisticas.bytes / 1024 / 1024:.1f} MB em {estatisticas.segundos:.1f}s '
+            f'({estatisticas.paginas_por_segundo:.1f} páginas/s).'
+        ))
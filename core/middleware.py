@@ -0,0 +1,60 @@
+# core/middleware.py
+"""
+OrcamentoConsultasMiddleware: conta as consultas de cada request
+(core/consultas.py) e
+
+- põe o total e o tempo no banco no cabeçalho Server-Timing (aparece na
+  aba de rede do navegador);
+- avisa no log (logger core.consultas) quando a mesma forma de SQL se
+  repete CONSULTAS_REPETICOES_ALERTA vezes ou mais — N+1 — ou quando a
+  URL passa do orçamento de ORCAMENTOS;
+- com CONSULTAS_ORCAMENTO_ESTRITO, estoura OrcamentoConsultasExcedido em
+  vez de só avisar (desenvolvimento).
+
+Ligado por MONITORAR_CONSULTAS (padrão: DEBUG). Consultas feitas enquanto
+uma StreamingHttpResponse é consumida (exportações) ficam de fora.
+"""
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .consultas import ORCAMENTOS, Consultas
+
+logger = logging.getLogger('core.consultas')
+
+
+class OrcamentoConsultasExcedido(Exception):
+    pass
+
+
+def nome_da_url(request):
+    rota = getattr(request, 'resolver_match', None)
+    return rota.view_name if rota else request.path
+
+
+class OrcamentoConsultasMiddleware:
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'MONITORAR_CONSULTAS', settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        consultas = Consultas()
+        with consultas.gravando():
+            resposta = self.get_response(request)
+
+        resposta['Server-Timing'] = f'db;dur={consultas.tempo * 1000:.1f};desc="{consultas.total} consultas"'
+
+        nome = nome_da_url(request)
+        orcamento = ORCAMENTOS.get(nome)
+        excedido = orcamento is not None and consultas.total > orcamento
+        if excedido or consultas.repetidas():
+            mensagem = f'{request.method} {request.path} ({nome}, orçamento {orcamento}): {consultas.relatorio()}'
+            if excedido and getattr(settings, 'CONSULTAS_ORCAMENTO_ESTRITO', False):
+                raise OrcamentoConsultasExcedido(mensagem)
+            logger.warning(mensagem)
+        else:
+            logger.debug('%s %s (%s): %s', request.method, request.path, nome, consultas.resumo())
+        return resposta
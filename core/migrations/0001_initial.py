@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoPainel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=20)),
+                ('estabelecimento_id', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('gerais', models.BooleanField(default=True)),
+                ('dados', models.JSONField(default=dict)),
+                ('criado_em', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Evento do painel',
+                'verbose_name_plural': 'Eventos do painel',
+            },
+        ),
+    ]
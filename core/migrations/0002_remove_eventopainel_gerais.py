@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:23
+
+from django.db import migrations
+
+
+def apagar_eventos(apps, schema_editor):
+    # Eventos vivem minutos; os do formato antigo (uma linha por evento)
+    # não se expandem no novo.
+    apps.get_model('core', 'EventoPainel').objects.using(schema_editor.connection.alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(apagar_eventos, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='eventopainel',
+            name='gerais',
+        ),
+    ]
@@ -1,3 +1,26 @@
+# core/models.py
 from django.db import models
 
-# Create your models here.
+
+class EventoPainel(models.Model):
+    """
+    Evento ao vivo do dashboard (core/eventos.py). A tabela é o canal entre
+    processos: quem grava a marcação insere aqui, e os processos com telas
+    conectadas leem o que entrou depois do último id que viram. Vive só
+    RETENCAO_EVENTOS — depois disso é apagado.
+    """
+    nome = models.CharField(max_length=20)
+    # Telas filtradas por este estabelecimento recebem o evento; as gerais
+    # (sem filtro) recebem todos.
+    estabelecimento_id = models.IntegerField(null=True, blank=True, db_index=True)
+    # Uma linha por marcação; quem lê expande nos eventos da tela
+    # (core/eventos.py:expandir).
+    dados = models.JSONField(default=dict)
+    criado_em = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Evento do painel'
+        verbose_name_plural = 'Eventos do painel'
+
+    def __str__(self):
+        return f"{self.nome} #{self.pk}"
@@ -0,0 +1,150 @@
+# core/paginacao.py
+"""
+Paginação por cursor (keyset) das marcações, na ordem das listas de
+histórico: mais recente primeiro, (data, horário, id) decrescente.
+
+Com OFFSET, a página 500 do histórico de um profissional lê e descarta
+10.000 linhas, e o Paginator ainda faz um COUNT(*) de tudo a cada página.
+Aqui a página seguinte é "as marcações antes da última mostrada":
+
+    WHERE data <= d AND (data < d OR horario < h OR (horario = h AND id < i))
+    ORDER BY data DESC, horario DESC, id DESC
+    LIMIT por_pagina + 1
+
+— com filtro de profissional, um range scan no índice (profissional, data),
+igual pra página 1 e pra página 500. A linha a mais só diz se existe
+próxima página; não há contagem (quem precisa de total usa o resumo diário,
+ponto/resumo_diario.py).
+
+O cursor é opaco pro cliente (base64 da posição e do sentido). Cursor
+inválido vira primeira página nos templates; a API responde 404
+(api/paginacao.py).
+
+Meses arquivados (ponto/arquivamento.py) entram na mesma página pelo
+`carregar_mes` de paginar_por_cursor — o histórico do profissional.
+"""
+import base64
+import json
+from datetime import date, time
+
+from django.db.models import Q
+
+from ponto.arquivamento import fim_do_mes
+
+ORDEM = ('-data', '-horario', '-id')
+ORDEM_INVERSA = ('data', 'horario', 'id')
+
+PROXIMA = 'p'
+ANTERIOR = 'a'
+
+
+def codificar_cursor(registro, sentido):
+    posicao = [sentido, registro.data.isoformat(), registro.horario.isoformat(), registro.pk]
+    return base64.urlsafe_b64encode(json.dumps(posicao, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """(sentido, data, horario, id) ou None se o cursor não for válido."""
+    if not cursor:
+        return None
+    try:
+        texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        sentido, data, horario, pk = json.loads(texto)
+        if sentido not in (PROXIMA, ANTERIOR):
+            return None
+        return sentido, date.fromisoformat(data), time.fromisoformat(horario), int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+def _mais_antigas(data, horario, pk):
+    return Q(data__lte=data) & (
+        Q(data__lt=data) | Q(horario__lt=horario) | Q(horario=horario, pk__lt=pk)
+    )
+
+
+def _mais_recentes(data, horario, pk):
+    return Q(data__gte=data) & (
+        Q(data__gt=data) | Q(horario__gt=horario) | Q(horario=horario, pk__gt=pk)
+    )
+
+
+class PaginaCursor:
+    """Uma página: as marcações e os cursores das páginas vizinhas (None se não houver)."""
+
+    def __init__(self, object_list, proximo_cursor, cursor_anterior):
+        self.object_list = object_list
+        self.proximo_cursor = proximo_cursor
+        self.cursor_anterior = cursor_anterior
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def tem_proxima(self):
+        return self.proximo_cursor is not None
+
+    @property
+    def tem_anterior(self):
+        return self.cursor_anterior is not None
+
+
+def _chave(registro):
+    return registro.data, registro.horario, registro.pk
+
+
+def paginar_por_cursor(registros, cursor=None, por_pagina=20, posicao=None, meses_arquivados=(),
+                       carregar_mes=None):
+    """
+    Página de `registros` (queryset de RegistroPonto, já filtrado) a partir
+    do cursor. `posicao` já decodificada dispensa o `cursor`.
+
+    Com `meses_arquivados` (primeiro dia de cada mês, ponto/arquivamento.py)
+    e `carregar_mes(mes)` (as marcações arquivadas daquele mês, já
+    filtradas), a página junta banco e arquivo na mesma ordem. Um mês só é
+    aberto quando a página chega nele: se o banco já encheu a página com
+    marcações mais novas que o mês inteiro, o arquivo nem é lido.
+    """
+    if posicao is None:
+        posicao = decodificar_cursor(cursor)
+    anterior = bool(posicao) and posicao[0] == ANTERIOR
+    alvo = posicao[1:] if posicao else None
+
+    if anterior:
+        consulta = registros.filter(_mais_recentes(*alvo)).order_by(*ORDEM_INVERSA)
+        meses = sorted(mes for mes in meses_arquivados if fim_do_mes(mes) >= alvo[0])
+    else:
+        consulta = registros.filter(_mais_antigas(*alvo)) if alvo else registros
+        consulta = consulta.order_by(*ORDEM)
+        meses = sorted((mes for mes in meses_arquivados if alvo is None or mes <= alvo[0]), reverse=True)
+    linhas = list(consulta[:por_pagina + 1])
+
+    for mes in meses:
+        if len(linhas) > por_pagina:
+            # a página já está cheia com marcações de antes (ou depois) do mês inteiro
+            limite = linhas[por_pagina].data
+            if (mes > limite) if anterior else (fim_do_mes(mes) < limite):
+                break
+        arquivadas = [
+            registro for registro in carregar_mes(mes)
+            if alvo is None or ((_chave(registro) > alvo) if anterior else (_chave(registro) < alvo))
+        ]
+        linhas = sorted(linhas + arquivadas, key=_chave, reverse=not anterior)[:por_pagina + 1]
+
+    if anterior:
+        tem_anterior = len(linhas) > por_pagina
+        linhas = linhas[:por_pagina][::-1]
+        tem_proxima = True
+    else:
+        tem_proxima = len(linhas) > por_pagina
+        linhas = linhas[:por_pagina]
+        tem_anterior = posicao is not None
+
+    return PaginaCursor(
+        linhas,
+        codificar_cursor(linhas[-1], PROXIMA) if tem_proxima and linhas else None,
+        codificar_cursor(linhas[0], ANTERIOR) if tem_anterior and linhas else None,
+    )
@@ -0,0 +1,129 @@
+# core/painel.py
+"""
+"Painel do dia" do dashboard: contagens e listas de hoje em poucas
+consultas agregadas.
+
+Antes, o dashboard fazia uns dez count() separados, carregava todos os
+profissionais ativos pra subtrair um set em Python e, pra cada profissional
+com registro incompleto, fazia mais duas consultas (Profissional.objects.get
++ última entrada). Aqui:
+
+- contagens de registros: UM aggregate com Count condicional
+  (Count('id', filter=Q(...)));
+- sem registro hoje / registro incompleto: o filtro é Exists() no próprio
+  SELECT de Profissional, e os dados da última entrada vêm por Subquery —
+  nada de loop por profissional;
+- as listas devolvem dicts leves (values()), não instâncias de model.
+
+painel_do_dia() junta tudo: quatro consultas, independente de quantos
+profissionais existem (mais duas em contagens_gerais()).
+"""
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from estabelecimentos.models import Estabelecimento
+from ponto.models import RegistroPonto
+from ponto.resumo_diario import resumos_periodo
+from usuarios.models import Profissional
+
+
+def _registros_do_dia(dia, estabelecimento=None):
+    registros = RegistroPonto.objects.filter(data=dia)
+    if estabelecimento:
+        registros = registros.filter(estabelecimento=estabelecimento)
+    return registros
+
+
+def contagens_do_dia(dia, estabelecimento=None):
+    """Registros/entradas/saídas/atrasados do dia num único aggregate."""
+    return _registros_do_dia(dia, estabelecimento).aggregate(
+        registros=Count('id'),
+        entradas=Count('id', filter=Q(tipo='ENTRADA')),
+        saidas=Count('id', filter=Q(tipo='SAIDA')),
+        atrasados=Count('id', filter=Q(tipo='ENTRADA', atraso_minutos__gt=0)),
+    )
+
+
+def contagens_gerais():
+    """Profissionais ativos e estabelecimentos (dois counts — tabelas diferentes)."""
+    return {
+        'total_profissionais': Profissional.objects.filter(ativo=True).count(),
+        'total_estabelecimentos': Estabelecimento.objects.count(),
+    }
+
+
+def resumo_tolerancia_periodo(data_inicio, data_fim, estabelecimento=None):
+    """Total de registros do período e quantos ficaram sem atraso/antecipação
+    — lido do resumo diário (ponto/resumo_diario.py), não das marcações."""
+    return resumos_periodo(data_inicio, data_fim, estabelecimento).aggregate(
+        total=Coalesce(Sum(F('entradas') + F('saidas')), 0),
+        dentro_tolerancia=Coalesce(Sum('registros_sem_desvio'), 0),
+    )
+
+
+def profissionais_incompletos(dia, estabelecimento=None):
+    """
+    Profissionais com ENTRADA e sem SAIDA no dia. Cada linha:
+    {'id', 'nome', 'cpf', 'horario_entrada_hoje', 'atraso_minutos',
+    'estabelecimento_nome'} — dados da última entrada do dia.
+    """
+    registros = _registros_do_dia(dia, estabelecimento).filter(profissional=OuterRef('pk'))
+    ultima_entrada = registros.filter(tipo='ENTRADA').order_by('-horario')
+
+    return list(
+        Profissional.objects
+        .filter(Exists(registros.filter(tipo='ENTRADA')))
+        .filter(~Exists(registros.filter(tipo='SAIDA')))
+        .annotate(
+            horario_entrada_hoje=Subquery(ultima_entrada.values('horario')[:1]),
+            atraso_minutos=Subquery(ultima_entrada.values('atraso_minutos')[:1]),
+            estabelecimento_nome=Subquery(ultima_entrada.values('estabelecimento__nome')[:1]),
+        )
+        .order_by('horario_entrada_hoje')
+        .values('id', 'nome', 'cpf', 'horario_entrada_hoje', 'atraso_minutos', 'estabelecimento_nome')
+    )
+
+
+def profissionais_sem_registro(dia, estabelecimento=None):
+    """Profissionais ativos (do estabelecimento, se informado) sem nenhum
+    registro no dia, em qualquer estabelecimento. Linhas {'id', 'nome', 'cpf'}."""
+    profissionais = Profissional.objects.filter(ativo=True)
+    if estabelecimento:
+        profissionais = profissionais.filter(estabelecimento=estabelecimento)
+
+    return list(
+        profissionais
+        .filter(~Exists(RegistroPonto.objects.filter(data=dia, profissional=OuterRef('pk'))))
+        .values('id', 'nome', 'cpf')
+    )
+
+
+def maiores_atrasos(dia, estabelecimento=None, limit=10):
+    """Entradas com atraso no dia, da maior pra menor. Linhas
+    {'profissional_id', 'profissional_nome', 'estabelecimento_nome',
+    'horario', 'atraso_minutos'}."""
+    return list(
+        _registros_do_dia(dia, estabelecimento)
+        .filter(tipo='ENTRADA', atraso_minutos__gt=0)
+        .order_by('-atraso_minutos')
+        .values(
+            'profissional_id', 'horario', 'atraso_minutos',
+            profissional_nome=F('profissional__nome'),
+            estabelecimento_nome=F('estabelecimento__nome'),
+        )[:limit]
+    )
+
+
+def painel_do_dia(dia, estabelecimento=None, limite_atrasos=5):
+    """Tudo que o dashboard mostra sobre o dia, num dict."""
+    contagens = contagens_do_dia(dia, estabelecimento)
+    incompletos = profissionais_incompletos(dia, estabelecimento)
+    sem_registro = profissionais_sem_registro(dia, estabelecimento)
+    return {
+        'contagens': contagens,
+        'incompletos': incompletos,
+        'sem_registro': sem_registro,
+        'maiores_atrasos': maiores_atrasos(dia, estabelecimento, limit=limite_atrasos),
+        'qtd_incompletos': len(incompletos),
+        'qtd_sem_registro': len(sem_registro),
+    }
@@ -0,0 +1,35 @@
+# core/pdf_processos.py
+"""
+Lado "worker" da geração de PDFs em lote (core/lote_pdf.py).
+
+Roda dentro dos processos do ProcessPoolExecutor e por isso NÃO importa
+nada do Django: recebe HTML já renderizado e devolve o PDF. Cada processo
+é iniciado uma vez (iniciar_processo) e fica quente pro lote inteiro:
+
+- o WeasyPrint já importado (pango/cairo carregados);
+- uma FontConfiguration só, com as fontes já resolvidas;
+- a folha de estilo do relatório parseada uma vez (CSS), em vez de o
+  <style> de cada HTML ser parseado de novo a cada PDF;
+- um documento pequeno renderizado na inicialização, pra carregar as
+  fontes antes do primeiro PDF de verdade.
+"""
+_estado = {}
+
+
+def iniciar_processo(css_texto):
+    from weasyprint import CSS, HTML
+    from weasyprint.text.fonts import FontConfiguration
+
+    configuracao_fontes = FontConfiguration()
+    folha = CSS(string=css_texto, font_config=configuracao_fontes)
+    HTML(string='<p>TimeFlow</p>').render(stylesheets=[folha], font_config=configuracao_fontes)
+
+    _estado.update(html=HTML, folha=folha, fontes=configuracao_fontes)
+
+
+def renderizar(nome_arquivo, html_texto, base_url=None):
+    """(nome_arquivo, bytes do PDF, número de páginas)."""
+    documento = _estado['html'](string=html_texto, base_url=base_url).render(
+        stylesheets=[_estado['folha']], font_config=_estado['fontes']
+    )
+    return nome_arquivo, documento.write_pdf(), len(documento.pages)
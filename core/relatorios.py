@@ -0,0 +1,449 @@
+# core/relatorios.py
+"""
+Pacote de dados dos relatórios por profissional.
+
+relatorio_profissional, o PDF, o histórico, horas trabalhadas, análise de
+frequência e o consolidado buscavam as mesmas marcações várias vezes na
+mesma requisição: o queryset da tela, de novo em
+calcular_horas_trabalhadas_periodo, mais um count() por tipo, mais o
+extrato do banco de horas e a classificação das horas (cada um com a sua
+consulta), e a frequência fazia três consultas por dia do mês.
+
+RelatorioProfissional busca o período UMA vez (com a folga de 1 dia antes e
+depois que o banco de horas e a classificação precisam pra casar plantões
+nas bordas), só com as colunas que as telas usam, e calcula o resto em
+memória — cada métrica é cached_property, calculada uma vez na primeira vez
+que alguém pede.
+
+obter_relatorio() guarda o pacote no próprio request: duas partes da mesma
+requisição pedindo o mesmo profissional/período usam o mesmo objeto.
+relatorios_em_lote() monta os pacotes de vários profissionais com UMA
+consulta de marcações (PDFs em lote, core/lote_pdf.py).
+
+Períodos que tocam meses arquivados (ponto/arquivamento.py) juntam as
+marcações do arquivo com as do banco, na mesma ordem cronológica.
+
+O histórico do profissional não monta o pacote: pagina_historico() lê
+uma página por cursor no banco e abre um mês arquivado só quando a página
+chega nele; os totais da tela saem do resumo diário.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import cached_property
+
+from django.db.models import prefetch_related_objects
+
+from municipio.calendario import calendario_do_profissional
+from ponto.banco_horas import calcular_extrato_banco_horas
+from ponto.classificacao_horas import classificar_horas_profissional
+from ponto.escalas import atravessa_meia_noite, dias_previstos, e_dia_previsto, horas_previstas_periodo
+from ponto.arquivamento import arquivos_do_periodo, com_relacionados, fim_do_mes, marcacoes_arquivadas
+from ponto.models import RegistroPonto
+from .paginacao import paginar_por_cursor
+
+# Colunas que as telas e os cálculos usam (o resto fica de fora do SELECT).
+# As observações vêm da tabela lateral de ajustes, no mesmo SELECT.
+RELACIONADOS = ('estabelecimento', 'ajuste')
+CAMPOS = (
+    'id', 'profissional_id', 'estabelecimento_id', 'data', 'horario', 'tipo',
+    'atraso_minutos', 'saida_antecipada_minutos', 'ajuste_manual',
+    'estabelecimento__nome', 'ajuste__justificativa', 'ajuste__observacoes',
+)
+
+DIAS_SEMANA = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+
+
+def formatar_horas(timedelta_obj):
+    """Formata um timedelta para HH:MM"""
+    if not timedelta_obj:
+        return "00:00"
+    total_segundos = int(abs(timedelta_obj.total_seconds()))
+    horas = total_segundos // 3600
+    minutos = (total_segundos % 3600) // 60
+    return f"{horas:02d}:{minutos:02d}"
+
+
+def obter_carga_horaria_timedelta(carga):
+    """Converte carga horária para timedelta"""
+    if not carga:
+        return timedelta(hours=8)
+    if isinstance(carga, timedelta):
+        return carga
+    if isinstance(carga, str):
+        try:
+            horas, minutos = map(int, carga.split(':'))
+            return timedelta(hours=horas, minutes=minutos)
+        except:
+            return timedelta(hours=8)
+    return timedelta(hours=8)
+
+
+def calcular_horas_trabalhadas_dia(registros_dia):
+    """Calcula horas trabalhadas em um dia específico"""
+    if not registros_dia:
+        return timedelta()
+
+    registros_ordenados = sorted(registros_dia, key=lambda x: x.horario)
+    horas_trabalhadas = timedelta()
+    entrada_atual = None
+    data_entrada = None
+
+    for registro in registros_ordenados:
+        if registro.tipo == 'ENTRADA':
+            entrada_atual = registro.horario
+            data_entrada = registro.data
+        elif registro.tipo == 'SAIDA' and entrada_atual:
+            entrada_dt = datetime.combine(data_entrada, entrada_atual)
+            saida_dt = datetime.combine(registro.data, registro.horario)
+            if saida_dt < entrada_dt:
+                saida_dt += timedelta(days=1)
+            horas_trabalhadas += saida_dt - entrada_dt
+            entrada_atual = None
+
+    return horas_trabalhadas
+
+
+def calcular_estatisticas_atrasos(registros, tolerancia_minutos):
+    """Calcula métricas detalhadas de atrasos e saídas antecipadas"""
+    stats = {
+        'total_atrasos': 0,
+        'total_saidas_antecipadas': 0,
+        'atraso_excedente': 0,
+        'saida_antecipada_excedente': 0,
+        'registros_com_atraso': 0,
+        'registros_com_saida_antecipada': 0,
+        'media_atrasos': 0,
+        'media_saidas_antecipadas': 0,
+        'atrasos_fora_tolerancia': [],
+        'saidas_fora_tolerancia': []
+    }
+
+    for registro in registros:
+        if registro.tipo == 'ENTRADA' and registro.atraso_minutos:
+            if registro.atraso_minutos > 0:
+                stats['registros_com_atraso'] += 1
+                stats['total_atrasos'] += registro.atraso_minutos
+                excedente = max(0, registro.atraso_minutos - tolerancia_minutos)
+                stats['atraso_excedente'] += excedente
+                if excedente > 0:
+                    stats['atrasos_fora_tolerancia'].append(registro)
+
+        elif registro.tipo == 'SAIDA' and registro.saida_antecipada_minutos:
+            if registro.saida_antecipada_minutos > 0:
+                stats['registros_com_saida_antecipada'] += 1
+                stats['total_saidas_antecipadas'] += registro.saida_antecipada_minutos
+                excedente = max(0, registro.saida_antecipada_minutos - tolerancia_minutos)
+                stats['saida_antecipada_excedente'] += excedente
+                if excedente > 0:
+                    stats['saidas_fora_tolerancia'].append(registro)
+
+    if stats['registros_com_atraso'] > 0:
+        stats['media_atrasos'] = stats['total_atrasos'] / stats['registros_com_atraso']
+    if stats['registros_com_saida_antecipada'] > 0:
+        stats['media_saidas_antecipadas'] = stats['total_saidas_antecipadas'] / stats['registros_com_saida_antecipada']
+
+    return stats
+
+
+def calcular_horas_por_dia_semana(horas_por_data):
+    """Calcula horas trabalhadas por dia da semana, a partir das horas de
+    cada data (uma passada, em vez de recalcular o dia pra cada dia da semana)"""
+    horas_total = [timedelta()] * 7
+    dias_com_registro = [0] * 7
+    for data_dia, horas_dia in horas_por_data.items():
+        if horas_dia.total_seconds() > 0:
+            horas_total[data_dia.weekday()] += horas_dia
+            dias_com_registro[data_dia.weekday()] += 1
+
+    resultado = []
+    for i, dia_nome in enumerate(DIAS_SEMANA):
+        if horas_total[i].total_seconds() > 0:
+            horas_decimal = horas_total[i].total_seconds() / 3600
+            resultado.append({
+                'dia': dia_nome,
+                'horas': formatar_horas(horas_total[i]),
+                'horas_decimal': round(horas_decimal, 2),
+                'media': round(horas_decimal / dias_com_registro[i], 1),
+                'dias': dias_com_registro[i]
+            })
+        else:
+            resultado.append({
+                'dia': dia_nome,
+                'horas': '00:00',
+                'horas_decimal': 0,
+                'media': 0,
+                'dias': 0
+            })
+
+    return resultado
+
+
+def _chave_cronologica(registro):
+    return registro.data, registro.horario, registro.pk
+
+
+def _com_arquivadas(marcacoes, data_inicio, data_fim, profissionais, estabelecimento_id=None):
+    """Marcações do banco + as arquivadas do período, em ordem cronológica."""
+    arquivadas = list(com_relacionados(
+        marcacoes_arquivadas(data_inicio, data_fim, profissionais=profissionais, estabelecimento_id=estabelecimento_id),
+        'estabelecimento',
+    ))
+    if not arquivadas:
+        return marcacoes
+    return sorted(arquivadas + marcacoes, key=_chave_cronologica)
+
+
+def identificar_dias_incompletos(registros_por_data):
+    """Identifica dias com registros incompletos"""
+    dias_incompletos = []
+    for data_dia, registros_dia in registros_por_data.items():
+        tipos = [r.tipo for r in registros_dia]
+        if ('ENTRADA' in tipos and 'SAIDA' not in tipos) or \
+           ('SAIDA' in tipos and 'ENTRADA' not in tipos) or \
+           len(registros_dia) == 1:
+            dias_incompletos.append(data_dia)
+    return dias_incompletos
+
+
+class RelatorioProfissional:
+    """
+    Marcações de um profissional num período (limites opcionais, inclusive)
+    e tudo o que os relatórios derivam delas. Com estabelecimento_id, só as
+    marcações daquele estabelecimento (histórico). `marcacoes` já buscadas
+    (período ± 1 dia, em ordem cronológica) dispensam a consulta.
+    """
+
+    def __init__(self, profissional, data_inicio=None, data_fim=None, estabelecimento_id=None, marcacoes=None):
+        self.profissional = profissional
+        self.data_inicio = data_inicio
+        self.data_fim = data_fim
+        self.estabelecimento_id = estabelecimento_id
+        if marcacoes is not None:
+            self.__dict__['marcacoes_com_folga'] = marcacoes
+
+    @cached_property
+    def marcacoes_com_folga(self):
+        """Período ± 1 dia, em ordem cronológica — a única consulta de marcações."""
+        inicio = self.data_inicio - timedelta(days=1) if self.data_inicio else None
+        fim = self.data_fim + timedelta(days=1) if self.data_fim else None
+        registros = RegistroPonto.objects.filter(profissional=self.profissional)
+        if inicio:
+            registros = registros.filter(data__gte=inicio)
+        if fim:
+            registros = registros.filter(data__lte=fim)
+        if self.estabelecimento_id:
+            registros = registros.filter(estabelecimento_id=self.estabelecimento_id)
+        marcacoes = list(
+            registros.select_related(*RELACIONADOS).only(*CAMPOS).order_by('data', 'horario', 'id')
+        )
+        return _com_arquivadas(marcacoes, inicio, fim, [self.profissional.pk], self.estabelecimento_id)
+
+    def _no_periodo(self, dia):
+        return (self.data_inicio is None or dia >= self.data_inicio) and \
+               (self.data_fim is None or dia <= self.data_fim)
+
+    @cached_property
+    def registros(self):
+        """Marcações do período, em ordem cronológica."""
+        return [registro for registro in self.marcacoes_com_folga if self._no_periodo(registro.data)]
+
+    @cached_property
+    def registros_recentes(self):
+        """Marcações do período, da mais recente pra mais antiga."""
+        return self.registros[::-1]
+
+    @cached_property
+    def _resumo(self):
+        registros_por_data = defaultdict(list)
+        entradas = saidas = 0
+        dias_com_entrada = set()
+        for registro in self.registros:
+            registros_por_data[registro.data].append(registro)
+            if registro.tipo == 'ENTRADA':
+                entradas += 1
+                dias_com_entrada.add(registro.data)
+            elif registro.tipo == 'SAIDA':
+                saidas += 1
+        return dict(registros_por_data), entradas, saidas, dias_com_entrada
+
+    @property
+    def registros_por_data(self):
+        """{data: [marcações do dia em ordem cronológica]}"""
+        return self._resumo[0]
+
+    @property
+    def total_registros(self):
+        return len(self.registros)
+
+    @property
+    def entradas(self):
+        return self._resumo[1]
+
+    @property
+    def saidas(self):
+        return self._resumo[2]
+
+    @property
+    def dias_trabalhados(self):
+        """Dias com ENTRADA — num plantão que vira a noite a saída cai no
+        dia seguinte, e contar as duas datas dobraria a presença."""
+        return len(self._resumo[3])
+
+    @cached_property
+    def horas_por_data(self):
+        return {
+            dia: calcular_horas_trabalhadas_dia(registros_dia)
+            for dia, registros_dia in self.registros_por_data.items()
+        }
+
+    @cached_property
+    def horas_trabalhadas(self):
+        return sum(self.horas_por_data.values(), timedelta())
+
+    @cached_property
+    def horas_por_dia_semana(self):
+        return calcular_horas_por_dia_semana(self.horas_por_data)
+
+    @cached_property
+    def calendario(self):
+        return calendario_do_profissional(self.profissional)
+
+    @cached_property
+    def dias_previstos(self):
+        return dias_previstos(self.profissional, self.data_inicio, self.data_fim, self.calendario)
+
+    @cached_property
+    def horas_previstas(self):
+        return horas_previstas_periodo(self.profissional, self.data_inicio, self.data_fim, self.calendario)
+
+    @cached_property
+    def feriados(self):
+        return self.calendario.feriados_entre(self.data_inicio, self.data_fim + timedelta(days=1))
+
+    @cached_property
+    def extrato(self):
+        """Extrato do banco de horas (ponto/banco_horas.py) sobre as mesmas marcações."""
+        return calcular_extrato_banco_horas(
+            self.profissional, self.data_inicio, self.data_fim,
+            registros=self.marcacoes_com_folga,
+        )
+
+    def classificacao(self, carga_diaria=None):
+        """Classificação das horas (ponto/classificacao_horas.py) sobre as mesmas marcações."""
+        return classificar_horas_profissional(
+            self.profissional, self.data_inicio, self.data_fim,
+            feriados=self.feriados, carga_diaria=carga_diaria,
+            registros=self.marcacoes_com_folga,
+        )
+
+    @cached_property
+    def dias_incompletos(self):
+        if atravessa_meia_noite(self.profissional):
+            # Plantão que vira a noite: entrada e saída em datas diferentes não é
+            # dia incompleto — usa o pareamento do banco de horas.
+            return self.extrato['dias_incompletos']
+        return identificar_dias_incompletos(self.registros_por_data)
+
+    def contar_dias_incompletos_previstos(self):
+        """Dias previstos com só entrada ou só saída (análise de frequência)."""
+        if atravessa_meia_noite(self.profissional):
+            return len(self.extrato['dias_incompletos'])
+        incompletos = 0
+        for dia, registros_dia in self.registros_por_data.items():
+            tipos = {registro.tipo for registro in registros_dia}
+            if len(tipos) == 1 and e_dia_previsto(self.profissional, dia, self.calendario):
+                incompletos += 1
+        return incompletos
+
+    def estatisticas_atrasos(self, tolerancia_minutos):
+        return calcular_estatisticas_atrasos(self.registros, tolerancia_minutos)
+
+
+def obter_relatorio(request, profissional, data_inicio=None, data_fim=None, estabelecimento_id=None):
+    """RelatorioProfissional memoizado no request."""
+    relatorios = getattr(request, '_relatorios_profissional', None)
+    if relatorios is None:
+        relatorios = request._relatorios_profissional = {}
+    chave = (profissional.pk, data_inicio, data_fim, estabelecimento_id)
+    if chave not in relatorios:
+        relatorios[chave] = RelatorioProfissional(profissional, data_inicio, data_fim, estabelecimento_id)
+    return relatorios[chave]
+
+
+def relatorios_em_lote(profissionais, data_inicio, data_fim):
+    """{profissional_id: RelatorioProfissional} com uma consulta de marcações."""
+    profissionais = list(profissionais)
+    marcacoes = defaultdict(list)
+    registros = (
+        RegistroPonto.objects
+        .filter(
+            profissional__in=profissionais,
+            data__gte=data_inicio - timedelta(days=1),
+            data__lte=data_fim + timedelta(days=1),
+        )
+        .select_related(*RELACIONADOS)
+        .only(*CAMPOS)
+        .order_by('data', 'horario', 'id')
+    )
+    for registro in registros.iterator(chunk_size=2000):
+        marcacoes[registro.profissional_id].append(registro)
+    com_arquivo = set()
+    arquivadas = marcacoes_arquivadas(
+        data_inicio - timedelta(days=1), data_fim + timedelta(days=1),
+        profissionais=[profissional.pk for profissional in profissionais],
+    )
+    for registro in com_relacionados(arquivadas, 'estabelecimento'):
+        marcacoes[registro.profissional_id].append(registro)
+        com_arquivo.add(registro.profissional_id)
+    for profissional_id in com_arquivo:
+        marcacoes[profissional_id].sort(key=_chave_cronologica)
+    return {
+        profissional.pk: RelatorioProfissional(
+            profissional, data_inicio, data_fim, marcacoes=marcacoes[profissional.pk]
+        )
+        for profissional in profissionais
+    }
+
+
+def pagina_historico(profissional, cursor=None, por_pagina=50, data_inicio=None, data_fim=None,
+                     estabelecimento_id=None, estabelecimentos=None):
+    """
+    Uma página do histórico do profissional (mais recente primeiro) por
+    cursor (core/paginacao.py): keyset no banco e, dos meses arquivados que
+    têm marcações dele, só os que a página alcança.
+    `estabelecimentos` ({pk: Estabelecimento}, se quem chama já tem):
+    o estabelecimento das marcações arquivadas sai dali, sem consulta.
+    """
+    registros = RegistroPonto.objects.filter(profissional=profissional)
+    if data_inicio:
+        registros = registros.filter(data__gte=data_inicio)
+    if data_fim:
+        registros = registros.filter(data__lte=data_fim)
+    if estabelecimento_id:
+        registros = registros.filter(estabelecimento_id=estabelecimento_id)
+    meses = list(
+        arquivos_do_periodo(data_inicio, data_fim)
+        .filter(indice__has_key=str(profissional.pk))
+        .values_list('mes', flat=True)
+    )
+
+    def carregar_mes(mes):
+        inicio = max(mes, data_inicio) if data_inicio else mes
+        fim = min(fim_do_mes(mes), data_fim) if data_fim else fim_do_mes(mes)
+        return marcacoes_arquivadas(inicio, fim, profissionais=[profissional.pk], estabelecimento_id=estabelecimento_id)
+
+    pagina = paginar_por_cursor(
+        registros.select_related(*RELACIONADOS).only(*CAMPOS), cursor, por_pagina,
+        meses_arquivados=meses, carregar_mes=carregar_mes,
+    )
+    arquivadas = [registro for registro in pagina if getattr(registro, 'arquivado', False)]
+    if estabelecimentos is not None:
+        for registro in arquivadas:
+            if registro.estabelecimento_id in estabelecimentos:
+                RegistroPonto.estabelecimento.field.set_cached_value(
+                    registro, estabelecimentos[registro.estabelecimento_id]
+                )
+        arquivadas = [registro for registro in arquivadas if registro.estabelecimento_id not in estabelecimentos]
+    if arquivadas:
+        prefetch_related_objects(arquivadas, 'estabelecimento')
+    return pagina
@@ -0,0 +1,71 @@
+# core/signals.py
+"""
+Invalida as seções do dashboard em cache (core/cache_painel.py):
+
+- marcação gravada ou excluída: a fonte de registros do dia afetado (hoje
+  ou passado). Numa edição que troca a data, a data antiga também conta —
+  ela vem de `_chave_resumo_anterior`, guardada pelo pre_save de
+  ponto/signals.py. Numa edição retroativa (data antes de hoje), os PDFs
+  em cache do profissional (core/cache_pdf.py) cujo período contém essas
+  datas são apagados — a batida do dia não mexe no disco: a chave do PDF
+  já muda com o resumo diário;
+- resumo diário reconstruído em massa (recálculo de tolerância, comando
+  `reconstruir_resumo_diario`): as fontes do período reconstruído;
+- profissional ou estabelecimento alterado: a fonte de cadastro (nomes,
+  totais, lista do filtro, quem está ativo).
+
+E gravam os eventos das marcações de hoje pras telas do dashboard
+(/painel/eventos/, core/eventos.py), só depois do commit.
+
+Registrado em core/apps.py -> CoreConfig.ready().
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from estabelecimentos.models import Estabelecimento
+from ponto.models import RegistroPonto
+from ponto.resumo_diario import resumos_reconstruidos
+from usuarios.models import Profissional
+from . import cache_pdf
+from .cache_painel import CADASTRO, REGISTROS_HOJE, REGISTROS_PASSADO, invalidar, invalidar_datas
+from .eventos import publicar_registro
+
+
+@receiver(post_save, sender=RegistroPonto)
+@receiver(post_delete, sender=RegistroPonto)
+def registro_alterado(sender, instance, **kwargs):
+    datas = [instance.data]
+    anterior = getattr(instance, '_chave_resumo_anterior', None)
+    if anterior:
+        datas.append(anterior[0])
+    hoje = timezone.now().date()
+    invalidar_datas(datas, hoje)
+    retroativas = [data for data in datas if data < hoje]
+    if retroativas:
+        cache_pdf.invalidar_profissional(instance.profissional_id, retroativas)
+
+
+@receiver(post_save, sender=RegistroPonto)
+def registro_publicar(sender, instance, created, raw=False, **kwargs):
+    if raw or instance.data != timezone.now().date():
+        return
+    transaction.on_commit(lambda: publicar_registro(instance, created))
+
+
+@receiver(resumos_reconstruidos)
+def resumos_alterados(sender, data_inicio=None, data_fim=None, **kwargs):
+    hoje = timezone.now().date()
+    if data_inicio is None or data_fim is None:
+        invalidar(REGISTROS_HOJE, REGISTROS_PASSADO)
+    else:
+        invalidar_datas([data_inicio, data_fim], hoje)
+
+
+@receiver(post_save, sender=Profissional)
+@receiver(post_delete, sender=Profissional)
+@receiver(post_save, sender=Estabelecimento)
+@receiver(post_delete, sender=Estabelecimento)
+def cadastro_alterado(sender, instance, **kwargs):
+    invalidar(CADASTRO)
@@ -0,0 +1,94 @@
+# core/testing.py
+"""
+Orçamento de consultas nos testes. Com OrcamentoConsultasMixin, o teste
+chama a URL pelo nome e falha se ela passar do número de consultas de
+ORCAMENTOS (core/consultas.py) ou repetir a mesma forma de SQL
+CONSULTAS_REPETICOES_ALERTA vezes (N+1) — com a lista das consultas
+repetidas na mensagem:
+
+    class PainelTests(OrcamentoConsultasMixin, TestCase):
+        def test_historico(self):
+            self.client.force_login(self.admin)
+            self.assertOrcamentoConsultas('core:historico_pontos', kwargs={'profissional_id': self.profissional.id})
+
+Crie pelo menos CONSULTAS_REPETICOES_ALERTA linhas de cada lista que a
+view mostra (marcações, profissionais, ajustes): com menos, um N+1 não
+chega a se repetir o bastante pra aparecer.
+
+criar_estabelecimento(), criar_profissional() e registrar() montam o
+cadastro mínimo dos testes dos apps.
+"""
+from itertools import count
+
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from .consultas import ORCAMENTOS, Consultas
+
+_sequencia = count(1)
+
+
+def criar_estabelecimento(nome=None, municipio=None):
+    from estabelecimentos.models import Estabelecimento
+    from municipio.models import Municipio
+
+    numero = next(_sequencia)
+    if municipio is None:
+        municipio = Municipio.objects.create(nome=f'Município {numero}', uf='SP', codigo_ibge=f'{numero:07d}')
+    return Estabelecimento.objects.create(
+        nome=nome or f'Estabelecimento {numero}', endereco='Rua A, 1', cnpj=f'{numero:014d}',
+        municipio=municipio, latitude=-23.5, longitude=-46.6,
+    )
+
+
+def criar_profissional(estabelecimento, **campos):
+    from usuarios.models import Profissional
+
+    numero = next(_sequencia)
+    campos.setdefault('nome', f'Profissional {numero}')
+    campos.setdefault('cpf', f'{numero:011d}')
+    campos.setdefault('ativo', True)
+    return Profissional.objects.create(estabelecimento=estabelecimento, **campos)
+
+
+def registrar(profissional, data, horario, tipo, **campos):
+    """
+    Marcação gravada pelo save() do model (tolerância e signals). Entra
+    como ajuste manual: sem isso o save() troca data e horário pela hora
+    atual.
+    """
+    from ponto.models import RegistroPonto
+
+    campos.setdefault('estabelecimento', profissional.estabelecimento)
+    campos.setdefault('ajuste_manual', True)
+    registro = RegistroPonto(profissional=profissional, data=data, horario=horario, tipo=tipo, **campos)
+    registro.save()
+    return registro
+
+
+class OrcamentoConsultasMixin:
+
+    def assertOrcamentoConsultas(self, nome_url, args=None, kwargs=None, parametros=None,
+                                 metodo='get', dados=None, cliente=None, **extra):
+        """Faz o request e confere as consultas; devolve a resposta."""
+        if nome_url not in ORCAMENTOS:
+            self.fail(f'{nome_url} sem orçamento em ORCAMENTOS (core/consultas.py).')
+        url = reverse(nome_url, args=args, kwargs=kwargs)
+        if parametros:
+            url = f'{url}?{urlencode(parametros)}'
+
+        consultas = Consultas()
+        with consultas.gravando():
+            resposta = getattr(cliente or self.client, metodo)(url, dados, **extra)
+            if resposta.streaming:
+                b''.join(resposta.streaming_content)
+
+        orcamento = ORCAMENTOS[nome_url]
+        problemas = []
+        if consultas.total > orcamento:
+            problemas.append(f'orçamento de {orcamento} consulta(s) excedido')
+        if consultas.repetidas():
+            problemas.append('consultas repetidas (N+1)')
+        if problemas:
+            self.fail(f'{nome_url}: {", ".join(problemas)} — {consultas.relatorio()}')
+        return resposta
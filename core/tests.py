@@ -1,3 +1,277 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from municipio.models import Municipio
+from ponto.models import RegistroPonto
+from timeflow.db_router import ReplicaMiddleware, ler_da_replica
+
+from . import cache_painel, views
+from .checks import cache_compartilhado_com_replicas
+from .eventos import publicar_registro
+from .models import EventoPainel
+from .testing import criar_estabelecimento, criar_profissional, registrar
+
+
+class EventosPainelTests(TestCase):
+    """core/eventos.py — sob WSGI (o cliente de teste), polling em vez de SSE."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        self.client.force_login(self.admin)
+        self.url = reverse('core:eventos_painel')
+
+    def test_sse_fora_do_asgi_responde_204(self):
+        self.assertEqual(self.client.get(self.url).status_code, 204)
+
+    def test_exige_admin(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_polling_entrega_so_o_que_a_tela_recebe(self):
+        inicio = self.client.get(self.url, {'desde': ''}).json()
+        self.assertEqual(inicio['eventos'], [])
+
+        registro = {'id': 1, 'tipo': 'ENTRADA', 'atraso': 45}
+        EventoPainel.objects.create(nome='marcacao', estabelecimento_id=1, dados={
+            'profissional_id': 7, 'registro': registro, 'situacao': 'incompleto', 'situacao_geral': 'completo',
+        })
+        EventoPainel.objects.create(nome='marcacao', estabelecimento_id=2, dados={
+            'profissional_id': 8, 'registro': None, 'situacao': 'completo', 'situacao_geral': 'completo',
+        })
+
+        geral = self.client.get(self.url, {'desde': inicio['ultimo']}).json()
+        self.assertEqual([(e['nome'], e['dados']) for e in geral['eventos']], [
+            ('registro', registro),
+            ('atraso', registro),
+            ('situacao', {'profissional_id': 7, 'estabelecimento_id': 1, 'situacao': 'completo'}),
+            ('situacao', {'profissional_id': 8, 'estabelecimento_id': 2, 'situacao': 'completo'}),
+        ])
+        self.assertEqual(geral['ultimo'], geral['eventos'][-1]['id'])
+
+        filtrada = self.client.get(self.url, {'desde': inicio['ultimo'], 'estabelecimento': 1}).json()
+        self.assertEqual([(e['nome'], e['dados']) for e in filtrada['eventos']], [
+            ('registro', registro),
+            ('atraso', registro),
+            ('situacao', {'profissional_id': 7, 'estabelecimento_id': 1, 'situacao': 'incompleto'}),
+        ])
+
+        self.assertEqual(self.client.get(self.url, {'desde': geral['ultimo']}).json()['eventos'], [])
+
+    def test_uma_linha_por_marcacao(self):
+        profissional = criar_profissional(criar_estabelecimento(), horario_entrada=time(8), horario_saida=time(17))
+        hoje = timezone.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar(profissional, hoje, time(9), 'ENTRADA')
+        with self.captureOnCommitCallbacks(execute=False):
+            saida = registrar(profissional, hoje, time(17), 'SAIDA')
+        with self.assertNumQueries(1):
+            # só o INSERT: saída nova não consulta o resumo
+            publicar_registro(saida, True)
+        eventos = list(EventoPainel.objects.order_by('pk'))
+        self.assertEqual(len(eventos), 2)
+        self.assertEqual((eventos[0].dados['situacao'], eventos[1].dados['situacao']), ('incompleto', 'completo'))
+        self.assertEqual(eventos[1].dados['registro']['id'], saida.pk)
+
+
+class CacheComReplicasTests(TestCase):
+    """core/checks.py — réplica de leitura exige cache compartilhado."""
+
+    def _cache(self, backend):
+        return {'default': {'BACKEND': backend}}
+
+    @override_settings(REPLICAS_LEITURA=['replica1'])
+    def test_rejeita_cache_por_processo(self):
+        for backend in ('django.core.cache.backends.locmem.LocMemCache',
+                        'django.core.cache.backends.dummy.DummyCache'):
+            with self.subTest(backend=backend), self.settings(CACHES=self._cache(backend)):
+                erros = cache_compartilhado_com_replicas(None)
+                self.assertEqual([erro.id for erro in erros], ['core.E001'])
+
+    @override_settings(REPLICAS_LEITURA=['replica1'])
+    def test_aceita_cache_compartilhado(self):
+        with self.settings(CACHES=self._cache('django.core.cache.backends.redis.RedisCache')):
+            self.assertEqual(cache_compartilhado_com_replicas(None), [])
+
+    @override_settings(REPLICAS_LEITURA=[])
+    def test_sem_replica_aceita_cache_local(self):
+        with self.settings(CACHES=self._cache('django.core.cache.backends.locmem.LocMemCache')):
+            self.assertEqual(cache_compartilhado_com_replicas(None), [])
+
+
+def _leitura():
+    """Banco em que uma leitura de RegistroPonto cairia agora (sem consultar)."""
+    return RegistroPonto.objects.all().db
+
+
+@ler_da_replica
+def _view_le(request):
+    return HttpResponse(_leitura())
+
+
+@ler_da_replica
+def _view_grava_e_le(request):
+    antes = _leitura()
+    with transaction.atomic():
+        no_atomic = _leitura()
+    Municipio.objects.create(nome='Município', uf='SP', codigo_ibge='9999999')
+    return HttpResponse(f'{antes} {no_atomic} {_leitura()}')
+
+
+@ler_da_replica
+def _view_streaming(request):
+    return StreamingHttpResponse(_leitura() for _ in range(3))
+
+
+def _view_grava(request):
+    Municipio.objects.create(nome='Município', uf='SP', codigo_ibge='9999998')
+    return HttpResponse()
+
+
+@override_settings(REPLICAS_LEITURA=['replica1'], REPLICA_JANELA_POS_ESCRITA=10)
+class RoteadorReplicasTests(TransactionTestCase):
+    """
+    timeflow/db_router.py com uma réplica (`replica1`) configurada. Confere
+    o roteamento (QuerySet.db), sem abrir conexão com a réplica. Fora do
+    TestCase: dentro da transação dele toda leitura já iria pro default.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.fabrica = RequestFactory()
+        self.usuario = User.objects.create_user('leitor', password='senha')
+
+    def _request(self, metodo='get'):
+        request = getattr(self.fabrica, metodo)('/')
+        request.user = self.usuario
+        return request
+
+    def test_leitura_na_replica_so_dentro_da_view_marcada(self):
+        self.assertEqual(_view_le(self._request()).content, b'replica1')
+        self.assertEqual(_leitura(), 'default')
+
+    def test_gravacao_e_atomic_ficam_no_default(self):
+        antes, no_atomic, depois = _view_grava_e_le(self._request()).content.decode().split()
+        self.assertEqual((antes, no_atomic, depois), ('replica1', 'default', 'default'))
+        self.assertTrue(Municipio.objects.using('default').filter(codigo_ibge='9999999').exists())
+        # POST nunca lê da réplica
+        self.assertEqual(_view_le(self._request('post')).content, b'default')
+
+    def test_janela_depois_de_gravar_manda_o_proximo_get_pro_default(self):
+        ReplicaMiddleware(_view_grava)(self._request('post'))
+        self.assertEqual(_view_le(self._request()).content, b'default')
+
+        # Outro usuário não é afetado; passada a janela, volta pra réplica.
+        outro = self._request()
+        outro.user = User.objects.create_user('outro', password='senha')
+        self.assertEqual(_view_le(outro).content, b'replica1')
+        cache.clear()
+        self.assertEqual(_view_le(self._request()).content, b'replica1')
+
+    def test_streaming_continua_na_replica_depois_da_view(self):
+        resposta = _view_streaming(self._request())
+        self.assertEqual(_leitura(), 'default')
+        self.assertEqual(b''.join(resposta.streaming_content), b'replica1' * 3)
+
+
+class CachePainelPorProcessoTests(TestCase):
+    """core/cache_painel.py — com cache por processo a seção vale só CACHE_VALIDADE_LOCAL segundos."""
+
+    @override_settings(PAINEL_CACHE_TIMEOUT=3600, CACHE_VALIDADE_LOCAL=60)
+    def test_timeout_curto_com_cache_por_processo(self):
+        self.assertEqual(cache_painel._timeout(), 60)
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}):
+            self.assertEqual(cache_painel._timeout(), 3600)
+
+
+class CachePdfTests(TestCase):
+    """core/cache_pdf.py — ETag/304 sem ler marcação e troca do PDF quando os dados mudam."""
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        configuracao = override_settings(PDF_CACHE_DIRETORIO=diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.pasta = os.path.join(diretorio.name, '{}')
+
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        self.client.force_login(admin)
+        self.profissional = criar_profissional(criar_estabelecimento())
+        self.fim = timezone.now().date().replace(day=1) - timedelta(days=1)
+        self.inicio = self.fim.replace(day=1)
+        registrar(self.profissional, self.inicio, time(8), 'ENTRADA')
+        registrar(self.profissional, self.inicio, time(17), 'SAIDA')
+
+        self.url = reverse('core:relatorio_profissional_pdf', kwargs={'profissional_id': self.profissional.pk})
+        self.periodo = {'data_inicio': self.inicio.isoformat(), 'data_fim': self.fim.isoformat()}
+        gerar = mock.patch.object(views, 'pdf_relatorio_profissional', wraps=views.pdf_relatorio_profissional)
+        self.gerar = gerar.start()
+        self.addCleanup(gerar.stop)
+
+    def _baixar(self, **cabecalhos):
+        resposta = self.client.get(self.url, self.periodo, **cabecalhos)
+        resposta.close()
+        return resposta
+
+    def _arquivos(self):
+        return os.listdir(self.pasta.format(self.profissional.pk))
+
+    def test_if_none_match_recebe_304_sem_gerar_nem_ler_marcacoes(self):
+        primeira = self._baixar()
+        self.assertEqual(primeira.status_code, 200)
+        self.assertTrue(primeira['ETag'])
+        self.assertEqual(self.gerar.call_count, 1)
+
+        with CaptureQueriesContext(connection) as consultas:
+            segunda = self._baixar(HTTP_IF_NONE_MATCH=primeira['ETag'])
+        self.assertEqual(segunda.status_code, 304)
+        self.assertEqual(self.gerar.call_count, 1)
+        tabela = RegistroPonto._meta.db_table
+        self.assertFalse([consulta for consulta in consultas.captured_queries if tabela in consulta['sql']])
+
+        # Sem If-None-Match: vem do disco, sem gerar de novo
+        terceira = self._baixar()
+        self.assertEqual(terceira.status_code, 200)
+        self.assertEqual(terceira['ETag'], primeira['ETag'])
+        self.assertEqual(self.gerar.call_count, 1)
+
+    def test_marcacao_no_periodo_muda_etag_e_substitui_o_pdf(self):
+        primeira = self._baixar()
+        self.assertEqual(len(self._arquivos()), 1)
+
+        # Edição retroativa: o signal apaga o PDF do período na hora
+        registrar(self.profissional, self.fim, time(8), 'ENTRADA')
+        self.assertEqual(self._arquivos(), [])
+
+        segunda = self._baixar(HTTP_IF_NONE_MATCH=primeira['ETag'])
+        self.assertEqual(segunda.status_code, 200)
+        self.assertNotEqual(segunda['ETag'], primeira['ETag'])
+        self.assertEqual(self.gerar.call_count, 2)
+        self.assertEqual(len(self._arquivos()), 1)
+
+    def test_versao_nova_apaga_a_antiga_do_mesmo_periodo(self):
+        # Batida de hoje (folga do período que acabou ontem): o disco fica
+        # como está, mas a chave muda e a versão nova toma o lugar da velha.
+        ontem = timezone.now().date() - timedelta(days=1)
+        self.periodo = {'data_inicio': self.inicio.isoformat(), 'data_fim': ontem.isoformat()}
+        primeira = self._baixar()
+        antes = self._arquivos()
+        registrar(self.profissional, timezone.now().date(), time(8), 'ENTRADA')
+        self.assertEqual(self._arquivos(), antes)
+
+        segunda = self._baixar()
+        self.assertNotEqual(segunda['ETag'], primeira['ETag'])
+        depois = self._arquivos()
+        self.assertEqual(len(depois), len(antes))
+        self.assertNotEqual(set(depois), set(antes))
@@ -0,0 +1,116 @@
+import tempfile
+from datetime import time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from ponto.models import RegistroManual
+from .consultas import ORCAMENTOS, minimo_repeticoes
+from .testing import OrcamentoConsultasMixin, criar_estabelecimento, criar_profissional, registrar
+
+
+class OrcamentosTests(OrcamentoConsultasMixin, TestCase):
+    """
+    Cada URL de ORCAMENTOS (core/consultas.py) dentro do orçamento e sem
+    N+1, com CONSULTAS_REPETICOES_ALERTA linhas de cada lista: profissionais,
+    marcações de cada um e ajustes manuais.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        cls.estabelecimento = criar_estabelecimento()
+
+        hoje = timezone.now().date()
+        # Mês anterior inteiro: dias fechados, fora da janela do "hoje".
+        cls.inicio = (hoje.replace(day=1) - timedelta(days=1)).replace(day=1)
+        cls.fim = hoje.replace(day=1) - timedelta(days=1)
+        linhas = minimo_repeticoes()
+        dias = [cls.inicio + timedelta(days=numero) for numero in range(linhas)]
+
+        cls.profissionais = []
+        for numero in range(linhas):
+            usuario = User.objects.create_user(f'profissional{numero}', password='senha')
+            profissional = criar_profissional(cls.estabelecimento, usuario=usuario)
+            cls.profissionais.append(profissional)
+            # hoje com entrada e saída: dashboard e dias incompletos com linhas
+            for dia in dias + [hoje]:
+                registrar(profissional, dia, time(8), 'ENTRADA')
+                registrar(profissional, dia, time(17), 'SAIDA')
+            for dia in dias:
+                RegistroManual.objects.create(
+                    profissional=profissional, data=dia, horario=time(8), tipo='ENTRADA',
+                    motivo='ESQUECIMENTO', ajustado_por=cls.admin,
+                )
+        cls.profissional = cls.profissionais[0]
+
+    def setUp(self):
+        # Sem o cache do dashboard e das jornadas, o request paga tudo.
+        cache.clear()
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        configuracao = override_settings(PDF_CACHE_DIRETORIO=diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def casos(self):
+        """{nome da URL: (usuário, argumentos do assertOrcamentoConsultas, status esperado)}."""
+        periodo = {'data_inicio': self.inicio.isoformat(), 'data_fim': self.fim.isoformat()}
+        mes = {'mes': self.inicio.month, 'ano': self.inicio.year}
+        profissional = {'profissional_id': self.profissional.pk}
+        admin, usuario = self.admin, self.profissional.usuario
+        jwt_admin = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(admin)}'}
+        jwt_usuario = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(usuario)}'}
+        return {
+            # core
+            'core:dashboard': (admin, {}, 200),
+            'core:relatorios_gerais': (admin, {'parametros': periodo}, 200),
+            'core:exportar_registros_csv': (admin, {'parametros': periodo}, 200),
+            'core:exportar_registros_xlsx': (admin, {'parametros': periodo}, 200),
+            'core:relatorio_profissional': (admin, {'kwargs': profissional, 'parametros': periodo}, 200),
+            'core:relatorio_profissional_pdf': (admin, {'kwargs': profissional, 'parametros': periodo}, 200),
+            'core:relatorios_estabelecimento_pdf': (
+                admin, {'kwargs': {'estabelecimento_id': self.estabelecimento.pk}, 'parametros': periodo}, 302,
+            ),
+            'core:historico_pontos': (admin, {'kwargs': profissional}, 200),
+            'core:horas_trabalhadas': (admin, {'kwargs': profissional, 'parametros': mes}, 200),
+            'core:analise_frequencia': (admin, {'kwargs': profissional, 'parametros': mes}, 200),
+            'core:relatorio_consolidado': (admin, {'kwargs': profissional, 'parametros': periodo}, 200),
+            'core:meu_perfil': (usuario, {}, 200),
+            'core:estatisticas_cache_painel': (admin, {}, 200),
+            # ponto
+            'lista_ajustes_manuais': (admin, {}, 200),
+            'meus_ajustes': (usuario, {}, 200),
+            'espelho_ponto': (admin, {'parametros': {'mes': self.inicio.strftime('%Y-%m')}}, 200),
+            'api_dias_incompletos_batch': (admin, {}, 200),
+            'registroponto-list': (admin, {**jwt_admin}, 200),
+            # api
+            'registros-list': (usuario, {**jwt_usuario}, 200),
+            'profissionais-list': (admin, {**jwt_admin}, 200),
+            'estabelecimentos-list': (admin, {**jwt_admin}, 200),
+            'buscar_registros_historico': (None, {'parametros': {'cpf': self.profissional.cpf, **periodo}}, 200),
+            'ocupacao_estabelecimentos': (admin, {}, 200),
+            'matriz_ausencias': (admin, {'parametros': periodo}, 200),
+            # usuarios
+            'usuarios:listar_profissionais': (admin, {}, 200),
+            'usuarios:detalhar_profissional': (admin, {'kwargs': {'id': self.profissional.pk}}, 200),
+        }
+
+    def _entrar(self, usuario):
+        self.client.logout()
+        if usuario is not None:
+            self.client.force_login(usuario)
+
+    def test_todas_as_urls_com_orcamento_tem_caso(self):
+        self.assertEqual(set(self.casos()), set(ORCAMENTOS))
+
+    def test_urls_dentro_do_orcamento(self):
+        for nome, (usuario, argumentos, status) in self.casos().items():
+            with self.subTest(url=nome):
+                cache.clear()
+                self._entrar(usuario)
+                resposta = self.assertOrcamentoConsultas(nome, **argumentos)
+                self.assertEqual(resposta.status_code, status)
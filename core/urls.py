@@ -15,11 +15,16 @@ urlpatterns = [
     # LOGOUT
     path('accounts/logout/', LogoutView.as_view(next_page='/'), name='logout'),
     path('', views.dashboard, name='dashboard'),
+    path('painel/cache/', views.estatisticas_cache_painel, name='estatisticas_cache_painel'),
+    path('painel/eventos/', views.eventos_painel, name='eventos_painel'),
     
     # Relatórios Gerais
     path('relatorios/', views.relatorios_gerais, name='relatorios_gerais'),
+    path('relatorios/exportar/csv/', views.exportar_registros_csv, name='exportar_registros_csv'),
+    path('relatorios/exportar/xlsx/', views.exportar_registros_xlsx, name='exportar_registros_xlsx'),
     path('relatorios/profissional/<int:profissional_id>/', views.relatorio_profissional, name='relatorio_profissional'),
     path('relatorios/profissional/<int:profissional_id>/pdf/', views.relatorio_profissional_pdf, name='relatorio_profissional_pdf'),
+    path('relatorios/estabelecimento/<int:estabelecimento_id>/pdfs/', views.relatorios_estabelecimento_pdf, name='relatorios_estabelecimento_pdf'),
     
     # Histórico e Estatísticas
     path('profissional/<int:profissional_id>/historico/', views.historico_pontos_profissional, name='historico_pontos'),
@@ -4,17 +4,42 @@ from collections import defaultdict
 from datetime import datetime, date, timedelta
 
 from django.contrib import messages
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core.handlers.asgi import ASGIRequest
 from django.core.paginator import Paginator
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from django.template.loader import render_to_string
 from django.utils import timezone
-from django.db.models import Count, Q, Sum, Max, Avg
-from weasyprint import HTML
+from django.db.models import Count, F, Sum, Max
+from django.db.models.functions import Coalesce
 
 from estabelecimentos.models import Estabelecimento
+from municipio.calendario import obter_calendario
+from . import cache_painel, cache_pdf
+from .documentos import (
+    contexto_relatorio_consolidado, pdf_relatorio_consolidado, pdf_relatorio_profissional,
+)
+from .exportacao import (
+    csv_registros, filtros_da_requisicao, marcacoes_arquivadas_filtradas, nome_arquivo_exportacao,
+    registros_filtrados, xlsx_registros,
+)
+from .eventos import ATRASO_GRAVE_MINUTOS, broker, eventos_desde, expandir, fluxo_eventos, ultimo_evento
+from .paginacao import paginar_por_cursor
+from .painel import (
+    contagens_do_dia, contagens_gerais, painel_do_dia, resumo_tolerancia_periodo,
+)
+from .relatorios import (
+    calcular_horas_trabalhadas_dia, formatar_horas, obter_carga_horaria_timedelta, obter_relatorio,
+    pagina_historico,
+)
+from ponto.escalas import carga_do_dia, descricao_regra, horas_previstas_periodo
 from ponto.models import RegistroPonto
+from ponto.ocupacao import quadro_ocupacao
+from ponto.presenca import dias_do_mapa, frequencia_periodo
+from ponto.resumo_diario import resumos_periodo
+from tarefas.fila import acima_do_limite, enfileirar
+from timeflow.db_router import ler_da_replica
 from usuarios.models import Profissional
 
 logger = logging.getLogger(__name__)
@@ -29,16 +54,6 @@ def is_admin(user):
     return user.is_superuser or user.is_staff
 
 
-def formatar_horas(timedelta_obj):
-    """Formata um timedelta para HH:MM"""
-    if not timedelta_obj:
-        return "00:00"
-    total_segundos = int(abs(timedelta_obj.total_seconds()))
-    horas = total_segundos // 3600
-    minutos = (total_segundos % 3600) // 60
-    return f"{horas:02d}:{minutos:02d}"
-
-
 def formatar_saldo_horas(minutos):
     """Formata saldo de horas com sinal"""
     if minutos >= 0:
@@ -51,15 +66,12 @@ def formatar_saldo_horas(minutos):
     return f"{sinal}{horas:02d}:{minutos_restantes:02d}"
 
 
-def calcular_dias_uteis(data_inicio, data_fim):
-    """Calcula dias úteis (segunda a sexta) entre duas datas"""
-    dias_uteis = 0
-    data_atual = data_inicio
-    while data_atual <= data_fim:
-        if data_atual.weekday() < 5:
-            dias_uteis += 1
-        data_atual += timedelta(days=1)
-    return dias_uteis
+def calcular_dias_uteis(data_inicio, data_fim, calendario=None):
+    """Calcula dias úteis (segunda a sexta, sem feriados) entre duas datas.
+    Sem calendário informado, considera só os feriados nacionais."""
+    if calendario is None:
+        calendario = obter_calendario()
+    return calendario.dias_uteis(data_inicio, data_fim)
 
 
 def calcular_dias_no_periodo(data_inicio, data_fim):
@@ -67,175 +79,39 @@ def calcular_dias_no_periodo(data_inicio, data_fim):
     return (data_fim - data_inicio).days + 1
 
 
-def obter_carga_horaria_timedelta(carga):
-    """Converte carga horária para timedelta"""
-    if not carga:
-        return timedelta(hours=8)
-    if isinstance(carga, timedelta):
-        return carga
-    if isinstance(carga, str):
-        try:
-            horas, minutos = map(int, carga.split(':'))
-            return timedelta(hours=horas, minutes=minutos)
-        except:
-            return timedelta(hours=8)
-    return timedelta(hours=8)
-
-
-def calcular_horas_trabalhadas_dia(registros_dia):
-    """Calcula horas trabalhadas em um dia específico"""
-    if not registros_dia:
-        return timedelta()
-    
-    registros_ordenados = sorted(registros_dia, key=lambda x: x.horario)
-    horas_trabalhadas = timedelta()
-    entrada_atual = None
-    data_entrada = None
-    
-    for registro in registros_ordenados:
-        if registro.tipo == 'ENTRADA':
-            entrada_atual = registro.horario
-            data_entrada = registro.data
-        elif registro.tipo == 'SAIDA' and entrada_atual:
-            entrada_dt = datetime.combine(data_entrada, entrada_atual)
-            saida_dt = datetime.combine(registro.data, registro.horario)
-            if saida_dt < entrada_dt:
-                saida_dt += timedelta(days=1)
-            horas_trabalhadas += saida_dt - entrada_dt
-            entrada_atual = None
-    
-    return horas_trabalhadas
-
-
-def calcular_horas_trabalhadas_periodo(data_inicio, data_fim, profissional):
-    """Calcula horas trabalhadas em um período"""
+def calcular_horas_trabalhadas_profissionais(data_inicio, data_fim, profissional_ids):
+    """Horas trabalhadas no período de vários profissionais numa consulta só.
+    Retorna {profissional_id: timedelta} (só quem tem registro)."""
     registros = RegistroPonto.objects.filter(
-        profissional=profissional,
+        profissional_id__in=profissional_ids,
         data__gte=data_inicio,
         data__lte=data_fim
-    ).order_by('data', 'horario')
+    ).order_by('profissional_id', 'data', 'horario').values_list(
+        'profissional_id', 'data', 'horario', 'tipo', named=True
+    )
     
     registros_por_dia = defaultdict(list)
     for registro in registros:
-        registros_por_dia[registro.data].append(registro)
+        registros_por_dia[(registro.profissional_id, registro.data)].append(registro)
     
-    total_horas = timedelta()
-    for registros_dia in registros_por_dia.values():
-        total_horas += calcular_horas_trabalhadas_dia(registros_dia)
+    total_horas = defaultdict(timedelta)
+    for (profissional_id, _), registros_dia in registros_por_dia.items():
+        total_horas[profissional_id] += calcular_horas_trabalhadas_dia(registros_dia)
     
-    return total_horas
+    return dict(total_horas)
 
 
-def calcular_horas_previstas_periodo(profissional, data_inicio, data_fim):
-    """Calcula horas previstas para o período respeitando o filtro"""
-    carga_diaria = obter_carga_horaria_timedelta(profissional.carga_horaria_diaria)
-    
-    # Plantão 24h - todos os dias
-    if carga_diaria.total_seconds() == 86400:
-        dias = calcular_dias_no_periodo(data_inicio, data_fim)
-        return timedelta(hours=24) * dias
-    
-    # Plantão 12h - dias úteis
-    elif carga_diaria.total_seconds() == 43200:
-        dias_uteis = calcular_dias_uteis(data_inicio, data_fim)
-        return timedelta(hours=12) * dias_uteis
-    
-    # Carga normal - dias úteis
-    else:
-        dias_uteis = calcular_dias_uteis(data_inicio, data_fim)
-        return carga_diaria * dias_uteis
-
-
-def calcular_estatisticas_atrasos(registros, tolerancia_minutos):
-    """Calcula métricas detalhadas de atrasos e saídas antecipadas"""
-    stats = {
-        'total_atrasos': 0,
-        'total_saidas_antecipadas': 0,
-        'atraso_excedente': 0,
-        'saida_antecipada_excedente': 0,
-        'registros_com_atraso': 0,
-        'registros_com_saida_antecipada': 0,
-        'media_atrasos': 0,
-        'media_saidas_antecipadas': 0,
-        'atrasos_fora_tolerancia': [],
-        'saidas_fora_tolerancia': []
-    }
-    
-    for registro in registros:
-        if registro.tipo == 'ENTRADA' and registro.atraso_minutos:
-            if registro.atraso_minutos > 0:
-                stats['registros_com_atraso'] += 1
-                stats['total_atrasos'] += registro.atraso_minutos
-                excedente = max(0, registro.atraso_minutos - tolerancia_minutos)
-                stats['atraso_excedente'] += excedente
-                if excedente > 0:
-                    stats['atrasos_fora_tolerancia'].append(registro)
-        
-        elif registro.tipo == 'SAIDA' and registro.saida_antecipada_minutos:
-            if registro.saida_antecipada_minutos > 0:
-                stats['registros_com_saida_antecipada'] += 1
-                stats['total_saidas_antecipadas'] += registro.saida_antecipada_minutos
-                excedente = max(0, registro.saida_antecipada_minutos - tolerancia_minutos)
-                stats['saida_antecipada_excedente'] += excedente
-                if excedente > 0:
-                    stats['saidas_fora_tolerancia'].append(registro)
-    
-    if stats['registros_com_atraso'] > 0:
-        stats['media_atrasos'] = stats['total_atrasos'] / stats['registros_com_atraso']
-    if stats['registros_com_saida_antecipada'] > 0:
-        stats['media_saidas_antecipadas'] = stats['total_saidas_antecipadas'] / stats['registros_com_saida_antecipada']
-    
-    return stats
-
-
-def calcular_horas_por_dia_semana(registros_por_data):
-    """Calcula horas trabalhadas por dia da semana"""
-    dias_semana = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
-    resultado = []
-    
-    for i, dia_nome in enumerate(dias_semana):
-        horas_total = timedelta()
-        dias_com_registro = 0
-        
-        for data_dia, registros_dia in registros_por_data.items():
-            if data_dia.weekday() == i:
-                horas_dia = calcular_horas_trabalhadas_dia(registros_dia)
-                if horas_dia.total_seconds() > 0:
-                    horas_total += horas_dia
-                    dias_com_registro += 1
-        
-        if horas_total.total_seconds() > 0:
-            horas_decimal = horas_total.total_seconds() / 3600
-            media = horas_decimal / dias_com_registro if dias_com_registro > 0 else 0
-            resultado.append({
-                'dia': dia_nome,
-                'horas': formatar_horas(horas_total),
-                'horas_decimal': round(horas_decimal, 2),
-                'media': round(media, 1),
-                'dias': dias_com_registro
-            })
-        else:
-            resultado.append({
-                'dia': dia_nome,
-                'horas': '00:00',
-                'horas_decimal': 0,
-                'media': 0,
-                'dias': 0
-            })
-    
-    return resultado
+def calcular_horas_trabalhadas_periodo(data_inicio, data_fim, profissional):
+    """Calcula horas trabalhadas em um período"""
+    return calcular_horas_trabalhadas_profissionais(
+        data_inicio, data_fim, [profissional.id]
+    ).get(profissional.id, timedelta())
 
 
-def identificar_dias_incompletos(registros_por_data):
-    """Identifica dias com registros incompletos"""
-    dias_incompletos = []
-    for data_dia, registros_dia in registros_por_data.items():
-        tipos = [r.tipo for r in registros_dia]
-        if ('ENTRADA' in tipos and 'SAIDA' not in tipos) or \
-           ('SAIDA' in tipos and 'ENTRADA' not in tipos) or \
-           len(registros_dia) == 1:
-            dias_incompletos.append(data_dia)
-    return dias_incompletos
+def calcular_horas_previstas_periodo(profissional, data_inicio, data_fim):
+    """Calcula horas previstas para o período respeitando o filtro.
+    A regra (escala de plantão ou carga × dias úteis) fica em ponto/escalas.py."""
+    return horas_previstas_periodo(profissional, data_inicio, data_fim)
 
 
 # ======================
@@ -243,6 +119,7 @@ def identificar_dias_incompletos(registros_por_data):
 # ======================
 
 @login_required
+@ler_da_replica
 def dashboard(request):
     """Painel administrativo principal"""
     if not request.user.is_superuser and not request.user.is_staff:
@@ -282,141 +159,239 @@ def dashboard(request):
     else:
         data_inicio = data_fim = hoje
     
+    # Seções em cache (core/cache_painel.py) — invalidadas pelos signals de
+    # core/signals.py quando há marcação nova ou mudança de cadastro.
+    estabelecimentos = cache_painel.secao(
+        'estabelecimentos', (), (cache_painel.CADASTRO,),
+        lambda: list(Estabelecimento.objects.all())
+    )
+    
     # Filtro de estabelecimento
     estabelecimento_filtrado = None
-    filtros = Q()
     if estabelecimento_id:
-        estabelecimento_filtrado = Estabelecimento.objects.filter(id=estabelecimento_id).first()
-        filtros &= Q(estabelecimento=estabelecimento_filtrado)
-    
-    # Estatísticas de atrasos
-    estatisticas_atrasos = calcular_estatisticas_atrasos_periodo(
-        data_inicio, data_fim, estabelecimento_filtrado
+        estabelecimento_filtrado = next(
+            (e for e in estabelecimentos if str(e.id) == str(estabelecimento_id)), None
+        )
+    id_filtro = estabelecimento_filtrado.id if estabelecimento_filtrado else ''
+    
+    # Totais (consultas agregadas — ver core/painel.py)
+    totais = cache_painel.secao('totais', (), (cache_painel.CADASTRO,), contagens_gerais)
+    contagens_hoje = cache_painel.secao(
+        'contagens_hoje', (hoje, id_filtro), (cache_painel.REGISTROS_HOJE,),
+        lambda: contagens_do_dia(hoje, estabelecimento_filtrado)
     )
     
-    # Totais
-    total_profissionais = Profissional.objects.filter(ativo=True).count()
-    total_estabelecimentos = Estabelecimento.objects.count()
+    # Estatísticas de atrasos, tolerância e rankings do período
+    dados_periodo = cache_painel.secao(
+        'periodo', (hoje, data_inicio, data_fim, id_filtro),
+        cache_painel.fontes_periodo(data_inicio, data_fim, hoje) + (cache_painel.CADASTRO,),
+        lambda: _dados_periodo_dashboard(data_inicio, data_fim, estabelecimento_filtrado)
+    )
     
-    registros_periodo = RegistroPonto.objects.filter(
-        data__range=[data_inicio, data_fim]
-    ).filter(filtros)
+    # Informações específicas para hoje
+    dados_hoje = {
+        'incompletos': [],
+        'sem_registro': [],
+        'maiores_atrasos': [],
+        'alertas': [],
+    }
+    if periodo == 'hoje':
+        dados_hoje = cache_painel.secao(
+            'painel_dia', (hoje, id_filtro),
+            (cache_painel.REGISTROS_HOJE, cache_painel.CADASTRO),
+            lambda: _dados_hoje_dashboard(hoje, estabelecimento_filtrado)
+        )
+    
+    # Quem está dentro agora: índice em memória, sem consulta (ponto/ocupacao.py)
+    ocupacao = None
+    if periodo == 'hoje':
+        ocupacao = quadro_ocupacao(
+            [estabelecimento_filtrado.id] if estabelecimento_filtrado else [e.id for e in estabelecimentos]
+        )
+    
+    ultimos_registros = cache_painel.secao(
+        'ultimos_registros', (hoje, id_filtro),
+        (cache_painel.REGISTROS_HOJE, cache_painel.REGISTROS_PASSADO, cache_painel.CADASTRO),
+        lambda: _ultimos_registros_dashboard(estabelecimento_filtrado)
+    )
     
-    registros_hoje = RegistroPonto.objects.filter(data=hoje).filter(filtros)
+    context = {
+        'total_profissionais': totais['total_profissionais'],
+        'total_estabelecimentos': totais['total_estabelecimentos'],
+        'registros_hoje': contagens_hoje['registros'],
+        'entradas_hoje': contagens_hoje['entradas'],
+        'saidas_hoje': contagens_hoje['saidas'],
+        'estatisticas_atrasos': dados_periodo['estatisticas_atrasos'],
+        'percentual_dentro_tolerancia': dados_periodo['percentual_dentro_tolerancia'],
+        'profissionais_com_atraso': dados_periodo['profissionais_com_atraso'],
+        'estabelecimentos_movimento': dados_periodo['estabelecimentos_movimento'],
+        'registros_incompletos_hoje': dados_hoje['incompletos'],
+        'profissionais_sem_registro_hoje': dados_hoje['sem_registro'],
+        'maiores_atrasos_hoje': dados_hoje['maiores_atrasos'],
+        'alertas': dados_hoje['alertas'],
+        'ultimos_registros': ultimos_registros,
+        'ocupacao': ocupacao,
+        'periodo': periodo,
+        'data_inicio': data_inicio,
+        'data_fim': data_fim,
+        'estabelecimentos': estabelecimentos,
+        'estabelecimento_selecionado': estabelecimento_filtrado,
+        'hoje': hoje,
+        'qtd_incompletos': len(dados_hoje['incompletos']),
+        'qtd_sem_registro': len(dados_hoje['sem_registro']),
+        'ids_incompletos': [item['id'] for item in dados_hoje['incompletos']],
+        'ids_sem_registro': [item['id'] for item in dados_hoje['sem_registro']],
+    }
     
-    # Percentual dentro da tolerância
-    registros_dentro_tolerancia = registros_periodo.filter(
-        Q(atraso_minutos=0) & Q(saida_antecipada_minutos=0)
-    ).count()
-    total_registros_periodo = registros_periodo.count()
+    return render(request, 'core/dashboard.html', context)
+
+
+def _dados_periodo_dashboard(data_inicio, data_fim, estabelecimento=None):
+    """Seção 'periodo' do dashboard: atrasos, tolerância e rankings."""
+    resumo_periodo = resumo_tolerancia_periodo(data_inicio, data_fim, estabelecimento)
     percentual_dentro_tolerancia = (
-        (registros_dentro_tolerancia / total_registros_periodo * 100)
-        if total_registros_periodo > 0 else 100
+        (resumo_periodo['dentro_tolerancia'] / resumo_periodo['total'] * 100)
+        if resumo_periodo['total'] > 0 else 100
     )
     
-    # Rankings
-    profissionais_com_atraso = RegistroPonto.objects.filter(
-        data__range=[data_inicio, data_fim],
-        atraso_minutos__gt=0
-    ).filter(filtros).values(
+    # Rankings (sobre o resumo diário — ver ponto/resumo_diario.py)
+    profissionais_com_atraso = resumos_periodo(
+        data_inicio, data_fim, estabelecimento
+    ).filter(entradas_com_atraso__gt=0).values(
         'profissional__id', 'profissional__nome', 'profissional__cpf'
     ).annotate(
-        total_atraso=Sum('atraso_minutos'),
-        qtd_atrasos=Count('id')
+        total_atraso=Sum('atraso_total'),
+        qtd_atrasos=Sum('entradas_com_atraso')
     ).order_by('-total_atraso')[:5]
     
-    estabelecimentos_movimento = RegistroPonto.objects.filter(
-        data__range=[data_inicio, data_fim]
-    ).values(
+    estabelecimentos_movimento = resumos_periodo(data_inicio, data_fim).values(
         'estabelecimento__id', 'estabelecimento__nome'
     ).annotate(
-        total_registros=Count('id'),
+        total_registros=Sum(F('entradas') + F('saidas')),
         total_profissionais=Count('profissional', distinct=True)
     ).order_by('-total_registros')[:5]
     
-    # Informações específicas para hoje
-    registros_incompletos_hoje = []
-    profissionais_sem_registro_hoje = []
-    maiores_atrasos_hoje = []
+    return {
+        'estatisticas_atrasos': calcular_estatisticas_atrasos_periodo(data_inicio, data_fim, estabelecimento),
+        'percentual_dentro_tolerancia': round(percentual_dentro_tolerancia, 1),
+        'profissionais_com_atraso': list(profissionais_com_atraso),
+        'estabelecimentos_movimento': list(estabelecimentos_movimento),
+    }
+
+
+def _dados_hoje_dashboard(hoje, estabelecimento=None):
+    """Seção 'painel_dia' do dashboard: painel do dia e alertas."""
+    painel = painel_do_dia(hoje, estabelecimento, limite_atrasos=5)
     alertas = []
     
-    if periodo == 'hoje':
-        registros_incompletos_hoje = calcular_registros_incompletos_hoje(estabelecimento_filtrado)
-        profissionais_sem_registro_hoje = identificar_profissionais_sem_registro_hoje(estabelecimento_filtrado)
-        maiores_atrasos_hoje = identificar_maiores_atrasos_hoje(estabelecimento_filtrado, limit=5)
-        
-        # Gerar alertas
-        for registro in registros_incompletos_hoje[:3]:
-            alertas.append({
-                'tipo': 'incompleto',
-                'titulo': f'{registro["profissional"].nome} com registro incompleto',
-                'mensagem': f'Registrou entrada às {registro["horario_entrada"].strftime("%H:%M")} mas não registrou saída',
-                'cor': 'warning',
-                'link': f'/relatorios/profissional/{registro["profissional"].id}/'
-            })
-        
-        for prof in profissionais_sem_registro_hoje[:2]:
+    for registro in painel['incompletos'][:3]:
+        alertas.append({
+            'tipo': 'incompleto',
+            'titulo': f'{registro["nome"]} com registro incompleto',
+            'mensagem': f'Registrou entrada às {registro["horario_entrada_hoje"].strftime("%H:%M")} mas não registrou saída',
+            'cor': 'warning',
+            'link': f'/relatorios/profissional/{registro["id"]}/'
+        })
+    
+    for prof in painel['sem_registro'][:2]:
+        alertas.append({
+            'tipo': 'sem_registro',
+            'titulo': f'{prof["nome"]} sem registro hoje',
+            'mensagem': 'Profissional ativo ainda não registrou ponto',
+            'cor': 'danger',
+            'link': f'/usuarios/profissionais/{prof["id"]}/'
+        })
+    
+    for atraso in painel['maiores_atrasos']:
+        if atraso['atraso_minutos'] > ATRASO_GRAVE_MINUTOS:
             alertas.append({
-                'tipo': 'sem_registro',
-                'titulo': f'{prof.nome} sem registro hoje',
-                'mensagem': 'Profissional ativo ainda não registrou ponto',
+                'tipo': 'atraso_grave',
+                'titulo': f'{atraso["profissional_nome"]} com atraso grave',
+                'mensagem': f'Atraso de {atraso["atraso_minutos"]} minutos na entrada',
                 'cor': 'danger',
-                'link': f'/usuarios/profissionais/{prof.id}/'
+                'link': f'/relatorios/profissional/{atraso["profissional_id"]}/'
             })
-        
-        for atraso in maiores_atrasos_hoje:
-            if atraso.atraso_minutos > 30:
-                alertas.append({
-                    'tipo': 'atraso_grave',
-                    'titulo': f'{atraso.profissional.nome} com atraso grave',
-                    'mensagem': f'Atraso de {atraso.atraso_minutos} minutos na entrada',
-                    'cor': 'danger',
-                    'link': f'/relatorios/profissional/{atraso.profissional.id}/'
-                })
     
-    context = {
-        'total_profissionais': total_profissionais,
-        'total_estabelecimentos': total_estabelecimentos,
-        'registros_hoje': registros_hoje.count(),
-        'entradas_hoje': registros_hoje.filter(tipo='ENTRADA').count(),
-        'saidas_hoje': registros_hoje.filter(tipo='SAIDA').count(),
-        'estatisticas_atrasos': estatisticas_atrasos,
-        'percentual_dentro_tolerancia': round(percentual_dentro_tolerancia, 1),
-        'profissionais_com_atraso': profissionais_com_atraso,
-        'estabelecimentos_movimento': estabelecimentos_movimento,
-        'registros_incompletos_hoje': registros_incompletos_hoje,
-        'profissionais_sem_registro_hoje': profissionais_sem_registro_hoje,
-        'maiores_atrasos_hoje': maiores_atrasos_hoje,
+    return {
+        'incompletos': painel['incompletos'],
+        'sem_registro': painel['sem_registro'],
+        'maiores_atrasos': painel['maiores_atrasos'],
         'alertas': alertas,
-        'ultimos_registros': RegistroPonto.objects.select_related(
-            'profissional', 'estabelecimento'
-        ).filter(filtros).order_by('-data', '-horario')[:10],
-        'periodo': periodo,
-        'data_inicio': data_inicio,
-        'data_fim': data_fim,
-        'estabelecimentos': Estabelecimento.objects.all(),
-        'estabelecimento_selecionado': estabelecimento_filtrado,
-        'hoje': hoje,
-        'qtd_incompletos': len(registros_incompletos_hoje),
-        'qtd_sem_registro': len(profissionais_sem_registro_hoje),
     }
+
+
+def _ultimos_registros_dashboard(estabelecimento=None):
+    registros = RegistroPonto.objects.select_related('profissional', 'estabelecimento')
+    if estabelecimento:
+        registros = registros.filter(estabelecimento=estabelecimento)
+    return list(registros.order_by('-data', '-horario')[:10])
+
+
+@login_required
+@user_passes_test(is_admin)
+def estatisticas_cache_painel(request):
+    """Acertos/faltas do cache do dashboard por seção (JSON)."""
+    return JsonResponse(cache_painel.estatisticas_cache())
+
+
+async def eventos_painel(request):
+    """
+    Eventos do dashboard (core/eventos.py). ?estabelecimento=<id> limita aos
+    eventos daquele estabelecimento.
+
+    - ?desde=<id>: JSON com os eventos depois daquele id (polling). Sem
+      valor, só o último id, pra começar dali;
+    - sob ASGI: stream SSE — cada tela aberta é só uma fila no event loop;
+    - sob WSGI: 204. O stream prenderia um worker por tela; o EventSource
+      desiste e a página passa pro polling.
+    """
+    usuario = await request.auser()
+    if not usuario.is_authenticated or not is_admin(usuario):
+        return HttpResponseForbidden()
     
-    return render(request, 'core/dashboard.html', context)
+    estabelecimento_id = request.GET.get('estabelecimento')
+    try:
+        estabelecimento_id = int(estabelecimento_id) if estabelecimento_id else None
+    except ValueError:
+        estabelecimento_id = None
+
+    if 'desde' in request.GET:
+        desde = request.GET['desde']
+        if not desde.isdigit():
+            return JsonResponse({'ultimo': await sync_to_async(ultimo_evento)(), 'eventos': []})
+        eventos = await sync_to_async(eventos_desde)(int(desde), estabelecimento_id)
+        return JsonResponse({
+            'ultimo': eventos[-1].pk if eventos else int(desde),
+            'eventos': [
+                {'id': evento.pk, 'nome': nome, 'dados': dados}
+                for evento in eventos
+                for nome, dados in expandir(evento, filtrada=estabelecimento_id is not None)
+            ],
+        })
+
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    resposta = StreamingHttpResponse(
+        fluxo_eventos(broker.assinar(estabelecimento_id)),
+        content_type='text/event-stream'
+    )
+    resposta['Cache-Control'] = 'no-cache'
+    resposta['X-Accel-Buffering'] = 'no'  # nginx: não segurar o stream
+    return resposta
 
 
 def calcular_estatisticas_atrasos_periodo(data_inicio, data_fim, estabelecimento=None):
-    """Calcula estatísticas de atrasos no período"""
-    filtros = Q(data__range=[data_inicio, data_fim], tipo='ENTRADA')
-    if estabelecimento:
-        filtros &= Q(estabelecimento=estabelecimento)
-    
-    stats = RegistroPonto.objects.filter(filtros).aggregate(
-        total_registros=Count('id'),
-        total_atrasos=Count('id', filter=Q(atraso_minutos__gt=0)),
-        total_sem_atraso=Count('id', filter=Q(atraso_minutos=0)),
-        soma_atrasos=Sum('atraso_minutos'),
-        media_atrasos=Avg('atraso_minutos', filter=Q(atraso_minutos__gt=0)),
-        max_atraso=Max('atraso_minutos')
+    """Calcula estatísticas de atrasos (das entradas) no período, pelo resumo diário"""
+    stats = resumos_periodo(data_inicio, data_fim, estabelecimento).aggregate(
+        total_registros=Coalesce(Sum('entradas'), 0),
+        total_atrasos=Coalesce(Sum('entradas_com_atraso'), 0),
+        soma_atrasos=Sum('atraso_total'),
+        max_atraso=Max('atraso_maximo')
+    )
+    stats['total_sem_atraso'] = stats['total_registros'] - stats['total_atrasos']
+    stats['media_atrasos'] = (
+        stats['soma_atrasos'] / stats['total_atrasos'] if stats['total_atrasos'] else None
     )
     
     if stats['total_registros']:
@@ -429,74 +404,12 @@ def calcular_estatisticas_atrasos_periodo(data_inicio, data_fim, estabelecimento
     return stats
 
 
-def calcular_registros_incompletos_hoje(estabelecimento=None):
-    """Identifica profissionais com registros incompletos hoje"""
-    hoje = timezone.now().date()
-    filtros = Q(data=hoje)
-    if estabelecimento:
-        filtros &= Q(estabelecimento=estabelecimento)
-    
-    registros_hoje = RegistroPonto.objects.filter(filtros)
-    
-    profissionais_com_entrada = set(registros_hoje.filter(tipo='ENTRADA').values_list('profissional_id', flat=True))
-    profissionais_com_saida = set(registros_hoje.filter(tipo='SAIDA').values_list('profissional_id', flat=True))
-    profissionais_incompletos = profissionais_com_entrada - profissionais_com_saida
-    
-    resultado = []
-    for prof_id in profissionais_incompletos:
-        try:
-            profissional = Profissional.objects.get(id=prof_id)
-            ultima_entrada = registros_hoje.filter(
-                profissional=profissional, tipo='ENTRADA'
-            ).order_by('-horario').first()
-            
-            if ultima_entrada:
-                resultado.append({
-                    'profissional': profissional,
-                    'ultima_entrada': ultima_entrada,
-                    'horario_entrada': ultima_entrada.horario,
-                    'atraso_minutos': ultima_entrada.atraso_minutos,
-                    'estabelecimento': ultima_entrada.estabelecimento
-                })
-        except Profissional.DoesNotExist:
-            continue
-    
-    return resultado
-
-
-def identificar_profissionais_sem_registro_hoje(estabelecimento=None):
-    """Identifica profissionais ativos sem registro hoje"""
-    hoje = timezone.now().date()
-    
-    filtros = Q(ativo=True)
-    if estabelecimento:
-        filtros &= Q(estabelecimento=estabelecimento)
-    
-    profissionais_ativos = Profissional.objects.filter(filtros)
-    profissionais_com_registro = set(RegistroPonto.objects.filter(
-        data=hoje
-    ).values_list('profissional_id', flat=True))
-    
-    return [p for p in profissionais_ativos if p.id not in profissionais_com_registro]
-
-
-def identificar_maiores_atrasos_hoje(estabelecimento=None, limit=10):
-    """Identifica os maiores atrasos do dia"""
-    hoje = timezone.now().date()
-    filtros = Q(data=hoje, tipo='ENTRADA', atraso_minutos__gt=0)
-    if estabelecimento:
-        filtros &= Q(estabelecimento=estabelecimento)
-    
-    return RegistroPonto.objects.filter(filtros).select_related(
-        'profissional', 'estabelecimento'
-    ).order_by('-atraso_minutos')[:limit]
-
-
 # ======================
 # RELATÓRIO PROFISSIONAL
 # ======================
 
 @login_required
+@ler_da_replica
 def relatorio_profissional(request, profissional_id):
     """Relatório do profissional com banco de horas individual"""
     profissional = get_object_or_404(Profissional, id=profissional_id)
@@ -542,24 +455,16 @@ def relatorio_profissional(request, profissional_id):
         horas_semana = carga_diaria.total_seconds() / 3600 * 5
         carga_horaria_semanal_formatada = formatar_horas(timedelta(hours=horas_semana))
     
-    # Buscar registros
-    registros = RegistroPonto.objects.filter(
-        profissional=profissional,
-        data__gte=data_inicio,
-        data__lte=data_fim
-    ).select_related('estabelecimento').order_by('-data', '-horario')
-    
-    # Agrupar por data
-    registros_por_data = defaultdict(list)
-    for registro in registros:
-        registros_por_data[registro.data].append(registro)
+    # Marcações do período: uma consulta só, métricas em memória (core/relatorios.py)
+    relatorio = obter_relatorio(request, profissional, data_inicio, data_fim)
+    registros = relatorio.registros_recentes
     
     # Calcular horas
-    horas_trabalhadas = calcular_horas_trabalhadas_periodo(data_inicio, data_fim, profissional)
+    horas_trabalhadas = relatorio.horas_trabalhadas
     horas_trabalhadas_decimal = round(horas_trabalhadas.total_seconds() / 3600, 2) if horas_trabalhadas else 0
     horas_trabalhadas_formatadas = formatar_horas(horas_trabalhadas)
     
-    horas_previstas = calcular_horas_previstas_periodo(profissional, data_inicio, data_fim)
+    horas_previstas = relatorio.horas_previstas
     horas_previstas_decimal = round(horas_previstas.total_seconds() / 3600, 2) if horas_previstas else 0
     horas_previstas_formatadas = formatar_horas(horas_previstas)
     
@@ -572,35 +477,31 @@ def relatorio_profissional(request, profissional_id):
         percentual_concluido = min(100, round((horas_trabalhadas_decimal / horas_previstas_decimal) * 100, 1))
     
     # Estatísticas de atrasos
-    stats_atrasos = calcular_estatisticas_atrasos(registros, tolerancia_minutos)
+    stats_atrasos = relatorio.estatisticas_atrasos(tolerancia_minutos)
     
-    # Estatísticas gerais
-    total_registros = registros.count()
-    entradas = registros.filter(tipo='ENTRADA').count()
-    saidas = registros.filter(tipo='SAIDA').count()
+    # Horas normais, extras e adicional noturno (folha de pagamento)
+    carga_prevista_dia = carga_do_dia(profissional, relatorio.calendario, carga_padrao=carga_diaria)
+    classificacao_horas = relatorio.classificacao(carga_diaria=carga_prevista_dia)
     
-    dias_uteis = calcular_dias_uteis(data_inicio, data_fim)
-    dias_trabalhados = len([d for d, regs in registros_por_data.items() 
-                           if any(r.tipo == 'ENTRADA' for r in regs)])
+    # Estatísticas gerais
+    total_registros = relatorio.total_registros
+    entradas = relatorio.entradas
+    saidas = relatorio.saidas
     
-    dias_incompletos = identificar_dias_incompletos(registros_por_data)
+    dias_uteis = relatorio.dias_previstos
+    dias_trabalhados = relatorio.dias_trabalhados
+    dias_incompletos = relatorio.dias_incompletos
     
     # Horas por dia da semana
-    horas_por_dia_semana = calcular_horas_por_dia_semana(registros_por_data)
+    horas_por_dia_semana = relatorio.horas_por_dia_semana
     
     # Agrupar registros para template
     registros_agrupados = []
-    for data_dia, registros_dia in sorted(registros_por_data.items(), reverse=True):
-        horas_dia = calcular_horas_trabalhadas_dia(registros_dia)
+    for data_dia, registros_dia in sorted(relatorio.registros_por_data.items(), reverse=True):
+        horas_dia = relatorio.horas_por_data[data_dia]
         
-        # Calcular carga esperada do dia
-        dia_util = data_dia.weekday() < 5
-        if carga_diaria.total_seconds() == 86400:
-            horas_esperada = timedelta(hours=24)
-        elif carga_diaria.total_seconds() == 43200:
-            horas_esperada = timedelta(hours=12) if dia_util else timedelta()
-        else:
-            horas_esperada = carga_diaria if dia_util else timedelta()
+        # Carga esperada do dia (escala de plantão ou carga × dia útil)
+        horas_esperada = carga_prevista_dia(data_dia)
         
         saldo_dia = (horas_dia.total_seconds() - horas_esperada.total_seconds()) / 60 if horas_esperada.total_seconds() > 0 else horas_dia.total_seconds() / 60
         
@@ -608,7 +509,7 @@ def relatorio_profissional(request, profissional_id):
             'data': data_dia,
             'data_formatada': data_dia.strftime('%d/%m/%Y'),
             'dia_semana': data_dia.strftime('%A'),
-            'registros': sorted(registros_dia, key=lambda x: x.horario),
+            'registros': registros_dia,
             'horas': formatar_horas(horas_dia) if horas_dia.total_seconds() > 0 else '00:00',
             'horas_decimal': round(horas_dia.total_seconds() / 3600, 2) if horas_dia.total_seconds() > 0 else 0,
             'horas_esperada': formatar_horas(horas_esperada) if horas_esperada.total_seconds() > 0 else '00:00',
@@ -652,6 +553,7 @@ def relatorio_profissional(request, profissional_id):
             'horas_previstas_decimal': horas_previstas_decimal,
             'percentual_concluido': percentual_concluido,
         },
+        'classificacao_horas': classificacao_horas['totais'],
         
         'total_atrasos': stats_atrasos['total_atrasos'],
         'total_saidas_antecipadas': stats_atrasos['total_saidas_antecipadas'],
@@ -680,8 +582,10 @@ def relatorio_profissional(request, profissional_id):
         
         'horas_por_dia': horas_por_dia_semana,
         
-        'is_plantao_12h': carga_diaria.total_seconds() == 43200,
-        'is_plantao_24h': carga_diaria.total_seconds() == 86400,
+        'escala': profissional.escala,
+        'regra_horas_previstas': descricao_regra(profissional),
+        'is_plantao_12h': profissional.escala is None and carga_diaria.total_seconds() == 43200,
+        'is_plantao_24h': profissional.escala is None and carga_diaria.total_seconds() == 86400,
         
         'diferenca_horas_decimal': round(horas_trabalhadas_decimal - horas_previstas_decimal, 2),
         'horas_trabalhadas': horas_trabalhadas_formatadas,
@@ -695,6 +599,7 @@ def relatorio_profissional(request, profissional_id):
 
 
 @login_required
+@ler_da_replica
 def relatorio_profissional_pdf(request, profissional_id):
     """Gera PDF do relatório do profissional"""
     try:
@@ -724,57 +629,42 @@ def relatorio_profissional_pdf(request, profissional_id):
         if data_fim < data_inicio:
             data_fim = data_inicio
         
-        # Buscar dados
-        registros = RegistroPonto.objects.filter(
-            profissional=profissional,
-            data__range=[data_inicio, data_fim]
-        ).order_by('data', 'horario')
-        
-        horas_trabalhadas = calcular_horas_trabalhadas_periodo(data_inicio, data_fim, profissional)
-        horas_previstas = calcular_horas_previstas_periodo(profissional, data_inicio, data_fim)
-        
-        # Agrupar por dia
-        registros_por_data = defaultdict(list)
-        for registro in registros:
-            registros_por_data[registro.data].append(registro)
-        
-        horas_por_dia = []
-        for data_dia, regs_dia in sorted(registros_por_data.items()):
-            horas_dia = calcular_horas_trabalhadas_dia(regs_dia)
-            horas_por_dia.append({
-                'data': data_dia.strftime('%d/%m/%Y'),
-                'dia_semana': data_dia.strftime('%A'),
-                'horas': formatar_horas(horas_dia),
-                'horas_decimal': round(horas_dia.total_seconds() / 3600, 2),
-            })
-        
-        context = {
-            'profissional': profissional,
-            'registros': registros,
-            'horas_por_dia': horas_por_dia,
-            'horas_trabalhadas': formatar_horas(horas_trabalhadas),
-            'horas_trabalhadas_decimal': round(horas_trabalhadas.total_seconds() / 3600, 2),
-            'carga_horaria_diaria': formatar_horas(obter_carga_horaria_timedelta(profissional.carga_horaria_diaria)),
-            'carga_horaria_semanal': formatar_horas(obter_carga_horaria_timedelta(profissional.carga_horaria_semanal)) if profissional.carga_horaria_semanal else '40:00',
-            'carga_horaria_esperada': formatar_horas(horas_previstas),
-            'diferenca_horas_decimal': round((horas_trabalhadas.total_seconds() - horas_previstas.total_seconds()) / 3600, 2),
-            'total_registros': registros.count(),
-            'entradas': registros.filter(tipo='ENTRADA').count(),
-            'saidas': registros.filter(tipo='SAIDA').count(),
-            'data_inicio': data_inicio.strftime('%d/%m/%Y'),
-            'data_fim': data_fim.strftime('%d/%m/%Y'),
-            'gerado_em': timezone.now(),
-            'usuario': request.user.get_full_name() or request.user.username,
-        }
+        usuario = request.user.get_full_name() or request.user.username
         
-        html_string = render_to_string('core/relatorio_profissional_pdf.html', context)
-        
-        response = HttpResponse(content_type='application/pdf')
-        filename = f"relatorio_{profissional.cpf}_{timezone.now().strftime('%Y%m%d_%H%M')}.pdf"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        HTML(string=html_string, base_url=request.build_absolute_uri()).write_pdf(response)
+        # Período longo: vai pra fila (tarefas/) em vez de travar o request
+        if acima_do_limite(data_inicio, data_fim) or request.GET.get('fila'):
+            tarefa = enfileirar(
+                'relatorio_profissional_pdf',
+                {
+                    'profissional_id': profissional.pk,
+                    'data_inicio': data_inicio.isoformat(),
+                    'data_fim': data_fim.isoformat(),
+                    'usuario': usuario,
+                },
+                usuario=request.user,
+                reaproveitar_concluida=data_fim < hoje,
+            )
+            return redirect('tarefas:acompanhar_tarefa', tarefa_id=tarefa.pk)
         
+        # Uma consulta de marcações (core/relatorios.py), PDF gerado em core/documentos.py
+        relatorio = obter_relatorio(request, profissional, data_inicio, data_fim)
+
+        def gerar():
+            return pdf_relatorio_profissional(
+                profissional, data_inicio, data_fim, usuario,
+                relatorio=relatorio, base_url=request.build_absolute_uri(),
+            )
+
+        # Período fechado: PDF guardado em disco (core/cache_pdf.py), com ETag
+        if cache_pdf.cacheavel(data_fim, hoje):
+            return cache_pdf.pdf_em_cache(
+                request, 'profissional', relatorio, usuario, gerar,
+                f"relatorio_{profissional.cpf}_{data_inicio:%Y%m%d}_{data_fim:%Y%m%d}.pdf",
+            )
+
+        nome_arquivo, conteudo = gerar()
+        response = HttpResponse(conteudo, content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
         return response
         
     except Exception as e:
@@ -782,12 +672,49 @@ def relatorio_profissional_pdf(request, profissional_id):
         return redirect('core:relatorio_profissional', profissional_id=profissional_id)
 
 
+@login_required
+@user_passes_test(is_admin)
+@ler_da_replica
+def relatorios_estabelecimento_pdf(request, estabelecimento_id):
+    """Zip com o PDF do relatório de cada profissional ativo do estabelecimento (gerado na fila)"""
+    estabelecimento = get_object_or_404(Estabelecimento, id=estabelecimento_id)
+
+    hoje = timezone.now().date()
+    inicio_mes = hoje.replace(day=1)
+    try:
+        data_inicio = datetime.strptime(request.GET.get('data_inicio', ''), '%Y-%m-%d').date()
+    except ValueError:
+        data_inicio = inicio_mes
+    try:
+        data_fim = datetime.strptime(request.GET.get('data_fim', ''), '%Y-%m-%d').date()
+    except ValueError:
+        data_fim = hoje
+    if data_fim < data_inicio:
+        data_fim = data_inicio
+
+    # Centenas de PDFs: sempre na fila (tarefas/). O pool de processos de
+    # core/lote_pdf.py só roda no worker, nunca dentro do request.
+    tarefa = enfileirar(
+        'relatorios_estabelecimento_zip',
+        {
+            'estabelecimento_id': estabelecimento.pk,
+            'data_inicio': data_inicio.isoformat(),
+            'data_fim': data_fim.isoformat(),
+            'usuario': request.user.get_full_name() or request.user.username,
+        },
+        usuario=request.user,
+        reaproveitar_concluida=data_fim < hoje,
+    )
+    return redirect('tarefas:acompanhar_tarefa', tarefa_id=tarefa.pk)
+
+
 # ======================
 # RELATÓRIOS GERAIS
 # ======================
 
 @login_required
 @user_passes_test(is_admin)
+@ler_da_replica
 def relatorios_gerais(request):
     """Relatórios gerais de ponto"""
     data_inicio = request.GET.get('data_inicio')
@@ -804,53 +731,61 @@ def relatorios_gerais(request):
     if estabelecimento_id:
         registros = registros.filter(estabelecimento_id=estabelecimento_id)
     
-    # Estatísticas gerais
-    total_registros = registros.count()
-    entradas = registros.filter(tipo='ENTRADA').count()
-    saidas = registros.filter(tipo='SAIDA').count()
-    
-    # Paginação dos registros
-    registros_ordenados = registros.order_by('-data', '-horario')
-    paginator_registros = Paginator(registros_ordenados, 20)
-    page_registros = paginator_registros.get_page(request.GET.get('page_registros', 1))
-    
-    # Estatísticas por profissional
-    profissionais_ids = registros.values_list('profissional_id', flat=True).distinct()
-    por_profissional = []
-    
-    for prof_id in profissionais_ids[:50]:  # Limitar para performance
-        try:
-            prof = Profissional.objects.get(id=prof_id)
-            registros_prof = registros.filter(profissional=prof)
-            
-            if data_inicio and data_fim:
-                data_incio_date = datetime.strptime(data_inicio, '%Y-%m-%d').date() if isinstance(data_inicio, str) else data_inicio
-                data_fim_date = datetime.strptime(data_fim, '%Y-%m-%d').date() if isinstance(data_fim, str) else data_fim
-                horas_prof = calcular_horas_trabalhadas_periodo(data_incio_date, data_fim_date, prof)
-            else:
-                horas_prof = timedelta()
-            
-            por_profissional.append({
-                'profissional': prof,
-                'total_registros': registros_prof.count(),
-                'entradas': registros_prof.filter(tipo='ENTRADA').count(),
-                'saidas': registros_prof.filter(tipo='SAIDA').count(),
-                'horas_trabalhadas': horas_prof,
-            })
-        except Profissional.DoesNotExist:
-            continue
-    
-    # Paginação dos profissionais
+    # Estatísticas gerais (resumo diário — uma linha por profissional/dia)
+    resumos = resumos_periodo(data_inicio or None, data_fim or None)
+    if estabelecimento_id:
+        resumos = resumos.filter(estabelecimento_id=estabelecimento_id)
+    totais = resumos.aggregate(
+        entradas=Coalesce(Sum('entradas'), 0),
+        saidas=Coalesce(Sum('saidas'), 0),
+    )
+    entradas = totais['entradas']
+    saidas = totais['saidas']
+    total_registros = entradas + saidas
+    
+    # Registros: página por cursor (core/paginacao.py) — sem OFFSET nem
+    # COUNT(*); o total do cabeçalho é o do resumo diário, acima
+    page_registros = paginar_por_cursor(registros, request.GET.get('cursor_registros'), 20)
+    
+    # Estatísticas por profissional: um GROUP BY no resumo diário, paginado
+    # no banco — o número de consultas não depende de quantos profissionais
+    # existem (contagem + página + horas da página).
+    por_profissional = resumos.values('profissional_id').annotate(
+        nome=F('profissional__nome'),
+        cpf=F('profissional__cpf'),
+        entradas=Sum('entradas'),
+        saidas=Sum('saidas'),
+    ).order_by('nome', 'profissional_id')
     paginator_profissionais = Paginator(por_profissional, 15)
     page_profissionais = paginator_profissionais.get_page(request.GET.get('page_profissionais', 1))
     
+    horas_por_profissional = {}
+    if data_inicio and data_fim:
+        data_inicio_date = datetime.strptime(data_inicio, '%Y-%m-%d').date()
+        data_fim_date = datetime.strptime(data_fim, '%Y-%m-%d').date()
+        horas_por_profissional = calcular_horas_trabalhadas_profissionais(
+            data_inicio_date, data_fim_date,
+            [linha['profissional_id'] for linha in page_profissionais.object_list]
+        )
+    
+    page_profissionais.object_list = [
+        {
+            'profissional': {'id': linha['profissional_id'], 'nome': linha['nome'], 'cpf': linha['cpf']},
+            'total_registros': linha['entradas'] + linha['saidas'],
+            'entradas': linha['entradas'],
+            'saidas': linha['saidas'],
+            'horas_trabalhadas': horas_por_profissional.get(linha['profissional_id'], timedelta()),
+        }
+        for linha in page_profissionais.object_list
+    ]
+    
     context = {
         'page_registros': page_registros,
         'page_profissionais': page_profissionais,
         'total_registros': total_registros,
         'entradas': entradas,
         'saidas': saidas,
-        'por_profissional': por_profissional,
+        'total_profissionais': paginator_profissionais.count,
         'estabelecimentos': Estabelecimento.objects.all(),
         'data_inicio': data_inicio,
         'data_fim': data_fim,
@@ -860,6 +795,52 @@ def relatorios_gerais(request):
     return render(request, 'core/relatorios_gerais.html', context)
 
 
+@login_required
+@user_passes_test(is_admin)
+@ler_da_replica
+def exportar_registros_csv(request):
+    """Marcações filtradas (período, estabelecimento, profissional) em CSV, em streaming"""
+    filtros = filtros_da_requisicao(request.GET)
+    response = StreamingHttpResponse(
+        csv_registros(registros_filtrados(**filtros), marcacoes_arquivadas_filtradas(**filtros)),
+        content_type='text/csv; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo_exportacao("csv", **filtros)}"'
+    return response
+
+
+@login_required
+@user_passes_test(is_admin)
+@ler_da_replica
+def exportar_registros_xlsx(request):
+    """
+    Marcações filtradas em XLSX (openpyxl write-only, montado em arquivo
+    temporário). Sem período fechado ou com período longo, vai pra fila.
+    """
+    filtros = filtros_da_requisicao(request.GET)
+    data_inicio, data_fim = filtros['data_inicio'], filtros['data_fim']
+    if not (data_inicio and data_fim) or acima_do_limite(data_inicio, data_fim) or request.GET.get('fila'):
+        tarefa = enfileirar(
+            'exportacao_xlsx',
+            {
+                'data_inicio': data_inicio.isoformat() if data_inicio else None,
+                'data_fim': data_fim.isoformat() if data_fim else None,
+                'estabelecimento_id': filtros['estabelecimento_id'],
+                'profissional_id': filtros['profissional_id'],
+            },
+            usuario=request.user,
+            reaproveitar_concluida=bool(data_fim) and data_fim < timezone.now().date(),
+        )
+        return redirect('tarefas:acompanhar_tarefa', tarefa_id=tarefa.pk)
+
+    return FileResponse(
+        xlsx_registros(registros_filtrados(**filtros), marcacoes_arquivadas_filtradas(**filtros)),
+        as_attachment=True,
+        filename=nome_arquivo_exportacao('xlsx', **filtros),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+
 # ======================
 # PERFIL DO USUÁRIO
 # ======================
@@ -877,7 +858,7 @@ def meu_perfil(request):
     registros = RegistroPonto.objects.filter(
         profissional=profissional,
         data__gte=trinta_dias_atras
-    ).select_related('estabelecimento').order_by('-data', '-horario')[:30]
+    ).select_related('estabelecimento', 'ajuste').order_by('-data', '-horario')[:30]
     
     inicio_mes = timezone.now().replace(day=1).date()
     horas_mes = calcular_horas_trabalhadas_periodo(inicio_mes, timezone.now().date(), profissional)
@@ -897,6 +878,7 @@ def meu_perfil(request):
 
 @login_required
 @user_passes_test(is_admin)
+@ler_da_replica
 def historico_pontos_profissional(request, profissional_id):
     """Histórico completo de pontos de um profissional"""
     profissional = get_object_or_404(Profissional, id=profissional_id)
@@ -905,41 +887,62 @@ def historico_pontos_profissional(request, profissional_id):
     data_fim = request.GET.get('data_fim')
     estabelecimento_id = request.GET.get('estabelecimento_id')
     
-    registros = RegistroPonto.objects.filter(profissional=profissional).select_related('estabelecimento')
-    
-    if data_inicio:
-        registros = registros.filter(data__gte=data_inicio)
-    if data_fim:
-        registros = registros.filter(data__lte=data_fim)
-    if estabelecimento_id:
-        registros = registros.filter(estabelecimento_id=estabelecimento_id)
-    
-    registros = registros.order_by('-data', '-horario')
+    def _data(valor):
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
+        except ValueError:
+            return None
+    
+    inicio, fim = _data(data_inicio), _data(data_fim)
+    
+    # Lista detalhada: uma página por cursor direto do banco (core/paginacao.py),
+    # agrupada por dia (mais recente primeiro). Meses arquivados
+    # (ponto/arquivamento.py) só são abertos quando a página chega neles; o
+    # estabelecimento das marcações deles sai da lista do filtro.
+    estabelecimentos = list(Estabelecimento.objects.all())
+    pagina = pagina_historico(
+        profissional, request.GET.get('cursor'), 50, inicio, fim, estabelecimento_id or None,
+        estabelecimentos={estabelecimento.pk: estabelecimento for estabelecimento in estabelecimentos},
+    )
     
-    # Agrupar por dia
-    registros_por_dia = defaultdict(list)
-    for registro in registros:
-        registros_por_dia[registro.data].append(registro)
+    # Totais e horas por dia do resumo diário (inclusive dos meses arquivados,
+    # que continuam no resumo) — sem ler as marcações do período.
+    resumos = resumos_periodo(inicio, fim, estabelecimento_id or None).filter(profissional=profissional)
+    totais = resumos.aggregate(
+        entradas=Coalesce(Sum('entradas'), 0),
+        saidas=Coalesce(Sum('saidas'), 0),
+        minutos=Coalesce(Sum('minutos_trabalhados'), 0),
+        dias=Count('data', distinct=True),
+    )
     
-    horas_por_dia = {}
-    for data_dia, regs_dia in registros_por_dia.items():
-        horas_por_dia[data_dia] = calcular_horas_trabalhadas_dia(regs_dia)
+    registros_por_dia = {}
+    for registro in pagina:
+        registros_por_dia.setdefault(registro.data, []).append(registro)
+    horas_por_dia = {
+        linha['data']: timedelta(minutes=linha['minutos'])
+        for linha in resumos.filter(data__in=list(registros_por_dia))
+        .values('data').annotate(minutos=Sum('minutos_trabalhados')).order_by()
+    } if registros_por_dia else {}
+    dias = [
+        {'data': data_dia, 'horas': horas_por_dia.get(data_dia, timedelta()), 'registros': registros_dia}
+        for data_dia, registros_dia in registros_por_dia.items()
+    ]
     
-    horas_trabalhadas = sum(horas_por_dia.values(), timedelta())
-    dias_trabalhados = len(horas_por_dia)
+    horas_trabalhadas = timedelta(minutes=totais['minutos'])
+    dias_trabalhados = totais['dias']
     
     context = {
         'profissional': profissional,
-        'registros': registros,
-        'registros_por_dia': dict(registros_por_dia),
+        'pagina': pagina,
+        'dias': dias,
         'horas_por_dia': horas_por_dia,
-        'total_registros': registros.count(),
-        'entradas': registros.filter(tipo='ENTRADA').count(),
-        'saidas': registros.filter(tipo='SAIDA').count(),
+        'total_registros': totais['entradas'] + totais['saidas'],
+        'entradas': totais['entradas'],
+        'saidas': totais['saidas'],
         'horas_trabalhadas': horas_trabalhadas,
         'dias_trabalhados': dias_trabalhados,
         'media_horas_dia': horas_trabalhadas / dias_trabalhados if dias_trabalhados > 0 else timedelta(),
-        'estabelecimentos': Estabelecimento.objects.all(),
+        'estabelecimentos': estabelecimentos,
         'data_inicio': data_inicio,
         'data_fim': data_fim,
         'estabelecimento_id': estabelecimento_id,
@@ -950,6 +953,7 @@ def historico_pontos_profissional(request, profissional_id):
 
 @login_required
 @user_passes_test(is_admin)
+@ler_da_replica
 def horas_trabalhadas_profissional(request, profissional_id):
     """Relatório detalhado de horas trabalhadas"""
     profissional = get_object_or_404(Profissional, id=profissional_id)
@@ -967,27 +971,18 @@ def horas_trabalhadas_profissional(request, profissional_id):
         data_fim = timezone.now().date()
         data_inicio = data_fim - timedelta(days=30)
     
-    registros = RegistroPonto.objects.filter(
-        profissional=profissional,
-        data__gte=data_inicio,
-        data__lte=data_fim
-    ).order_by('data', 'horario')
-    
-    registros_por_data = defaultdict(list)
-    for registro in registros:
-        registros_por_data[registro.data].append(registro)
+    relatorio = obter_relatorio(request, profissional, data_inicio, data_fim)
     
     dias_trabalho = []
-    for data_dia in (data_inicio + timedelta(n) for n in range((data_fim - data_inicio).days + 1)):
-        if data_dia in registros_por_data:
-            horas_dia = calcular_horas_trabalhadas_dia(registros_por_data[data_dia])
-            if horas_dia.total_seconds() > 0:
-                dias_trabalho.append({
-                    'data': data_dia,
-                    'horas': horas_dia,
-                    'horas_decimal': horas_dia.total_seconds() / 3600,
-                    'registros': registros_por_data[data_dia]
-                })
+    for data_dia, registros_dia in sorted(relatorio.registros_por_data.items()):
+        horas_dia = relatorio.horas_por_data[data_dia]
+        if horas_dia.total_seconds() > 0:
+            dias_trabalho.append({
+                'data': data_dia,
+                'horas': horas_dia,
+                'horas_decimal': horas_dia.total_seconds() / 3600,
+                'registros': registros_dia
+            })
     
     total_horas = sum((d['horas'] for d in dias_trabalho), timedelta())
     
@@ -997,7 +992,7 @@ def horas_trabalhadas_profissional(request, profissional_id):
         'total_horas': total_horas,
         'total_horas_decimal': total_horas.total_seconds() / 3600,
         'media_horas_dia': total_horas / len(dias_trabalho) if dias_trabalho else timedelta(),
-        'dias_uteis': calcular_dias_uteis(data_inicio, data_fim),
+        'dias_uteis': relatorio.dias_previstos,
         'mes': mes,
         'ano': ano,
         'data_inicio': data_inicio,
@@ -1009,6 +1004,7 @@ def horas_trabalhadas_profissional(request, profissional_id):
 
 @login_required
 @user_passes_test(is_admin)
+@ler_da_replica
 def analise_frequencia_profissional(request, profissional_id):
     """Análise de frequência e faltas"""
     profissional = get_object_or_404(Profissional, id=profissional_id)
@@ -1027,40 +1023,22 @@ def analise_frequencia_profissional(request, profissional_id):
         data_inicio = hoje.replace(day=1)
         data_fim = hoje
     
-    dias_uteis = calcular_dias_uteis(data_inicio, data_fim)
-    dias_com_registro = RegistroPonto.objects.filter(
-        profissional=profissional,
-        data__gte=data_inicio,
-        data__lte=data_fim
-    ).values('data').distinct().count()
-    
-    faltas = max(0, dias_uteis - dias_com_registro)
-    percentual_frequencia = (dias_com_registro / dias_uteis * 100) if dias_uteis > 0 else 0
-    
-    # Dias incompletos
-    dias_incompletos = 0
-    data_atual = data_inicio
-    while data_atual <= data_fim:
-        if data_atual.weekday() < 5:
-            registros_dia = RegistroPonto.objects.filter(
-                profissional=profissional,
-                data=data_atual
-            )
-            entradas = registros_dia.filter(tipo='ENTRADA').count()
-            saidas = registros_dia.filter(tipo='SAIDA').count()
-            if (entradas > 0 and saidas == 0) or (entradas == 0 and saidas > 0):
-                dias_incompletos += 1
-        data_atual += timedelta(days=1)
+    # Mapas de presença do mês (ponto/presenca.py): uma linha, sem ler marcações.
+    # O dia conta pela ENTRADA: num plantão que vira a noite a saída cai no
+    # dia seguinte, e contar as duas datas dobraria a presença.
+    frequencia = frequencia_periodo(profissional, data_inicio, data_fim)
     
     context = {
         'profissional': profissional,
         'data_inicio': data_inicio,
         'data_fim': data_fim,
-        'dias_uteis': dias_uteis,
-        'dias_trabalhados': dias_com_registro,
-        'faltas': faltas,
-        'percentual_frequencia': percentual_frequencia,
-        'dias_incompletos': dias_incompletos,
+        'dias_uteis': frequencia['dias_previstos'],
+        'dias_trabalhados': frequencia['dias_trabalhados'],
+        'faltas': frequencia['faltas'],
+        'percentual_frequencia': frequencia['percentual_frequencia'],
+        'dias_incompletos': frequencia['dias_incompletos'],
+        'maior_sequencia_faltas': frequencia['maior_sequencia_faltas'],
+        'dias_falta': dias_do_mapa(frequencia['mapa_faltas'], data_inicio),
         'mes': mes,
         'ano': ano,
     }
@@ -1075,6 +1053,7 @@ def get_client_ip(request):
 
 @login_required
 @user_passes_test(is_admin)
+@ler_da_replica
 def relatorio_consolidado_profissional(request, profissional_id):
     """Relatório consolidado com todos os dados"""
     profissional = get_object_or_404(Profissional, id=profissional_id)
@@ -1092,59 +1071,49 @@ def relatorio_consolidado_profissional(request, profissional_id):
         data_fim = timezone.now().date()
         data_inicio = data_fim - timedelta(days=30)
     
-    horas_trabalhadas = calcular_horas_trabalhadas_periodo(data_inicio, data_fim, profissional)
-    
-    dias_uteis = calcular_dias_uteis(data_inicio, data_fim)
-    dias_trabalhados = RegistroPonto.objects.filter(
-        profissional=profissional,
-        data__gte=data_inicio,
-        data__lte=data_fim
-    ).values('data').distinct().count()
-    
-    registros = RegistroPonto.objects.filter(
-        profissional=profissional,
-        data__gte=data_inicio,
-        data__lte=data_fim
-    )
-    total_registros = registros.count()
-    entradas = registros.filter(tipo='ENTRADA').count()
-    saidas = registros.filter(tipo='SAIDA').count()
-    
-    context = {
-        'profissional': profissional,
-        'data_inicio': data_inicio,
-        'data_fim': data_fim,
-        'horas_trabalhadas': horas_trabalhadas,
-        'dias_uteis': dias_uteis,
-        'dias_trabalhados': dias_trabalhados,
-        'faltas': dias_uteis - dias_trabalhados,
-        'total_registros': total_registros,
-        'entradas': entradas,
-        'saidas': saidas,
-        'mes': mes,
-        'ano': ano,
-    }
+    if 'pdf' in request.GET and (acima_do_limite(data_inicio, data_fim) or request.GET.get('fila')):
+        tarefa = enfileirar(
+            'relatorio_consolidado_pdf',
+            {
+                'profissional_id': profissional.pk,
+                'data_inicio': data_inicio.isoformat(),
+                'data_fim': data_fim.isoformat(),
+                'mes': mes,
+                'ano': ano,
+                'usuario': request.user.get_full_name() or request.user.username,
+            },
+            usuario=request.user,
+            reaproveitar_concluida=data_fim < timezone.now().date(),
+        )
+        return redirect('tarefas:acompanhar_tarefa', tarefa_id=tarefa.pk)
+    
+    relatorio = obter_relatorio(request, profissional, data_inicio, data_fim)
+    context = contexto_relatorio_consolidado(profissional, data_inicio, data_fim, mes, ano, relatorio)
     
     if 'pdf' in request.GET:
-        return gerar_pdf_relatorio_consolidado(request, context)
+        return gerar_pdf_relatorio_consolidado(request, context, relatorio)
     
     return render(request, 'core/relatorio_consolidado.html', context)
 
 
-def gerar_pdf_relatorio_consolidado(request, context):
+def gerar_pdf_relatorio_consolidado(request, context, relatorio=None):
     """Gera PDF do relatório consolidado"""
     try:
-        context['gerado_em'] = timezone.now()
-        context['usuario_gerador'] = request.user.get_full_name() or request.user.username
-        
-        html_string = render_to_string('core/relatorio_consolidado_pdf.html', context)
-        
-        response = HttpResponse(content_type='application/pdf')
-        filename = f"relatorio_consolidado_{context['profissional'].cpf}_{timezone.now().strftime('%Y%m%d_%H%M')}.pdf"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        HTML(string=html_string, base_url=request.build_absolute_uri()).write_pdf(response)
-        
+        usuario = request.user.get_full_name() or request.user.username
+
+        def gerar():
+            return pdf_relatorio_consolidado(context, usuario, base_url=request.build_absolute_uri())
+
+        # Período fechado: PDF guardado em disco (core/cache_pdf.py), com ETag
+        if relatorio is not None and cache_pdf.cacheavel(context['data_fim'], timezone.now().date()):
+            return cache_pdf.pdf_em_cache(
+                request, 'consolidado', relatorio, usuario, gerar,
+                f"relatorio_consolidado_{context['profissional'].cpf}_{context['data_inicio']:%Y%m%d}_{context['data_fim']:%Y%m%d}.pdf",
+            )
+
+        nome_arquivo, conteudo = gerar()
+        response = HttpResponse(conteudo, content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
         return response
         
     except Exception as e:
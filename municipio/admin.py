@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Municipio
+from .models import Municipio, Feriado
 
 @admin.register(Municipio)
 class MunicipioAdmin(admin.ModelAdmin):
@@ -12,4 +12,21 @@ class MunicipioAdmin(admin.ModelAdmin):
         (None, {
             'fields': ('nome', 'uf', 'codigo_ibge')
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(Feriado)
+class FeriadoAdmin(admin.ModelAdmin):
+    list_display = ['nome', 'data', 'recorrente', 'abrangencia', 'uf', 'municipio']
+    search_fields = ['nome', 'municipio__nome', 'municipio__codigo_ibge']
+    list_filter = ['abrangencia', 'recorrente', 'uf']
+    autocomplete_fields = ['municipio']
+
+    fieldsets = (
+        (None, {
+            'fields': ('nome', 'data', 'recorrente')
+        }),
+        ('Abrangência', {
+            'fields': ('abrangencia', 'uf', 'municipio')
+        }),
+    )
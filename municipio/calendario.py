@@ -0,0 +1,217 @@
+# municipio/calendario.py
+"""
+Calendário de dias úteis por município, com feriados nacionais, estaduais
+(UF do município) e municipais.
+
+Em vez de andar dia a dia a cada consulta, o calendário guarda um vetor de
+somas acumuladas (prefix sums): acumulado[i] = quantos dias úteis existem
+de self.inicio até o dia anterior a self.inicio + i. Contar dias úteis
+entre duas datas vira uma subtração — O(1), qualquer que seja o período.
+Junto, um bitmap (int do Python) com bit i ligado se self.inicio + i é dia
+útil — usado pelos mapas de presença (ponto/presenca.py), que cruzam os
+dias úteis com os dias trabalhados por AND.
+
+Ciclo de vida:
+- é montado sob demanda, na primeira consulta de cada município, e cobre
+  só os anos pedidos até ali (se uma consulta sair da janela, o vetor é
+  remontado cobrindo os anos novos);
+- fica em memória do processo, em _calendarios;
+- é invalidado quando um Feriado (ou a UF de um Município) muda — os
+  signals em municipio/signals.py incrementam uma versão guardada no cache
+  do Django, e cada processo compara essa versão antes de reaproveitar o
+  calendário que tem em memória. Com um cache compartilhado (Redis,
+  Memcached) isso vale entre processos; com o LocMemCache padrão a versão
+  não sai do processo, e o calendário é remontado a cada
+  CACHE_VALIDADE_LOCAL segundos (timeflow/cache.py).
+
+O mesmo calendário é lido por várias threads do servidor. O vetor e o
+bitmap ficam juntos numa _Janela que nunca é alterada: estender o período
+monta uma janela nova e troca a referência de uma vez, e cada consulta lê
+uma janela só do começo ao fim. A janela não passa de MAXIMO_ANOS; uma
+consulta fora disso (uma data digitada errado, 1900) é respondida por uma
+janela montada só pra ela, sem substituir a que fica em memória.
+"""
+import threading
+import time
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from timeflow.cache import validade_local
+
+CHAVE_VERSAO = 'calendario_feriados:versao'
+
+MAXIMO_ANOS = 30
+
+_calendarios = {}
+
+
+class _Janela:
+    """Somas acumuladas e bitmap de ano_inicial a ano_final. Não muda depois de montada."""
+
+    __slots__ = ('ano_inicial', 'ano_final', 'inicio', 'acumulado', 'mascara')
+
+    def __init__(self, ano_inicial, ano_final, e_util):
+        self.ano_inicial = ano_inicial
+        self.ano_final = ano_final
+        self.inicio = date(ano_inicial, 1, 1)
+        total_dias = (date(ano_final + 1, 1, 1) - self.inicio).days
+
+        acumulado = [0] * (total_dias + 1)
+        bits = []
+        dia = self.inicio
+        for i in range(total_dias):
+            util = e_util(dia)
+            acumulado[i + 1] = acumulado[i] + (1 if util else 0)
+            bits.append('1' if util else '0')
+            dia += timedelta(days=1)
+        self.acumulado = acumulado
+        self.mascara = int(''.join(reversed(bits)) or '0', 2)
+
+    def cobre(self, ano_min, ano_max):
+        return self.ano_inicial <= ano_min and ano_max <= self.ano_final
+
+
+class CalendarioDiasUteis:
+    """Dias úteis (segunda a sexta, exceto feriados) com consulta O(1)."""
+
+    def __init__(self, feriados_recorrentes, feriados_datas, ano_inicial, ano_final):
+        self.feriados_recorrentes = frozenset(feriados_recorrentes)  # {(mes, dia)}
+        self.feriados_datas = frozenset(feriados_datas)              # {date}
+        self._trava = threading.Lock()
+        self._janela = _Janela(ano_inicial, ano_final, self._e_util)
+
+    @property
+    def ano_inicial(self):
+        return self._janela.ano_inicial
+
+    @property
+    def ano_final(self):
+        return self._janela.ano_final
+
+    def _e_util(self, dia):
+        return (
+            dia.weekday() < 5
+            and (dia.month, dia.day) not in self.feriados_recorrentes
+            and dia not in self.feriados_datas
+        )
+
+    def _cobrir(self, *datas):
+        """Janela que cobre as datas — a atual, uma estendida ou uma avulsa."""
+        ano_min = min(d.year for d in datas)
+        ano_max = max(d.year for d in datas)
+        janela = self._janela
+        if janela.cobre(ano_min, ano_max):
+            return janela
+        with self._trava:
+            janela = self._janela  # outra thread pode ter estendido enquanto esperávamos
+            if janela.cobre(ano_min, ano_max):
+                return janela
+            ano_inicial = min(ano_min, janela.ano_inicial)
+            ano_final = max(ano_max, janela.ano_final)
+            if ano_final - ano_inicial + 1 > MAXIMO_ANOS:
+                return _Janela(ano_min, ano_max, self._e_util)
+            self._janela = _Janela(ano_inicial, ano_final, self._e_util)
+            return self._janela
+
+    def e_feriado(self, dia):
+        return (dia.month, dia.day) in self.feriados_recorrentes or dia in self.feriados_datas
+
+    def e_dia_util(self, dia):
+        janela = self._cobrir(dia)
+        i = (dia - janela.inicio).days
+        return janela.acumulado[i + 1] > janela.acumulado[i]
+
+    def dias_uteis(self, data_inicio, data_fim):
+        """Dias úteis entre data_inicio e data_fim (inclusive)."""
+        if data_fim < data_inicio:
+            return 0
+        janela = self._cobrir(data_inicio, data_fim)
+        return (
+            janela.acumulado[(data_fim - janela.inicio).days + 1]
+            - janela.acumulado[(data_inicio - janela.inicio).days]
+        )
+
+    def mascara_dias_uteis(self, data_inicio, data_fim):
+        """Bitmap dos dias úteis do período: bit i = data_inicio + i."""
+        if data_fim < data_inicio:
+            return 0
+        janela = self._cobrir(data_inicio, data_fim)
+        total = (data_fim - data_inicio).days + 1
+        return (janela.mascara >> (data_inicio - janela.inicio).days) & ((1 << total) - 1)
+
+    def feriados_entre(self, data_inicio, data_fim):
+        """Conjunto de datas de feriado no período (inclusive), p/ o cálculo de horas extras 100%."""
+        datas = {d for d in self.feriados_datas if data_inicio <= d <= data_fim}
+        for ano in range(data_inicio.year, data_fim.year + 1):
+            for mes, dia in self.feriados_recorrentes:
+                try:
+                    candidato = date(ano, mes, dia)
+                except ValueError:  # 29/02 em ano não bissexto
+                    continue
+                if data_inicio <= candidato <= data_fim:
+                    datas.add(candidato)
+        return datas
+
+
+def _versao_atual():
+    return cache.get_or_set(CHAVE_VERSAO, 1, timeout=None)
+
+
+def invalidar_calendarios():
+    """Chamado pelos signals quando feriados (ou a UF de um município) mudam."""
+    try:
+        cache.incr(CHAVE_VERSAO)
+    except ValueError:
+        cache.set(CHAVE_VERSAO, 2, timeout=None)
+    _calendarios.clear()
+
+
+def _carregar_feriados(municipio):
+    from .models import Feriado
+
+    filtro = Q(abrangencia='NACIONAL')
+    if municipio is not None:
+        filtro |= Q(abrangencia='ESTADUAL', uf=municipio.uf)
+        filtro |= Q(abrangencia='MUNICIPAL', municipio=municipio)
+
+    recorrentes = set()
+    datas = set()
+    for data_feriado, recorrente in Feriado.objects.filter(filtro).values_list('data', 'recorrente'):
+        if recorrente:
+            recorrentes.add((data_feriado.month, data_feriado.day))
+        else:
+            datas.add(data_feriado)
+    return recorrentes, datas
+
+
+def _dentro_da_validade(montado_em):
+    validade = validade_local()
+    return validade is None or time.monotonic() - montado_em < validade
+
+
+def obter_calendario(municipio=None):
+    """
+    Calendário do município (ou só com feriados nacionais, se municipio for
+    None). Montado na primeira chamada e reaproveitado enquanto a versão dos
+    feriados não mudar.
+    """
+    chave = municipio.pk if municipio is not None else None
+    versao = _versao_atual()
+
+    item = _calendarios.get(chave)
+    if item is not None and item[0] == versao and _dentro_da_validade(item[2]):
+        return item[1]
+
+    recorrentes, datas = _carregar_feriados(municipio)
+    ano = date.today().year
+    calendario = CalendarioDiasUteis(recorrentes, datas, ano - 1, ano + 1)
+    _calendarios[chave] = (versao, calendario, time.monotonic())
+    return calendario
+
+
+def calendario_do_profissional(profissional):
+    """Calendário do município do estabelecimento do profissional."""
+    estabelecimento = profissional.estabelecimento
+    return obter_calendario(estabelecimento.municipio if estabelecimento else None)
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('municipio', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Feriado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100)),
+                ('data', models.DateField(help_text='Para feriados recorrentes, só o dia e o mês são considerados.')),
+                ('recorrente', models.BooleanField(default=True, help_text='Repete todo ano no mesmo dia/mês (ex: 7 de setembro). Desmarque para feriados móveis (Carnaval, Corpus Christi).')),
+                ('abrangencia', models.CharField(choices=[('NACIONAL', 'Nacional'), ('ESTADUAL', 'Estadual'), ('MUNICIPAL', 'Municipal')], default='NACIONAL', max_length=10)),
+                ('uf', models.CharField(blank=True, help_text='Obrigatório para feriados estaduais.', max_length=2)),
+                ('municipio', models.ForeignKey(blank=True, help_text='Obrigatório para feriados municipais.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='feriados', to='municipio.municipio')),
+            ],
+            options={
+                'verbose_name': 'Feriado',
+                'verbose_name_plural': 'Feriados',
+                'ordering': ['data'],
+                'indexes': [models.Index(fields=['abrangencia', 'uf'], name='municipio_f_abrange_ab16e2_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 
 class Municipio(models.Model):
@@ -10,4 +11,52 @@ class Municipio(models.Model):
     
     class Meta:
         verbose_name = "Município"
-        verbose_name_plural = "Municípios"
\ No newline at end of file
+        verbose_name_plural = "Municípios"
+
+
+class Feriado(models.Model):
+    """
+    Feriado nacional, estadual (pela UF do município) ou municipal (pelo
+    município, identificado pelo código IBGE). Usado pelo calendário de dias
+    úteis em municipio/calendario.py.
+    """
+    ABRANGENCIA_CHOICES = [
+        ('NACIONAL', 'Nacional'),
+        ('ESTADUAL', 'Estadual'),
+        ('MUNICIPAL', 'Municipal'),
+    ]
+
+    nome = models.CharField(max_length=100)
+    data = models.DateField(help_text='Para feriados recorrentes, só o dia e o mês são considerados.')
+    recorrente = models.BooleanField(
+        default=True,
+        help_text='Repete todo ano no mesmo dia/mês (ex: 7 de setembro). '
+                  'Desmarque para feriados móveis (Carnaval, Corpus Christi).'
+    )
+    abrangencia = models.CharField(max_length=10, choices=ABRANGENCIA_CHOICES, default='NACIONAL')
+    uf = models.CharField(max_length=2, blank=True, help_text='Obrigatório para feriados estaduais.')
+    municipio = models.ForeignKey(
+        Municipio,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='feriados',
+        help_text='Obrigatório para feriados municipais.'
+    )
+
+    def __str__(self):
+        return f"{self.nome} ({self.data.strftime('%d/%m')})"
+
+    def clean(self):
+        if self.abrangencia == 'ESTADUAL' and not self.uf:
+            raise ValidationError({'uf': 'Informe a UF do feriado estadual.'})
+        if self.abrangencia == 'MUNICIPAL' and not self.municipio_id:
+            raise ValidationError({'municipio': 'Informe o município do feriado municipal.'})
+
+    class Meta:
+        verbose_name = "Feriado"
+        verbose_name_plural = "Feriados"
+        ordering = ['data']
+        indexes = [
+            models.Index(fields=['abrangencia', 'uf']),
+        ]
@@ -0,0 +1,25 @@
+# municipio/signals.py
+"""
+Invalida os calendários de dias úteis em memória (municipio/calendario.py)
+quando um feriado é criado, alterado ou removido, ou quando um município
+muda — a UF decide quais feriados estaduais valem pra ele.
+
+Registrado em municipio/apps.py -> MunicipioConfig.ready().
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .calendario import invalidar_calendarios
+from .models import Feriado, Municipio
+
+
+@receiver(post_save, sender=Feriado)
+@receiver(post_delete, sender=Feriado)
+def feriado_alterado(sender, instance, **kwargs):
+    invalidar_calendarios()
+
+
+@receiver(post_save, sender=Municipio)
+def municipio_alterado(sender, instance, created, **kwargs):
+    if not created:
+        invalidar_calendarios()
@@ -1,3 +1,55 @@
-from django.test import TestCase
+import time
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+
+from .calendario import MAXIMO_ANOS, CalendarioDiasUteis, invalidar_calendarios, obter_calendario
+from .models import Feriado
+
+
+class CalendarioDiasUteisTests(SimpleTestCase):
+    """municipio/calendario.py"""
+
+    def setUp(self):
+        self.calendario = CalendarioDiasUteis({(12, 25)}, {date(2026, 9, 7)}, 2026, 2026)
+
+    def test_dias_uteis_descontam_fim_de_semana_e_feriados(self):
+        # setembro/2026: 22 dias de semana, menos o 7 de setembro
+        self.assertEqual(self.calendario.dias_uteis(date(2026, 9, 1), date(2026, 9, 30)), 21)
+        self.assertFalse(self.calendario.e_dia_util(date(2026, 9, 7)))
+        self.assertEqual(self.calendario.mascara_dias_uteis(date(2026, 9, 4), date(2026, 9, 8)), 0b10001)
+
+    def test_consulta_fora_da_janela_estende_o_periodo(self):
+        janela = self.calendario._janela
+        self.assertFalse(self.calendario.e_dia_util(date(2027, 12, 25)))
+        self.assertEqual((self.calendario.ano_inicial, self.calendario.ano_final), (2026, 2027))
+        self.assertIsNot(self.calendario._janela, janela)
+        # a janela antiga continua inteira pra quem ainda está lendo dela
+        self.assertEqual(janela.ano_final, 2026)
+
+    def test_data_muito_distante_nao_substitui_a_janela(self):
+        ano = 2026 - MAXIMO_ANOS  # 1996: 08 a 12/01 é segunda a sexta
+        self.assertEqual(self.calendario.dias_uteis(date(ano, 1, 8), date(ano, 1, 12)), 5)
+        self.assertEqual((self.calendario.ano_inicial, self.calendario.ano_final), (2026, 2026))
+
+
+class CalendarioEntreProcessosTests(TestCase):
+    """Com cache por processo (LocMemCache nos testes), o calendário vale CACHE_VALIDADE_LOCAL segundos."""
+
+    def setUp(self):
+        invalidar_calendarios()
+        self.addCleanup(invalidar_calendarios)
+        segunda = date(date.today().year, 2, 1)
+        self.segunda = segunda + timedelta(days=-segunda.weekday() % 7)
+
+    def test_feriado_gravado_em_outro_processo_entra_depois_da_validade(self):
+        calendario = obter_calendario()
+        # O signal do outro processo não chega aqui.
+        with mock.patch('municipio.signals.invalidar_calendarios'):
+            Feriado.objects.create(nome='Feriado', data=self.segunda, recorrente=False, abrangencia='NACIONAL')
+        self.assertIs(obter_calendario(), calendario)
+
+        depois = time.monotonic() + 61
+        with mock.patch('municipio.calendario.time.monotonic', return_value=depois):
+            self.assertFalse(obter_calendario().e_dia_util(self.segunda))
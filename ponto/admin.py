@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import RegistroPonto
+from .models import ArquivoMarcacoes, PresencaMensal, RegistroPonto, ResumoDiarioPonto
 
 @admin.register(RegistroPonto)
 class RegistroPontoSimpleAdmin(admin.ModelAdmin):
@@ -28,7 +28,13 @@ class RegistroPontoSimpleAdmin(admin.ModelAdmin):
         'estabelecimento__nome'
     ]
     
-    readonly_fields = ['created_at']
+    def get_queryset(self, request):
+        # __str__ usa o nome do profissional (exclusão em lote, histórico)
+        return super().get_queryset(request).select_related('profissional', 'estabelecimento')
+
+    # latitude/longitude são propriedades sobre latitude_e7/longitude_e7
+    # (ver RegistroPonto) — só exibição
+    readonly_fields = ['created_at', 'latitude', 'longitude']
     
     fieldsets = (
         (None, {
@@ -52,4 +58,63 @@ class RegistroPontoSimpleAdmin(admin.ModelAdmin):
         ('Metadados', {
             'fields': ('created_at',)
         })
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(ResumoDiarioPonto)
+class ResumoDiarioPontoAdmin(admin.ModelAdmin):
+    """Somente leitura: as linhas são mantidas pelos signals de RegistroPonto
+    e pelo comando `reconstruir_resumo_diario`."""
+    list_display = [
+        'data',
+        'profissional',
+        'estabelecimento',
+        'entradas',
+        'saidas',
+        'entradas_com_atraso',
+        'atraso_total',
+        'completo',
+    ]
+    list_filter = ['completo', 'data', 'estabelecimento']
+    search_fields = ['profissional__nome', 'profissional__cpf']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PresencaMensal)
+class PresencaMensalAdmin(admin.ModelAdmin):
+    """Somente leitura: as linhas são mantidas pelos signals de RegistroPonto
+    e pelo comando `reconstruir_presenca_mensal`."""
+    list_display = ['profissional', 'ano', 'mes', 'dias_trabalhados', 'atualizado_em']
+    list_filter = ['ano', 'mes']
+    search_fields = ['profissional__nome', 'profissional__cpf']
+
+    @admin.display(description='Dias trabalhados')
+    def dias_trabalhados(self, obj):
+        return obj.dias_entrada.bit_count()
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArquivoMarcacoes)
+class ArquivoMarcacoesAdmin(admin.ModelAdmin):
+    """Somente leitura: as linhas são mantidas pelo comando `arquivar_marcacoes`."""
+    list_display = ['mes', 'quantidade', 'nsr_inicial', 'nsr_final', 'tamanho_bytes', 'arquivado_em']
+    exclude = ['indice']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,462 @@
+# ponto/arquivamento.py
+"""
+Arquivamento das marcações antigas: a lei exige guardar, não deixar tudo
+quente. Meses inteiros de RegistroPonto mais velhos que o horizonte
+(settings.ARQUIVO_MARCACOES_HORIZONTE_MESES) saem do banco pra um arquivo
+por mês em settings.ARQUIVO_MARCACOES_DIRETORIO, e fica no banco só o
+manifesto (ArquivoMarcacoes) — as tabelas e índices quentes param de
+carregar anos de linhas frias.
+
+Formato do arquivo (`AAAA/AAAA-MM_<carimbo>.jsonl.gz`):
+
+- uma linha JSON por marcação, com todas as colunas de RegistroPonto pelo
+  nome (NSR, hash_registro, registro_manual_referencia_id, ajustado_por_id,
+  codigo_validacao...) — nada é recalculado na volta. Os valores são os
+  lógicos, não os do layout do banco: hash em hex, GPS em graus e os
+  textos de AjusteRegistroPonto na própria linha (CAMPOS);
+- cada profissional é um membro gzip separado, em ordem de profissional e,
+  dentro dele, de (data, horário, id). O manifesto guarda a posição e o
+  tamanho de cada membro (`indice`): o histórico de uma pessoa lê só o
+  pedaço dela, sem descomprimir o mês;
+- sha256 do arquivo inteiro no manifesto, conferido nas leituras completas
+  (AFD) e pelo `arquivar_marcacoes --verificar`; cada membro gzip ainda tem
+  o próprio CRC32.
+
+Leitura transparente — marcacoes_arquivadas() devolve RegistroPonto
+montados a partir do arquivo (fora do banco, `arquivado = True`), e quem
+lê marcações de períodos antigos junta com as do banco:
+
+- core/relatorios.py (RelatorioProfissional e relatorios_em_lote) — e com
+  ele o relatório do profissional e os PDFs;
+- o histórico do profissional (core/relatorios.py -> pagina_historico),
+  que abre um mês arquivado só quando a página por cursor chega nele;
+- afd/gerador.py (marcações tipo 7, que carregam NSR e hash da cadeia);
+- o espelho de ponto e o AEJ (ponto/espelho.py -> espelhos, por lote de
+  profissionais);
+- a exportação CSV/XLSX (core/exportacao.py);
+- RegistroPonto.save(): se não sobrar nenhuma marcação com hash no banco,
+  a cadeia continua do hash_final do último mês arquivado.
+
+O que NÃO lê arquivo (continua só com o banco): painéis e API mobile, que
+trabalham com períodos recentes, e a validação pública de comprovante
+(codigo_validacao) — o arquivo não é indexado por código; pra um mês
+arquivado ela responde 404 dizendo até onde vai o arquivo.
+
+Resumo diário e mapas de presença dos meses arquivados ficam no banco como
+estavam (a exclusão do arquivamento não dispara signals), e as
+reconstruções (`reconstruir_resumo_diario`, `reconstruir_presenca_mensal`)
+não mexem em meses arquivados. Marcação nova ou editada pra dentro de um mês
+arquivado é recusada (RegistroPonto.clean -> mes_arquivado): o resumo, a
+presença e a checagem de duplicidade só enxergam o banco, e o mês ficaria
+pela metade. Pra corrigir um mês arquivado, restaure o mês primeiro. Os
+signals de resumo/presença também pulam dias arquivados, pro caso de uma
+linha chegar por fora do save (bulk_create, update()).
+
+Não existe um verificador da cadeia de hashes no sistema; o que se confere
+aqui é a integridade do arquivo (sha256, CRC dos membros e contagem contra
+o manifesto).
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import date, datetime, time, timedelta
+from itertools import chain
+from uuid import UUID
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+
+from .models import ESCALA_GPS, AjusteRegistroPonto, ArquivoMarcacoes, RegistroPonto
+
+VERSAO_FORMATO = 1
+LOTE = 2000
+LOTE_PROFISSIONAIS = 200
+LOTE_EXCLUSAO = 1000
+
+# Colunas de cada linha do arquivo. Não mudam com o layout do banco — os
+# arquivos já gravados continuam legíveis.
+CAMPOS = [
+    'id', 'profissional_id', 'estabelecimento_id', 'data', 'horario', 'tipo', 'latitude', 'longitude',
+    'created_at', 'atraso_minutos', 'saida_antecipada_minutos', 'dentro_tolerancia', 'ajuste_manual',
+    'registro_manual_referencia_id', 'justificativa_ajuste', 'observacoes', 'ajustado_por_id',
+    'codigo_validacao', 'nsr', 'hash_registro', 'identificador_coletor', 'offline',
+]
+
+_CAMPOS = RegistroPonto._meta.concrete_fields
+_CONSULTA = [campo.attname for campo in _CAMPOS] + ['ajuste__justificativa', 'ajuste__observacoes']
+
+# colunas do banco que não estão no arquivo com o mesmo nome/valor
+_DO_ARQUIVO = {
+    'latitude_e7': lambda dados: round(dados['latitude'] * ESCALA_GPS),
+    'longitude_e7': lambda dados: round(dados['longitude'] * ESCALA_GPS),
+    'hash_binario': lambda dados: bytes.fromhex(dados['hash_registro']) if dados.get('hash_registro') else None,
+}
+
+
+def diretorio():
+    return getattr(
+        settings, 'ARQUIVO_MARCACOES_DIRETORIO', os.path.join(settings.BASE_DIR, 'arquivo_marcacoes')
+    )
+
+
+def horizonte_meses():
+    return getattr(settings, 'ARQUIVO_MARCACOES_HORIZONTE_MESES', 24)
+
+
+def fim_do_mes(mes):
+    return (mes.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+def limite_do_horizonte(meses=None, hoje=None):
+    """Primeiro dia do mais antigo mês que fica no banco."""
+    meses = horizonte_meses() if meses is None else meses
+    hoje = hoje or timezone.now().date()
+    total = hoje.year * 12 + hoje.month - 1 - meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def meses_a_arquivar(meses=None, hoje=None):
+    """Primeiro dia de cada mês, antes do horizonte, que ainda tem marcações no banco."""
+    limite = limite_do_horizonte(meses, hoje)
+    return list(RegistroPonto.objects.filter(data__lt=limite).dates('data', 'month'))
+
+
+def primeiro_dia_nao_arquivado():
+    """Dia seguinte ao último mês arquivado (None se nada foi arquivado)."""
+    ultimo = ArquivoMarcacoes.objects.order_by('-mes').values_list('mes', flat=True).first()
+    return fim_do_mes(ultimo) + timedelta(days=1) if ultimo else None
+
+
+def mes_arquivado(dia):
+    """
+    Se o mês de `dia` já foi arquivado. O mês corrente e os seguintes
+    nunca são (o horizonte conta meses fechados), então a marcação do dia
+    não consulta o banco.
+    """
+    if dia >= timezone.now().date().replace(day=1):
+        return False
+    return ArquivoMarcacoes.objects.filter(mes=dia.replace(day=1)).exists()
+
+
+def hash_final_arquivado():
+    """hash_registro da marcação de maior NSR já arquivada ('' se nenhuma)."""
+    return (
+        ArquivoMarcacoes.objects
+        .exclude(hash_final='')
+        .order_by('-nsr_final')
+        .values_list('hash_final', flat=True)
+        .first()
+    ) or ''
+
+
+# ---------------------------------------------------------------------------
+# Escrita
+# ---------------------------------------------------------------------------
+
+def _para_json(valor):
+    if isinstance(valor, (date, time, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, UUID):
+        return str(valor)
+    raise TypeError(f'Valor não serializável: {valor!r}')
+
+
+def _dados(valores):
+    """Linha do arquivo (CAMPOS) a partir de uma tupla de _CONSULTA."""
+    dados = dict(zip(_CONSULTA, valores))
+    dados['latitude'] = dados['latitude_e7'] / ESCALA_GPS
+    dados['longitude'] = dados['longitude_e7'] / ESCALA_GPS
+    dados['hash_registro'] = bytes(dados['hash_binario']).hex() if dados['hash_binario'] else ''
+    dados['justificativa_ajuste'] = dados['ajuste__justificativa']
+    dados['observacoes'] = dados['ajuste__observacoes']
+    return {campo: dados[campo] for campo in CAMPOS}
+
+
+def _chave_cronologica(dados):
+    return dados['data'], dados['horario'], dados['id']
+
+
+def _linhas_do_membro(caminho, posicao, tamanho):
+    with open(caminho, 'rb') as arquivo:
+        arquivo.seek(posicao)
+        bloco = arquivo.read(tamanho)
+    return gzip.decompress(bloco).splitlines()
+
+
+def _marcacoes_por_profissional(registros, anterior):
+    """
+    (profissional_id, [dicts em ordem cronológica]) de todo mundo que tem
+    marcação no mês — as do banco e, se o mês já foi arquivado antes, as do
+    arquivo anterior. Lê LOTE_PROFISSIONAIS profissionais por consulta.
+    """
+    profissionais = set(registros.order_by().values_list('profissional_id', flat=True).distinct())
+    caminho_anterior = None
+    if anterior is not None:
+        profissionais |= {int(chave) for chave in anterior.indice}
+        caminho_anterior = os.path.join(diretorio(), anterior.caminho)
+    profissionais = sorted(profissionais)
+
+    for inicio in range(0, len(profissionais), LOTE_PROFISSIONAIS):
+        lote = profissionais[inicio:inicio + LOTE_PROFISSIONAIS]
+        do_banco = {profissional_id: [] for profissional_id in lote}
+        consulta = (
+            registros.filter(profissional_id__in=lote)
+            .order_by('profissional_id', 'data', 'horario', 'id')
+            .values_list(*_CONSULTA)
+        )
+        for valores in consulta.iterator(chunk_size=LOTE):
+            dados = _dados(valores)
+            do_banco[dados['profissional_id']].append(dados)
+
+        for profissional_id in lote:
+            marcacoes = do_banco[profissional_id]
+            posicao = anterior.indice.get(str(profissional_id)) if anterior is not None else None
+            if posicao:
+                # Mês rearquivado: junta com o que já estava no arquivo
+                marcacoes = [json.loads(linha) for linha in _linhas_do_membro(caminho_anterior, *posicao)] + [
+                    json.loads(json.dumps(dados, default=_para_json)) for dados in marcacoes
+                ]
+                marcacoes.sort(key=_chave_cronologica)
+            yield profissional_id, marcacoes
+
+
+def _gravar_arquivo(caminho, membros):
+    """Grava os membros gzip; devolve (sha256, tamanho, indice, estatísticas)."""
+    sha = hashlib.sha256()
+    indice = {}
+    posicao = 0
+    estatisticas = {'quantidade': 0, 'nsr_inicial': None, 'nsr_final': None, 'hash_final': '', 'ids': []}
+    with open(caminho, 'wb') as arquivo:
+        for profissional_id, marcacoes in membros:
+            if not marcacoes:
+                continue
+            texto = ''.join(
+                json.dumps(dados, default=_para_json, ensure_ascii=False, separators=(',', ':')) + '\n'
+                for dados in marcacoes
+            )
+            bloco = gzip.compress(texto.encode('utf-8'), compresslevel=6, mtime=0)
+            arquivo.write(bloco)
+            sha.update(bloco)
+            indice[str(profissional_id)] = [posicao, len(bloco)]
+            posicao += len(bloco)
+
+            for dados in marcacoes:
+                estatisticas['quantidade'] += 1
+                estatisticas['ids'].append(dados['id'])
+                nsr = dados['nsr']
+                if nsr is not None:
+                    if estatisticas['nsr_inicial'] is None or nsr < estatisticas['nsr_inicial']:
+                        estatisticas['nsr_inicial'] = nsr
+                    if estatisticas['nsr_final'] is None or nsr > estatisticas['nsr_final']:
+                        estatisticas['nsr_final'] = nsr
+                        estatisticas['hash_final'] = dados['hash_registro']
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    return sha.hexdigest(), posicao, indice, estatisticas
+
+
+def _excluir(modelo, campo, valores):
+    """
+    DELETE direto das linhas com `campo` em `valores` — sem o Collector e
+    sem signals do .delete(): nada de recalcular resumo/presença nem de
+    carregar as linhas antes de apagar.
+    """
+    conexao = connections[router.db_for_write(modelo)]
+    tabela = conexao.ops.quote_name(modelo._meta.db_table)
+    coluna = conexao.ops.quote_name(modelo._meta.get_field(campo).column)
+    marcadores = ', '.join(['%s'] * len(valores))
+    with conexao.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {tabela} WHERE {coluna} IN ({marcadores})', valores)
+
+
+def arquivar_mes(mes):
+    """
+    Move as marcações do mês (primeiro dia em `mes`) do banco pro arquivo e
+    grava o manifesto. Devolve o ArquivoMarcacoes, ou None se não havia nada.
+
+    O arquivo é gravado e sincronizado em disco antes da transação que cria
+    o manifesto e apaga as linhas (só as que foram gravadas — o que chegar
+    no meio do caminho fica pro próximo arquivamento). A exclusão é direta,
+    sem signals: resumo diário, presença e caches dos meses antigos ficam
+    como estavam.
+    """
+    mes = mes.replace(day=1)
+    registros = RegistroPonto.objects.filter(data__gte=mes, data__lte=fim_do_mes(mes))
+    anterior = ArquivoMarcacoes.objects.filter(mes=mes).first()
+    if anterior is None and not registros.exists():
+        return None
+
+    relativo = os.path.join(f'{mes:%Y}', f'{mes:%Y-%m}_{timezone.now():%Y%m%d%H%M%S%f}.jsonl.gz')
+    caminho = os.path.join(diretorio(), relativo)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+    os.close(descritor)
+    try:
+        sha256, tamanho, indice, estatisticas = _gravar_arquivo(
+            temporario, _marcacoes_por_profissional(registros, anterior)
+        )
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+    ids = estatisticas.pop('ids')
+    try:
+        with transaction.atomic():
+            arquivo, _ = ArquivoMarcacoes.objects.update_or_create(
+                mes=mes,
+                defaults={
+                    'caminho': relativo,
+                    'sha256': sha256,
+                    'tamanho_bytes': tamanho,
+                    'indice': indice,
+                    'versao_formato': VERSAO_FORMATO,
+                    **estatisticas,
+                },
+            )
+            for inicio in range(0, len(ids), LOTE_EXCLUSAO):
+                do_lote = ids[inicio:inicio + LOTE_EXCLUSAO]
+                _excluir(AjusteRegistroPonto, 'registro', do_lote)
+                _excluir(RegistroPonto, 'id', do_lote)
+    except BaseException:
+        os.remove(caminho)
+        raise
+
+    if anterior is not None and anterior.caminho != relativo:
+        try:
+            os.remove(os.path.join(diretorio(), anterior.caminho))
+        except FileNotFoundError:
+            pass
+    return arquivo
+
+
+# ---------------------------------------------------------------------------
+# Leitura
+# ---------------------------------------------------------------------------
+
+def _sha256_do_arquivo(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        while pedaco := arquivo.read(1024 * 1024):
+            sha.update(pedaco)
+    return sha.hexdigest()
+
+
+def _conferir(arquivo):
+    caminho = os.path.join(diretorio(), arquivo.caminho)
+    if _sha256_do_arquivo(caminho) != arquivo.sha256:
+        raise ValueError(f'Arquivo de marcações de {arquivo.mes:%m/%Y} não confere com o manifesto: {caminho}')
+    return caminho
+
+
+def _linhas(arquivo, profissionais=None):
+    """Linhas (bytes) do arquivo — todas (conferindo o sha256) ou só dos profissionais."""
+    if profissionais is None:
+        with gzip.open(_conferir(arquivo), 'rb') as conteudo:
+            yield from conteudo
+        return
+    caminho = os.path.join(diretorio(), arquivo.caminho)
+    for profissional_id in sorted(profissionais):
+        posicao = arquivo.indice.get(str(profissional_id))
+        if posicao:
+            yield from _linhas_do_membro(caminho, *posicao)
+
+
+def _valor(campo, dados):
+    if campo.attname in _DO_ARQUIVO:
+        return _DO_ARQUIVO[campo.attname](dados)
+    if campo.attname in dados:
+        return campo.to_python(dados[campo.attname])
+    return campo.get_default()
+
+
+def _registro(linha):
+    dados = json.loads(linha)
+    registro = RegistroPonto.from_db(
+        RegistroPonto.objects.db,
+        [campo.attname for campo in _CAMPOS],
+        [_valor(campo, dados) for campo in _CAMPOS],
+    )
+    justificativa, observacoes = dados.get('justificativa_ajuste'), dados.get('observacoes')
+    ajuste = None
+    if justificativa or observacoes:
+        ajuste = AjusteRegistroPonto(registro=registro, justificativa=justificativa, observacoes=observacoes)
+    # ajuste em cache: as propriedades de texto não vão ao banco
+    RegistroPonto.ajuste.related.set_cached_value(registro, ajuste)
+    registro.arquivado = True
+    return registro
+
+
+def arquivos_do_periodo(data_inicio=None, data_fim=None):
+    arquivos = ArquivoMarcacoes.objects.all()
+    if data_inicio:
+        arquivos = arquivos.filter(mes__gte=data_inicio.replace(day=1))
+    if data_fim:
+        arquivos = arquivos.filter(mes__lte=data_fim)
+    return arquivos.order_by('mes')
+
+
+def marcacoes_arquivadas(data_inicio=None, data_fim=None, profissionais=None, estabelecimento_id=None,
+                         apenas_com_nsr=False):
+    """
+    Gerador dos RegistroPonto arquivados no período (limites opcionais,
+    inclusive): mês a mês e, dentro do mês, por profissional em ordem
+    cronológica. `profissionais` (ids) lê só os membros deles. Os
+    relacionados não vêm carregados — ver com_relacionados().
+    """
+    if profissionais is not None:
+        profissionais = set(profissionais)
+        if not profissionais:
+            return
+    for arquivo in arquivos_do_periodo(data_inicio, data_fim):
+        for linha in _linhas(arquivo, profissionais):
+            registro = _registro(linha)
+            if data_inicio and registro.data < data_inicio:
+                continue
+            if data_fim and registro.data > data_fim:
+                continue
+            if estabelecimento_id and registro.estabelecimento_id != int(estabelecimento_id):
+                continue
+            if apenas_com_nsr and registro.nsr is None:
+                continue
+            yield registro
+
+
+def com_relacionados(registros, *relacionados):
+    """Carrega os relacionados (ex.: 'profissional') das marcações arquivadas, LOTE por consulta."""
+    lote = []
+    for registro in registros:
+        lote.append(registro)
+        if len(lote) == LOTE:
+            prefetch_related_objects(lote, *relacionados)
+            yield from lote
+            lote = []
+    if lote:
+        prefetch_related_objects(lote, *relacionados)
+        yield from lote
+
+
+def verificar_arquivo(arquivo):
+    """Problemas do arquivo do mês contra o manifesto (lista vazia = íntegro)."""
+    caminho = os.path.join(diretorio(), arquivo.caminho)
+    if not os.path.exists(caminho):
+        return [f'arquivo não encontrado: {caminho}']
+    problemas = []
+    if _sha256_do_arquivo(caminho) != arquivo.sha256:
+        problemas.append('sha256 não confere')
+    quantidade = 0
+    try:
+        for linha in chain.from_iterable(_linhas_do_membro(caminho, *posicao) for posicao in arquivo.indice.values()):
+            json.loads(linha)
+            quantidade += 1
+    except (OSError, EOFError, ValueError) as erro:
+        problemas.append(f'membro ilegível: {erro}')
+    else:
+        if quantidade != arquivo.quantidade:
+            problemas.append(f'{quantidade} marcações no arquivo, {arquivo.quantidade} no manifesto')
+    return problemas
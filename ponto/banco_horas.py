@@ -15,6 +15,10 @@ Regra adotada (padrão de mercado / CLT art. 59):
   buffer de +1 dia consultado) fica marcada como "incompleto" — não entra
   no saldo até o RH resolver com ajuste manual.
 - O saldo total do período é a soma dos saldos diários válidos.
+- Cada dia completo também traz a classificação das horas (normal, extra
+  50%, extra 100% e adicional noturno) — ver ponto/classificacao_horas.py.
+- A carga esperada de cada dia vem de ponto/escalas.py: na escala de
+  plantão, um dia de folga espera 0h (tudo que foi trabalhado é crédito).
 
 ⚠️ CORRIGIDO (bug anterior): a primeira versão deste arquivo agrupava
 registros por data igual, o que fazia todo plantão de 24h aparecer como
@@ -24,6 +28,8 @@ quando o plantão estava completo. Testado com o cenário entrada
 """
 from datetime import timedelta, datetime
 
+from .classificacao_horas import classificar_intervalos, totalizar
+from .escalas import carga_do_dia
 from .models import RegistroPonto
 
 
@@ -37,27 +43,37 @@ def _formatar_timedelta(td):
     return f"{sinal}{horas:02d}:{minutos:02d}"
 
 
-def calcular_extrato_banco_horas(profissional, data_inicio, data_fim):
+def calcular_extrato_banco_horas(profissional, data_inicio, data_fim, feriados=None, registros=None):
     """
     Monta o extrato diário do banco de horas de um profissional num período.
     Retorna dict com 'dias' (lista ordenada), 'saldo_total',
-    'saldo_total_formatado' e 'dias_incompletos'.
+    'saldo_total_formatado', 'dias_incompletos' e 'classificacao' (totais
+    por categoria de hora no período).
+    registros: marcações já carregadas, em ordem cronológica, cobrindo de
+    data_inicio - 1 a data_fim + 1 dia (ex.: core/relatorios.py) — evita
+    buscar de novo.
     """
-    carga_diaria = profissional.carga_horaria_diaria or timedelta()
+    carga_esperada = carga_do_dia(profissional, carga_padrao=timedelta())
+    # Sem escala nem carga cadastrada o saldo continua contra 0h, mas a
+    # classificação recebe None: sem referência, nada vira extra 50%.
+    tem_carga = profissional.escala_id or profissional.carga_horaria_diaria
+    carga_classificacao = carga_esperada if tem_carga else None
 
     # Busca com 1 dia de folga antes/depois do período — necessário pra
     # conseguir casar um plantão que começou um pouco antes ou termina um
     # pouco depois das bordas do período pedido.
-    registros = list(
-        RegistroPonto.objects.filter(
-            profissional=profissional,
-            data__gte=data_inicio - timedelta(days=1),
-            data__lte=data_fim + timedelta(days=1),
-        ).order_by('data', 'horario')
-    )
+    if registros is None:
+        registros = list(
+            RegistroPonto.objects.filter(
+                profissional=profissional,
+                data__gte=data_inicio - timedelta(days=1),
+                data__lte=data_fim + timedelta(days=1),
+            ).order_by('data', 'horario')
+        )
 
     dias_extrato = {}
     dias_incompletos = []
+    intervalos = []
     saldo_total = timedelta()
 
     def _marcar_incompleto(entrada):
@@ -66,7 +82,7 @@ def calcular_extrato_banco_horas(profissional, data_inicio, data_fim):
             dias_extrato[entrada.data] = {
                 'data': entrada.data,
                 'horas_trabalhadas': timedelta(),
-                'horas_esperadas': carga_diaria,
+                'horas_esperadas': carga_esperada(entrada.data),
                 'saldo': None,
                 'saldo_formatado': 'Pendente',
                 'completo': False,
@@ -91,12 +107,13 @@ def calcular_extrato_banco_horas(profissional, data_inicio, data_fim):
             horas_trabalhadas = saida_dt - entrada_dt
 
             if data_inicio <= dia_referencia <= data_fim:
-                saldo_dia = horas_trabalhadas - carga_diaria
+                intervalos.append((entrada_dt, saida_dt, dia_referencia))
+                saldo_dia = horas_trabalhadas - carga_esperada(dia_referencia)
                 saldo_total += saldo_dia
                 dias_extrato[dia_referencia] = {
                     'data': dia_referencia,
                     'horas_trabalhadas': horas_trabalhadas,
-                    'horas_esperadas': carga_diaria,
+                    'horas_esperadas': carga_esperada(dia_referencia),
                     'saldo': saldo_dia,
                     'saldo_formatado': _formatar_timedelta(saldo_dia),
                     'completo': True,
@@ -107,6 +124,11 @@ def calcular_extrato_banco_horas(profissional, data_inicio, data_fim):
     if entrada_pendente is not None:
         _marcar_incompleto(entrada_pendente)
 
+    classificacao = classificar_intervalos(intervalos, carga_classificacao, feriados)
+    for dia_referencia, categorias in classificacao.items():
+        if dias_extrato[dia_referencia]['completo']:
+            dias_extrato[dia_referencia]['classificacao'] = categorias
+
     dias_ordenados = sorted(dias_extrato.values(), key=lambda d: d['data'])
 
     return {
@@ -114,4 +136,7 @@ def calcular_extrato_banco_horas(profissional, data_inicio, data_fim):
         'saldo_total': saldo_total,
         'saldo_total_formatado': _formatar_timedelta(saldo_total),
         'dias_incompletos': dias_incompletos,
+        'classificacao': totalizar(
+            d['classificacao'] for d in dias_ordenados if 'classificacao' in d
+        ),
     }
\ No newline at end of file
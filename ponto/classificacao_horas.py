@@ -0,0 +1,230 @@
+# ponto/classificacao_horas.py
+"""
+Classificação das horas trabalhadas para a folha de pagamento.
+
+Cada intervalo trabalhado (entrada pareada com a PRÓXIMA saída, mesma regra
+do banco de horas — ver ponto/banco_horas.py) é dividido em:
+
+- normal:     até a carga horária diária esperada;
+- extra_50:   o que passar da carga num dia comum (CLT art. 59, §1º);
+- extra_100:  tudo o que cair em domingo ou feriado (Lei 605/49, art. 9º);
+- noturno:    a parte entre 22:00 e 05:00 (CLT art. 73). É um adicional
+              SOBRE as categorias acima, não uma categoria exclusiva — uma
+              hora extra noturna conta em extra_50 E em noturno.
+- noturno_reduzido: o noturno convertido pra hora noturna reduzida
+              (52min30s), ou seja, noturno * 60 / 52,5.
+
+Como funciona (e por que não é minuto a minuto):
+em vez de percorrer cada minuto do intervalo, montamos uma vez só a lista
+ordenada de "fronteiras" do calendário no período (00:00, 05:00 e 22:00 de
+cada dia) e recortamos cada intervalo contra ela com bisect. Um plantão de
+24h vira no máximo 4 ou 5 pedaços, independente da duração — o custo cresce
+com o número de marcações, não com o número de minutos trabalhados.
+
+O total é atribuído ao dia em que a ENTRADA aconteceu (o "plantão de
+segunda", mesmo terminando terça), igual ao extrato do banco de horas. Já a
+regra do domingo/feriado olha o dia de calendário de cada pedaço: um plantão
+que começa sábado 19:00 e termina domingo 07:00 tem 5h comuns e 7h a 100%.
+"""
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+
+INICIO_NOTURNO = time(22, 0)
+FIM_NOTURNO = time(5, 0)
+
+# Hora noturna reduzida: 52min30s contam como 60min (CLT art. 73, §1º).
+FATOR_HORA_NOTURNA = 60 / 52.5
+
+CATEGORIAS = ('normal', 'extra_50', 'extra_100', 'noturno', 'noturno_reduzido')
+
+
+def _formatar_horas(td):
+    """Formata um timedelta (sempre positivo aqui) como 'HH:MM'."""
+    total_segundos = int(td.total_seconds())
+    horas = total_segundos // 3600
+    minutos = (total_segundos % 3600) // 60
+    return f"{horas:02d}:{minutos:02d}"
+
+
+def _dia_zerado(dia):
+    return {
+        'data': dia,
+        'normal': timedelta(),
+        'extra_50': timedelta(),
+        'extra_100': timedelta(),
+        'noturno': timedelta(),
+        'noturno_reduzido': timedelta(),
+    }
+
+
+def parear_marcacoes(registros):
+    """
+    Pareia as marcações em ordem cronológica: cada ENTRADA com a PRÓXIMA
+    SAIDA (que pode estar no dia seguinte, no caso de plantão).
+
+    Retorna (intervalos, entradas_sem_saida), onde intervalos é uma lista de
+    (inicio, fim, dia_referencia) com inicio/fim como datetime e
+    dia_referencia = data da entrada. Uma entrada seguida de outra entrada
+    fica em entradas_sem_saida; uma saída sem entrada antes é ignorada.
+    """
+    intervalos = []
+    entradas_sem_saida = []
+    entrada_pendente = None
+
+    for registro in sorted(registros, key=lambda r: (r.data, r.horario)):
+        if registro.tipo == 'ENTRADA':
+            if entrada_pendente is not None:
+                entradas_sem_saida.append(entrada_pendente)
+            entrada_pendente = registro
+
+        elif registro.tipo == 'SAIDA' and entrada_pendente is not None:
+            inicio = datetime.combine(entrada_pendente.data, entrada_pendente.horario)
+            fim = datetime.combine(registro.data, registro.horario)
+            if fim < inicio:
+                fim += timedelta(days=1)
+            intervalos.append((inicio, fim, entrada_pendente.data))
+            entrada_pendente = None
+
+    if entrada_pendente is not None:
+        entradas_sem_saida.append(entrada_pendente)
+
+    return intervalos, entradas_sem_saida
+
+
+def _montar_fronteiras(primeiro_dia, ultimo_dia, feriados):
+    """
+    Fronteiras do calendário entre primeiro_dia 00:00 e (ultimo_dia + 1) 00:00.
+    Retorna (fronteiras, trechos) onde trechos[i] descreve o pedaço entre
+    fronteiras[i] e fronteiras[i + 1]: (e_noturno, e_domingo_ou_feriado).
+    """
+    fronteiras = []
+    trechos = []
+    dia = primeiro_dia
+    while dia <= ultimo_dia:
+        especial = dia.weekday() == 6 or dia in feriados
+        meia_noite = datetime.combine(dia, time(0, 0))
+        fronteiras.extend([
+            meia_noite,
+            datetime.combine(dia, FIM_NOTURNO),
+            datetime.combine(dia, INICIO_NOTURNO),
+        ])
+        trechos.extend([
+            (True, especial),   # 00:00 - 05:00
+            (False, especial),  # 05:00 - 22:00
+            (True, especial),   # 22:00 - 24:00
+        ])
+        dia += timedelta(days=1)
+    fronteiras.append(datetime.combine(dia, time(0, 0)))
+    return fronteiras, trechos
+
+
+def classificar_intervalos(intervalos, carga_diaria, feriados=None):
+    """
+    Classifica os intervalos (saída de parear_marcacoes) por dia de
+    referência. carga_diaria pode ser um timedelta fixo ou uma função
+    data -> timedelta (pra escalas em que a carga muda de um dia pro outro).
+    Carga None significa "sem carga cadastrada": nada vira hora extra 50%,
+    porque não há referência pra saber onde a jornada normal termina.
+    feriados é um conjunto de datas tratadas como domingo.
+
+    Retorna dict {dia_referencia: {'data', 'normal', 'extra_50',
+    'extra_100', 'noturno', 'noturno_reduzido'}} com timedeltas, mais a
+    versão 'HH:MM' de cada categoria em '<categoria>_formatado'.
+    """
+    if not intervalos:
+        return {}
+
+    feriados = feriados or set()
+    if callable(carga_diaria):
+        carga_do_dia = carga_diaria
+    elif carga_diaria is None:
+        carga_do_dia = lambda _dia: timedelta.max
+    else:
+        carga_do_dia = lambda _dia: carga_diaria
+
+    primeiro_dia = min(inicio for inicio, _, _ in intervalos).date()
+    ultimo_dia = max(fim for _, fim, _ in intervalos).date()
+    fronteiras, trechos = _montar_fronteiras(primeiro_dia, ultimo_dia, feriados)
+
+    dias = {}
+    carga_restante = {}
+
+    for inicio, fim, dia_referencia in sorted(intervalos):
+        if dia_referencia not in dias:
+            dias[dia_referencia] = _dia_zerado(dia_referencia)
+            carga_restante[dia_referencia] = carga_do_dia(dia_referencia)
+        totais = dias[dia_referencia]
+
+        i = bisect_right(fronteiras, inicio) - 1
+        while i < len(trechos) and fronteiras[i] < fim:
+            pedaco = min(fim, fronteiras[i + 1]) - max(inicio, fronteiras[i])
+            e_noturno, e_especial = trechos[i]
+
+            if e_especial:
+                totais['extra_100'] += pedaco
+            else:
+                normal = min(pedaco, max(carga_restante[dia_referencia], timedelta()))
+                carga_restante[dia_referencia] -= normal
+                totais['normal'] += normal
+                totais['extra_50'] += pedaco - normal
+
+            if e_noturno:
+                totais['noturno'] += pedaco
+            i += 1
+
+    for totais in dias.values():
+        totais['noturno_reduzido'] = totais['noturno'] * FATOR_HORA_NOTURNA
+        for categoria in CATEGORIAS:
+            totais[f'{categoria}_formatado'] = _formatar_horas(totais[categoria])
+
+    return dias
+
+
+def totalizar(dias):
+    """Soma as categorias de vários dias e devolve também a versão 'HH:MM'."""
+    totais = {categoria: timedelta() for categoria in CATEGORIAS}
+    for dia in dias:
+        for categoria in CATEGORIAS:
+            totais[categoria] += dia[categoria]
+    for categoria in CATEGORIAS:
+        totais[f'{categoria}_formatado'] = _formatar_horas(totais[categoria])
+    return totais
+
+
+def classificar_horas_profissional(profissional, data_inicio, data_fim, feriados=None, carga_diaria=None,
+                                   registros=None):
+    """
+    Classificação completa de um profissional num período.
+    carga_diaria, se informada, substitui a carga do profissional (ex: o
+    relatório usa 8h como padrão quando não há carga cadastrada). Sem ela,
+    vale a escala de plantão, se houver, ou a carga_horaria_diaria.
+    registros: marcações já carregadas cobrindo de data_inicio - 1 a
+    data_fim + 1 dia, se quem chama já buscou (core/relatorios.py).
+    Retorna dict com 'dias' (lista ordenada por data) e 'totais'.
+    """
+    from .models import RegistroPonto
+
+    # Mesma folga de 1 dia do banco de horas, pra casar plantões nas bordas.
+    if registros is None:
+        registros = RegistroPonto.objects.filter(
+            profissional=profissional,
+            data__gte=data_inicio - timedelta(days=1),
+            data__lte=data_fim + timedelta(days=1),
+        ).only('data', 'horario', 'tipo')
+
+    intervalos, _ = parear_marcacoes(registros)
+    intervalos = [item for item in intervalos if data_inicio <= item[2] <= data_fim]
+
+    if carga_diaria is None:
+        if profissional.escala_id:
+            from .escalas import carga_do_dia
+            carga_diaria = carga_do_dia(profissional)
+        else:
+            carga_diaria = profissional.carga_horaria_diaria
+    dias = classificar_intervalos(intervalos, carga_diaria, feriados)
+    dias_ordenados = sorted(dias.values(), key=lambda d: d['data'])
+
+    return {
+        'dias': dias_ordenados,
+        'totais': totalizar(dias_ordenados),
+    }
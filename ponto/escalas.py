@@ -0,0 +1,142 @@
+# ponto/escalas.py
+"""
+Carga prevista do profissional — um lugar só pra regra de plantão.
+
+Antes, cada tela tinha o seu `if carga_horaria_diaria == 86400 / 43200`
+(core/views.py, ponto/utils.py), e o 12x36 era calculado como 12h × dias
+úteis, o que está errado: quem trabalha 12x36 dá plantão dia sim, dia não,
+inclusive sábado, domingo e feriado.
+
+Regra:
+- profissional COM escala (usuarios.Escala): vale o ciclo da escala. Horas e
+  dias previstos saem direto da aritmética do ciclo (Escala.dias_de_plantao),
+  sem loop de dias.
+- profissional SEM escala: comportamento antigo, centralizado aqui —
+  carga de 24h conta todos os dias do período; qualquer outra carga conta
+  só os dias úteis do calendário do município (municipio/calendario.py).
+
+mascara_prevista() dá os mesmos dias previstos como bitmap (bit i =
+data_inicio + i), pros mapas de presença de ponto/presenca.py.
+"""
+from datetime import timedelta
+
+from municipio.calendario import calendario_do_profissional
+
+CARGA_PADRAO = timedelta(hours=8)
+PLANTAO_24H = timedelta(hours=24)
+
+
+def _carga(profissional, carga_padrao=CARGA_PADRAO):
+    return profissional.carga_horaria_diaria or carga_padrao
+
+
+def _e_plantao_24h_legado(profissional):
+    return profissional.escala_id is None and profissional.carga_horaria_diaria == PLANTAO_24H
+
+
+def dias_previstos(profissional, data_inicio, data_fim, calendario=None):
+    """Dias em que o profissional deveria trabalhar no período (inclusive)."""
+    if data_fim < data_inicio:
+        return 0
+    if profissional.escala_id:
+        return profissional.escala.dias_de_plantao(data_inicio, data_fim)
+    if _e_plantao_24h_legado(profissional):
+        return (data_fim - data_inicio).days + 1
+    calendario = calendario or calendario_do_profissional(profissional)
+    return calendario.dias_uteis(data_inicio, data_fim)
+
+
+def horas_previstas_periodo(profissional, data_inicio, data_fim, calendario=None, carga_padrao=CARGA_PADRAO):
+    """Horas que o profissional deveria cumprir no período (timedelta)."""
+    if profissional.escala_id:
+        return profissional.escala.horas_previstas(data_inicio, data_fim)
+    dias = dias_previstos(profissional, data_inicio, data_fim, calendario)
+    return _carga(profissional, carga_padrao) * dias
+
+
+def mascara_prevista(profissional, data_inicio, data_fim, calendario=None):
+    """Bitmap dos dias previstos no período: bit i = data_inicio + i."""
+    if data_fim < data_inicio:
+        return 0
+    total = (data_fim - data_inicio).days + 1
+    if profissional.escala_id:
+        escala = profissional.escala
+        inicio = (data_inicio - escala.data_ancora).days % escala.ciclo_dias
+        voltas = (inicio + total) // escala.ciclo_dias + 1
+        dias = (escala.padrao * voltas)[inicio:inicio + total]
+        return int(dias[::-1], 2)
+    if _e_plantao_24h_legado(profissional):
+        return (1 << total) - 1
+    calendario = calendario or calendario_do_profissional(profissional)
+    return calendario.mascara_dias_uteis(data_inicio, data_fim)
+
+
+def e_dia_previsto(profissional, dia, calendario=None):
+    if profissional.escala_id:
+        return profissional.escala.em_plantao(dia)
+    if _e_plantao_24h_legado(profissional):
+        return True
+    calendario = calendario or calendario_do_profissional(profissional)
+    return calendario.e_dia_util(dia)
+
+
+def carga_do_dia(profissional, calendario=None, carga_padrao=CARGA_PADRAO):
+    """
+    Função dia -> horas previstas naquele dia, no formato que
+    classificacao_horas.classificar_intervalos aceita. Num dia fora da
+    escala (ou fora dos dias úteis) a carga é zero.
+    """
+    if profissional.escala_id:
+        escala = profissional.escala
+        return lambda dia: escala.horas_plantao if escala.em_plantao(dia) else timedelta()
+
+    carga = _carga(profissional, carga_padrao)
+    if _e_plantao_24h_legado(profissional):
+        return lambda dia: carga
+
+    calendario = calendario or calendario_do_profissional(profissional)
+    return lambda dia: carga if calendario.e_dia_util(dia) else timedelta()
+
+
+def atravessa_meia_noite(profissional):
+    """
+    True se o plantão começa num dia e termina no outro — aí a primeira
+    marcação do dia pode ser a SAÍDA do plantão de ontem, e a saída pode
+    cair na mesma data de uma saída anterior.
+
+    Plantão de 24h sempre atravessa. Fora isso, pelos horários do
+    profissional: saída antes (ou na hora) da entrada, ou entrada + duração
+    do plantão (da escala, ou a carga diária) passando das 24:00. Sem
+    horário cadastrado, não atravessa. Escala 12x36 diurna (07:00-19:00)
+    não atravessa; a noturna (19:00-07:00) sim.
+    """
+    if profissional.escala_id:
+        duracao = profissional.escala.horas_plantao
+    else:
+        duracao = profissional.carga_horaria_diaria
+    if duracao and duracao >= PLANTAO_24H:
+        return True
+
+    entrada = profissional.horario_entrada
+    saida = profissional.horario_saida
+    if entrada is None:
+        return False
+    if saida is not None:
+        return saida <= entrada
+    if not duracao:
+        return False
+    inicio = timedelta(hours=entrada.hour, minutes=entrada.minute, seconds=entrada.second)
+    return inicio + duracao > PLANTAO_24H
+
+
+def descricao_regra(profissional):
+    """Texto curto pro relatório explicar de onde vêm as horas previstas."""
+    if profissional.escala_id:
+        escala = profissional.escala
+        return (
+            f"Escala {escala.nome}: ciclo de {escala.ciclo_dias} dia(s), "
+            f"{escala.padrao.count('1')} de plantão por ciclo."
+        )
+    if _e_plantao_24h_legado(profissional):
+        return 'Entrada e saída em dias diferentes. 24h × todos os dias do período.'
+    return 'Carga diária × dias úteis (sem feriados).'
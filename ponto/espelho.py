@@ -0,0 +1,338 @@
+# ponto/espelho.py
+"""
+Espelho de Ponto mensal (Portaria MTP 671/2021, art. 84): o relatório que o
+profissional assina no fim do mês, com as marcações de cada dia, os ajustes
+manuais (que de propósito NÃO entram no AFD — ver RegistroPonto.nsr), as
+horas trabalhadas e previstas e o saldo.
+
+Feito pra rodar pro quadro inteiro do empregador (milhares de
+profissionais) em poucos minutos:
+
+- os profissionais são lidos em lotes de LOTE_PROFISSIONAIS, em ordem de
+  pk (pk > último pk do lote anterior, como em core/exportacao.py); pra
+  cada lote, uma consulta das marcações do mês (± 1 dia, pra casar
+  plantões nas bordas, como o banco de horas) e uma dos ajustes manuais
+  (RegistroManual) do mês, só daqueles profissionais. A memória fica no
+  tamanho de um lote, não do mês inteiro — e sem cursores abertos em
+  paralelo: o iterator() sozinho não segura memória no MySQL, cujo driver
+  traz o resultado inteiro antes do primeiro fetchmany;
+- as marcações vêm como tuplas (values_list), sem montar model;
+- períodos que tocam meses arquivados (ponto/arquivamento.py) juntam, por
+  lote, as marcações arquivadas dos profissionais do lote (só os membros
+  deles no arquivo) — o espelho e o AEJ de um mês antigo são os mesmos
+  antes e depois do arquivamento;
+- horas e saldo saem de ponto/banco_horas.py (o mesmo extrato da tela do
+  banco de horas) e a carga de cada dia de ponto/escalas.py.
+
+Cabeçalho com os mesmos dados do AFD (afd/gerador.py -> dados_empregador):
+CNPJ, razão social, nº do REP-P no INPI e o período. Cada marcação leva o
+NSR que tem no AFD — a fiscalização confere uma coisa com a outra; ajuste
+manual aparece sem NSR, com o motivo.
+
+Saídas:
+- csv_espelhos(): CSV (;) pra folha de pagamento, uma linha por dia
+  (registro "D") e uma de totais por profissional (registro "T"), gerado
+  linha a linha;
+- pdf_espelhos(): PDF, uma página por profissional (template
+  espelho_ponto_pdf.html). Pra centenas de profissionais, gere por
+  estabelecimento ou pela fila de tarefas.
+
+Comando: `python manage.py gerar_espelho_ponto`.
+"""
+import csv
+import io
+from datetime import date, timedelta
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from afd.gerador import dados_empregador
+from municipio.calendario import calendario_do_profissional
+from usuarios.models import Profissional
+from .arquivamento import arquivos_do_periodo, marcacoes_arquivadas
+from .banco_horas import _formatar_timedelta, calcular_extrato_banco_horas
+from .escalas import carga_do_dia, horas_previstas_periodo
+from .models import RegistroManual, RegistroPonto
+
+DIAS_SEMANA = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+MOTIVOS = dict(RegistroManual.MOTIVOS)
+
+CAMPOS_MARCACAO = ('profissional_id', 'data', 'horario', 'tipo', 'nsr', 'ajuste_manual', 'justificativa_ajuste')
+CAMPOS_AJUSTE = ('profissional_id', 'data', 'horario', 'tipo', 'motivo', 'ajustado_por__username', 'confirmado')
+
+COLUNAS_CSV = [
+    'registro', 'cnpj', 'cpf', 'nome', 'estabelecimento', 'data', 'dia_semana', 'marcacoes', 'nsr',
+    'ajustes', 'horas_trabalhadas', 'horas_previstas', 'saldo_dia', 'saldo_acumulado', 'ocorrencia',
+]
+
+LOTE_PROFISSIONAIS = 200
+
+
+def periodo_do_mes(ano, mes):
+    inicio = date(ano, mes, 1)
+    fim = (inicio + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return inicio, fim
+
+
+def _horas(td):
+    """HH:MM sem sinal (horas podem passar de 24)."""
+    minutos = int(td.total_seconds()) // 60
+    return f'{minutos // 60:02d}:{minutos % 60:02d}'
+
+
+def _por_profissional(linhas):
+    """{profissional_id: [linhas]}, na ordem em que vieram."""
+    grupos = {}
+    for linha in linhas:
+        grupos.setdefault(linha.profissional_id, []).append(linha)
+    return grupos
+
+
+def espelho_profissional(profissional, data_inicio, data_fim, marcacoes, ajustes):
+    """
+    Espelho de um profissional: dict com o cabeçalho, os dias do período e
+    os totais. `marcacoes` em ordem cronológica cobrindo data_inicio - 1 a
+    data_fim + 1; `ajustes` os RegistroManual do período.
+    """
+    calendario = calendario_do_profissional(profissional)
+    feriados = calendario.feriados_entre(data_inicio, data_fim + timedelta(days=1))
+    extrato = calcular_extrato_banco_horas(
+        profissional, data_inicio, data_fim, feriados=feriados, registros=marcacoes
+    )
+    extrato_por_dia = {dia['data']: dia for dia in extrato['dias']}
+    carga = carga_do_dia(profissional, calendario, carga_padrao=timedelta())
+
+    marcacoes_por_dia = {}
+    for marcacao in marcacoes:
+        if data_inicio <= marcacao.data <= data_fim:
+            marcacoes_por_dia.setdefault(marcacao.data, []).append(marcacao)
+    ajustes_por_dia = {}
+    for ajuste in ajustes:
+        ajustes_por_dia.setdefault(ajuste.data, []).append(ajuste)
+
+    dias = []
+    saldo_acumulado = timedelta()
+    horas_trabalhadas = timedelta()
+    faltas = 0
+    nsrs = []
+    dia = data_inicio
+    while dia <= data_fim:
+        do_dia = marcacoes_por_dia.get(dia, [])
+        extrato_dia = extrato_por_dia.get(dia)
+        prevista = carga(dia)
+
+        if extrato_dia and extrato_dia['completo']:
+            trabalhadas = extrato_dia['horas_trabalhadas']
+            saldo = extrato_dia['saldo']
+            saldo_acumulado += saldo
+            horas_trabalhadas += trabalhadas
+            ocorrencia = ''
+        else:
+            trabalhadas = timedelta()
+            saldo = None
+            if extrato_dia:
+                ocorrencia = 'Incompleto'
+            elif do_dia:
+                ocorrencia = ''  # só a saída de um plantão do dia anterior
+            elif dia in feriados:
+                ocorrencia = 'Feriado'
+            elif prevista:
+                ocorrencia = 'Falta'
+                faltas += 1
+            else:
+                ocorrencia = ''
+
+        nsrs.extend(marcacao.nsr for marcacao in do_dia if marcacao.nsr)
+        dias.append({
+            'data': dia,
+            'dia_semana': DIAS_SEMANA[dia.weekday()],
+            'marcacoes': [
+                {
+                    'tipo': marcacao.tipo,
+                    'horario': marcacao.horario,
+                    'nsr': marcacao.nsr,
+                    'ajuste_manual': marcacao.ajuste_manual,
+                    'justificativa': marcacao.justificativa_ajuste or '',
+                }
+                for marcacao in do_dia
+            ],
+            'ajustes': [
+                {
+                    'tipo': ajuste.tipo,
+                    'horario': ajuste.horario.strftime('%H:%M'),
+                    'motivo': MOTIVOS.get(ajuste.motivo, ajuste.motivo),
+                    'ajustado_por': ajuste.ajustado_por__username or '',
+                    'confirmado': ajuste.confirmado,
+                }
+                for ajuste in ajustes_por_dia.get(dia, [])
+            ],
+            'horas_trabalhadas': _horas(trabalhadas),
+            'horas_previstas': _horas(prevista),
+            'minutos_trabalhados': int(trabalhadas.total_seconds()) // 60,
+            'minutos_previstos': int(prevista.total_seconds()) // 60,
+            'saldo_minutos': int(saldo.total_seconds() / 60) if saldo is not None else None,
+            'saldo': _formatar_timedelta(saldo) if saldo is not None else '',
+            'saldo_acumulado': _formatar_timedelta(saldo_acumulado),
+            'ocorrencia': ocorrencia,
+        })
+        dia += timedelta(days=1)
+
+    return {
+        'profissional': profissional,
+        'data_inicio': data_inicio,
+        'data_fim': data_fim,
+        'dias': dias,
+        'nsr_inicial': min(nsrs) if nsrs else None,
+        'nsr_final': max(nsrs) if nsrs else None,
+        'total_ajustes': len(ajustes),
+        'faltas': faltas,
+        'dias_incompletos': len(extrato['dias_incompletos']),
+        'horas_trabalhadas': _horas(horas_trabalhadas),
+        'horas_previstas': _horas(horas_previstas_periodo(
+            profissional, data_inicio, data_fim, calendario, carga_padrao=timedelta()
+        )),
+        'saldo': extrato['saldo_total_formatado'],
+    }
+
+
+def quadro_profissionais(data_inicio, data_fim, estabelecimento_id=None, profissionais=None,
+                         com_marcacao_no_periodo=False):
+    """
+    Profissionais do espelho, em ordem de pk: os ativos (do estabelecimento
+    / IDs, se pedido) e, com `com_marcacao_no_periodo`, também quem já saiu
+    mas tem marcação no período (AEJ, afd/gerador_aej.py).
+    """
+    filtro = Q(ativo=True)
+    if com_marcacao_no_periodo:
+        filtro |= Q(pk__in=RegistroPonto.objects.filter(
+            data__gte=data_inicio, data__lte=data_fim
+        ).values('profissional_id'))
+        # dos meses arquivados, quem tem membro no arquivo do mês
+        arquivados = {
+            int(profissional_id)
+            for indice in arquivos_do_periodo(data_inicio, data_fim).values_list('indice', flat=True)
+            for profissional_id in indice
+        }
+        if arquivados:
+            filtro |= Q(pk__in=arquivados)
+    quadro = Profissional.objects.filter(filtro)
+    if estabelecimento_id:
+        quadro = quadro.filter(estabelecimento_id=estabelecimento_id)
+    if profissionais:
+        quadro = quadro.filter(pk__in=profissionais)
+    return quadro.select_related('escala', 'estabelecimento__municipio').order_by('pk')
+
+
+def lotes_do_quadro(quadro, tamanho=LOTE_PROFISSIONAIS):
+    """Listas de profissionais do quadro, em ordem de pk, `tamanho` por consulta."""
+    quadro = quadro.order_by('pk')
+    ultimo = 0
+    while True:
+        lote = list(quadro.filter(pk__gt=ultimo)[:tamanho])
+        if lote:
+            yield lote
+        if len(lote) < tamanho:
+            return
+        ultimo = lote[-1].pk
+
+
+def espelhos(data_inicio, data_fim, estabelecimento_id=None, profissionais=None, quadro=None):
+    """Gerador dos espelhos de todos os profissionais ativos (por estabelecimento/ID, se pedido),
+    ou dos de `quadro` (queryset de quadro_profissionais)."""
+    if quadro is None:
+        quadro = quadro_profissionais(data_inicio, data_fim, estabelecimento_id, profissionais)
+    inicio, fim = data_inicio - timedelta(days=1), data_fim + timedelta(days=1)
+    com_arquivo = arquivos_do_periodo(inicio, fim).exists()
+
+    for lote in lotes_do_quadro(quadro, LOTE_PROFISSIONAIS):
+        ids = [profissional.pk for profissional in lote]
+        marcacoes = _por_profissional(
+            RegistroPonto.objects
+            .filter(data__gte=inicio, data__lte=fim, profissional_id__in=ids)
+            .annotate(justificativa_ajuste=F('ajuste__justificativa'))
+            .order_by('profissional_id', 'data', 'horario', 'id')
+            .values_list(*CAMPOS_MARCACAO, named=True)
+        )
+        if com_arquivo:
+            # RegistroPonto arquivados têm os mesmos atributos das tuplas
+            arquivadas = _por_profissional(marcacoes_arquivadas(inicio, fim, profissionais=ids))
+            for profissional_id, do_arquivo in arquivadas.items():
+                marcacoes[profissional_id] = sorted(
+                    do_arquivo + marcacoes.get(profissional_id, []),
+                    key=lambda marcacao: (marcacao.data, marcacao.horario),
+                )
+        ajustes = _por_profissional(
+            RegistroManual.objects
+            .filter(data__gte=data_inicio, data__lte=data_fim, profissional_id__in=ids)
+            .order_by('profissional_id', 'data', 'horario', 'id')
+            .values_list(*CAMPOS_AJUSTE, named=True)
+        )
+        for profissional in lote:
+            yield espelho_profissional(
+                profissional, data_inicio, data_fim,
+                marcacoes.get(profissional.pk, []), ajustes.get(profissional.pk, []),
+            )
+
+
+def _marcacoes_texto(marcacoes):
+    return ' '.join(
+        f"{'E' if marcacao['tipo'] == 'ENTRADA' else 'S'}{marcacao['horario']:%H:%M}{'*' if marcacao['ajuste_manual'] else ''}"
+        for marcacao in marcacoes
+    )
+
+
+def csv_espelhos(espelhos_gerados):
+    """Gerador das linhas (texto) do CSV pra folha de pagamento."""
+    empregador = dados_empregador()
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=';', lineterminator='\r\n')
+
+    def linha(valores):
+        escritor.writerow(valores)
+        texto = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return texto
+
+    yield linha(COLUNAS_CSV)
+    for espelho in espelhos_gerados:
+        profissional = espelho['profissional']
+        estabelecimento = profissional.estabelecimento.nome if profissional.estabelecimento_id else ''
+        for dia in espelho['dias']:
+            yield linha([
+                'D', empregador['cnpj'], profissional.cpf, profissional.nome, estabelecimento,
+                dia['data'].strftime('%d/%m/%Y'), dia['dia_semana'],
+                _marcacoes_texto(dia['marcacoes']),
+                ' '.join(str(marcacao['nsr']) for marcacao in dia['marcacoes'] if marcacao['nsr']),
+                ' | '.join(f"{ajuste['horario']} {ajuste['motivo']}" for ajuste in dia['ajustes']),
+                dia['horas_trabalhadas'], dia['horas_previstas'], dia['saldo'], dia['saldo_acumulado'],
+                dia['ocorrencia'],
+            ])
+        yield linha([
+            'T', empregador['cnpj'], profissional.cpf, profissional.nome, estabelecimento,
+            f"{espelho['data_inicio']:%d/%m/%Y}-{espelho['data_fim']:%d/%m/%Y}", '', '',
+            f"{espelho['nsr_inicial'] or ''}-{espelho['nsr_final'] or ''}",
+            espelho['total_ajustes'], espelho['horas_trabalhadas'], espelho['horas_previstas'], '',
+            espelho['saldo'], f"{espelho['faltas']} falta(s); {espelho['dias_incompletos']} incompleto(s)",
+        ])
+
+
+def nome_arquivo_espelho(data_inicio, extensao, estabelecimento_id=None):
+    sufixo = f'_{estabelecimento_id}' if estabelecimento_id else ''
+    return f"espelho_ponto_{data_inicio:%Y%m}{sufixo}.{extensao}"
+
+
+def pdf_espelhos(espelhos_gerados, data_inicio, data_fim, usuario, base_url=None):
+    """Bytes do PDF, uma página (ou mais) por profissional."""
+    from django.template.loader import render_to_string
+    from weasyprint import HTML
+
+    html = render_to_string('espelho_ponto_pdf.html', {
+        'empregador': dados_empregador(),
+        'espelhos': espelhos_gerados,
+        'data_inicio': data_inicio,
+        'data_fim': data_fim,
+        'usuario': usuario,
+        'gerado_em': timezone.now(),
+    })
+    return HTML(string=html, base_url=base_url).write_pdf()
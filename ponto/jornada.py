@@ -0,0 +1,180 @@
+# ponto/jornada.py
+"""
+Jornada compilada: atraso/saída antecipada de uma marcação com UMA consulta
+num vetor, em vez de montar datetimes e comparar a cada batida de ponto.
+
+A jornada do profissional (usuarios.Jornada, ou os horários fixos
+horario_entrada/horario_saida quando não há jornada) é convertida uma vez
+em dois vetores de 10080 posições — um por minuto da semana
+(segunda 00:00 = 0, domingo 23:59 = 10079):
+
+- atraso[m]:      minutos de atraso de uma ENTRADA feita no minuto m;
+- antecipacao[m]: minutos de antecipação de uma SAIDA feita no minuto m.
+
+A tolerância do profissional já está descontada nos vetores: valor 0 é
+"dentro da tolerância". Referência de cada marcação:
+- ENTRADA: a entrada prevista no mesmo dia da semana;
+- SAIDA:   a saída prevista que cai nesse dia da semana — num turno noturno
+           (saída menor que a entrada) é a do turno que começou na véspera.
+           Se duas saídas caem no mesmo dia, vale a mais próxima.
+Dia sem horário previsto não gera atraso nem antecipação.
+
+Intervalo (JornadaDia.intervalo_minutos): fica no meio do turno. Uma SAIDA
+antes do fim do intervalo é a ida pro intervalo (referência: o começo
+dele) e uma ENTRADA depois do começo do intervalo é a volta (referência: o
+fim dele) — quem sai pro almoço às 12:00 num turno de 08:00 às 17:00 não
+tem 5h de saída antecipada.
+
+Tolerância: a do profissional, ou TOLERANCIA_PADRAO (10 min) quando não
+há — a mesma regra `tolerancia_minutos or 10` das telas de marcação e dos
+relatórios (ponto/views.py, core/views.py).
+
+Os vetores não dependem do profissional, só da jornada (ou dos horários
+fixos) e da tolerância: ficam num LRU por esses parâmetros, com no máximo
+MAXIMO_COMPILADAS entradas (~40 KB cada) — profissionais com a mesma
+jornada e tolerância dividem a mesma tabela.
+
+Invalidação entre processos sem depender do cache do Django: a chave do
+LRU leva tudo de que os vetores dependem. Os horários fixos e a tolerância
+vêm do próprio profissional, lido do banco a cada marcação; a jornada
+entra com o Jornada.atualizado_em, que os signals de ponto/signals.py
+também tocam quando um dia dela muda. Jornada editada em outro worker
+muda a chave aqui na próxima marcação, e a tabela antiga sai do LRU sozinha
+— o atraso gravado em RegistroPonto nunca sai de uma jornada velha, mesmo
+com o LocMemCache padrão.
+"""
+from array import array
+from functools import lru_cache
+
+MINUTOS_DIA = 24 * 60
+MINUTOS_SEMANA = 7 * MINUTOS_DIA
+
+TOLERANCIA_PADRAO = 10
+MAXIMO_COMPILADAS = 256
+
+
+class JornadaCompilada:
+    __slots__ = ('atraso', 'antecipacao')
+
+    def __init__(self, atraso, antecipacao):
+        self.atraso = atraso
+        self.antecipacao = antecipacao
+
+    def avaliar(self, data, horario, tipo):
+        """Retorna (minutos, dentro_tolerancia) — minutos é o atraso na
+        ENTRADA ou a antecipação na SAIDA."""
+        indice = data.weekday() * MINUTOS_DIA + horario.hour * 60 + horario.minute
+        vetor = self.atraso if tipo == 'ENTRADA' else self.antecipacao
+        minutos = vetor[indice]
+        return minutos, minutos == 0
+
+
+def _minuto(horario):
+    return horario.hour * 60 + horario.minute
+
+
+def _turnos_da_jornada(jornada_id):
+    """((dia_semana, entrada, saida, intervalo), ...) em minutos."""
+    from usuarios.models import JornadaDia
+
+    return tuple(
+        (dia, _minuto(entrada), _minuto(saida), intervalo)
+        for dia, entrada, saida, intervalo in JornadaDia.objects.filter(jornada_id=jornada_id)
+        .order_by('dia_semana').values_list('dia_semana', 'entrada', 'saida', 'intervalo_minutos')
+    )
+
+
+def _tolerancia(profissional):
+    return profissional.tolerancia_minutos or TOLERANCIA_PADRAO
+
+
+def compilar_turnos(turnos, tolerancia):
+    """
+    Monta os vetores de uma lista de (dia_semana, entrada, saida, intervalo)
+    em minutos. None se não houver turno.
+    """
+    if not turnos:
+        return None
+
+    entradas = [None] * 7
+    saidas = [[] for _ in range(7)]
+    for dia, entrada, saida, _intervalo in turnos:
+        entradas[dia] = entrada
+        dia_saida = (dia + 1) % 7 if saida <= entrada else dia
+        saidas[dia_saida].append(saida)
+
+    atraso = array('H', [0]) * MINUTOS_SEMANA
+    antecipacao = array('H', [0]) * MINUTOS_SEMANA
+
+    for dia in range(7):
+        base = dia * MINUTOS_DIA
+        entrada = entradas[dia]
+        if entrada is not None:
+            limite = entrada + tolerancia
+            for minuto in range(limite + 1, MINUTOS_DIA):
+                atraso[base + minuto] = minuto - limite
+
+        if saidas[dia]:
+            for minuto in range(MINUTOS_DIA):
+                saida = min(saidas[dia], key=lambda s: abs(s - minuto))
+                limite = saida - tolerancia
+                if minuto < limite:
+                    antecipacao[base + minuto] = limite - minuto
+
+    # Intervalos, em minutos da semana contados do começo do turno (um
+    # turno noturno tem o intervalo no dia seguinte).
+    for dia, entrada, saida, intervalo in turnos:
+        duracao = (saida - entrada) % MINUTOS_DIA or MINUTOS_DIA
+        if not 0 < intervalo < duracao:
+            continue
+        inicio = dia * MINUTOS_DIA + entrada
+        fim = inicio + duracao
+        ida = inicio + duracao // 2 - intervalo // 2
+        volta = ida + intervalo
+        for minuto in range(inicio, volta):
+            antecipacao[minuto % MINUTOS_SEMANA] = max(ida - tolerancia - minuto, 0)
+        for minuto in range(ida, fim):
+            atraso[minuto % MINUTOS_SEMANA] = max(minuto - volta - tolerancia, 0)
+
+    return JornadaCompilada(atraso, antecipacao)
+
+
+@lru_cache(maxsize=MAXIMO_COMPILADAS)
+def _compilada(jornada_id, jornada_atualizada_em, horario_entrada, horario_saida, tolerancia):
+    # jornada_atualizada_em só entra na chave: jornada editada = chave nova.
+    if jornada_id is not None:
+        turnos = _turnos_da_jornada(jornada_id)
+    elif horario_entrada and horario_saida:
+        entrada, saida = _minuto(horario_entrada), _minuto(horario_saida)
+        turnos = tuple((dia, entrada, saida, 0) for dia in range(7))
+    else:
+        turnos = ()
+    return compilar_turnos(turnos, tolerancia)
+
+
+def compilar_jornada(profissional):
+    """
+    Vetores do profissional (do LRU). None se não houver horário previsto.
+    Com jornada, lê profissional.jornada (uma consulta se não veio no
+    select_related).
+    """
+    if profissional.jornada_id:
+        return _compilada(
+            profissional.jornada_id, profissional.jornada.atualizado_em, None, None, _tolerancia(profissional)
+        )
+    return _compilada(
+        None, None, profissional.horario_entrada, profissional.horario_saida, _tolerancia(profissional)
+    )
+
+
+def invalidar_jornadas():
+    """Esvazia o LRU deste processo (os outros trocam de chave sozinhos)."""
+    _compilada.cache_clear()
+
+
+def calcular_tolerancia_marcacao(profissional, data, horario, tipo):
+    """(minutos, dentro_tolerancia) de uma marcação — ver JornadaCompilada.avaliar."""
+    compilada = compilar_jornada(profissional)
+    if compilada is None:
+        return 0, True
+    return compilada.avaliar(data, horario, tipo)
@@ -0,0 +1,115 @@
+# ponto/management/commands/arquivar_marcacoes.py
+"""
+Move pro arquivo (ponto/arquivamento.py) os meses de marcações mais
+antigos que o horizonte (settings.ARQUIVO_MARCACOES_HORIZONTE_MESES). Rode
+todo mês, pelo cron — meses já arquivados que receberam marcação nova são
+regravados com ela.
+
+Uso:
+    python manage.py arquivar_marcacoes
+    python manage.py arquivar_marcacoes --horizonte-meses 36 --dry-run
+    python manage.py arquivar_marcacoes --mes 2023-05
+    python manage.py arquivar_marcacoes --verificar
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ponto.arquivamento import (
+    arquivar_mes, fim_do_mes, horizonte_meses, limite_do_horizonte, meses_a_arquivar, verificar_arquivo,
+)
+from ponto.models import ArquivoMarcacoes, RegistroPonto
+
+
+def _mes(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f'Mês inválido: {valor} (use AAAA-MM).')
+
+
+class Command(BaseCommand):
+    help = 'Arquiva (em arquivos compactados por mês) as marcações mais antigas que o horizonte.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horizonte-meses',
+            type=int,
+            help='Meses completos, antes do atual, que ficam no banco (padrão: settings.ARQUIVO_MARCACOES_HORIZONTE_MESES).',
+        )
+        parser.add_argument(
+            '--mes',
+            type=_mes,
+            action='append',
+            help='AAAA-MM: arquiva só esse mês (pode repetir). Precisa estar antes do horizonte.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Só mostra os meses e quantas marcações sairiam do banco.',
+        )
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Confere os arquivos existentes contra os manifestos (não arquiva nada).',
+        )
+
+    def handle(self, *args, **options):
+        if options['verificar']:
+            self._verificar()
+            return
+
+        meses = options['horizonte_meses']
+        if meses is None:
+            meses = horizonte_meses()
+        if meses < 0:
+            raise CommandError('--horizonte-meses não pode ser negativo.')
+        limite = limite_do_horizonte(meses)
+
+        if options['mes']:
+            recentes = [mes for mes in options['mes'] if mes >= limite]
+            if recentes:
+                raise CommandError(
+                    f'{recentes[0]:%m/%Y} está dentro do horizonte ({meses} meses, a partir de {limite:%m/%Y}).'
+                )
+            a_arquivar = sorted(set(options['mes']))
+        else:
+            a_arquivar = meses_a_arquivar(meses)
+
+        if not a_arquivar:
+            self.stdout.write(f'Nenhum mês antes de {limite:%m/%Y} com marcações no banco.')
+            return
+
+        for mes in a_arquivar:
+            quantidade = RegistroPonto.objects.filter(data__gte=mes, data__lte=fim_do_mes(mes)).count()
+            if options['dry_run']:
+                self.stdout.write(f'{mes:%m/%Y}: {quantidade} marcação(ões) sairiam do banco.')
+                continue
+            arquivo = arquivar_mes(mes)
+            if arquivo is None:
+                self.stdout.write(f'{mes:%m/%Y}: nada a arquivar.')
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f'{mes:%m/%Y}: {quantidade} marcação(ões) arquivada(s) — {arquivo.quantidade} no arquivo, '
+                f'{arquivo.tamanho_bytes / 1024 / 1024:.1f} MB ({arquivo.caminho}).'
+            ))
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Nenhuma gravação feita (--dry-run).'))
+
+    def _verificar(self):
+        arquivos = ArquivoMarcacoes.objects.order_by('mes')
+        if not arquivos.exists():
+            self.stdout.write('Nenhum mês arquivado.')
+            return
+        com_problema = 0
+        for arquivo in arquivos:
+            problemas = verificar_arquivo(arquivo)
+            if problemas:
+                com_problema += 1
+                self.stdout.write(self.style.ERROR(f'{arquivo.mes:%m/%Y}: ' + '; '.join(problemas)))
+            else:
+                self.stdout.write(f'{arquivo.mes:%m/%Y}: ok ({arquivo.quantidade} marcações).')
+        if com_problema:
+            raise CommandError(f'{com_problema} arquivo(s) com problema.')
+        self.stdout.write(self.style.SUCCESS('Todos os arquivos conferem com os manifestos.'))
@@ -0,0 +1,84 @@
+# ponto/management/commands/gerar_espelho_ponto.py
+"""
+Gera o Espelho de Ponto do mês (ponto/espelho.py) de todos os profissionais
+ativos — ou de um estabelecimento — em CSV (folha de pagamento) ou PDF.
+
+Sem --mes, usa o mês anterior (fechamento).
+
+Uso:
+    python manage.py gerar_espelho_ponto
+    python manage.py gerar_espelho_ponto --mes 2025-01 --saida /tmp/espelho_jan.csv
+    python manage.py gerar_espelho_ponto --mes 2025-01 --estabelecimento 3 --formato pdf
+    python manage.py gerar_espelho_ponto --dry-run
+"""
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ponto.espelho import csv_espelhos, espelhos, nome_arquivo_espelho, pdf_espelhos, periodo_do_mes
+from usuarios.models import Profissional
+
+
+def _mes(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f'Mês inválido: {valor} (use AAAA-MM).')
+
+
+class Command(BaseCommand):
+    help = 'Gera o Espelho de Ponto mensal dos profissionais ativos (CSV ou PDF).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', type=_mes, help='AAAA-MM (padrão: mês anterior).')
+        parser.add_argument('--estabelecimento', type=int, help='ID do estabelecimento. Padrão: todos.')
+        parser.add_argument('--formato', choices=['csv', 'pdf'], default='csv')
+        parser.add_argument('--saida', help='Caminho do arquivo (padrão: espelho_ponto_<AAAAMM>.<formato>).')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Só mostra quantos espelhos seriam gerados.',
+        )
+
+    def handle(self, *args, **options):
+        mes = options['mes'] or (timezone.now().date().replace(day=1) - timedelta(days=1))
+        data_inicio, data_fim = periodo_do_mes(mes.year, mes.month)
+        estabelecimento_id = options['estabelecimento']
+        formato = options['formato']
+        saida = options['saida'] or nome_arquivo_espelho(data_inicio, formato, estabelecimento_id)
+
+        profissionais = Profissional.objects.filter(ativo=True)
+        if estabelecimento_id:
+            profissionais = profissionais.filter(estabelecimento_id=estabelecimento_id)
+        self.stdout.write(
+            f'{profissionais.count()} profissional(is) ativo(s), '
+            f'{data_inicio:%d/%m/%Y} a {data_fim:%d/%m/%Y}, {formato.upper()} -> {saida}'
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Nenhum arquivo gerado (--dry-run).'))
+            return
+
+        inicio = time.perf_counter()
+        gerados = 0
+
+        def contar(fluxo):
+            nonlocal gerados
+            for espelho in fluxo:
+                gerados += 1
+                yield espelho
+
+        fluxo = contar(espelhos(data_inicio, data_fim, estabelecimento_id=estabelecimento_id))
+        if formato == 'csv':
+            with open(saida, 'w', encoding='utf-8', newline='') as arquivo:
+                for linha in csv_espelhos(fluxo):
+                    arquivo.write(linha)
+        else:
+            conteudo = pdf_espelhos(fluxo, data_inicio, data_fim, 'Sistema TimeFlow')
+            with open(saida, 'wb') as arquivo:
+                arquivo.write(conteudo)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{gerados} espelho(s) gerado(s) em {time.perf_counter() - inicio:.1f}s.'
+        ))
@@ -0,0 +1,144 @@
+# ponto/management/commands/medir_armazenamento_registros.py
+"""
+Mede o espaço das marcações no banco: linhas, bytes por linha, tamanho dos
+dados e de cada índice de ponto_registroponto (e da tabela lateral de
+ajustes, ponto_ajusteregistroponto). Com --consulta, lê as marcações dos
+últimos N dias (o que relatórios e painéis fazem) e, no MySQL, mostra a
+taxa de acerto do buffer pool do InnoDB nessa leitura.
+
+Rode antes e depois de mudanças de layout (ex.: migração 0008) pra
+comparar.
+
+- MySQL: information_schema.TABLES/INNODB_INDEXES (estatísticas do
+  InnoDB — rode ANALYZE TABLE antes pra números atuais) e SHOW GLOBAL
+  STATUS (Innodb_buffer_pool_read_requests / _reads).
+- SQLite: tabela virtual dbstat (tamanho real das páginas e do conteúdo).
+  Não existe buffer pool; --consulta mostra só o tempo.
+
+Uso:
+    python manage.py medir_armazenamento_registros
+    python manage.py medir_armazenamento_registros --consulta 90
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from ponto.models import AjusteRegistroPonto, RegistroPonto
+
+TABELAS = (RegistroPonto._meta.db_table, AjusteRegistroPonto._meta.db_table)
+
+
+def _mb(valor):
+    return f'{valor / 1024 / 1024:,.1f} MB'
+
+
+def _tamanhos_sqlite(cursor, tabela):
+    """(linhas, bytes de dados, bytes de conteúdo, {índice: bytes})"""
+    cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(tabela)}')
+    linhas = cursor.fetchone()[0]
+    cursor.execute(
+        """
+        SELECT s.name, SUM(s.pgsize), SUM(s.payload), m.type
+        FROM dbstat s JOIN sqlite_master m ON m.name = s.name
+        WHERE m.tbl_name = %s
+        GROUP BY s.name, m.type
+        """,
+        [tabela],
+    )
+    dados = conteudo = 0
+    indices = {}
+    for nome, paginas, carga, tipo in cursor.fetchall():
+        if tipo == 'table':
+            dados, conteudo = paginas, carga
+        else:
+            indices[nome] = paginas
+    return linhas, dados, conteudo, indices
+
+
+def _tamanhos_mysql(cursor, tabela):
+    cursor.execute(
+        """
+        SELECT TABLE_ROWS, DATA_LENGTH, AVG_ROW_LENGTH
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """,
+        [tabela],
+    )
+    linha = cursor.fetchone()
+    if linha is None:
+        return 0, 0, 0, {}
+    linhas, dados, media = linha
+    cursor.execute(
+        """
+        SELECT INDEX_NAME, SUM(STAT_VALUE) * @@innodb_page_size
+        FROM mysql.innodb_index_stats
+        WHERE database_name = DATABASE() AND table_name LIKE %s AND stat_name = 'size'
+        GROUP BY INDEX_NAME
+        """,
+        [f'{tabela}%'],
+    )
+    indices = {nome: int(tamanho) for nome, tamanho in cursor.fetchall() if nome != 'PRIMARY'}
+    return linhas, dados, (media or 0) * (linhas or 0), indices
+
+
+def _buffer_pool(cursor):
+    cursor.execute("SHOW GLOBAL STATUS LIKE 'Innodb_buffer_pool_read%%'")
+    status = {nome: int(valor) for nome, valor in cursor.fetchall() if valor.isdigit()}
+    return status.get('Innodb_buffer_pool_read_requests', 0), status.get('Innodb_buffer_pool_reads', 0)
+
+
+class Command(BaseCommand):
+    help = 'Mede linhas, bytes por linha e índices das marcações (e o buffer pool, no MySQL).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--consulta',
+            type=int,
+            metavar='DIAS',
+            help='Lê as marcações dos últimos DIAS dias e mede a leitura.',
+        )
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in ('mysql', 'sqlite'):
+            self.stdout.write(self.style.WARNING(f'Banco {vendor}: medição só implementada pra MySQL e SQLite.'))
+            return
+
+        with connection.cursor() as cursor:
+            for tabela in TABELAS:
+                medir = _tamanhos_mysql if vendor == 'mysql' else _tamanhos_sqlite
+                linhas, dados, conteudo, indices = medir(cursor, tabela)
+                self.stdout.write(self.style.MIGRATE_HEADING(tabela))
+                self.stdout.write(f'  linhas:            {linhas:,}')
+                self.stdout.write(f'  dados:             {_mb(dados)}')
+                if linhas:
+                    self.stdout.write(f'  bytes por linha:   {conteudo / linhas:,.1f} (conteúdo), {dados / linhas:,.1f} (com páginas)')
+                for nome, tamanho in sorted(indices.items()):
+                    self.stdout.write(f'  índice {nome}: {_mb(tamanho)}')
+                self.stdout.write(f'  total dos índices: {_mb(sum(indices.values()))}')
+
+            if options['consulta']:
+                self._medir_consulta(cursor, vendor, options['consulta'])
+
+    def _medir_consulta(self, cursor, vendor, dias):
+        fim = RegistroPonto.objects.order_by('-data').values_list('data', flat=True).first() or timezone.now().date()
+        registros = (
+            RegistroPonto.objects
+            .filter(data__gte=fim - timedelta(days=dias), data__lte=fim)
+            .select_related('estabelecimento', 'ajuste')
+        )
+        antes = _buffer_pool(cursor) if vendor == 'mysql' else None
+        inicio = time.monotonic()
+        lidas = sum(1 for _ in registros.iterator(chunk_size=2000))
+        duracao = time.monotonic() - inicio
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Leitura de {dias} dia(s) até {fim:%d/%m/%Y}'))
+        self.stdout.write(f'  {lidas:,} marcações em {duracao:.2f} s')
+        if antes is not None:
+            depois = _buffer_pool(cursor)
+            pedidos = depois[0] - antes[0]
+            do_disco = depois[1] - antes[1]
+            taxa = 100 * (1 - do_disco / pedidos) if pedidos else 100
+            self.stdout.write(f'  buffer pool: {pedidos:,} leituras de página, {do_disco:,} do disco ({taxa:.2f}% de acerto)')
@@ -0,0 +1,86 @@
+# ponto/management/commands/particionar_registros.py
+"""
+Mantém as partições mensais da tabela de marcações no MySQL (ver
+ponto/particionamento.py). Rode todo mês, pelo cron: cria as partições
+que faltam até REGISTROPONTO_PARTICOES_A_FRENTE meses à frente. Em outros
+bancos (SQLite) não faz nada.
+
+--converter particiona uma tabela que ainda não é particionada (a
+migração 0007 faz isso sozinha; use o comando quando ela foi aplicada com
+--fake por causa do tamanho da tabela).
+
+Uso:
+    python manage.py particionar_registros
+    python manage.py particionar_registros --dry-run
+    python manage.py particionar_registros --converter
+    python manage.py particionar_registros --listar
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ponto import particionamento
+
+
+class Command(BaseCommand):
+    help = 'Cria as partições mensais futuras da tabela de marcações (MySQL).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--converter',
+            action='store_true',
+            help='Particiona a tabela, se ainda não for particionada (reescreve a tabela inteira).',
+        )
+        parser.add_argument(
+            '--listar',
+            action='store_true',
+            help='Só lista as partições existentes.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Só mostra o SQL que seria executado.',
+        )
+
+    def handle(self, *args, **options):
+        if not particionamento.suportado():
+            self.stdout.write(
+                f'Banco {connection.vendor}: particionamento só existe no MySQL, nada a fazer.'
+            )
+            return
+
+        existentes = particionamento.particoes()
+
+        if options['listar']:
+            if not existentes:
+                self.stdout.write('Tabela não particionada.')
+            for nome, limite in existentes:
+                self.stdout.write(f'{nome}: data < {limite:%d/%m/%Y}' if limite else f'{nome}: resto')
+            return
+
+        if not existentes:
+            if not options['converter']:
+                raise CommandError(
+                    'Tabela não particionada: rode a migração 0007 ou use --converter.'
+                )
+            comandos = particionamento.sql_conversao()
+        else:
+            if options['converter']:
+                self.stdout.write('Tabela já particionada.')
+            comando = particionamento.sql_novas_particoes()
+            comandos = [comando] if comando else []
+
+        if not comandos:
+            self.stdout.write(
+                f'Partições já criadas até {particionamento.particoes_a_frente()} mes(es) à frente.'
+            )
+            return
+
+        if options['dry_run']:
+            for comando in comandos:
+                self.stdout.write(comando + ';')
+            self.stdout.write(self.style.WARNING('Nenhuma alteração feita (--dry-run).'))
+            return
+
+        particionamento.executar(comandos)
+        total = len(particionamento.particoes())
+        self.stdout.write(self.style.SUCCESS(f'Tabela de marcações com {total} partição(ões).'))
@@ -0,0 +1,88 @@
+# ponto/management/commands/recalcular_tolerancia.py
+"""
+Recalcula atraso_minutos, saida_antecipada_minutos e dentro_tolerancia dos
+registros já gravados, depois que o RH corrige horário, tolerância ou
+jornada de alguém. Não mexe em NSR nem em hash do AFD — ver
+ponto/recalculo.py.
+
+Uso:
+    python manage.py recalcular_tolerancia --profissional 12 --data-inicio 2025-01-01
+    python manage.py recalcular_tolerancia --data-inicio 2025-01-01 --data-fim 2025-03-31
+    python manage.py recalcular_tolerancia --profissional 12 --profissional 15 --dry-run
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from usuarios.models import Profissional
+from ponto.recalculo import recalcular_tolerancia
+
+
+def _data(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Data inválida: {valor} (use AAAA-MM-DD).')
+
+
+class Command(BaseCommand):
+    help = 'Recalcula atraso/saída antecipada/tolerância dos registros de ponto já gravados.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profissional',
+            type=int,
+            action='append',
+            help='ID do profissional (pode repetir). Padrão: todos.',
+        )
+        parser.add_argument('--data-inicio', type=_data, help='AAAA-MM-DD (inclusive).')
+        parser.add_argument('--data-fim', type=_data, help='AAAA-MM-DD (inclusive).')
+        parser.add_argument(
+            '--chunk',
+            type=int,
+            default=2000,
+            help='Registros lidos/gravados por lote (padrão: 2000).',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Só conta quantos registros mudariam, sem gravar nada no banco.',
+        )
+
+    def handle(self, *args, **options):
+        data_inicio = options['data_inicio']
+        data_fim = options['data_fim']
+        if data_inicio and data_fim and data_inicio > data_fim:
+            raise CommandError('--data-inicio não pode ser depois de --data-fim.')
+
+        profissionais = None
+        if options['profissional']:
+            profissionais = list(Profissional.objects.filter(id__in=options['profissional']))
+            faltando = set(options['profissional']) - {p.id for p in profissionais}
+            if faltando:
+                raise CommandError(f'Profissional(is) não encontrado(s): {sorted(faltando)}')
+
+        analisados, alterados = recalcular_tolerancia(
+            profissionais=profissionais,
+            data_inicio=data_inicio,
+            data_fim=data_fim,
+            dry_run=options['dry_run'],
+            chunk=options['chunk'],
+        )
+        total_alterados = sum(alterados.values())
+
+        if alterados:
+            nomes = dict(Profissional.objects.filter(id__in=alterados).values_list('id', 'nome'))
+            for profissional_id, quantidade in alterados.most_common():
+                self.stdout.write(f'  {nomes.get(profissional_id, profissional_id)}: {quantidade} registro(s)')
+
+        if options['dry_run']:
+            self.stdout.write(
+                f'{analisados} registro(s) analisado(s), {total_alterados} mudaria(m).'
+            )
+            self.stdout.write(self.style.WARNING('Nenhuma gravação feita (--dry-run).'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{analisados} registro(s) analisado(s), {total_alterados} atualizado(s).'
+        ))
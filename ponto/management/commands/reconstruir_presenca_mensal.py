@@ -0,0 +1,72 @@
+# ponto/management/commands/reconstruir_presenca_mensal.py
+"""
+Remonta os mapas de presença (PresencaMensal) a partir das marcações. Use
+na primeira instalação, depois de importar marcações direto no banco ou se
+desconfiar que os mapas divergiram — ver ponto/presenca.py.
+
+Os limites são estendidos pro mês inteiro (cada linha cobre um mês).
+
+Uso:
+    python manage.py reconstruir_presenca_mensal
+    python manage.py reconstruir_presenca_mensal --data-inicio 2025-01-01 --data-fim 2025-12-31
+    python manage.py reconstruir_presenca_mensal --profissional 12 --dry-run
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from ponto.models import PresencaMensal, RegistroPonto
+from ponto.presenca import filtro_meses, reconstruir_presencas
+
+
+def _data(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Data inválida: {valor} (use AAAA-MM-DD).')
+
+
+class Command(BaseCommand):
+    help = 'Remonta os mapas de presença mensal (PresencaMensal) a partir das marcações.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data-inicio', type=_data, help='AAAA-MM-DD (vale o mês inteiro).')
+        parser.add_argument('--data-fim', type=_data, help='AAAA-MM-DD (vale o mês inteiro).')
+        parser.add_argument(
+            '--profissional',
+            type=int,
+            action='append',
+            help='ID do profissional (pode repetir). Padrão: todos.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Só mostra quantas linhas existem hoje e quantas seriam geradas.',
+        )
+
+    def handle(self, *args, **options):
+        data_inicio = options['data_inicio']
+        data_fim = options['data_fim']
+        profissionais = options['profissional']
+        if data_inicio and data_fim and data_inicio > data_fim:
+            raise CommandError('--data-inicio não pode ser depois de --data-fim.')
+
+        if options['dry_run']:
+            presencas = PresencaMensal.objects.filter(filtro_meses(data_inicio, data_fim))
+            registros = RegistroPonto.objects.annotate(ano=ExtractYear('data'), mes=ExtractMonth('data'))
+            registros = registros.filter(filtro_meses(data_inicio, data_fim))
+            if profissionais:
+                presencas = presencas.filter(profissional__in=profissionais)
+                registros = registros.filter(profissional__in=profissionais)
+            esperadas = registros.order_by().values('profissional_id', 'ano', 'mes').distinct().count()
+            self.stdout.write(f'{presencas.count()} linha(s) de presença hoje, {esperadas} seriam gerada(s).')
+            self.stdout.write(self.style.WARNING('Nenhuma gravação feita (--dry-run).'))
+            return
+
+        gravadas = reconstruir_presencas(
+            data_inicio=data_inicio,
+            data_fim=data_fim,
+            profissionais=profissionais,
+        )
+        self.stdout.write(self.style.SUCCESS(f'{gravadas} linha(s) de presença mensal gravada(s).'))
@@ -0,0 +1,77 @@
+# ponto/management/commands/reconstruir_resumo_diario.py
+"""
+Remonta o resumo diário (ResumoDiarioPonto) a partir das marcações. Use na
+primeira instalação, depois de importar marcações direto no banco ou se
+desconfiar que o resumo divergiu — ver ponto/resumo_diario.py.
+
+Uso:
+    python manage.py reconstruir_resumo_diario
+    python manage.py reconstruir_resumo_diario --data-inicio 2025-01-01 --data-fim 2025-01-31
+    python manage.py reconstruir_resumo_diario --profissional 12 --dry-run
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ponto.models import RegistroPonto, ResumoDiarioPonto
+from ponto.resumo_diario import reconstruir_resumos
+
+
+def _data(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Data inválida: {valor} (use AAAA-MM-DD).')
+
+
+class Command(BaseCommand):
+    help = 'Remonta o resumo diário de ponto (ResumoDiarioPonto) a partir das marcações.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data-inicio', type=_data, help='AAAA-MM-DD (inclusive).')
+        parser.add_argument('--data-fim', type=_data, help='AAAA-MM-DD (inclusive).')
+        parser.add_argument(
+            '--profissional',
+            type=int,
+            action='append',
+            help='ID do profissional (pode repetir). Padrão: todos.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Só mostra quantas linhas existem hoje e quantas seriam geradas.',
+        )
+
+    def handle(self, *args, **options):
+        data_inicio = options['data_inicio']
+        data_fim = options['data_fim']
+        profissionais = options['profissional']
+        if data_inicio and data_fim and data_inicio > data_fim:
+            raise CommandError('--data-inicio não pode ser depois de --data-fim.')
+
+        if options['dry_run']:
+            filtros = {}
+            if data_inicio:
+                filtros['data__gte'] = data_inicio
+            if data_fim:
+                filtros['data__lte'] = data_fim
+            if profissionais:
+                filtros['profissional__in'] = profissionais
+            atuais = ResumoDiarioPonto.objects.filter(**filtros).count()
+            esperadas = (
+                RegistroPonto.objects.filter(**filtros)
+                .order_by()
+                .values('data', 'estabelecimento_id', 'profissional_id')
+                .distinct()
+                .count()
+            )
+            self.stdout.write(f'{atuais} linha(s) no resumo hoje, {esperadas} seriam gerada(s).')
+            self.stdout.write(self.style.WARNING('Nenhuma gravação feita (--dry-run).'))
+            return
+
+        gravadas = reconstruir_resumos(
+            data_inicio=data_inicio,
+            data_fim=data_fim,
+            profissionais=profissionais,
+        )
+        self.stdout.write(self.style.SUCCESS(f'{gravadas} linha(s) de resumo diário gravada(s).'))
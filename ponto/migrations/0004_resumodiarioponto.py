@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estabelecimentos', '0001_initial'),
+        ('ponto', '0003_registroponto_codigo_validacao_and_more'),
+        ('usuarios', '0003_jornada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiarioPonto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('entradas', models.PositiveIntegerField(default=0)),
+                ('saidas', models.PositiveIntegerField(default=0)),
+                ('entradas_com_atraso', models.PositiveIntegerField(default=0)),
+                ('atraso_total', models.PositiveIntegerField(default=0, verbose_name='Atraso total (minutos)')),
+                ('atraso_maximo', models.PositiveIntegerField(default=0, verbose_name='Maior atraso (minutos)')),
+                ('saidas_antecipadas', models.PositiveIntegerField(default=0)),
+                ('saida_antecipada_total', models.PositiveIntegerField(default=0, verbose_name='Saída antecipada total (minutos)')),
+                ('registros_sem_desvio', models.PositiveIntegerField(default=0)),
+                ('completo', models.BooleanField(default=False, help_text='Teve entrada e saída no dia.')),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('estabelecimento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='estabelecimentos.estabelecimento')),
+                ('profissional', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='usuarios.profissional')),
+            ],
+            options={
+                'verbose_name': 'Resumo diário de ponto',
+                'verbose_name_plural': 'Resumos diários de ponto',
+                'indexes': [models.Index(fields=['data', 'estabelecimento'], name='ponto_resum_data_029c28_idx'), models.Index(fields=['profissional', 'data'], name='ponto_resum_profiss_e78f68_idx')],
+                'unique_together': {('data', 'estabelecimento', 'profissional')},
+            },
+        ),
+    ]
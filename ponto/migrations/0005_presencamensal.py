@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:40
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def preencher_presencas(apps, schema_editor):
+    """
+    Mapas das marcações já gravadas — o mesmo GROUP BY do comando
+    `reconstruir_presenca_mensal` (ponto/presenca.py), com os models
+    históricos.
+    """
+    RegistroPonto = apps.get_model('ponto', 'RegistroPonto')
+    PresencaMensal = apps.get_model('ponto', 'PresencaMensal')
+    banco = schema_editor.connection.alias
+
+    linhas = RegistroPonto.objects.using(banco).order_by().values('profissional_id', 'data').annotate(
+        entrada=Count('id', filter=Q(tipo='ENTRADA')),
+        saida=Count('id', filter=Q(tipo='SAIDA')),
+        ajuste=Count('id', filter=Q(ajuste_manual=True)),
+    )
+    mapas = defaultdict(lambda: [0, 0, 0])
+    for linha in linhas.iterator(chunk_size=2000):
+        mapa = mapas[(linha['profissional_id'], linha['data'].year, linha['data'].month)]
+        bit = 1 << (linha['data'].day - 1)
+        for i, campo in enumerate(('entrada', 'saida', 'ajuste')):
+            if linha[campo]:
+                mapa[i] |= bit
+
+    PresencaMensal.objects.using(banco).bulk_create(
+        [
+            PresencaMensal(
+                profissional_id=prof_id, ano=ano, mes=mes,
+                dias_entrada=entrada, dias_saida=saida, dias_ajuste_manual=ajuste,
+            )
+            for (prof_id, ano, mes), (entrada, saida, ajuste) in mapas.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ponto', '0004_resumodiarioponto'),
+        ('usuarios', '0003_jornada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PresencaMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ano', models.PositiveSmallIntegerField()),
+                ('mes', models.PositiveSmallIntegerField()),
+                ('dias_entrada', models.PositiveIntegerField(default=0)),
+                ('dias_saida', models.PositiveIntegerField(default=0)),
+                ('dias_ajuste_manual', models.PositiveIntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('profissional', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='usuarios.profissional')),
+            ],
+            options={
+                'verbose_name': 'Presença mensal',
+                'verbose_name_plural': 'Presenças mensais',
+                'indexes': [models.Index(fields=['ano', 'mes'], name='ponto_prese_ano_b42157_idx')],
+                'unique_together': {('profissional', 'ano', 'mes')},
+            },
+        ),
+        migrations.RunPython(preencher_presencas, migrations.RunPython.noop),
+    ]
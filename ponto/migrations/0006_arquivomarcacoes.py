@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ponto', '0005_presencamensal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArquivoMarcacoes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primeiro dia do mês arquivado.', unique=True)),
+                ('caminho', models.CharField(help_text='Relativo a ARQUIVO_MARCACOES_DIRETORIO.', max_length=255)),
+                ('quantidade', models.PositiveIntegerField(default=0)),
+                ('nsr_inicial', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('nsr_final', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('hash_final', models.CharField(blank=True, max_length=64)),
+                ('sha256', models.CharField(max_length=64)),
+                ('tamanho_bytes', models.PositiveBigIntegerField(default=0)),
+                ('indice', models.JSONField(default=dict)),
+                ('versao_formato', models.PositiveSmallIntegerField(default=1)),
+                ('arquivado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Mês de marcações arquivado',
+                'verbose_name_plural': 'Meses de marcações arquivados',
+                'ordering': ['mes'],
+            },
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Particiona ponto_registroponto por mês no MySQL (ponto/particionamento.py).
+# As FKs ficam db_constraint=False no estado das migrações em todo banco,
+# mas as constraints só saem do banco no MySQL (que não aceita FK em tabela
+# particionada); nos outros bancos continuam lá. No MySQL o último ALTER
+# reescreve a tabela inteira: com a tabela grande, rode
+# `python manage.py particionar_registros --dry-run` pra ver o SQL, aplique
+# esta migração com --fake e faça a conversão com
+# `python manage.py particionar_registros --converter` numa janela de manutenção.
+
+def remover_constraints(apps, schema_editor):
+    from ponto import particionamento
+
+    particionamento.alterar_chaves_estrangeiras(apps, schema_editor, manter=False)
+
+
+def recriar_constraints(apps, schema_editor):
+    from ponto import particionamento
+
+    particionamento.alterar_chaves_estrangeiras(apps, schema_editor, manter=True)
+
+
+def particionar(apps, schema_editor):
+    from ponto import particionamento
+
+    if particionamento.suportado(schema_editor.connection) and not particionamento.particoes(schema_editor.connection):
+        particionamento.executar(particionamento.sql_conversao(schema_editor.connection), schema_editor.connection)
+
+
+def desparticionar(apps, schema_editor):
+    from ponto import particionamento
+
+    if particionamento.suportado(schema_editor.connection) and particionamento.particoes(schema_editor.connection):
+        particionamento.executar(particionamento.sql_reversao(schema_editor.connection), schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estabelecimentos', '0001_initial'),
+        ('ponto', '0006_arquivomarcacoes'),
+        ('usuarios', '0003_jornada'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # DDL do MySQL não é transacional
+    atomic = False
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='registroponto',
+                    name='ajustado_por',
+                    field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='registros_ajustados', to=settings.AUTH_USER_MODEL, verbose_name='Ajustado por'),
+                ),
+                migrations.AlterField(
+                    model_name='registroponto',
+                    name='estabelecimento',
+                    field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='estabelecimentos.estabelecimento'),
+                ),
+                migrations.AlterField(
+                    model_name='registroponto',
+                    name='profissional',
+                    field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='usuarios.profissional'),
+                ),
+                migrations.AlterField(
+                    model_name='registroponto',
+                    name='registro_manual_referencia',
+                    field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='ponto.registromanual', verbose_name='Referência do Registro Manual'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(remover_constraints, recriar_constraints),
+            ],
+        ),
+        migrations.RunPython(particionar, desparticionar),
+    ]
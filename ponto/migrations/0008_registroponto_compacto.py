@@ -0,0 +1,121 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:21
+
+import django.db.models.deletion
+import ponto.models
+from django.db import migrations, models, transaction
+from django.db.models import F, Func
+from django.db.models.functions import Round
+
+
+# Layout compacto de ponto_registroponto: hash em BINARY(32), GPS em
+# inteiros (1e-7 grau) e justificativa/observações na tabela lateral
+# ponto_ajusteregistroponto. As colunas novas são preenchidas a partir das
+# antigas, FAIXA ids por transação (sem uma transação gigante no MySQL),
+# antes de as antigas saírem. Sem volta: o `migrate` reverso não recria as
+# colunas antigas preenchidas.
+
+FAIXA = 10000
+ESCALA_GPS = 10_000_000
+
+
+def preencher(apps, schema_editor):
+    RegistroPonto = apps.get_model('ponto', 'RegistroPonto')
+    AjusteRegistroPonto = apps.get_model('ponto', 'AjusteRegistroPonto')
+    mysql = schema_editor.connection.vendor == 'mysql'
+
+    ultimo = RegistroPonto.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    for inicio in range(0, ultimo + 1, FAIXA):
+        faixa = RegistroPonto.objects.filter(pk__gte=inicio, pk__lt=inicio + FAIXA)
+        with transaction.atomic():
+            faixa.update(
+                latitude_e7=Round(F('latitude') * ESCALA_GPS),
+                longitude_e7=Round(F('longitude') * ESCALA_GPS),
+            )
+
+            com_hash = faixa.exclude(hash_registro='')
+            if mysql:
+                com_hash.update(
+                    hash_binario=Func(F('hash_registro'), function='UNHEX', output_field=models.BinaryField())
+                )
+            else:
+                RegistroPonto.objects.bulk_update(
+                    [
+                        RegistroPonto(pk=pk, hash_binario=bytes.fromhex(hash_hex))
+                        for pk, hash_hex in com_hash.values_list('pk', 'hash_registro')
+                    ],
+                    ['hash_binario'],
+                    batch_size=1000,
+                )
+
+            AjusteRegistroPonto.objects.bulk_create(
+                [
+                    AjusteRegistroPonto(registro_id=pk, justificativa=justificativa, observacoes=observacoes)
+                    for pk, justificativa, observacoes in (
+                        faixa.exclude(justificativa_ajuste__isnull=True, observacoes__isnull=True)
+                        .values_list('pk', 'justificativa_ajuste', 'observacoes')
+                    )
+                    if justificativa or observacoes
+                ],
+                batch_size=1000,
+            )
+
+
+class Migration(migrations.Migration):
+
+    # uma transação por faixa de ids, não pela migração inteira
+    atomic = False
+
+    dependencies = [
+        ('ponto', '0007_particionamento_registroponto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AjusteRegistroPonto',
+            fields=[
+                ('registro', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ajuste', serialize=False, to='ponto.registroponto')),
+                ('justificativa', models.CharField(blank=True, help_text='Justificativa para o ajuste manual do registro', max_length=255, null=True, verbose_name='Justificativa do Ajuste')),
+                ('observacoes', models.TextField(blank=True, help_text='Observações adicionais sobre o registro', null=True, verbose_name='Observações')),
+            ],
+            options={
+                'verbose_name': 'Ajuste de registro de ponto',
+                'verbose_name_plural': 'Ajustes de registros de ponto',
+            },
+        ),
+        migrations.AddField(
+            model_name='registroponto',
+            name='hash_binario',
+            field=ponto.models.HashSHA256Field(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='registroponto',
+            name='latitude_e7',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='registroponto',
+            name='longitude_e7',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(preencher),
+        migrations.RemoveField(
+            model_name='registroponto',
+            name='hash_registro',
+        ),
+        migrations.RemoveField(
+            model_name='registroponto',
+            name='justificativa_ajuste',
+        ),
+        migrations.RemoveField(
+            model_name='registroponto',
+            name='latitude',
+        ),
+        migrations.RemoveField(
+            model_name='registroponto',
+            name='longitude',
+        ),
+        migrations.RemoveField(
+            model_name='registroponto',
+            name='observacoes',
+        ),
+    ]
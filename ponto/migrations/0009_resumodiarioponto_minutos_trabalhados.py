@@ -0,0 +1,103 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:03
+
+import gzip
+import json
+import os
+from collections import defaultdict
+from datetime import date, time
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Cópias de ponto/arquivamento.py -> diretorio e ponto/resumo_diario.py ->
+# minutos_trabalhados como estavam nesta migração: ela não pode mudar se o
+# código do app mudar depois.
+
+
+def diretorio():
+    return getattr(
+        settings, 'ARQUIVO_MARCACOES_DIRETORIO', os.path.join(settings.BASE_DIR, 'arquivo_marcacoes')
+    )
+
+
+def minutos_trabalhados(marcacoes):
+    """Minutos trabalhados de [(horario, tipo)] de um dia: cada ENTRADA com a SAIDA seguinte."""
+    segundos = 0
+    entrada = None
+    for horario, tipo in sorted(marcacoes, key=lambda marcacao: marcacao[0]):
+        instante = horario.hour * 3600 + horario.minute * 60 + horario.second
+        if tipo == 'ENTRADA':
+            entrada = instante
+        elif tipo == 'SAIDA' and entrada is not None:
+            segundos += instante - entrada
+            entrada = None
+    return segundos // 60
+
+
+def _marcacoes_arquivadas(caminho):
+    """{dia: {(estabelecimento_id, profissional_id): [(horario, tipo)]}} de um arquivo de mês."""
+    marcacoes = defaultdict(lambda: defaultdict(list))
+    if caminho is None:
+        return marcacoes
+    caminho = os.path.join(diretorio(), caminho)
+    if not os.path.exists(caminho):
+        # `arquivar_marcacoes --verificar` aponta o arquivo que falta
+        return marcacoes
+    with gzip.open(caminho, 'rt', encoding='utf-8') as conteudo:
+        for linha in conteudo:
+            dados = json.loads(linha)
+            chave = (dados['estabelecimento_id'], dados['profissional_id'])
+            marcacoes[date.fromisoformat(dados['data'])][chave].append(
+                (time.fromisoformat(dados['horario']), dados['tipo'])
+            )
+    return marcacoes
+
+
+def preencher_minutos(apps, schema_editor):
+    """
+    minutos_trabalhados das linhas já existentes, um dia por vez: marcações
+    do banco e, nos meses arquivados (ponto/arquivamento.py), as do arquivo
+    do mês — os resumos desses meses continuam no banco.
+    """
+    RegistroPonto = apps.get_model('ponto', 'RegistroPonto')
+    ResumoDiarioPonto = apps.get_model('ponto', 'ResumoDiarioPonto')
+    ArquivoMarcacoes = apps.get_model('ponto', 'ArquivoMarcacoes')
+    banco = schema_editor.connection.alias
+
+    arquivos = dict(ArquivoMarcacoes.objects.using(banco).values_list('mes', 'caminho'))
+    mes_lido = None
+    do_arquivo = {}
+    for dia in ResumoDiarioPonto.objects.using(banco).dates('data', 'day'):
+        if dia.replace(day=1) != mes_lido:
+            mes_lido = dia.replace(day=1)
+            do_arquivo = _marcacoes_arquivadas(arquivos.get(mes_lido))
+
+        marcacoes = defaultdict(list, {chave: list(lista) for chave, lista in do_arquivo.get(dia, {}).items()})
+        linhas = RegistroPonto.objects.using(banco).filter(data=dia).order_by('horario', 'id').values_list(
+            'estabelecimento_id', 'profissional_id', 'horario', 'tipo'
+        )
+        for estabelecimento_id, profissional_id, horario, tipo in linhas:
+            marcacoes[(estabelecimento_id, profissional_id)].append((horario, tipo))
+
+        resumos = list(ResumoDiarioPonto.objects.using(banco).filter(data=dia))
+        for resumo in resumos:
+            resumo.minutos_trabalhados = minutos_trabalhados(
+                marcacoes.get((resumo.estabelecimento_id, resumo.profissional_id), [])
+            )
+        ResumoDiarioPonto.objects.using(banco).bulk_update(resumos, ['minutos_trabalhados'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ponto', '0008_registroponto_compacto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumodiarioponto',
+            name='minutos_trabalhados',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(preencher_minutos, migrations.RunPython.noop),
+    ]
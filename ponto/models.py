@@ -92,6 +92,24 @@ class RegistroManual(models.Model):
         return self.get_motivo_display()
 
 
+# Coordenadas das marcações em inteiros de 1e-7 grau (~1 cm): 4 bytes cada em
+# vez dos 8 do double, e ±180 * 10^7 cabe num INT.
+ESCALA_GPS = 10_000_000
+
+
+class HashSHA256Field(models.BinaryField):
+    """SHA-256 em 32 bytes crus — BINARY(32) no MySQL (o BinaryField puro vira LONGBLOB)."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs['max_length'] = 32
+        super().__init__(*args, **kwargs)
+
+    def db_type(self, connection):
+        if connection.vendor == 'mysql':
+            return 'binary(32)'
+        return super().db_type(connection)
+
+
 class RegistroPonto(models.Model):
     TIPO_REGISTRO = [
         ('ENTRADA', 'Entrada'),
@@ -108,13 +126,26 @@ class RegistroPonto(models.Model):
         ('05', 'Outro dispositivo eletrônico'),
     ]
 
-    profissional = models.ForeignKey(Profissional, on_delete=models.CASCADE)
-    estabelecimento = models.ForeignKey(Estabelecimento, on_delete=models.CASCADE)
+    # No MySQL a tabela é particionada por mês (ponto/particionamento.py), e
+    # o banco diverge do que o Django declara aqui:
+    # - a chave primária é (id, data), não id — o id continua AUTO_INCREMENT;
+    # - as únicas de nsr e codigo_validacao são (nsr, data) e
+    #   (codigo_validacao, data) — a unicidade de verdade vem da sequência
+    #   de NSR e do uuid4;
+    # - as FKs não têm constraint no banco (db_constraint=False). Nos outros
+    #   bancos a migração 0007 não mexe nelas (no SQLite, a tabela recriada
+    #   por uma migração seguinte já sai sem); o estado das migrações é o
+    #   mesmo em todos. on_delete continua valendo — quem apaga em
+    #   cascata/SET_NULL é o Django, não o banco.
+    profissional = models.ForeignKey(Profissional, on_delete=models.CASCADE, db_constraint=False)
+    estabelecimento = models.ForeignKey(Estabelecimento, on_delete=models.CASCADE, db_constraint=False)
     data = models.DateField()
     horario = models.TimeField()
     tipo = models.CharField(max_length=10, choices=TIPO_REGISTRO)
-    latitude = models.FloatField()
-    longitude = models.FloatField()
+    # GPS em inteiros (ESCALA_GPS) — latitude/longitude em graus são
+    # propriedades, lidas e gravadas como antes
+    latitude_e7 = models.IntegerField(default=0)
+    longitude_e7 = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     # ✅ CAMPOS PARA CONTROLE DE TOLERÂNCIA
@@ -129,23 +160,12 @@ class RegistroPonto(models.Model):
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
+        db_constraint=False,
         verbose_name='Referência do Registro Manual'
     )
 
-    justificativa_ajuste = models.CharField(
-        max_length=255,
-        blank=True,
-        null=True,
-        verbose_name='Justificativa do Ajuste',
-        help_text='Justificativa para o ajuste manual do registro'
-    )
-
-    observacoes = models.TextField(
-        blank=True,
-        null=True,
-        verbose_name='Observações',
-        help_text='Observações adicionais sobre o registro'
-    )
+    # justificativa_ajuste e observacoes (quase sempre vazias) ficam em
+    # AjusteRegistroPonto — ver as propriedades mais abaixo
 
     ajustado_por = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -153,6 +173,7 @@ class RegistroPonto(models.Model):
         null=True,
         blank=True,
         related_name='registros_ajustados',
+        db_constraint=False,
         verbose_name='Ajustado por'
     )
 
@@ -160,6 +181,7 @@ class RegistroPonto(models.Model):
     # É usado pelos 4 endpoints de comprovante em api/views_comprovantes.py
     # (get_object_or_404(RegistroPonto, codigo_validacao=codigo)) — sem ele
     # aqui, esses endpoints quebravam com FieldError.
+    # unique=True aqui; no MySQL particionado, (codigo_validacao, data).
     codigo_validacao = models.UUIDField(
         default=uuid.uuid4,
         editable=False,
@@ -179,9 +201,16 @@ class RegistroPonto(models.Model):
     # foram capturados por um coletor de verdade, então não fazem sentido
     # como registro tipo "7" do AFD. Ficam de fora de propósito; o lugar
     # certo pra eles aparecer nos relatórios fiscais é o Espelho de Ponto
-    # (ainda não implementado).
+    # (ponto/espelho.py).
+    #
+    # No MySQL particionado, as únicas de nsr e codigo_validacao são
+    # (campo, data) no banco — ver ponto/particionamento.py.
+    #
+    # O hash fica em 32 bytes crus (hash_binario); hash_registro é a
+    # propriedade com o hex de 64 caracteres que o AFD e o comprovante usam.
+    # unique=True aqui; no MySQL particionado, (nsr, data).
     nsr = models.PositiveBigIntegerField(unique=True, editable=False, null=True, blank=True)
-    hash_registro = models.CharField(max_length=64, editable=False, blank=True)
+    hash_binario = HashSHA256Field(editable=False, null=True, blank=True)
     identificador_coletor = models.CharField(
         max_length=2, choices=IDENTIFICADOR_COLETOR_CHOICES, default='02'
     )
@@ -205,8 +234,89 @@ class RegistroPonto(models.Model):
     def __str__(self):
         return f"{self.profissional.get_full_name()} - {self.data} {self.tipo}"
 
+    # ---- Campos compactados: a mesma interface de antes ----
+
+    @property
+    def latitude(self):
+        return self.latitude_e7 / ESCALA_GPS
+
+    @latitude.setter
+    def latitude(self, valor):
+        self.latitude_e7 = round(float(valor) * ESCALA_GPS)
+
+    @property
+    def longitude(self):
+        return self.longitude_e7 / ESCALA_GPS
+
+    @longitude.setter
+    def longitude(self, valor):
+        self.longitude_e7 = round(float(valor) * ESCALA_GPS)
+
+    @property
+    def hash_registro(self):
+        """Hash da cadeia do AFD em hex ('' se a marcação não tem)."""
+        return bytes(self.hash_binario).hex() if self.hash_binario else ''
+
+    @hash_registro.setter
+    def hash_registro(self, valor):
+        self.hash_binario = bytes.fromhex(valor) if valor else None
+
+    def _ajuste(self):
+        """AjusteRegistroPonto da marcação ou None (com select_related('ajuste'), sem consulta)."""
+        try:
+            return self.ajuste
+        except AjusteRegistroPonto.DoesNotExist:
+            return None
+
+    def _texto_ajuste(self, nome, campo):
+        pendentes = self.__dict__.get('_textos_ajuste', {})
+        if nome in pendentes:
+            return pendentes[nome]
+        ajuste = self._ajuste()
+        return getattr(ajuste, campo) if ajuste else None
+
+    def _definir_texto_ajuste(self, nome, valor):
+        # gravado na tabela lateral pelo save()
+        self.__dict__.setdefault('_textos_ajuste', {})[nome] = valor
+
+    @property
+    def justificativa_ajuste(self):
+        return self._texto_ajuste('justificativa_ajuste', 'justificativa')
+
+    @justificativa_ajuste.setter
+    def justificativa_ajuste(self, valor):
+        self._definir_texto_ajuste('justificativa_ajuste', valor)
+
+    @property
+    def observacoes(self):
+        return self._texto_ajuste('observacoes', 'observacoes')
+
+    @observacoes.setter
+    def observacoes(self, valor):
+        self._definir_texto_ajuste('observacoes', valor)
+
+    def _gravar_ajuste(self, textos, eh_novo):
+        atual = None if eh_novo else self._ajuste()
+        justificativa = textos.get('justificativa_ajuste', atual.justificativa if atual else None)
+        observacoes = textos.get('observacoes', atual.observacoes if atual else None)
+        ajuste = None
+        if justificativa or observacoes:
+            ajuste = atual or AjusteRegistroPonto(registro=self)
+            ajuste.justificativa = justificativa
+            ajuste.observacoes = observacoes
+            ajuste.save()
+        elif atual:
+            atual.delete()
+        RegistroPonto.ajuste.related.set_cached_value(self, ajuste)
+
     def clean(self):
-        """Validação para garantir apenas uma entrada e uma saída por dia"""
+        """Validação para garantir apenas uma entrada e uma saída por dia,
+        fora de meses já arquivados (ponto/arquivamento.py)"""
+        from .arquivamento import mes_arquivado  # import local: arquivamento importa este módulo
+        if self.data and mes_arquivado(self.data):
+            raise ValidationError(
+                f'As marcações de {self.data:%m/%Y} estão arquivadas; restaure o mês antes de alterá-lo.'
+            )
         if not self.ajuste_manual:
             if RegistroPonto.objects.filter(
                 profissional=self.profissional,
@@ -230,8 +340,11 @@ class RegistroPonto(models.Model):
         if not self.pk:  # Apenas para novos registros
             self._converter_para_brasilia()
 
-        # Calcula atraso/saída antecipada antes de salvar
-        self._calcular_tolerancia()
+        # Calcula atraso/saída antecipada antes de salvar — numa inserção,
+        # só se a view ainda não calculou pra esta mesma marcação
+        # (ver definir_tolerancia)
+        if not eh_novo or getattr(self, '_tolerancia_calculada_para', None) != self._chave_tolerancia():
+            self._calcular_tolerancia()
 
         # Se for ajuste manual, marca campos específicos
         if self.ajuste_manual and not self.ajustado_por:
@@ -253,13 +366,17 @@ class RegistroPonto(models.Model):
             data_hora_marcacao = datetime.combine(self.data, self.horario)
             data_hora_gravacao = timezone.now()
 
+            # Sem marcação com hash no banco (tudo arquivado), a cadeia
+            # continua do último mês arquivado (ponto/arquivamento.py)
+            from .arquivamento import hash_final_arquivado
             hash_anterior = (
                 RegistroPonto.objects
-                .exclude(hash_registro='')
+                .filter(hash_binario__isnull=False)
                 .order_by('-nsr')
-                .values_list('hash_registro', flat=True)
+                .values_list('hash_binario', flat=True)
                 .first()
-            ) or ''
+            )
+            hash_anterior = bytes(hash_anterior).hex() if hash_anterior else hash_final_arquivado()
 
             base = (
                 f"{self.nsr}"
@@ -271,10 +388,14 @@ class RegistroPonto(models.Model):
                 f"{'1' if self.offline else '0'}"
                 f"{hash_anterior}"
             )
-            self.hash_registro = hashlib.sha256(base.encode('utf-8')).hexdigest()
+            self.hash_binario = hashlib.sha256(base.encode('utf-8')).digest()
 
         super().save(*args, **kwargs)
 
+        textos = self.__dict__.pop('_textos_ajuste', None)
+        if textos:
+            self._gravar_ajuste(textos, eh_novo)
+
     def _converter_para_brasilia(self):
         """Converte o horário para o fuso horário de Brasília"""
         try:
@@ -292,54 +413,35 @@ class RegistroPonto(models.Model):
         except Exception as e:
             print(f"Erro na conversão de timezone: {e}")
 
+    def _chave_tolerancia(self):
+        """Marcação (tipo, data, minuto) — o que decide atraso/antecipação."""
+        return (self.tipo, self.data, self.horario.hour, self.horario.minute)
+
+    def definir_tolerancia(self, minutos, dentro_tolerancia):
+        """
+        Recebe o atraso/antecipação já calculado pela view (ver
+        ponto/jornada.py), pra save() não calcular de novo. Se a data ou o
+        horário mudarem até o save (ex: _converter_para_brasilia virou o
+        minuto), o valor é descartado e save() recalcula.
+        """
+        self.atraso_minutos = minutos if self.tipo == 'ENTRADA' else 0
+        self.saida_antecipada_minutos = minutos if self.tipo == 'SAIDA' else 0
+        self.dentro_tolerancia = dentro_tolerancia
+        self._tolerancia_calculada_para = self._chave_tolerancia()
+
     def _calcular_tolerancia(self):
-        """Calcula atraso e saída antecipada baseado no horário esperado"""
-        try:
-            horario_entrada_esperado = self.profissional.horario_entrada
-            horario_saida_esperado = self.profissional.horario_saida
-            tolerancia_minutos = self.profissional.tolerancia_minutos or 0
-
-            if not horario_entrada_esperado or not horario_saida_esperado:
-                self.dentro_tolerancia = True
-                self.atraso_minutos = 0
-                self.saida_antecipada_minutos = 0
-                return
-
-            if self.tipo == 'ENTRADA':
-                horario_registro = datetime.combine(self.data, self.horario)
-                horario_limite = datetime.combine(self.data, horario_entrada_esperado)
-                horario_com_tolerancia = horario_limite + timedelta(minutes=tolerancia_minutos)
-
-                if horario_registro > horario_com_tolerancia:
-                    diferenca = horario_registro - horario_com_tolerancia
-                    self.atraso_minutos = int(diferenca.total_seconds() / 60)
-                    self.dentro_tolerancia = False
-                else:
-                    self.atraso_minutos = 0
-                    self.dentro_tolerancia = True
-
-                self.saida_antecipada_minutos = 0
-
-            elif self.tipo == 'SAIDA':
-                horario_registro = datetime.combine(self.data, self.horario)
-                horario_limite = datetime.combine(self.data, horario_saida_esperado)
-                horario_com_tolerancia = horario_limite - timedelta(minutes=tolerancia_minutos)
-
-                if horario_registro < horario_com_tolerancia:
-                    diferenca = horario_com_tolerancia - horario_registro
-                    self.saida_antecipada_minutos = int(diferenca.total_seconds() / 60)
-                    self.dentro_tolerancia = False
-                else:
-                    self.saida_antecipada_minutos = 0
-                    self.dentro_tolerancia = True
-
-                self.atraso_minutos = 0
+        """Calcula atraso e saída antecipada pela jornada compilada do profissional"""
+        from .jornada import calcular_tolerancia_marcacao
 
+        try:
+            minutos, dentro_tolerancia = calcular_tolerancia_marcacao(
+                self.profissional, self.data, self.horario, self.tipo
+            )
         except Exception as e:
             print(f"Erro no cálculo de tolerância: {e}")
-            self.atraso_minutos = 0
-            self.saida_antecipada_minutos = 0
-            self.dentro_tolerancia = True
+            minutos, dentro_tolerancia = 0, True
+
+        self.definir_tolerancia(minutos, dentro_tolerancia)
 
     @property
     def horario_brasilia(self):
@@ -397,6 +499,175 @@ class RegistroPonto(models.Model):
         return "Registro normal"
 
 
+class AjusteRegistroPonto(models.Model):
+    """
+    Textos de ajuste de uma marcação (justificativa e observações), fora da
+    tabela de marcações: quase toda marcação não tem nenhum dos dois, e
+    eles só engordavam a linha. Uma linha só pra marcação que tem algum.
+
+    Lido e gravado pelas propriedades RegistroPonto.justificativa_ajuste e
+    .observacoes — quem lista muitas marcações e mostra esses textos usa
+    select_related('ajuste'). db_constraint=False pelo mesmo motivo das FKs
+    de RegistroPonto (particionamento no MySQL).
+    """
+    registro = models.OneToOneField(
+        RegistroPonto,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ajuste',
+        db_constraint=False,
+    )
+    justificativa = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        verbose_name='Justificativa do Ajuste',
+        help_text='Justificativa para o ajuste manual do registro'
+    )
+    observacoes = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='Observações',
+        help_text='Observações adicionais sobre o registro'
+    )
+
+    class Meta:
+        verbose_name = 'Ajuste de registro de ponto'
+        verbose_name_plural = 'Ajustes de registros de ponto'
+
+    def __str__(self):
+        return f"Ajuste do registro {self.registro_id}"
+
+
+class ResumoDiarioPonto(models.Model):
+    """
+    Resumo pré-agregado: uma linha por (data, estabelecimento, profissional).
+
+    Os painéis de período (dashboard, relatórios gerais, rankings) somam
+    estas linhas em vez de reagregar RegistroPonto — um mês lê ~30 linhas por
+    pessoa, não todas as marcações.
+
+    Mantido a cada gravação/exclusão de RegistroPonto pelos signals de
+    ponto/signals.py (recalcula só a linha afetada) e reconstruível com o
+    comando `reconstruir_resumo_diario`. Nunca edite à mão — a fonte da
+    verdade continua sendo RegistroPonto. Ver ponto/resumo_diario.py.
+    """
+    data = models.DateField()
+    estabelecimento = models.ForeignKey(Estabelecimento, on_delete=models.CASCADE, related_name='+')
+    profissional = models.ForeignKey(Profissional, on_delete=models.CASCADE, related_name='+')
+
+    entradas = models.PositiveIntegerField(default=0)
+    saidas = models.PositiveIntegerField(default=0)
+    entradas_com_atraso = models.PositiveIntegerField(default=0)
+    atraso_total = models.PositiveIntegerField(default=0, verbose_name='Atraso total (minutos)')
+    atraso_maximo = models.PositiveIntegerField(default=0, verbose_name='Maior atraso (minutos)')
+    saidas_antecipadas = models.PositiveIntegerField(default=0)
+    saida_antecipada_total = models.PositiveIntegerField(
+        default=0, verbose_name='Saída antecipada total (minutos)'
+    )
+    # Registros (entrada ou saída) sem atraso e sem saída antecipada.
+    registros_sem_desvio = models.PositiveIntegerField(default=0)
+    # Cada ENTRADA com a SAÍDA seguinte do mesmo dia e estabelecimento — o
+    # pareamento de calcular_horas_trabalhadas_dia (core/relatorios.py).
+    minutos_trabalhados = models.PositiveIntegerField(default=0)
+    completo = models.BooleanField(default=False, help_text='Teve entrada e saída no dia.')
+
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Resumo diário de ponto'
+        verbose_name_plural = 'Resumos diários de ponto'
+        unique_together = ['data', 'estabelecimento', 'profissional']
+        indexes = [
+            models.Index(fields=['data', 'estabelecimento']),
+            models.Index(fields=['profissional', 'data']),
+        ]
+
+    def __str__(self):
+        return f"{self.profissional_id} - {self.data} ({self.estabelecimento_id})"
+
+    @property
+    def total_registros(self):
+        return self.entradas + self.saidas
+
+
+class PresencaMensal(models.Model):
+    """
+    Mapas de presença: uma linha por (profissional, ano, mês), com um bitmap
+    por tipo de informação — bit 0 = dia 1, bit 30 = dia 31.
+
+    - dias_entrada: dias com ENTRADA (é o que conta como dia trabalhado —
+      num plantão que vira a noite a saída cai no dia seguinte);
+    - dias_saida: dias com SAÍDA (entrada AND saída = dia completo);
+    - dias_ajuste_manual: dias com alguma marcação de ajuste manual.
+
+    Frequência, faltas e sequências de um ano inteiro saem de 12 linhas por
+    pessoa e meia dúzia de AND/popcount contra os dias previstos (ver
+    ponto/presenca.py). Mantido pelos signals de RegistroPonto e
+    reconstruível com o comando `reconstruir_presenca_mensal`. Como o
+    resumo diário, nunca edite à mão.
+    """
+    profissional = models.ForeignKey(Profissional, on_delete=models.CASCADE, related_name='+')
+    ano = models.PositiveSmallIntegerField()
+    mes = models.PositiveSmallIntegerField()
+
+    dias_entrada = models.PositiveIntegerField(default=0)
+    dias_saida = models.PositiveIntegerField(default=0)
+    dias_ajuste_manual = models.PositiveIntegerField(default=0)
+
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Presença mensal'
+        verbose_name_plural = 'Presenças mensais'
+        unique_together = ['profissional', 'ano', 'mes']
+        indexes = [
+            models.Index(fields=['ano', 'mes']),
+        ]
+
+    def __str__(self):
+        return f"{self.profissional} - {self.mes:02d}/{self.ano}"
+
+
+class ArquivoMarcacoes(models.Model):
+    """
+    Manifesto de um mês de marcações arquivado (ponto/arquivamento.py): as
+    linhas de RegistroPonto daquele mês saíram do banco e estão num arquivo
+    JSONL comprimido (gzip), com NSR, hash e vínculo de ajuste manual
+    intactos. Uma linha por mês; rearquivar o mês (marcações que chegaram
+    depois) gera um arquivo novo e atualiza esta linha.
+
+    `indice` = {profissional_id: [posição, tamanho]} — cada profissional é
+    um membro gzip separado, lido sem descomprimir o mês inteiro. `sha256`
+    é do arquivo todo, conferido nas leituras completas (AFD) e pelo
+    comando `arquivar_marcacoes --verificar`.
+
+    Criado e mantido só pelo comando `arquivar_marcacoes`; nunca edite à
+    mão — sem esta linha o arquivo fica ilegível pro sistema.
+    """
+    mes = models.DateField(unique=True, help_text='Primeiro dia do mês arquivado.')
+    caminho = models.CharField(max_length=255, help_text='Relativo a ARQUIVO_MARCACOES_DIRETORIO.')
+    quantidade = models.PositiveIntegerField(default=0)
+    nsr_inicial = models.PositiveBigIntegerField(null=True, blank=True)
+    nsr_final = models.PositiveBigIntegerField(null=True, blank=True)
+    # hash_registro da marcação de maior NSR do arquivo: continua a cadeia do
+    # AFD se não sobrar nenhuma marcação com hash no banco
+    hash_final = models.CharField(max_length=64, blank=True)
+    sha256 = models.CharField(max_length=64)
+    tamanho_bytes = models.PositiveBigIntegerField(default=0)
+    indice = models.JSONField(default=dict)
+    versao_formato = models.PositiveSmallIntegerField(default=1)
+    arquivado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Mês de marcações arquivado'
+        verbose_name_plural = 'Meses de marcações arquivados'
+        ordering = ['mes']
+
+    def __str__(self):
+        return f"{self.mes:%m/%Y} - {self.quantidade} marcações"
+
+
 def criar_registro_manual_saida(profissional, data, horario, justificativa, observacoes, usuario_admin):
     """
     Função para criar registro manual de saída
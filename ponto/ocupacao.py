@@ -0,0 +1,275 @@
+# ponto/ocupacao.py
+"""
+Índice de ocupação: quem está de plantão/expediente AGORA em cada
+estabelecimento.
+
+Calcular isso direto de RegistroPonto exige parear entradas e saídas de
+todo mundo, atravessando a meia-noite (plantão que começou ontem). Aqui o
+pareamento é feito uma vez e mantido em memória:
+
+- por estabelecimento, OcupacaoEstabelecimento guarda os turnos de ontem e
+  hoje de cada profissional como intervalos [inicio, fim) em minutos a
+  partir da meia-noite de hoje (inicio negativo = começou ontem; fim None =
+  ainda aberto), mais os abertos agora e a contagem por profissão;
+- é montado do banco na primeira consulta (e na virada do dia), com uma
+  consulta só, e atualizado a cada marcação commitada
+  (registrar_marcacao(), chamado por ponto/signals.py).
+
+Uma marcação nova no fim da sequência do profissional é aplicada direto no
+índice; edição, exclusão ou marcação fora de ordem (ajuste manual) só marca
+o estabelecimento pra remontar na próxima consulta. Entre processos vale o
+mesmo esquema de municipio/calendario.py: versão por estabelecimento no
+cache do Django — o processo que aplicou a marcação só segue sem remontar
+se a versão que ele incrementou é exatamente a seguinte à que tinha. Com
+cache por processo (o LocMemCache padrão) as marcações atendidas pelos
+outros workers não mexem na versão daqui: o índice é remontado a cada
+CACHE_VALIDADE_LOCAL segundos (timeflow/cache.py).
+
+Turno aberto há mais de DURACAO_MAXIMA_TURNO (esqueceu de bater a saída)
+não conta como presente.
+"""
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from timeflow.cache import validade_local
+
+MINUTOS_DIA = 24 * 60
+DURACAO_MAXIMA_TURNO = 26 * 60  # plantão de 24h + folga
+
+CHAVE_VERSAO = 'ocupacao:versao'
+SEM_PROFISSAO = 'Sem profissão'
+
+_indices = {}
+_profissionais = {}
+_lock = threading.Lock()
+
+
+def _minuto(data, horario, hoje):
+    return (data - hoje).days * MINUTOS_DIA + horario.hour * 60 + horario.minute
+
+
+def _agora(hoje):
+    agora = timezone.now()
+    return (agora.date() - hoje).days * MINUTOS_DIA + agora.hour * 60 + agora.minute
+
+
+class OcupacaoEstabelecimento:
+    __slots__ = ('dia', 'montado_em', 'turnos', 'abertos', 'ultima', 'por_profissao')
+
+    def __init__(self, dia):
+        self.dia = dia
+        self.montado_em = time.monotonic()
+        self.turnos = {}         # profissional_id -> [[inicio, fim], ...]
+        self.abertos = {}        # profissional_id -> inicio do turno aberto
+        self.ultima = {}         # profissional_id -> minuto da última marcação
+        self.por_profissao = Counter()
+
+    def aplicar(self, profissional_id, tipo, minuto):
+        """Aplica uma marcação. As marcações de cada profissional precisam vir
+        em ordem; SAIDA sem entrada aberta fecha um turno que começou antes
+        da janela (ontem 00:00)."""
+        self.ultima[profissional_id] = minuto
+        turnos = self.turnos.setdefault(profissional_id, [])
+        inicio = self.abertos.pop(profissional_id, None)
+
+        if inicio is not None:
+            # Fecha o turno aberto. Se a marcação é outra ENTRADA, a saída do
+            # turno anterior não foi batida: ele termina aqui.
+            self.por_profissao[_profissao(profissional_id)] -= 1
+            turnos[-1][1] = minuto
+            if tipo == 'SAIDA':
+                return
+
+        if tipo == 'ENTRADA':
+            turnos.append([minuto, None])
+            self.abertos[profissional_id] = minuto
+            self.por_profissao[_profissao(profissional_id)] += 1
+        elif not turnos:
+            turnos.append([-MINUTOS_DIA, minuto])
+
+    def presentes(self, minuto=None, agora=None):
+        """{profissional_id: inicio} de quem estava dentro no minuto (None = agora)."""
+        agora = _agora(self.dia) if agora is None else agora
+        if minuto is None or minuto >= agora:
+            return {
+                prof_id: inicio for prof_id, inicio in self.abertos.items()
+                if agora - inicio <= DURACAO_MAXIMA_TURNO
+            }
+
+        presentes = {}
+        for prof_id, turnos in self.turnos.items():
+            for inicio, fim in turnos:
+                if inicio <= minuto and (minuto < fim if fim is not None else minuto - inicio <= DURACAO_MAXIMA_TURNO):
+                    presentes[prof_id] = inicio
+                    break
+        return presentes
+
+    def contagem_por_profissao(self, agora=None):
+        agora = _agora(self.dia) if agora is None else agora
+        if all(agora - inicio <= DURACAO_MAXIMA_TURNO for inicio in self.abertos.values()):
+            return +self.por_profissao
+        return Counter(_profissao(prof_id) for prof_id in self.presentes(agora=agora))
+
+
+def _profissao(profissional_id):
+    return _profissionais.get(profissional_id, (None, SEM_PROFISSAO))[1]
+
+
+def _carregar_profissionais(ids):
+    from usuarios.models import Profissional
+
+    faltando = [prof_id for prof_id in ids if prof_id not in _profissionais]
+    if not faltando:
+        return
+    for prof_id, nome, profissao in Profissional.objects.filter(id__in=faltando).values_list(
+        'id', 'nome', 'profissao__profissao'
+    ):
+        _profissionais[prof_id] = (nome, profissao or SEM_PROFISSAO)
+
+
+def _chave_versao(estabelecimento_id):
+    return f'{CHAVE_VERSAO}:{estabelecimento_id}'
+
+
+def _versoes(estabelecimento_ids):
+    chaves = [_chave_versao(estab_id) for estab_id in estabelecimento_ids] + [CHAVE_VERSAO]
+    atuais = cache.get_many(chaves)
+    for chave in chaves:
+        if chave not in atuais:
+            cache.add(chave, 1, timeout=None)
+            atuais[chave] = cache.get(chave, 1)
+    geral = atuais[CHAVE_VERSAO]
+    return {estab_id: (geral, atuais[_chave_versao(estab_id)]) for estab_id in estabelecimento_ids}
+
+
+def _incrementar(chave):
+    try:
+        return cache.incr(chave)
+    except ValueError:
+        cache.add(chave, 1, timeout=None)
+        return cache.incr(chave)
+
+
+def _montar(estabelecimento_ids, hoje):
+    """Monta os índices dos estabelecimentos com UMA consulta (ontem e hoje)."""
+    from ponto.models import RegistroPonto
+
+    indices = {estab_id: OcupacaoEstabelecimento(hoje) for estab_id in estabelecimento_ids}
+    marcacoes = (
+        RegistroPonto.objects
+        .filter(data__range=[hoje - timedelta(days=1), hoje], estabelecimento_id__in=estabelecimento_ids)
+        .order_by('data', 'horario', 'id')
+        .values_list('estabelecimento_id', 'profissional_id', 'tipo', 'data', 'horario')
+    )
+    marcacoes = list(marcacoes)
+    _carregar_profissionais({linha[1] for linha in marcacoes})
+    for estab_id, prof_id, tipo, data, horario in marcacoes:
+        indices[estab_id].aplicar(prof_id, tipo, _minuto(data, horario, hoje))
+    return indices
+
+
+def obter_ocupacoes(estabelecimento_ids):
+    """{estabelecimento_id: OcupacaoEstabelecimento} atualizados."""
+    hoje = timezone.now().date()
+    versoes = _versoes(estabelecimento_ids)
+    validade = validade_local()
+    montado_depois_de = None if validade is None else time.monotonic() - validade
+    with _lock:
+        desatualizados = [
+            estab_id for estab_id in estabelecimento_ids
+            if estab_id not in _indices
+            or _indices[estab_id][0] != versoes[estab_id]
+            or _indices[estab_id][1].dia != hoje
+            or (montado_depois_de is not None and _indices[estab_id][1].montado_em < montado_depois_de)
+        ]
+        if desatualizados:
+            for estab_id, indice in _montar(desatualizados, hoje).items():
+                _indices[estab_id] = (versoes[estab_id], indice)
+        return {estab_id: _indices[estab_id][1] for estab_id in estabelecimento_ids}
+
+
+def registrar_marcacao(registro, criado):
+    """
+    Chamado depois do commit de uma marcação. Aplica direto no índice
+    quando dá; senão deixa o estabelecimento pra remontar.
+    """
+    hoje = timezone.now().date()
+    if registro.data < hoje - timedelta(days=1):
+        return
+
+    estab_id = registro.estabelecimento_id
+    nova_versao = _incrementar(_chave_versao(estab_id))
+    with _lock:
+        item = _indices.get(estab_id)
+        if item is None:
+            return
+        (geral, versao), indice = item
+        minuto = _minuto(registro.data, registro.horario, hoje)
+        em_ordem = criado and indice.dia == hoje and minuto >= indice.ultima.get(registro.profissional_id, minuto)
+        if em_ordem and nova_versao == versao + 1:
+            _carregar_profissionais([registro.profissional_id])
+            indice.aplicar(registro.profissional_id, registro.tipo, minuto)
+            _indices[estab_id] = ((geral, nova_versao), indice)
+        else:
+            del _indices[estab_id]
+
+
+def invalidar_ocupacao(estabelecimento_id=None):
+    """Sem estabelecimento: invalida todos (ex.: nome/profissão alterados)."""
+    if estabelecimento_id is None:
+        _incrementar(CHAVE_VERSAO)
+        with _lock:
+            _indices.clear()
+            _profissionais.clear()
+    else:
+        _incrementar(_chave_versao(estabelecimento_id))
+        with _lock:
+            _indices.pop(estabelecimento_id, None)
+
+
+def _horario_para_minuto(horario):
+    return None if horario is None else horario.hour * 60 + horario.minute
+
+
+def quadro_ocupacao(estabelecimento_ids, horario=None):
+    """
+    Quem estava dentro (agora, ou no horário de hoje informado) nos
+    estabelecimentos. Retorna {'total', 'por_profissao', 'presentes'} —
+    presentes = [{'profissional_id', 'nome', 'profissao',
+    'estabelecimento_id', 'desde'}] ordenado por nome.
+    """
+    ocupacoes = obter_ocupacoes(estabelecimento_ids)
+    minuto = _horario_para_minuto(horario)
+    hoje = timezone.now().date()
+    agora = _agora(hoje)
+    meia_noite = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    presentes = []
+    por_profissao = Counter()
+    for estab_id, indice in ocupacoes.items():
+        atuais = indice.presentes(minuto, agora)
+        if minuto is None or minuto >= agora:
+            por_profissao.update(indice.contagem_por_profissao(agora))
+        else:
+            por_profissao.update(_profissao(prof_id) for prof_id in atuais)
+        for prof_id, inicio in atuais.items():
+            nome, profissao = _profissionais.get(prof_id, ('', SEM_PROFISSAO))
+            presentes.append({
+                'profissional_id': prof_id,
+                'nome': nome,
+                'profissao': profissao,
+                'estabelecimento_id': estab_id,
+                'desde': meia_noite + timedelta(minutes=inicio),
+            })
+
+    presentes.sort(key=lambda item: item['nome'])
+    return {
+        'total': len(presentes),
+        'por_profissao': dict(sorted(por_profissao.items())),
+        'presentes': presentes,
+    }
@@ -0,0 +1,213 @@
+# ponto/particionamento.py
+"""
+Particionamento da tabela de marcações (RegistroPonto) por mês, no MySQL:
+RANGE COLUMNS(data), uma partição por mês (`pAAAAMM`, "data < primeiro
+dia do mês seguinte") e uma última `pfuturo` (MAXVALUE) que só existe pra
+nenhuma inserção falhar — o comando `particionar_registros` cria os meses
+seguintes com antecedência (settings.REGISTROPONTO_PARTICOES_A_FRENTE),
+partindo a `pfuturo` enquanto ela ainda está vazia (instantâneo).
+
+Toda consulta com filtro de intervalo em `data` — painéis e ocupação
+(hoje/ontem), relatórios, espelho, AEJ, AFD, resumo diário, exportação —
+lê só as partições do período (partition pruning); os índices de cada
+partição são do tamanho de um mês. Consultas sem `data` (por id, por
+codigo_validacao, o último NSR da cadeia) continuam certas, mas consultam
+o índice de cada partição.
+
+O MySQL impõe duas regras a tabelas particionadas, e a conversão cuida
+delas:
+
+- toda chave única (a primária inclusive) precisa conter a coluna de
+  particionamento: a primária vira (id, data) e as únicas de `nsr` e
+  `codigo_validacao` viram (nsr, data) e (codigo_validacao, data). O id
+  continua AUTO_INCREMENT e único na prática; NSR continua único porque
+  vem da sequência global (afd.models.SequenciaNSR, com lock) e o código
+  de validação é um uuid4. No Django (estado das migrações e
+  validate_unique dos formulários) os campos continuam `unique=True`;
+- nada de chaves estrangeiras: a migração 0007 tira do banco as
+  constraints das FKs de RegistroPonto (CHAVES_ESTRANGEIRAS) — só no MySQL
+  (alterar_chaves_estrangeiras); nos outros bancos elas continuam. No
+  estado das migrações os campos são `db_constraint=False` em todo banco.
+  A integridade já era garantida pelo Django (on_delete).
+
+Em outros bancos (SQLite no desenvolvimento) tudo aqui é no-op: a tabela
+fica como está e as mesmas consultas funcionam.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.db import connection as conexao_padrao
+from django.utils import timezone
+
+from .models import RegistroPonto
+
+TABELA = RegistroPonto._meta.db_table
+COLUNA = 'data'
+FUTURO = 'pfuturo'
+CHAVES_ESTRANGEIRAS = ('profissional', 'estabelecimento', 'registro_manual_referencia', 'ajustado_por')
+
+
+def suportado(conexao=None):
+    return (conexao or conexao_padrao).vendor == 'mysql'
+
+
+def particoes_a_frente():
+    return getattr(settings, 'REGISTROPONTO_PARTICOES_A_FRENTE', 3)
+
+
+def _mes_seguinte(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def _particao(mes):
+    """Definição da partição do mês (`mes` = primeiro dia)."""
+    return f"PARTITION p{mes:%Y%m} VALUES LESS THAN ('{_mes_seguinte(mes):%Y-%m-%d}')"
+
+
+def _futuro():
+    return f'PARTITION {FUTURO} VALUES LESS THAN (MAXVALUE)'
+
+
+def particoes(conexao=None):
+    """[(nome, limite)] das partições da tabela, em ordem; limite None = MAXVALUE. Vazia = não particionada."""
+    conexao = conexao or conexao_padrao
+    with conexao.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+            """,
+            [TABELA],
+        )
+        linhas = cursor.fetchall()
+    return [
+        (nome, None if descricao == 'MAXVALUE' else date.fromisoformat(descricao.strip("'")))
+        for nome, descricao in linhas
+    ]
+
+
+def _meses(inicio, fim):
+    """Primeiro dia de cada mês de `inicio` até `fim` (inclusive)."""
+    mes = inicio.replace(day=1)
+    while mes <= fim:
+        yield mes
+        mes = _mes_seguinte(mes)
+
+
+def _ultimo_mes(hoje=None):
+    """Último mês que precisa ter partição própria."""
+    hoje = hoje or timezone.now().date()
+    total = hoje.year * 12 + hoje.month - 1 + particoes_a_frente()
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def sql_conversao(conexao=None, hoje=None):
+    """
+    Comandos que convertem a tabela (ainda não particionada) — chaves e
+    partições do mês da marcação mais antiga até REGISTROPONTO_PARTICOES_A_FRENTE
+    meses à frente. O último ALTER reescreve a tabela inteira.
+    """
+    conexao = conexao or conexao_padrao
+    nome = conexao.ops.quote_name
+    with conexao.cursor() as cursor:
+        restricoes = conexao.introspection.get_constraints(cursor, TABELA)
+        cursor.execute(f'SELECT MIN({nome(COLUNA)}) FROM {nome(TABELA)}')
+        primeira = cursor.fetchone()[0]
+
+    comandos = [
+        f'ALTER TABLE {nome(TABELA)} DROP PRIMARY KEY, ADD PRIMARY KEY ({nome("id")}, {nome(COLUNA)})'
+    ]
+    for restricao, detalhes in sorted(restricoes.items()):
+        if detalhes['unique'] and not detalhes['primary_key'] and COLUNA not in detalhes['columns']:
+            colunas = ', '.join(nome(coluna) for coluna in [*detalhes['columns'], COLUNA])
+            comandos.append(
+                f'ALTER TABLE {nome(TABELA)} DROP INDEX {nome(restricao)}, '
+                f'ADD UNIQUE INDEX {nome(restricao)} ({colunas})'
+            )
+
+    hoje = hoje or timezone.now().date()
+    definicoes = [_particao(mes) for mes in _meses(primeira or hoje, _ultimo_mes(hoje))] + [_futuro()]
+    comandos.append(
+        f'ALTER TABLE {nome(TABELA)} PARTITION BY RANGE COLUMNS({nome(COLUNA)}) (\n    '
+        + ',\n    '.join(definicoes) + '\n)'
+    )
+    return comandos
+
+
+def sql_reversao(conexao=None):
+    """Volta a tabela pro formato original (sem partições, chaves de uma coluna)."""
+    conexao = conexao or conexao_padrao
+    nome = conexao.ops.quote_name
+    with conexao.cursor() as cursor:
+        restricoes = conexao.introspection.get_constraints(cursor, TABELA)
+
+    comandos = [
+        f'ALTER TABLE {nome(TABELA)} REMOVE PARTITIONING',
+        f'ALTER TABLE {nome(TABELA)} DROP PRIMARY KEY, ADD PRIMARY KEY ({nome("id")})',
+    ]
+    for campo in ('nsr', 'codigo_validacao'):
+        for restricao, detalhes in sorted(restricoes.items()):
+            if detalhes['unique'] and detalhes['columns'] == [campo, COLUNA]:
+                comandos.append(
+                    f'ALTER TABLE {nome(TABELA)} DROP INDEX {nome(restricao)}, '
+                    f'ADD UNIQUE INDEX {nome(restricao)} ({nome(campo)})'
+                )
+    return comandos
+
+
+def sql_novas_particoes(conexao=None, hoje=None):
+    """
+    Comando que cria as partições que faltam até REGISTROPONTO_PARTICOES_A_FRENTE
+    meses à frente (None se já existem). Parte a `pfuturo` — com ela vazia,
+    só muda o dicionário de dados.
+    """
+    conexao = conexao or conexao_padrao
+    existentes = [limite for _, limite in particoes(conexao) if limite is not None]
+    if not existentes:
+        return None
+    novas = [_particao(mes) for mes in _meses(max(existentes), _ultimo_mes(hoje))]
+    if not novas:
+        return None
+    nome = conexao.ops.quote_name
+    return (
+        f'ALTER TABLE {nome(TABELA)} REORGANIZE PARTITION {FUTURO} INTO (\n    '
+        + ',\n    '.join(novas + [_futuro()]) + '\n)'
+    )
+
+
+def executar(comandos, conexao=None):
+    conexao = conexao or conexao_padrao
+    with conexao.cursor() as cursor:
+        for comando in comandos:
+            cursor.execute(comando)
+
+
+def _sem_constraint(campo):
+    """Cópia do ForeignKey (de um model histórico) com db_constraint=False."""
+    nome, _caminho, args, kwargs = campo.deconstruct()
+    copia = campo.__class__(*args, **{**kwargs, 'db_constraint': False})
+    copia.set_attributes_from_name(nome)
+    copia.model = campo.model
+    copia.remote_field.model = campo.remote_field.model
+    return copia
+
+
+def alterar_chaves_estrangeiras(apps, schema_editor, manter):
+    """
+    Tira (`manter` False) ou devolve (True) as constraints das FKs de
+    RegistroPonto no banco — só no MySQL, o único que particiona. Chamado
+    pela migração 0007 (RunPython dentro de SeparateDatabaseAndState), com
+    o model histórico ainda com as constraints.
+    """
+    if not suportado(schema_editor.connection):
+        return
+    modelo = apps.get_model('ponto', 'RegistroPonto')
+    for nome in CHAVES_ESTRANGEIRAS:
+        com = modelo._meta.get_field(nome)
+        sem = _sem_constraint(com)
+        if manter:
+            schema_editor.alter_field(modelo, sem, com)
+        else:
+            schema_editor.alter_field(modelo, com, sem)
@@ -0,0 +1,296 @@
+# ponto/presenca.py
+"""
+Mapas de presença (PresencaMensal): frequência, faltas e sequências sem
+percorrer marcações nem dias.
+
+Um mapa é um int do Python usado como bitmap: bit i = data_inicio + i.
+Os bitmaps mensais gravados no banco são deslocados e juntados num mapa do
+período pedido (um ano cabe num int de 366 bits), e os dias previstos vêm
+no mesmo formato de ponto/escalas.mascara_prevista(). A partir daí:
+
+- dias trabalhados = popcount(entrada);
+- faltas           = popcount(previsto AND NOT entrada), só até hoje — um
+  período que termina no futuro não tem faltas nos dias que não chegaram;
+- dias completos   = popcount(entrada AND saida);
+- dias incompletos = popcount((entrada XOR saida) AND previsto) — só
+  entrada ou só saída num dia previsto. No plantão que vira a noite a
+  saída do dia D cai em D+1: incompleta é a entrada sem saída no mesmo dia
+  nem no seguinte, ou a saída sem entrada no mesmo dia nem no anterior;
+- sequências (maior sequência de dias trabalhados, de faltas) saem de
+  deslocamentos e AND, sem loop por dia.
+
+Escrita:
+- atualizar_presenca(): recalcula os bits de UM dia de um profissional a
+  partir das marcações desse dia — chamado pelos signals de RegistroPonto
+  (ponto/signals.py). Grava com UPDATE ... SET campo = (campo & ~bit) | novo,
+  sem ler a linha antes;
+- reconstruir_presencas(): apaga e remonta os meses do período com um
+  GROUP BY só — comando `reconstruir_presenca_mensal`.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from municipio.calendario import calendario_do_profissional
+from .arquivamento import primeiro_dia_nao_arquivado
+from .escalas import atravessa_meia_noite, mascara_prevista
+from .models import PresencaMensal, RegistroPonto
+
+CAMPOS = ('dias_entrada', 'dias_saida', 'dias_ajuste_manual')
+
+AGREGADOS = {
+    'dias_entrada': Count('id', filter=Q(tipo='ENTRADA')),
+    'dias_saida': Count('id', filter=Q(tipo='SAIDA')),
+    'dias_ajuste_manual': Count('id', filter=Q(ajuste_manual=True)),
+}
+
+MASCARA_MES = (1 << 31) - 1
+
+
+def _bit(dia):
+    return 1 << (dia.day - 1)
+
+
+def atualizar_presenca(profissional_id, dia):
+    """Recalcula os bits do dia a partir das marcações do profissional nele."""
+    agregado = RegistroPonto.objects.filter(profissional_id=profissional_id, data=dia).aggregate(**AGREGADOS)
+    bit = _bit(dia)
+    chave = {'profissional_id': profissional_id, 'ano': dia.year, 'mes': dia.month}
+
+    if not any(agregado.values()):
+        linhas = PresencaMensal.objects.filter(**chave)
+        linhas.update(**{campo: F(campo).bitand(MASCARA_MES ^ bit) for campo in CAMPOS})
+        linhas.filter(**{campo: 0 for campo in CAMPOS}).delete()
+        return
+
+    valores = {
+        campo: F(campo).bitand(MASCARA_MES ^ bit).bitor(bit if agregado[campo] else 0)
+        for campo in CAMPOS
+    }
+    if not PresencaMensal.objects.filter(**chave).update(**valores):
+        # Primeira marcação do mês (get_or_create cobre a corrida com outro processo).
+        PresencaMensal.objects.get_or_create(**chave)
+        PresencaMensal.objects.filter(**chave).update(**valores)
+
+
+def filtro_meses(data_inicio, data_fim):
+    """Q das linhas mensais que tocam o período (limites opcionais)."""
+    filtro = Q()
+    if data_inicio:
+        filtro &= Q(ano__gt=data_inicio.year) | Q(ano=data_inicio.year, mes__gte=data_inicio.month)
+    if data_fim:
+        filtro &= Q(ano__lt=data_fim.year) | Q(ano=data_fim.year, mes__lte=data_fim.month)
+    return filtro
+
+
+def reconstruir_presencas(data_inicio=None, data_fim=None, profissionais=None, lote=1000):
+    """
+    Remonta os meses que tocam o período (limites opcionais) a partir das
+    marcações. Os limites são estendidos pro mês inteiro — cada linha cobre
+    um mês. Retorna quantas linhas foram gravadas. Meses arquivados
+    (ponto/arquivamento.py) ficam de fora.
+    """
+    limite = primeiro_dia_nao_arquivado()
+    if limite and (data_inicio is None or data_inicio < limite):
+        data_inicio = limite
+    if data_inicio:
+        data_inicio = data_inicio.replace(day=1)
+    if data_fim:
+        proximo = (data_fim.replace(day=28) + timedelta(days=4)).replace(day=1)
+        data_fim = proximo - timedelta(days=1)
+
+    registros = RegistroPonto.objects.all()
+    if data_inicio:
+        registros = registros.filter(data__gte=data_inicio)
+    if data_fim:
+        registros = registros.filter(data__lte=data_fim)
+    presencas = PresencaMensal.objects.filter(filtro_meses(data_inicio, data_fim))
+    if profissionais is not None:
+        registros = registros.filter(profissional__in=profissionais)
+        presencas = presencas.filter(profissional__in=profissionais)
+
+    linhas = registros.order_by().values('profissional_id', 'data').annotate(**AGREGADOS)
+    mapas = defaultdict(lambda: dict.fromkeys(CAMPOS, 0))
+    for linha in linhas.iterator(chunk_size=lote):
+        mapa = mapas[(linha['profissional_id'], linha['data'].year, linha['data'].month)]
+        bit = _bit(linha['data'])
+        for campo in CAMPOS:
+            if linha[campo]:
+                mapa[campo] |= bit
+
+    with transaction.atomic():
+        presencas.delete()
+        PresencaMensal.objects.bulk_create(
+            [
+                PresencaMensal(profissional_id=prof_id, ano=ano, mes=mes, **mapa)
+                for (prof_id, ano, mes), mapa in mapas.items()
+            ],
+            batch_size=lote,
+        )
+    return len(mapas)
+
+
+def mapas_periodo(profissional_ids, data_inicio, data_fim):
+    """
+    {profissional_id: {'dias_entrada': int, 'dias_saida': int,
+    'dias_ajuste_manual': int}} com bit i = data_inicio + i. Uma consulta;
+    profissional sem linha no período não aparece (= tudo zero).
+    """
+    total = (data_fim - data_inicio).days + 1
+    periodo = (1 << total) - 1
+    mapas = defaultdict(lambda: dict.fromkeys(CAMPOS, 0))
+
+    linhas = PresencaMensal.objects.filter(
+        filtro_meses(data_inicio, data_fim), profissional_id__in=profissional_ids
+    ).values_list('profissional_id', 'ano', 'mes', *CAMPOS)
+    for prof_id, ano, mes, *bitmaps in linhas:
+        deslocamento = (date(ano, mes, 1) - data_inicio).days
+        mapa = mapas[prof_id]
+        for campo, bits in zip(CAMPOS, bitmaps):
+            bits = bits << deslocamento if deslocamento >= 0 else bits >> -deslocamento
+            mapa[campo] |= bits & periodo
+    return dict(mapas)
+
+
+def contar(bits):
+    return bits.bit_count()
+
+
+def maior_sequencia(bits):
+    """Maior sequência de bits ligados consecutivos."""
+    tamanho = 0
+    while bits:
+        bits &= bits >> 1
+        tamanho += 1
+    return tamanho
+
+
+def maior_sequencia_faltas(faltas, fora_da_escala):
+    """
+    Maior número de faltas seguidas, pulando os dias fora da escala (falta
+    na sexta e na segunda são duas seguidas). Percorre as sequências de
+    (falta OR fora da escala), não os dias.
+    """
+    restantes = faltas | fora_da_escala
+    maior = 0
+    while restantes:
+        inicio = (restantes & -restantes).bit_length() - 1
+        resto = restantes >> inicio
+        tamanho = (~resto & (resto + 1)).bit_length() - 1
+        trecho = ((1 << tamanho) - 1) << inicio
+        maior = max(maior, contar(faltas & trecho))
+        restantes &= ~trecho
+    return maior
+
+
+def dias_do_mapa(bits, data_inicio):
+    """Datas dos bits ligados (pra listar faltas, por exemplo)."""
+    dias = []
+    while bits:
+        menor = bits & -bits
+        dias.append(data_inicio + timedelta(days=menor.bit_length() - 1))
+        bits ^= menor
+    return dias
+
+
+def _ate_hoje(data_inicio, data_fim, hoje):
+    """Bits do período de data_inicio até hoje (o período todo, se já passou)."""
+    ultimo = min(data_fim, hoje)
+    if ultimo < data_inicio:
+        return 0
+    return (1 << ((ultimo - data_inicio).days + 1)) - 1
+
+
+def frequencia_periodo(profissional, data_inicio, data_fim, calendario=None, mapa=None, hoje=None):
+    """
+    Frequência do profissional no período. `mapa` (de mapas_periodo) evita a
+    consulta quando já foi buscado pra vários profissionais de uma vez.
+    dias_previstos é o período inteiro; faltas, percentual, incompletos e
+    sequências contam só os dias até hoje.
+    """
+    if mapa is None:
+        mapa = mapas_periodo([profissional.pk], data_inicio, data_fim).get(profissional.pk)
+    mapa = mapa or dict.fromkeys(CAMPOS, 0)
+
+    decorrido = _ate_hoje(data_inicio, data_fim, hoje or timezone.now().date())
+    previsto_total = mascara_prevista(
+        profissional, data_inicio, data_fim, calendario or calendario_do_profissional(profissional)
+    )
+    previsto = previsto_total & decorrido
+    entrada = mapa['dias_entrada']
+    saida = mapa['dias_saida']
+    faltas = previsto & ~entrada
+
+    if atravessa_meia_noite(profissional):
+        # Saída do plantão no mesmo dia ou no seguinte (a do último dia do
+        # período, ou de hoje, pode ainda não ter acontecido — não conta
+        # como incompleta).
+        sem_saida = entrada & ~(saida | (saida >> 1)) & (decorrido >> 1)
+        sem_entrada = saida & ~(entrada | (entrada << 1)) & decorrido & ~1
+        incompletos = sem_saida | sem_entrada
+    else:
+        incompletos = (entrada ^ saida) & previsto
+
+    previstos_ate_hoje = contar(previsto)
+    dias_trabalhados = contar(entrada)
+    return {
+        'dias_previstos': contar(previsto_total),
+        'dias_trabalhados': dias_trabalhados,
+        'faltas': contar(faltas),
+        'dias_completos': contar(entrada & saida),
+        'dias_incompletos': contar(incompletos),
+        'dias_ajuste_manual': contar(mapa['dias_ajuste_manual']),
+        'percentual_frequencia': (
+            contar(previsto & entrada) / previstos_ate_hoje * 100 if previstos_ate_hoje else 0
+        ),
+        'maior_sequencia_trabalhada': maior_sequencia(entrada),
+        'maior_sequencia_faltas': maior_sequencia_faltas(faltas, ~previsto & decorrido),
+        'mapa_faltas': faltas,
+        'mapa_presenca': entrada,
+    }
+
+
+def _texto(bits, total):
+    """Bitmap -> '0'/'1' por dia, posição i = data_inicio + i."""
+    return format(bits, f'0{total}b')[::-1] if total else ''
+
+
+def matriz_ausencias(profissionais, data_inicio, data_fim):
+    """
+    Faltas e presença de vários profissionais no período, com UMA consulta
+    de mapas. Passe os profissionais com select_related('escala',
+    'estabelecimento') — o calendário é montado uma vez por município.
+    Cada linha traz os contadores e os mapas em texto ('0'/'1' por dia).
+    """
+    profissionais = list(profissionais)
+    total = (data_fim - data_inicio).days + 1
+    mapas = mapas_periodo([profissional.pk for profissional in profissionais], data_inicio, data_fim)
+
+    calendarios = {}
+    linhas = []
+    for profissional in profissionais:
+        estabelecimento = profissional.estabelecimento
+        municipio_id = estabelecimento.municipio_id if estabelecimento else None
+        if municipio_id not in calendarios:
+            calendarios[municipio_id] = calendario_do_profissional(profissional)
+
+        frequencia = frequencia_periodo(
+            profissional, data_inicio, data_fim, calendarios[municipio_id],
+            mapa=mapas.get(profissional.pk, dict.fromkeys(CAMPOS, 0)),
+        )
+        linhas.append({
+            'profissional_id': profissional.pk,
+            'nome': profissional.nome,
+            'estabelecimento_id': profissional.estabelecimento_id,
+            'dias_previstos': frequencia['dias_previstos'],
+            'dias_trabalhados': frequencia['dias_trabalhados'],
+            'faltas': frequencia['faltas'],
+            'dias_incompletos': frequencia['dias_incompletos'],
+            'maior_sequencia_faltas': frequencia['maior_sequencia_faltas'],
+            'mapa_faltas': _texto(frequencia['mapa_faltas'], total),
+            'mapa_presenca': _texto(frequencia['mapa_presenca'], total),
+        })
+    return linhas
@@ -0,0 +1,104 @@
+# ponto/recalculo.py
+"""
+Recálculo retroativo de atraso_minutos, saida_antecipada_minutos e
+dentro_tolerancia.
+
+Esses três campos são gravados no momento da marcação. Se o RH corrige o
+horário, a tolerância ou a jornada de alguém depois, os registros antigos
+continuam com o valor velho — e o dashboard e os rankings também.
+
+Como funciona:
+- lê só as colunas necessárias, em blocos (iterator com chunk_size);
+- calcula cada registro pela jornada compilada (ponto/jornada.py) — uma
+  consulta no vetor por registro, sem montar datetime;
+- grava só o que mudou, com bulk_update nos TRÊS campos acima. bulk_update
+  não passa pelo save(): NSR, hash_registro e demais campos do AFD nunca
+  são tocados;
+- como bulk_update também não dispara signals, o resumo diário
+  (ResumoDiarioPonto) dos dias alterados é remontado no final.
+
+Usado pelo comando `recalcular_tolerancia` e, se
+PONTO_RECALCULAR_TOLERANCIA_AUTOMATICO estiver ligado, pelos signals de
+ponto/signals.py quando o profissional ou a jornada muda.
+"""
+from collections import Counter
+
+from django.db import transaction
+
+from usuarios.models import Profissional
+from .jornada import calcular_tolerancia_marcacao
+from .models import RegistroPonto
+from .resumo_diario import reconstruir_resumos
+
+CAMPOS_TOLERANCIA = ['atraso_minutos', 'saida_antecipada_minutos', 'dentro_tolerancia']
+
+
+def _valores(registro, minutos, dentro):
+    return (
+        minutos if registro.tipo == 'ENTRADA' else 0,
+        minutos if registro.tipo == 'SAIDA' else 0,
+        dentro,
+    )
+
+
+def recalcular_tolerancia(profissionais=None, data_inicio=None, data_fim=None, dry_run=False, chunk=2000):
+    """
+    Recalcula os campos de tolerância dos registros dos profissionais
+    informados (None = todos) no período (limites opcionais, inclusive).
+
+    Retorna (analisados, alterados), com alterados = Counter
+    {profissional_id: registros alterados}. Em dry_run nada é gravado e
+    'alterados' é quantos registros mudariam.
+    """
+    registros = RegistroPonto.objects.all()
+    if profissionais is not None:
+        registros = registros.filter(profissional__in=profissionais)
+    if data_inicio:
+        registros = registros.filter(data__gte=data_inicio)
+    if data_fim:
+        registros = registros.filter(data__lte=data_fim)
+    registros = registros.only('id', 'profissional_id', 'data', 'horario', 'tipo', *CAMPOS_TOLERANCIA).order_by('id')
+
+    cache_profissionais = {}
+    dias_alterados = set()
+    analisados = 0
+    alterados = Counter()
+    pendentes = []
+
+    def _gravar():
+        if pendentes and not dry_run:
+            with transaction.atomic():
+                RegistroPonto.objects.bulk_update(pendentes, CAMPOS_TOLERANCIA, batch_size=chunk)
+        pendentes.clear()
+
+    for registro in registros.iterator(chunk_size=chunk):
+        analisados += 1
+        profissional = cache_profissionais.get(registro.profissional_id)
+        if profissional is None:
+            profissional = Profissional.objects.select_related('jornada').get(pk=registro.profissional_id)
+            cache_profissionais[registro.profissional_id] = profissional
+
+        minutos, dentro = calcular_tolerancia_marcacao(
+            profissional, registro.data, registro.horario, registro.tipo
+        )
+        novos = _valores(registro, minutos, dentro)
+        atuais = tuple(getattr(registro, campo) for campo in CAMPOS_TOLERANCIA)
+        if novos == atuais:
+            continue
+
+        alterados[registro.profissional_id] += 1
+        dias_alterados.add(registro.data)
+        registro.atraso_minutos, registro.saida_antecipada_minutos, registro.dentro_tolerancia = novos
+        pendentes.append(registro)
+        if len(pendentes) >= chunk:
+            _gravar()
+
+    _gravar()
+
+    if dias_alterados and not dry_run:
+        reconstruir_resumos(
+            data_inicio=min(dias_alterados),
+            data_fim=max(dias_alterados),
+            profissionais=list(alterados),
+        )
+    return analisados, alterados
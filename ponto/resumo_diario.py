@@ -0,0 +1,170 @@
+# ponto/resumo_diario.py
+"""
+Manutenção e leitura do resumo diário (ResumoDiarioPonto).
+
+Escrita:
+- atualizar_resumo(): recalcula UMA linha (data, estabelecimento,
+  profissional) direto das marcações — chamado pelos signals de
+  RegistroPonto a cada save/delete. Como recalcula a partir da fonte em vez
+  de somar/subtrair deltas, não acumula erro se um signal se perder;
+- reconstruir_resumos(): apaga e remonta um período inteiro com um GROUP BY
+  só — usado pelo comando `reconstruir_resumo_diario` e depois de
+  alterações em massa que não passam por signals (bulk_update do
+  recálculo de tolerância, ponto/recalculo.py).
+
+minutos_trabalhados não sai de um agregado SQL (depende de parear entrada
+e saída): atualizar_resumo lê os horários da linha, e reconstruir_resumos
+os horários de um dia por vez.
+
+Como reconstruir_resumos() grava com bulk_create (sem signals por linha),
+no final ela dispara o signal `resumos_reconstruidos` com o período — o
+cache do dashboard (core/cache_painel.py) escuta esse signal.
+
+Leitura: resumos_periodo() devolve o queryset filtrado pro período e
+estabelecimento; quem consome (core/views.py, core/painel.py) agrega em
+cima dele.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.dispatch import Signal
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .arquivamento import primeiro_dia_nao_arquivado
+from .models import RegistroPonto, ResumoDiarioPonto
+
+# Enviado com data_inicio/data_fim (None = sem limite) depois de uma reconstrução.
+resumos_reconstruidos = Signal()
+
+AGREGADOS = {
+    'entradas': Count('id', filter=Q(tipo='ENTRADA')),
+    'saidas': Count('id', filter=Q(tipo='SAIDA')),
+    'entradas_com_atraso': Count('id', filter=Q(tipo='ENTRADA', atraso_minutos__gt=0)),
+    'atraso_total': Coalesce(Sum('atraso_minutos', filter=Q(tipo='ENTRADA')), 0),
+    'atraso_maximo': Coalesce(Max('atraso_minutos', filter=Q(tipo='ENTRADA')), 0),
+    'saidas_antecipadas': Count('id', filter=Q(tipo='SAIDA', saida_antecipada_minutos__gt=0)),
+    'saida_antecipada_total': Coalesce(Sum('saida_antecipada_minutos', filter=Q(tipo='SAIDA')), 0),
+    'registros_sem_desvio': Count('id', filter=Q(atraso_minutos=0, saida_antecipada_minutos=0)),
+}
+
+
+def minutos_trabalhados(marcacoes):
+    """
+    Minutos trabalhados de [(horario, tipo)] de um mesmo dia: cada ENTRADA
+    com a SAIDA seguinte, como calcular_horas_trabalhadas_dia
+    (core/relatorios.py).
+    """
+    segundos = 0
+    entrada = None
+    for horario, tipo in sorted(marcacoes, key=lambda marcacao: marcacao[0]):
+        instante = horario.hour * 3600 + horario.minute * 60 + horario.second
+        if tipo == 'ENTRADA':
+            entrada = instante
+        elif tipo == 'SAIDA' and entrada is not None:
+            segundos += instante - entrada
+            entrada = None
+    return segundos // 60
+
+
+def _minutos_do_dia(registros, dia):
+    """{(estabelecimento_id, profissional_id): minutos} das marcações do dia."""
+    marcacoes = defaultdict(list)
+    linhas = registros.filter(data=dia).order_by('horario', 'id').values_list(
+        'estabelecimento_id', 'profissional_id', 'horario', 'tipo'
+    )
+    for estabelecimento_id, profissional_id, horario, tipo in linhas:
+        marcacoes[(estabelecimento_id, profissional_id)].append((horario, tipo))
+    return {chave: minutos_trabalhados(do_dia) for chave, do_dia in marcacoes.items()}
+
+
+def _valores_resumo(agregado, minutos=0):
+    valores = {campo: max(agregado[campo] or 0, 0) for campo in AGREGADOS}
+    valores['completo'] = valores['entradas'] > 0 and valores['saidas'] > 0
+    valores['minutos_trabalhados'] = minutos
+    return valores
+
+
+def atualizar_resumo(data, estabelecimento_id, profissional_id):
+    """Recalcula a linha do resumo de uma chave; apaga se não sobrou marcação."""
+    chave = {'data': data, 'estabelecimento_id': estabelecimento_id, 'profissional_id': profissional_id}
+    registros = RegistroPonto.objects.filter(**chave)
+    agregado = registros.aggregate(total=Count('id'), **AGREGADOS)
+
+    if not agregado['total']:
+        ResumoDiarioPonto.objects.filter(**chave).delete()
+        return None
+
+    minutos = minutos_trabalhados(registros.order_by('horario', 'id').values_list('horario', 'tipo'))
+    resumo, _ = ResumoDiarioPonto.objects.update_or_create(
+        defaults=_valores_resumo(agregado, minutos), **chave
+    )
+    return resumo
+
+
+def reconstruir_resumos(data_inicio=None, data_fim=None, profissionais=None, lote=1000):
+    """
+    Remonta o resumo do período (limites opcionais, inclusive) a partir das
+    marcações, num GROUP BY só. Retorna quantas linhas foram gravadas.
+    Meses arquivados (ponto/arquivamento.py) ficam de fora: as marcações
+    deles não estão mais no banco.
+    """
+    limite = primeiro_dia_nao_arquivado()
+    if limite and (data_inicio is None or data_inicio < limite):
+        data_inicio = limite
+    registros = RegistroPonto.objects.all()
+    resumos = ResumoDiarioPonto.objects.all()
+    if data_inicio:
+        registros = registros.filter(data__gte=data_inicio)
+        resumos = resumos.filter(data__gte=data_inicio)
+    if data_fim:
+        registros = registros.filter(data__lte=data_fim)
+        resumos = resumos.filter(data__lte=data_fim)
+    if profissionais is not None:
+        registros = registros.filter(profissional__in=profissionais)
+        resumos = resumos.filter(profissional__in=profissionais)
+
+    linhas = (
+        registros
+        .order_by()
+        .values('data', 'estabelecimento_id', 'profissional_id')
+        .annotate(**AGREGADOS)
+        .order_by('data')
+    )
+
+    gravadas = 0
+    pendentes = []
+    dia = minutos = None
+    with transaction.atomic():
+        resumos.delete()
+        for linha in linhas.iterator(chunk_size=lote):
+            if linha['data'] != dia:
+                dia = linha['data']
+                minutos = _minutos_do_dia(registros, dia)
+            pendentes.append(ResumoDiarioPonto(
+                data=linha['data'],
+                estabelecimento_id=linha['estabelecimento_id'],
+                profissional_id=linha['profissional_id'],
+                **_valores_resumo(linha, minutos.get((linha['estabelecimento_id'], linha['profissional_id']), 0)),
+            ))
+            if len(pendentes) >= lote:
+                ResumoDiarioPonto.objects.bulk_create(pendentes)
+                gravadas += len(pendentes)
+                pendentes = []
+        ResumoDiarioPonto.objects.bulk_create(pendentes)
+        gravadas += len(pendentes)
+
+    resumos_reconstruidos.send(sender=ResumoDiarioPonto, data_inicio=data_inicio, data_fim=data_fim)
+    return gravadas
+
+
+def resumos_periodo(data_inicio=None, data_fim=None, estabelecimento=None):
+    """Linhas do resumo no período (limites opcionais, inclusive)."""
+    resumos = ResumoDiarioPonto.objects.all()
+    if data_inicio:
+        resumos = resumos.filter(data__gte=data_inicio)
+    if data_fim:
+        resumos = resumos.filter(data__lte=data_fim)
+    if estabelecimento:
+        resumos = resumos.filter(estabelecimento=estabelecimento)
+    return resumos
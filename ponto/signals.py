@@ -0,0 +1,168 @@
+# ponto/signals.py
+"""
+Signals do app ponto ligados ao cadastro do profissional:
+
+- descartam as jornadas compiladas em memória (ponto/jornada.py) quando
+  muda alguma coisa que entra no cálculo de atraso/saída antecipada: o
+  profissional (horários fixos, tolerância, jornada ou escala escolhida),
+  a jornada
+  ou um dos dias dela;
+- se PONTO_RECALCULAR_TOLERANCIA_AUTOMATICO estiver ligado, recalculam os
+  registros dos últimos PONTO_RECALCULAR_TOLERANCIA_DIAS dias de quem foi
+  afetado (ponto/recalculo.py), depois do commit. Desligado por padrão:
+  num profissional com muitos registros isso pesa no save do admin — aí o
+  caminho é o comando `recalcular_tolerancia`;
+- mantêm o resumo diário (ResumoDiarioPonto) e os mapas de presença
+  (PresencaMensal) em dia a cada marcação gravada ou excluída
+  (ponto/resumo_diario.py, ponto/presenca.py) — fora dos meses arquivados
+  (ponto/arquivamento.py);
+- atualizam o índice de ocupação (ponto/ocupacao.py) depois do commit de
+  cada marcação, e o invalidam quando muda nome, profissão ou
+  estabelecimento do profissional.
+
+Save do profissional que não mexe nesses campos (telefone, e-mail, ativo)
+não invalida nada.
+
+Registrado em ponto/apps.py -> PontoConfig.ready().
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from usuarios.models import Jornada, JornadaDia, Profissional
+from .arquivamento import mes_arquivado
+from .jornada import invalidar_jornadas
+from .models import RegistroPonto
+from .ocupacao import invalidar_ocupacao, registrar_marcacao
+from .presenca import atualizar_presenca
+from .resumo_diario import atualizar_resumo
+
+CAMPOS_JORNADA = ('horario_entrada', 'horario_saida', 'tolerancia_minutos', 'jornada_id')
+# Nome e profissão aparecem no quadro de ocupação.
+CAMPOS_OCUPACAO = ('nome', 'profissao_id', 'estabelecimento_id')
+CAMPOS_OBSERVADOS = CAMPOS_JORNADA + ('escala_id',) + CAMPOS_OCUPACAO
+
+
+def _recalculo_automatico():
+    return getattr(settings, 'PONTO_RECALCULAR_TOLERANCIA_AUTOMATICO', False)
+
+
+def _agendar_recalculo(profissionais):
+    from .recalculo import recalcular_tolerancia
+
+    dias = getattr(settings, 'PONTO_RECALCULAR_TOLERANCIA_DIAS', 90)
+    data_inicio = timezone.now().date() - timedelta(days=dias) if dias else None
+    transaction.on_commit(
+        lambda: recalcular_tolerancia(profissionais=profissionais, data_inicio=data_inicio)
+    )
+
+
+def _campos_alterados(update_fields):
+    """Campos de CAMPOS_OBSERVADOS que o save pode ter mudado (vazio se nenhum)."""
+    if update_fields is not None:
+        nomes = {Profissional._meta.get_field(nome).attname for nome in update_fields}
+        return {campo for campo in CAMPOS_OBSERVADOS if campo in nomes}
+    return set(CAMPOS_OBSERVADOS)
+
+
+@receiver(pre_save, sender=Profissional)
+def guardar_valores_anteriores(sender, instance, update_fields=None, raw=False, **kwargs):
+    # Os valores de antes, pra invalidar jornada e ocupação só quando mudam
+    # (editar o telefone não descarta nada).
+    if raw or instance.pk is None or not _campos_alterados(update_fields):
+        return
+    valores = Profissional.objects.filter(pk=instance.pk).values_list(*CAMPOS_OBSERVADOS).first()
+    instance._valores_anteriores = dict(zip(CAMPOS_OBSERVADOS, valores)) if valores else None
+
+
+@receiver(post_save, sender=Profissional)
+def profissional_alterado(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if created or raw:
+        return
+    candidatos = _campos_alterados(update_fields)
+    if not candidatos:
+        return
+    anteriores = instance.__dict__.pop('_valores_anteriores', None)
+    alterados = {
+        campo for campo in candidatos
+        if anteriores is None or anteriores[campo] != getattr(instance, campo)
+    }
+
+    if alterados & set(CAMPOS_JORNADA + ('escala_id',)):
+        invalidar_jornadas()
+    if alterados & set(CAMPOS_OCUPACAO):
+        transaction.on_commit(invalidar_ocupacao)
+    if _recalculo_automatico() and anteriores is not None and alterados & set(CAMPOS_JORNADA):
+        _agendar_recalculo([instance])
+
+
+@receiver(post_save, sender=Jornada)
+@receiver(post_delete, sender=Jornada)
+@receiver(post_save, sender=JornadaDia)
+@receiver(post_delete, sender=JornadaDia)
+def jornada_alterada(sender, instance, **kwargs):
+    if sender is JornadaDia:
+        # atualizado_em da jornada está na chave das tabelas compiladas
+        # (ponto/jornada.py): é assim que os outros processos ficam sabendo.
+        Jornada.objects.filter(pk=instance.jornada_id).update(atualizado_em=timezone.now())
+    invalidar_jornadas()
+
+    if _recalculo_automatico() and sender is JornadaDia:
+        profissionais = list(Profissional.objects.filter(jornada_id=instance.jornada_id))
+        if profissionais:
+            _agendar_recalculo(profissionais)
+
+
+def _chave_resumo(registro):
+    return (registro.data, registro.estabelecimento_id, registro.profissional_id)
+
+
+def _atualizar_dia(data, estabelecimento_id, profissional_id, presenca=True):
+    # Mês arquivado: as marcações dele estão no arquivo, não no banco —
+    # recalcular daqui apagaria o resumo e a presença que ficaram.
+    if mes_arquivado(data):
+        return
+    atualizar_resumo(data, estabelecimento_id, profissional_id)
+    if presenca:
+        atualizar_presenca(profissional_id, data)
+
+
+@receiver(pre_save, sender=RegistroPonto)
+def guardar_chave_resumo_anterior(sender, instance, raw=False, **kwargs):
+    # Numa edição (ajuste manual), a data/profissional/estabelecimento podem
+    # mudar — a linha antiga do resumo também precisa ser recalculada.
+    if raw or instance.pk is None:
+        return
+    instance._chave_resumo_anterior = (
+        RegistroPonto.objects.filter(pk=instance.pk)
+        .values_list('data', 'estabelecimento_id', 'profissional_id')
+        .first()
+    )
+
+
+@receiver(post_save, sender=RegistroPonto)
+def registro_gravado(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    chave = _chave_resumo(instance)
+    _atualizar_dia(*chave)
+
+    anterior = getattr(instance, '_chave_resumo_anterior', None)
+    if anterior and anterior != chave:
+        outro_dia = (anterior[0], anterior[2]) != (instance.data, instance.profissional_id)
+        _atualizar_dia(*anterior, presenca=outro_dia)
+        if anterior[1] != instance.estabelecimento_id:
+            transaction.on_commit(lambda: invalidar_ocupacao(anterior[1]))
+
+    transaction.on_commit(lambda: registrar_marcacao(instance, created))
+
+
+@receiver(post_delete, sender=RegistroPonto)
+def registro_excluido(sender, instance, **kwargs):
+    _atualizar_dia(*_chave_resumo(instance))
+    estabelecimento_id = instance.estabelecimento_id
+    transaction.on_commit(lambda: invalidar_ocupacao(estabelecimento_id))
@@ -1,3 +1,672 @@
-from django.test import TestCase
+import tempfile
+from datetime import date, datetime, time, timedelta
+from importlib import import_module
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection, migrations
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from afd.gerador import gerar_afd
+from afd.gerador_aej import gerar_aej
+from core import relatorios
+from core.exportacao import csv_registros, marcacoes_arquivadas_filtradas, registros_filtrados
+from core.relatorios import RelatorioProfissional, pagina_historico
+from core.testing import OrcamentoConsultasMixin, criar_estabelecimento, criar_profissional, registrar
+from usuarios.models import Profissional
+from . import espelho
+from .arquivamento import arquivar_mes
+from .banco_horas import calcular_extrato_banco_horas
+from .classificacao_horas import classificar_intervalos, parear_marcacoes
+from .escalas import atravessa_meia_noite
+from .jornada import compilar_jornada, compilar_turnos
+from .models import AjusteRegistroPonto, PresencaMensal, RegistroPonto, ResumoDiarioPonto
+from .presenca import frequencia_periodo
+
+
+def marcacao(data, horario, tipo):
+    return SimpleNamespace(data=data, horario=horario, tipo=tipo)
+
+
+class ClassificacaoHorasTests(SimpleTestCase):
+    """ponto/classificacao_horas.py"""
+
+    def test_pareia_entrada_com_a_proxima_saida_mesmo_no_dia_seguinte(self):
+        intervalos, sem_saida = parear_marcacoes([
+            marcacao(date(2026, 9, 7), time(19), 'ENTRADA'),
+            marcacao(date(2026, 9, 8), time(7), 'SAIDA'),
+            marcacao(date(2026, 9, 8), time(19), 'ENTRADA'),
+            marcacao(date(2026, 9, 8), time(20), 'ENTRADA'),
+        ])
+        self.assertEqual(intervalos, [
+            (datetime(2026, 9, 7, 19), datetime(2026, 9, 8, 7), date(2026, 9, 7)),
+        ])
+        self.assertEqual([m.horario for m in sem_saida], [time(19), time(20)])
+
+    def test_dia_comum_divide_normal_e_extra_50(self):
+        # segunda, 08:00-18:00 com carga de 8h
+        dias = classificar_intervalos(
+            [(datetime(2026, 9, 7, 8), datetime(2026, 9, 7, 18), date(2026, 9, 7))],
+            timedelta(hours=8),
+        )
+        dia = dias[date(2026, 9, 7)]
+        self.assertEqual(dia['normal'], timedelta(hours=8))
+        self.assertEqual(dia['extra_50'], timedelta(hours=2))
+        self.assertEqual(dia['extra_100'], timedelta())
+        self.assertEqual(dia['noturno'], timedelta())
+
+    def test_plantao_de_sabado_para_domingo(self):
+        # sábado 19:00 -> domingo 07:00: 5h comuns, 7h a 100%, 7h noturnas
+        dias = classificar_intervalos(
+            [(datetime(2026, 9, 5, 19), datetime(2026, 9, 6, 7), date(2026, 9, 5))],
+            timedelta(hours=12),
+        )
+        dia = dias[date(2026, 9, 5)]
+        self.assertEqual(dia['normal'], timedelta(hours=5))
+        self.assertEqual(dia['extra_50'], timedelta())
+        self.assertEqual(dia['extra_100'], timedelta(hours=7))
+        self.assertEqual(dia['noturno'], timedelta(hours=7))
+        self.assertEqual(dia['noturno_reduzido'], timedelta(hours=8))
+        self.assertEqual(dia['noturno_formatado'], '07:00')
+
+    def test_feriado_conta_como_domingo(self):
+        dias = classificar_intervalos(
+            [(datetime(2026, 9, 7, 8), datetime(2026, 9, 7, 12), date(2026, 9, 7))],
+            timedelta(hours=8),
+            feriados={date(2026, 9, 7)},
+        )
+        self.assertEqual(dias[date(2026, 9, 7)]['extra_100'], timedelta(hours=4))
+        self.assertEqual(dias[date(2026, 9, 7)]['normal'], timedelta())
+
+    def test_sem_carga_nada_vira_extra(self):
+        dias = classificar_intervalos(
+            [(datetime(2026, 9, 7, 6), datetime(2026, 9, 7, 20), date(2026, 9, 7))],
+            None,
+        )
+        self.assertEqual(dias[date(2026, 9, 7)]['normal'], timedelta(hours=14))
+        self.assertEqual(dias[date(2026, 9, 7)]['extra_50'], timedelta())
+
+
+class AtravessaMeiaNoiteTests(SimpleTestCase):
+    """ponto/escalas.py:atravessa_meia_noite"""
+
+    def profissional(self, entrada=None, saida=None, horas_plantao=None, carga=None):
+        escala = SimpleNamespace(horas_plantao=horas_plantao) if horas_plantao else None
+        return SimpleNamespace(
+            escala_id=1 if escala else None, escala=escala, carga_horaria_diaria=carga,
+            horario_entrada=entrada, horario_saida=saida,
+        )
+
+    def test_plantao_diurno_nao_atravessa(self):
+        self.assertFalse(atravessa_meia_noite(self.profissional(time(7), time(19), timedelta(hours=12))))
+        self.assertFalse(atravessa_meia_noite(self.profissional(time(7), horas_plantao=timedelta(hours=12))))
+        self.assertFalse(atravessa_meia_noite(self.profissional(time(8), time(17), carga=timedelta(hours=8))))
+
+    def test_plantao_noturno_atravessa(self):
+        self.assertTrue(atravessa_meia_noite(self.profissional(time(19), time(7), timedelta(hours=12))))
+        self.assertTrue(atravessa_meia_noite(self.profissional(time(19), horas_plantao=timedelta(hours=12))))
+        self.assertTrue(atravessa_meia_noite(self.profissional(time(22), carga=timedelta(hours=8))))
+
+    def test_plantao_de_24h(self):
+        self.assertTrue(atravessa_meia_noite(self.profissional(time(7), time(7), timedelta(hours=24))))
+        self.assertTrue(atravessa_meia_noite(self.profissional(horas_plantao=timedelta(hours=24))))
+        self.assertTrue(atravessa_meia_noite(self.profissional(carga=timedelta(hours=24))))
+        # horário cadastrado desatualizado não desfaz o plantão de 24h
+        self.assertTrue(atravessa_meia_noite(self.profissional(time(8), time(17), carga=timedelta(hours=24))))
+
+    def test_sem_horario_e_sem_plantao_de_24h(self):
+        self.assertFalse(atravessa_meia_noite(self.profissional(horas_plantao=timedelta(hours=12))))
+        self.assertFalse(atravessa_meia_noite(self.profissional()))
+
+
+class JornadaCompiladaTests(SimpleTestCase):
+    """ponto/jornada.py"""
+
+    SEGUNDA = date(2026, 9, 7)
+
+    def test_sem_tolerancia_cadastrada_vale_o_padrao(self):
+        profissional = SimpleNamespace(
+            jornada_id=None, horario_entrada=time(8), horario_saida=time(17), tolerancia_minutos=None,
+        )
+        compilada = compilar_jornada(profissional)
+        self.assertEqual(compilada.avaliar(self.SEGUNDA, time(8, 10), 'ENTRADA'), (0, True))
+        self.assertEqual(compilada.avaliar(self.SEGUNDA, time(8, 25), 'ENTRADA'), (15, False))
+
+    def test_mesmos_parametros_dividem_a_tabela(self):
+        um = SimpleNamespace(jornada_id=None, horario_entrada=time(8), horario_saida=time(17), tolerancia_minutos=5)
+        outro = SimpleNamespace(jornada_id=None, horario_entrada=time(8), horario_saida=time(17), tolerancia_minutos=5)
+        self.assertIs(compilar_jornada(um), compilar_jornada(outro))
+
+    def test_intervalo_no_meio_do_turno(self):
+        # 08:00-18:00 com 1h de intervalo: 12:30-13:30
+        compilada = compilar_turnos([(0, 8 * 60, 18 * 60, 60)], tolerancia=10)
+        self.assertEqual(compilada.avaliar(self.SEGUNDA, time(12, 30), 'SAIDA'), (0, True))
+        self.assertEqual(compilada.avaliar(self.SEGUNDA, time(11, 0), 'SAIDA'), (80, False))
+        self.assertEqual(compilada.avaliar(self.SEGUNDA, time(13, 35), 'ENTRADA'), (0, True))
+        self.assertEqual(compilada.avaliar(self.SEGUNDA, time(14, 0), 'ENTRADA'), (20, False))
+        # fora do intervalo, entrada e saída do turno como antes
+        self.assertEqual(compilada.avaliar(self.SEGUNDA, time(8, 30), 'ENTRADA'), (20, False))
+        self.assertEqual(compilada.avaliar(self.SEGUNDA, time(17, 0), 'SAIDA'), (50, False))
+
+    def test_intervalo_de_turno_noturno_cai_no_dia_seguinte(self):
+        # segunda 19:00 -> terça 07:00, intervalo 00:30-01:30 de terça
+        compilada = compilar_turnos([(0, 19 * 60, 7 * 60, 60)], tolerancia=0)
+        terca = self.SEGUNDA + timedelta(days=1)
+        self.assertEqual(compilada.avaliar(terca, time(0, 30), 'SAIDA'), (0, True))
+        self.assertEqual(compilada.avaliar(terca, time(2, 0), 'ENTRADA'), (30, False))
+        self.assertEqual(compilada.avaliar(terca, time(6, 0), 'SAIDA'), (60, False))
+
+
+class JornadaEntreProcessosTests(TestCase):
+    """ponto/jornada.py — jornada editada em outro processo muda a chave do LRU deste."""
+
+    SEGUNDA = date(2026, 9, 7)
+
+    def test_dia_alterado_sem_invalidar_o_lru_local(self):
+        from usuarios.models import Jornada, JornadaDia
+
+        jornada = Jornada.objects.create(nome='Comercial')
+        dia = JornadaDia.objects.create(jornada=jornada, dia_semana=0, entrada=time(8), saida=time(17))
+        profissional = criar_profissional(criar_estabelecimento(), jornada=jornada, tolerancia_minutos=5)
+        self.assertEqual(compilar_jornada(profissional).avaliar(self.SEGUNDA, time(8, 30), 'ENTRADA'), (25, False))
+
+        # O signal do outro processo não esvazia o LRU daqui.
+        with mock.patch('ponto.signals.invalidar_jornadas'):
+            dia.entrada = time(9)
+            dia.save()
+        profissional.refresh_from_db()
+        self.assertEqual(compilar_jornada(profissional).avaliar(self.SEGUNDA, time(8, 30), 'ENTRADA'), (0, True))
+
+
+class ResumosMantidosPelosSignalsTests(TestCase):
+    """Resumo diário e mapa de presença atualizados a cada marcação (ponto/signals.py)."""
+
+    DIA = date(2026, 9, 8)  # terça
+
+    def setUp(self):
+        self.estabelecimento = criar_estabelecimento()
+        self.profissional = criar_profissional(
+            self.estabelecimento, horario_entrada=time(8), horario_saida=time(17), tolerancia_minutos=10,
+        )
+
+    def resumo(self, dia=DIA):
+        return ResumoDiarioPonto.objects.get(
+            data=dia, estabelecimento=self.estabelecimento, profissional=self.profissional,
+        )
+
+    def presenca(self, dia=DIA):
+        return PresencaMensal.objects.get(profissional=self.profissional, ano=dia.year, mes=dia.month)
+
+    def test_marcacoes_do_dia_entram_no_resumo(self):
+        registrar(self.profissional, self.DIA, time(8, 30), 'ENTRADA')
+        resumo = self.resumo()
+        self.assertEqual((resumo.entradas, resumo.saidas, resumo.completo), (1, 0, False))
+        self.assertEqual((resumo.entradas_com_atraso, resumo.atraso_total, resumo.atraso_maximo), (1, 20, 20))
+
+        registrar(self.profissional, self.DIA, time(16, 30), 'SAIDA')
+        resumo = self.resumo()
+        self.assertEqual((resumo.entradas, resumo.saidas, resumo.completo), (1, 1, True))
+        self.assertEqual((resumo.saidas_antecipadas, resumo.saida_antecipada_total), (1, 20))
+        self.assertEqual(resumo.minutos_trabalhados, 8 * 60)
+
+    def test_exclusao_recalcula_e_apaga_o_resumo_vazio(self):
+        entrada = registrar(self.profissional, self.DIA, time(8), 'ENTRADA')
+        saida = registrar(self.profissional, self.DIA, time(17), 'SAIDA')
+        saida.delete()
+        self.assertEqual((self.resumo().saidas, self.resumo().completo), (0, False))
+        entrada.delete()
+        self.assertFalse(ResumoDiarioPonto.objects.exists())
+
+    def test_edicao_que_troca_a_data_move_o_resumo_e_a_presenca(self):
+        registro = registrar(self.profissional, self.DIA, time(8), 'ENTRADA')
+        outro_dia = self.DIA + timedelta(days=1)
+        registro.data = outro_dia
+        registro.save()
+        self.assertFalse(ResumoDiarioPonto.objects.filter(data=self.DIA).exists())
+        self.assertEqual(self.resumo(outro_dia).entradas, 1)
+        self.assertEqual(self.presenca().dias_entrada, 1 << (outro_dia.day - 1))
+
+    def test_mapa_de_presenca_liga_e_desliga_o_bit_do_dia(self):
+        bit = 1 << (self.DIA.day - 1)
+        registrar(self.profissional, self.DIA, time(8), 'ENTRADA', ajuste_manual=True)
+        saida = registrar(self.profissional, self.DIA, time(17), 'SAIDA')
+        presenca = self.presenca()
+        self.assertEqual((presenca.dias_entrada, presenca.dias_saida, presenca.dias_ajuste_manual), (bit, bit, bit))
+
+        saida.delete()
+        self.assertEqual(self.presenca().dias_saida, 0)
+        registrar(self.profissional, self.DIA + timedelta(days=1), time(8), 'ENTRADA')
+        self.assertEqual(self.presenca().dias_entrada, bit | bit << 1)
+
+    def test_frequencia_nao_conta_falta_em_dia_que_nao_chegou(self):
+        # setembro/2026 com "hoje" em 09/09: 7 dias úteis até lá, 1 trabalhado
+        registrar(self.profissional, self.DIA, time(8), 'ENTRADA')
+        registrar(self.profissional, self.DIA, time(17), 'SAIDA')
+        frequencia = frequencia_periodo(
+            self.profissional, date(2026, 9, 1), date(2026, 9, 30), hoje=date(2026, 9, 9),
+        )
+        self.assertEqual(frequencia['dias_previstos'], 22)
+        self.assertEqual(frequencia['faltas'], 6)
+        self.assertEqual(frequencia['dias_trabalhados'], 1)
+        self.assertAlmostEqual(frequencia['percentual_frequencia'], 100 / 7)
+
+
+class ProfissionalAlteradoTests(TestCase):
+    """ponto/signals.py — jornada e ocupação descartadas só quando o campo que usam muda."""
+
+    def setUp(self):
+        self.profissional = criar_profissional(
+            criar_estabelecimento(), horario_entrada=time(8), horario_saida=time(17),
+        )
+
+    def salvar(self, **campos):
+        for campo, valor in campos.items():
+            setattr(self.profissional, campo, valor)
+        with mock.patch('ponto.signals.invalidar_jornadas') as jornadas, \
+                mock.patch('ponto.signals.invalidar_ocupacao') as ocupacao, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.profissional.save()
+        return jornadas.called, ocupacao.called
+
+    def test_telefone_nao_invalida_nada(self):
+        self.assertEqual(self.salvar(telefone='(11) 99999-9999'), (False, False))
+
+    def test_horario_invalida_a_jornada(self):
+        self.assertEqual(self.salvar(horario_entrada=time(7)), (True, False))
+
+    def test_nome_invalida_a_ocupacao(self):
+        self.assertEqual(self.salvar(nome='Outro nome'), (False, True))
+
+
+class OcupacaoEntreProcessosTests(TestCase):
+    """ponto/ocupacao.py — com cache por processo o índice é remontado depois de CACHE_VALIDADE_LOCAL segundos."""
+
+    def test_marcacao_de_outro_processo_entra_depois_da_validade(self):
+        import time as relogio
+        from . import ocupacao
+
+        estabelecimento = criar_estabelecimento()
+        profissional = criar_profissional(estabelecimento)
+        ocupacao.invalidar_ocupacao()
+        self.addCleanup(ocupacao.invalidar_ocupacao)
+        self.assertEqual(ocupacao.quadro_ocupacao([estabelecimento.pk])['total'], 0)
+
+        # Marcação atendida por outro worker: nada chega no índice daqui.
+        agora = timezone.now()
+        with mock.patch('ponto.signals.registrar_marcacao'):
+            registrar(profissional, agora.date(), agora.time(), 'ENTRADA')
+        self.assertEqual(ocupacao.quadro_ocupacao([estabelecimento.pk])['total'], 0)
+
+        depois = relogio.monotonic() + 61
+        with mock.patch('ponto.ocupacao.time.monotonic', return_value=depois):
+            self.assertEqual(ocupacao.quadro_ocupacao([estabelecimento.pk])['total'], 1)
+
+
+class BancoHorasTests(TestCase):
+    """ponto/banco_horas.py"""
+
+    DIA = date(2026, 9, 8)  # terça
+
+    def setUp(self):
+        self.estabelecimento = criar_estabelecimento()
+
+    def extrato(self, profissional):
+        registrar(profissional, self.DIA, time(8), 'ENTRADA')
+        registrar(profissional, self.DIA, time(18), 'SAIDA')
+        return calcular_extrato_banco_horas(profissional, self.DIA, self.DIA)
+
+    def test_sem_carga_cadastrada_nada_vira_extra(self):
+        extrato = self.extrato(criar_profissional(self.estabelecimento))
+        self.assertEqual(extrato['classificacao']['normal'], timedelta(hours=10))
+        self.assertEqual(extrato['classificacao']['extra_50'], timedelta())
+
+    def test_com_carga_o_que_passa_vira_extra_50(self):
+        extrato = self.extrato(criar_profissional(self.estabelecimento, carga_horaria_diaria=timedelta(hours=8)))
+        self.assertEqual(extrato['classificacao']['normal'], timedelta(hours=8))
+        self.assertEqual(extrato['classificacao']['extra_50'], timedelta(hours=2))
+
+
+@mock.patch.object(espelho, 'LOTE_PROFISSIONAIS', 2)
+class EspelhoEmLotesTests(TestCase):
+    """ponto/espelho.py:espelhos — profissionais em lotes por pk, marcações de cada lote à parte."""
+
+    def setUp(self):
+        self.estabelecimento = criar_estabelecimento()
+        self.outro = criar_estabelecimento()
+        self.profissionais = [
+            criar_profissional(self.estabelecimento, horario_entrada=time(8), horario_saida=time(17))
+            for _ in range(5)
+        ]
+        criar_profissional(self.outro, horario_entrada=time(8), horario_saida=time(17))
+        # O i-ésimo profissional bate i dias (o primeiro, nenhum).
+        for i, profissional in enumerate(self.profissionais):
+            for dia in range(1, i + 1):
+                registrar(profissional, date(2026, 3, dia), time(8), 'ENTRADA')
+                registrar(profissional, date(2026, 3, dia), time(17), 'SAIDA')
+
+    def test_cada_espelho_com_as_proprias_marcacoes(self):
+        gerados = list(espelho.espelhos(date(2026, 3, 1), date(2026, 3, 31), estabelecimento_id=self.estabelecimento.pk))
+        self.assertEqual([e['profissional'] for e in gerados], self.profissionais)
+        for i, gerado in enumerate(gerados):
+            marcacoes = sum(len(dia['marcacoes']) for dia in gerado['dias'])
+            self.assertEqual(marcacoes, 2 * i)
+
+    def test_aej_com_vinculos_e_marcacoes_de_todos_os_lotes(self):
+        linhas = ''.join(gerar_aej(date(2026, 3, 1), date(2026, 3, 31))).splitlines()
+        tipos = [linha[:2] for linha in linhas]
+        self.assertEqual(tipos.count('03'), 6)
+        self.assertEqual(tipos.count('05'), 2 * sum(range(5)))
+        self.assertEqual(linhas[-1].split('|')[3], '6')
+
+    def test_estabelecimento_invalido_da_404(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'senha'))
+        resposta = self.client.get(reverse('espelho_ponto'), {'estabelecimento': 'abc', 'mes': '2026-03'})
+        self.assertEqual(resposta.status_code, 404)
+
+
+class ArquivamentoTests(OrcamentoConsultasMixin, TestCase):
+    """ponto/arquivamento.py — arquivar_mes e a volta: relatório, AFD e histórico por cursor."""
+
+    ANTIGO = date(2024, 1, 1)
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        configuracao = override_settings(ARQUIVO_MARCACOES_DIRETORIO=diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+        self.estabelecimento = criar_estabelecimento()
+        self.profissional = criar_profissional(
+            self.estabelecimento, horario_entrada=time(8), horario_saida=time(17), tolerancia_minutos=10,
+        )
+        # Janeiro/2024 (vai pro arquivo) e setembro/2026 (fica no banco), 3 dias de cada.
+        for dia in (date(2024, 1, 8), date(2024, 1, 9), date(2024, 1, 10),
+                    date(2026, 9, 8), date(2026, 9, 9), date(2026, 9, 10)):
+            registrar(self.profissional, dia, time(8), 'ENTRADA')
+            registrar(self.profissional, dia, time(17), 'SAIDA', justificativa_ajuste='Esqueceu de bater')
+        # Uma marcação real (com NSR e hash) no mês arquivado, pro AFD.
+        real = registrar(self.profissional, date(2024, 1, 11), time(8), 'ENTRADA', ajuste_manual=False)
+        RegistroPonto.objects.filter(pk=real.pk).update(data=date(2024, 1, 11), horario=time(8))
+
+    def chaves(self, registros):
+        return [(registro.data, registro.horario, registro.pk, registro.tipo) for registro in registros]
+
+    def test_relatorio_e_afd_iguais_depois_de_arquivar(self):
+        antes = RelatorioProfissional(self.profissional, date(2024, 1, 1), date(2024, 1, 31))
+        afd_antes = gerar_afd(date(2024, 1, 1), date(2024, 1, 31))[1].splitlines()
+
+        arquivo = arquivar_mes(self.ANTIGO)
+
+        self.assertEqual(arquivo.quantidade, 7)
+        self.assertFalse(RegistroPonto.objects.filter(data__lt=date(2024, 2, 1)).exists())
+        self.assertFalse(AjusteRegistroPonto.objects.filter(registro__data__lt=date(2024, 2, 1)).exists())
+        # A exclusão não passa por signals: o resumo do mês continua lá.
+        self.assertEqual(ResumoDiarioPonto.objects.filter(data__lt=date(2024, 2, 1)).count(), 3)
+
+        depois = RelatorioProfissional(self.profissional, date(2024, 1, 1), date(2024, 1, 31))
+        self.assertEqual(self.chaves(depois.registros), self.chaves(antes.registros))
+        self.assertEqual(depois.horas_trabalhadas, antes.horas_trabalhadas)
+        self.assertEqual(
+            [registro.justificativa_ajuste for registro in depois.registros],
+            [registro.justificativa_ajuste for registro in antes.registros],
+        )
+
+        afd_depois = gerar_afd(date(2024, 1, 1), date(2024, 1, 31))[1].splitlines()
+        # Fora o cabeçalho (data de geração), o AFD é o mesmo.
+        self.assertEqual(afd_depois[1:], afd_antes[1:])
+        self.assertTrue(any(linha[9] == '7' for linha in afd_depois))
+
+    def test_historico_pagina_banco_e_arquivo_na_mesma_ordem(self):
+        esperado = self.chaves(sorted(
+            RegistroPonto.objects.filter(profissional=self.profissional),
+            key=lambda registro: (registro.data, registro.horario, registro.pk), reverse=True,
+        ))
+        arquivar_mes(self.ANTIGO)
+
+        vistos = []
+        pagina = pagina_historico(self.profissional, por_pagina=4)
+        while True:
+            vistos.extend(self.chaves(pagina))
+            if not pagina.tem_proxima:
+                break
+            pagina = pagina_historico(self.profissional, pagina.proximo_cursor, por_pagina=4)
+        self.assertEqual(vistos, esperado)
+        self.assertTrue(any(getattr(registro, 'arquivado', False) for registro in pagina))
+        self.assertTrue(all(registro.estabelecimento.nome for registro in pagina))
+
+        # 13 marcações: da última página (1), a anterior é a terceira.
+        anterior = pagina_historico(self.profissional, pagina.cursor_anterior, por_pagina=4)
+        self.assertEqual(self.chaves(anterior), esperado[8:12])
+
+    def test_mes_arquivado_so_abre_quando_a_pagina_chega_nele(self):
+        arquivar_mes(self.ANTIGO)
+        with mock.patch.object(relatorios, 'marcacoes_arquivadas', wraps=relatorios.marcacoes_arquivadas) as lidas:
+            primeira = pagina_historico(self.profissional, por_pagina=4)
+            self.assertEqual(lidas.call_count, 0)
+            pagina_historico(self.profissional, primeira.proximo_cursor, por_pagina=4)
+            self.assertEqual(lidas.call_count, 1)
+
+    def test_historico_com_totais_do_resumo(self):
+        arquivar_mes(self.ANTIGO)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'senha'))
+        # Com mês arquivado na página, o mesmo orçamento de consultas.
+        resposta = self.assertOrcamentoConsultas('core:historico_pontos', args=[self.profissional.pk])
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.context['total_registros'], 13)
+        self.assertEqual(resposta.context['dias_trabalhados'], 7)
+        self.assertEqual(resposta.context['horas_trabalhadas'], timedelta(hours=54))
+
+    def test_marcacao_em_mes_arquivado_e_recusada(self):
+        arquivar_mes(self.ANTIGO)
+        resumos = list(ResumoDiarioPonto.objects.filter(data__lt=date(2024, 2, 1)).values())
+        presencas = list(PresencaMensal.objects.filter(ano=2024, mes=1).values())
+
+        with self.assertRaises(ValidationError):
+            registrar(self.profissional, date(2024, 1, 15), time(8), 'ENTRADA')
+        # Nem editando uma marcação do banco pra dentro do mês arquivado.
+        quente = RegistroPonto.objects.filter(data=date(2026, 9, 8), tipo='ENTRADA').get()
+        quente.data = date(2024, 1, 15)
+        with self.assertRaises(ValidationError):
+            quente.save()
+
+        # Linha que chegou por fora do save: excluir não mexe no resumo nem na presença do mês.
+        [avulsa] = RegistroPonto.objects.bulk_create([RegistroPonto(
+            profissional=self.profissional, estabelecimento=self.estabelecimento,
+            data=date(2024, 1, 8), horario=time(12), tipo='ENTRADA', ajuste_manual=True,
+        )])
+        RegistroPonto.objects.get(pk=avulsa.pk).delete()
+
+        self.assertEqual(list(ResumoDiarioPonto.objects.filter(data__lt=date(2024, 2, 1)).values()), resumos)
+        self.assertEqual(list(PresencaMensal.objects.filter(ano=2024, mes=1).values()), presencas)
+        self.assertFalse(RegistroPonto.objects.filter(data__lt=date(2024, 2, 1)).exists())
+
+    def test_espelho_aej_e_exportacao_iguais_depois_de_arquivar(self):
+        periodo = (date(2024, 1, 1), date(2024, 1, 31))
+        filtros = {'data_inicio': periodo[0], 'data_fim': periodo[1]}
+        espelhos_antes = list(espelho.espelhos(*periodo))
+        # Fora do quadro ativo: no AEJ ele só entra pelas marcações do período.
+        Profissional.objects.filter(pk=self.profissional.pk).update(ativo=False)
+        aej_antes = ''.join(gerar_aej(*periodo)).splitlines()
+        csv_antes = ''.join(csv_registros(registros_filtrados(**filtros)))
+
+        arquivar_mes(self.ANTIGO)
+        csv_depois = ''.join(csv_registros(registros_filtrados(**filtros), marcacoes_arquivadas_filtradas(**filtros)))
+        self.assertEqual(csv_depois, csv_antes)
+        # Fora o cabeçalho (data de geração), o AEJ é o mesmo.
+        self.assertEqual(''.join(gerar_aej(*periodo)).splitlines()[1:], aej_antes[1:])
+        Profissional.objects.filter(pk=self.profissional.pk).update(ativo=True)
+        self.assertEqual(list(espelho.espelhos(*periodo)), espelhos_antes)
+
+    def test_comprovante_de_mes_arquivado_explica_o_404(self):
+        codigo = RegistroPonto.objects.get(data=date(2024, 1, 11)).codigo_validacao
+        self.assertEqual(self.client.get(reverse('validar_registro', args=[codigo])).status_code, 200)
+
+        arquivar_mes(self.ANTIGO)
+        resposta = self.client.get(reverse('validar_registro', args=[codigo]))
+        self.assertEqual(resposta.status_code, 404)
+        self.assertIn('01/02/2024', resposta.json()['erro'])
+
+
+class RegistroCompactoTests(TestCase):
+    """Layout compacto de RegistroPonto (migração 0008): GPS, hash e textos de ajuste com a interface de antes."""
+
+    # AFD gerado pelo layout antigo (colunas hash_registro/latitude/longitude)
+    # com estas mesmas marcações e a geração em 19/10/2026 08:34.
+    AFD_LAYOUT_ANTIGO = (
+        '0000000001100000000000000              RAZAO SOCIAL NAO CONFIGURADA'
+        + ' ' * 122
+        + '999999999999999992026-03-012026-03-312026-10-19T08:34:00-0300004100000000000000'
+        + ' ' * 30 + '9798\r\n'
+        '00000004172026-03-02T08:00:00-03000123456789092026-03-02T08:00:00-0300020' + 'ab' * 32 + '\r\n'
+        '00000004272026-03-02T17:01:00-03000123456789092026-03-02T17:03:00-0300021' + '0f' * 32 + '\r\n'
+        '0000000090000000000000000000000000000000000000000000000000000029\r\n'
+        'ASSINATURA_DIGITAL_EM_ARQUIVO_P7S' + ' ' * 67 + '\r\n'
+    )
+
+    def setUp(self):
+        self.profissional = criar_profissional(criar_estabelecimento(), cpf='123.456.789-09')
+
+    def test_gps_e_hash_voltam_iguais_do_banco(self):
+        registro = registrar(self.profissional, date(2026, 3, 2), time(8), 'ENTRADA')
+        registro.latitude = -23.5505199
+        registro.longitude = -46.6333094
+        registro.hash_registro = 'ab' * 32
+        registro.save()
+
+        lido = RegistroPonto.objects.get(pk=registro.pk)
+        self.assertEqual((lido.latitude_e7, lido.longitude_e7), (-235505199, -466333094))
+        self.assertAlmostEqual(lido.latitude, -23.5505199, places=7)
+        self.assertAlmostEqual(lido.longitude, -46.6333094, places=7)
+        self.assertEqual(bytes(lido.hash_binario), b'\xab' * 32)
+        self.assertEqual(lido.hash_registro, 'ab' * 32)
+
+        lido.hash_registro = ''
+        lido.save()
+        lido.refresh_from_db()
+        self.assertIsNone(lido.hash_binario)
+        self.assertEqual(lido.hash_registro, '')
+
+    def test_textos_de_ajuste_so_na_tabela_lateral_quando_existem(self):
+        sem_texto = registrar(self.profissional, date(2026, 3, 2), time(8), 'ENTRADA')
+        self.assertFalse(AjusteRegistroPonto.objects.filter(registro=sem_texto).exists())
+        self.assertIsNone(RegistroPonto.objects.get(pk=sem_texto.pk).justificativa_ajuste)
+
+        registro = registrar(self.profissional, date(2026, 3, 2), time(17), 'SAIDA', justificativa_ajuste='Esqueceu')
+        ajuste = AjusteRegistroPonto.objects.get(registro=registro)
+        self.assertEqual((ajuste.justificativa, ajuste.observacoes), ('Esqueceu', None))
+
+        lido = RegistroPonto.objects.select_related('ajuste').get(pk=registro.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(lido.justificativa_ajuste, 'Esqueceu')
+            self.assertIsNone(lido.observacoes)
+
+        # Só um dos textos muda: o outro fica.
+        lido.observacoes = 'Conferido com a chefia'
+        lido.save()
+        ajuste.refresh_from_db()
+        self.assertEqual((ajuste.justificativa, ajuste.observacoes), ('Esqueceu', 'Conferido com a chefia'))
+
+        # Sem nenhum texto, a linha lateral sai.
+        lido.justificativa_ajuste = None
+        lido.observacoes = ''
+        lido.save()
+        self.assertFalse(AjusteRegistroPonto.objects.filter(registro=registro).exists())
+        lido = RegistroPonto.objects.get(pk=registro.pk)
+        self.assertIsNone(lido.justificativa_ajuste)
+        self.assertIsNone(lido.observacoes)
+
+    def test_afd_igual_ao_do_layout_antigo(self):
+        for nsr, tipo, horario, criado_em, offline, hash_registro in (
+            (41, 'ENTRADA', time(8, 0, 7), datetime(2026, 3, 2, 8, 0, 9), False, 'ab' * 32),
+            (42, 'SAIDA', time(17, 1), datetime(2026, 3, 2, 17, 3), True, '0f' * 32),
+        ):
+            registro = registrar(self.profissional, date(2026, 3, 2), horario, tipo)
+            RegistroPonto.objects.filter(pk=registro.pk).update(
+                nsr=nsr, created_at=criado_em, offline=offline, identificador_coletor='02',
+                hash_binario=bytes.fromhex(hash_registro),
+            )
+
+        class Agora(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return datetime(2026, 10, 19, 8, 34)
+
+        with mock.patch('afd.gerador.datetime', Agora):
+            _, conteudo = gerar_afd(date(2026, 3, 1), date(2026, 3, 31))
+        self.assertEqual(conteudo, self.AFD_LAYOUT_ANTIGO)
+
+
+class PreenchimentoCompactacaoTests(TransactionTestCase):
+    """Migração 0008 -> preencher(): do layout antigo pro compacto, FAIXA ids por vez."""
+
+    def setUp(self):
+        self.migracao = import_module('ponto.migrations.0008_registroponto_compacto')
+        loader = MigrationExecutor(connection).loader
+        # Estado do meio da 0008: colunas antigas e novas, antes do RunPython.
+        estado = loader.project_state(('ponto', '0007_particionamento_registroponto'))
+        for operacao in loader.get_migration('ponto', '0008_registroponto_compacto').operations:
+            if isinstance(operacao, migrations.RunPython):
+                break
+            operacao.state_forwards('ponto', estado)
+        # Tabelas à parte, ao lado das de verdade.
+        for nome in ('registroponto', 'ajusteregistroponto'):
+            estado.models['ponto', nome].options.update(db_table=f'teste_0008_{nome}', indexes=[])
+        self.apps = estado.apps
+        modelos = [self.apps.get_model('ponto', 'RegistroPonto'), self.apps.get_model('ponto', 'AjusteRegistroPonto')]
+        with connection.schema_editor() as editor:
+            for modelo in modelos:
+                editor.create_model(modelo)
+
+        def apagar():
+            with connection.schema_editor() as editor:
+                for modelo in modelos:
+                    editor.delete_model(modelo)
+        self.addCleanup(apagar)
+
+    def test_preenche_gps_hash_e_textos(self):
+        profissional = criar_profissional(criar_estabelecimento())
+        Antigo = self.apps.get_model('ponto', 'RegistroPonto')
+        comum = {
+            'profissional_id': profissional.pk, 'estabelecimento_id': profissional.estabelecimento_id,
+            'data': date(2026, 3, 2), 'horario': time(8),
+        }
+        real = Antigo.objects.create(
+            tipo='ENTRADA', latitude=-23.5505199, longitude=-46.6333094, hash_registro='ab' * 32, nsr=1, **comum,
+        )
+        ajustada = Antigo.objects.create(
+            tipo='SAIDA', latitude=0, longitude=0, hash_registro='', ajuste_manual=True,
+            justificativa_ajuste='Esqueceu', observacoes='', **comum,
+        )
+        so_observacao = Antigo.objects.create(
+            tipo='ENTRADA', latitude=1.5, longitude=-2.25, hash_registro='', observacoes='Conferido',
+            **{**comum, 'data': date(2026, 3, 3)},
+        )
+
+        # FAIXA pequena: as três marcações em duas transações
+        with mock.patch.object(self.migracao, 'FAIXA', 2):
+            self.migracao.preencher(self.apps, SimpleNamespace(connection=connection))
+
+        valores = {
+            linha['pk']: linha
+            for linha in Antigo.objects.values('pk', 'latitude_e7', 'longitude_e7', 'hash_binario')
+        }
+        self.assertEqual(
+            (valores[real.pk]['latitude_e7'], valores[real.pk]['longitude_e7']), (-235505199, -466333094)
+        )
+        self.assertEqual(bytes(valores[real.pk]['hash_binario']), b'\xab' * 32)
+        self.assertIsNone(valores[ajustada.pk]['hash_binario'])
+        self.assertEqual(
+            (valores[so_observacao.pk]['latitude_e7'], valores[so_observacao.pk]['longitude_e7']), (15000000, -22500000)
+        )
+
+        ajustes = self.apps.get_model('ponto', 'AjusteRegistroPonto').objects
+        self.assertEqual(
+            set(ajustes.values_list('registro_id', 'justificativa', 'observacoes')),
+            {(ajustada.pk, 'Esqueceu', ''), (so_observacao.pk, None, 'Conferido')},
+        )
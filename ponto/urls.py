@@ -21,4 +21,7 @@ urlpatterns = [
          views.excluir_registro_manual, name='excluir_registro_manual'),
     path('api/dias-incompletos-batch/', 
          views.verificar_dias_incompletos_batch, name='api_dias_incompletos_batch'),
+    path('espelho/', views.espelho_ponto, name='espelho_ponto'),
+    path('banco-horas/', views.extrato_banco_horas, name='extrato_banco_horas'),
+    path('banco-horas/<int:profissional_id>/', views.extrato_banco_horas, name='extrato_banco_horas_profissional'),
 ]
\ No newline at end of file
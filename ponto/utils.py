@@ -3,52 +3,27 @@ from datetime import datetime, time, timedelta
 from django.utils import timezone
 
 
-def calcular_tolerancia(profissional, horario_atual, tipo):
+def calcular_tolerancia(profissional, horario_atual, tipo, data=None):
     """
-    Calcula tolerância para entrada e saída
+    Calcula tolerância para entrada e saída pela jornada compilada do
+    profissional (ponto/jornada.py)
     Retorna: (minutos_atraso/antecipacao, dentro_tolerancia)
     """
-    if tipo == 'ENTRADA':
-        horario_previsto = profissional.horario_entrada
-        tolerancia = profissional.tolerancia_minutos or 10
-    else:
-        horario_previsto = profissional.horario_saida
-        tolerancia = profissional.tolerancia_minutos or 10
-
-    if not horario_previsto:
-        return 0, True
-
-    hoje = timezone.now().date()
-    horario_previsto_dt = datetime.combine(hoje, horario_previsto)
-    horario_atual_dt = datetime.combine(hoje, horario_atual)
-
-    if tipo == 'ENTRADA':
-        horario_limite = horario_previsto_dt + timedelta(minutes=tolerancia)
-        if horario_atual_dt > horario_limite:
-            diferenca = horario_atual_dt - horario_limite
-            minutos_atraso = int(diferenca.total_seconds() / 60)
-            return minutos_atraso, False
-        else:
-            return 0, True
-    else:  # SAIDA
-        horario_limite = horario_previsto_dt - timedelta(minutes=tolerancia)
-        if horario_atual_dt < horario_limite:
-            diferenca = horario_limite - horario_atual_dt
-            minutos_antecipacao = int(diferenca.total_seconds() / 60)
-            return minutos_antecipacao, False
-        else:
-            return 0, True
+    from .jornada import calcular_tolerancia_marcacao
+
+    data = data or timezone.now().date()
+    return calcular_tolerancia_marcacao(profissional, data, horario_atual, tipo)
 
 
 def determinar_proximo_tipo(profissional, estabelecimento, data):
     """
-    Determina próximo tipo considerando plantões de 24h
+    Determina próximo tipo considerando plantões que atravessam a meia-noite
+    (escala de plantão ou carga de 24h — ver ponto/escalas.py)
     """
+    from .escalas import atravessa_meia_noite
     from .models import RegistroPonto
 
-    is_plantao_24h = False
-    if profissional.carga_horaria_diaria:
-        is_plantao_24h = profissional.carga_horaria_diaria.total_seconds() == 86400
+    is_plantao_24h = atravessa_meia_noite(profissional)
 
     registros_hoje = RegistroPonto.objects.filter(
         profissional=profissional,
@@ -97,13 +72,10 @@ def verificar_registro_duplicado(profissional, estabelecimento, data, tipo):
     """
     Verifica se já existe registro do mesmo tipo no dia
     """
+    from .escalas import atravessa_meia_noite
     from .models import RegistroPonto
 
-    carga_horaria_24h = False
-    if profissional.carga_horaria_diaria:
-        carga_horaria_24h = profissional.carga_horaria_diaria.total_seconds() == 86400
-
-    if carga_horaria_24h and tipo == 'SAIDA':
+    if atravessa_meia_noite(profissional) and tipo == 'SAIDA':
         return False
 
     return RegistroPonto.objects.filter(
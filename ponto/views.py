@@ -21,7 +21,9 @@ from estabelecimentos.models import Estabelecimento
 from usuarios.models import Profissional
 from .models import RegistroPonto, RegistroManual
 from .utils import calcular_tolerancia, determinar_proximo_tipo, verificar_registro_duplicado
+from api.paginacao import PaginacaoCursorRegistros
 from api.serializers import RegistroPontoSerializer, RegistroPontoCreateSerializer
+from timeflow.db_router import ler_da_replica
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -44,7 +46,8 @@ JUSTIFICATIVAS_PREDEFINIDAS = [
 # ============================================================================
 
 class RegistroPontoViewSet(viewsets.ModelViewSet):
-    queryset = RegistroPonto.objects.all()
+    # RegistroPontoSerializer lê profissional e estabelecimento de cada linha
+    queryset = RegistroPonto.objects.select_related('profissional', 'estabelecimento')
     serializer_class = RegistroPontoSerializer
     # ⚠️ CORRIGIDO: antes estava AllowAny para o ViewSet inteiro, o que deixava
     # list/create/update/delete de QUALQUER registro de ponto abertos sem login.
@@ -52,6 +55,7 @@ class RegistroPontoViewSet(viewsets.ModelViewSet):
     # A action 'registrar' (usada pelo app de bater ponto via CPF) continua
     # aberta de propósito, com permission_classes própria abaixo.
     permission_classes = [IsAuthenticated]
+    pagination_class = PaginacaoCursorRegistros
 
     @action(detail=False, methods=['post'], permission_classes=[AllowAny])
     def registrar(self, request):
@@ -87,7 +91,7 @@ class RegistroPontoViewSet(viewsets.ModelViewSet):
                 )
             
             atraso_minutos, dentro_tolerancia = calcular_tolerancia(
-                profissional, horario_atual, tipo
+                profissional, horario_atual, tipo, hoje
             )
             
             registro = RegistroPonto(
@@ -98,10 +102,8 @@ class RegistroPontoViewSet(viewsets.ModelViewSet):
                 tipo=tipo,
                 latitude=latitude,
                 longitude=longitude,
-                atraso_minutos=atraso_minutos if tipo == 'ENTRADA' else 0,
-                saida_antecipada_minutos=atraso_minutos if tipo == 'SAIDA' else 0,
-                dentro_tolerancia=dentro_tolerancia
             )
+            registro.definir_tolerancia(atraso_minutos, dentro_tolerancia)
             
             registro.save()
             
@@ -402,9 +404,9 @@ def meus_ajustes_solicitados(request):
     profissional = request.user.profissional
     ajustes = RegistroManual.objects.filter(
         profissional=profissional
-    ).order_by('-data', '-horario')[:30]
+    ).select_related('ajustado_por').order_by('-data', '-horario')[:30]
     
-    return render(request, 'ponto/meus_ajustes.html', {
+    return render(request, 'meus_ajustes.html', {
         'ajustes': ajustes,
         'profissional': profissional
     })
@@ -416,9 +418,13 @@ def lista_ajustes_manuais(request):
     """
     Lista de todos os ajustes manuais (apenas admin)
     """
-    ajustes = RegistroManual.objects.all().order_by('-data', '-horario')[:100]
+    ajustes = (
+        RegistroManual.objects
+        .select_related('profissional', 'ajustado_por')
+        .order_by('-data', '-horario')[:100]
+    )
     
-    return render(request, 'ponto/lista_ajustes_manuais.html', {
+    return render(request, 'lista_ajustes_manuais.html', {
         'ajustes': ajustes
     })
 
@@ -664,29 +670,32 @@ def verificar_dias_incompletos_batch(request):
         profissionais = Profissional.objects.filter(ativo=True)
         resultado = []
         
-        for profissional in profissionais:
-            registros = RegistroPonto.objects.filter(
-                profissional=profissional,
-                data__gte=data_inicio,
-                data__lte=data_fim
-            )
+        # Marcações do período de todos os profissionais numa consulta só
+        # (antes era uma por profissional), agrupadas por profissional e data
+        registros_por_profissional = {}
+        registros = RegistroPonto.objects.filter(
+            profissional__ativo=True,
+            data__gte=data_inicio,
+            data__lte=data_fim
+        ).values_list('profissional_id', 'data', 'tipo')
+        for profissional_id, data, tipo in registros:
+            registros_por_data = registros_por_profissional.setdefault(profissional_id, {})
+            data_key = data.isoformat()
+            if data_key not in registros_por_data:
+                registros_por_data[data_key] = {'entradas': 0, 'saidas': 0}
             
-            # Agrupar por data
-            registros_por_data = {}
-            for registro in registros:
-                data_key = registro.data.isoformat()
-                if data_key not in registros_por_data:
-                    registros_por_data[data_key] = {'entradas': [], 'saidas': []}
-                
-                if registro.tipo == 'ENTRADA':
-                    registros_por_data[data_key]['entradas'].append(registro)
-                else:
-                    registros_por_data[data_key]['saidas'].append(registro)
+            if tipo == 'ENTRADA':
+                registros_por_data[data_key]['entradas'] += 1
+            else:
+                registros_por_data[data_key]['saidas'] += 1
+        
+        for profissional in profissionais:
+            registros_por_data = registros_por_profissional.get(profissional.id, {})
             
             # Verificar dias incompletos para este profissional
             dias_incompletos = []
             for data_str, registros_dia in registros_por_data.items():
-                if len(registros_dia['entradas']) > 0 and len(registros_dia['saidas']) == 0:
+                if registros_dia['entradas'] > 0 and registros_dia['saidas'] == 0:
                     dias_incompletos.append(data_str)
             
             if dias_incompletos:
@@ -884,9 +893,11 @@ def registro_manual_saida(request):
 # ============================================================================
 
 from .banco_horas import calcular_extrato_banco_horas
+from municipio.calendario import calendario_do_profissional
 
 
 @login_required
+@ler_da_replica
 def extrato_banco_horas(request, profissional_id=None):
     """
     Exibe o extrato do banco de horas: saldo total em destaque + extrato dia a dia.
@@ -897,8 +908,10 @@ def extrato_banco_horas(request, profissional_id=None):
             return redirect('extrato_banco_horas')
         profissional = get_object_or_404(Profissional, id=profissional_id)
     else:
-        # AJUSTE AQUI conforme como Profissional se relaciona com o User logado.
-        profissional = get_object_or_404(Profissional, cpf=request.user.username)
+        if not hasattr(request.user, 'profissional'):
+            messages.error(request, 'Você não tem um perfil profissional.')
+            return redirect('core:dashboard')
+        profissional = request.user.profissional
 
     hoje = timezone.now().date()
     data_inicio_str = request.GET.get('data_inicio')
@@ -911,9 +924,12 @@ def extrato_banco_horas(request, profissional_id=None):
         data_inicio = hoje.replace(day=1)
         data_fim = hoje
 
-    extrato = calcular_extrato_banco_horas(profissional, data_inicio, data_fim)
+    feriados = calendario_do_profissional(profissional).feriados_entre(
+        data_inicio, data_fim + timedelta(days=1)
+    )
+    extrato = calcular_extrato_banco_horas(profissional, data_inicio, data_fim, feriados=feriados)
 
-    return render(request, 'ponto/extrato_banco_horas.html', {
+    return render(request, 'extrato_banco_horas.html', {
         'profissional': profissional,
         'extrato': extrato,
         'data_inicio': data_inicio,
@@ -1000,9 +1016,9 @@ def registrar_ponto(request):
                 contexto['erro'] = f'Registro duplicado. Próximo registro esperado: {tipo_oposto.lower()}.'
                 return render(request, 'ponto/registro_ponto.html', contexto)
 
-            minutos, dentro_tolerancia = calcular_tolerancia(profissional, horario_atual, tipo)
+            minutos, dentro_tolerancia = calcular_tolerancia(profissional, horario_atual, tipo, hoje)
 
-            registro = RegistroPonto.objects.create(
+            registro = RegistroPonto(
                 profissional=profissional,
                 estabelecimento=estabelecimento,
                 data=hoje,
@@ -1010,10 +1026,9 @@ def registrar_ponto(request):
                 tipo=tipo,
                 latitude=latitude or 0,
                 longitude=longitude or 0,
-                atraso_minutos=minutos if tipo == 'ENTRADA' else 0,
-                saida_antecipada_minutos=minutos if tipo == 'SAIDA' else 0,
-                dentro_tolerancia=dentro_tolerancia,
             )
+            registro.definir_tolerancia(minutos, dentro_tolerancia)
+            registro.save()
 
             if dentro_tolerancia:
                 mensagem = 'Registro realizado com sucesso!'
@@ -1040,4 +1055,56 @@ def registrar_ponto(request):
             logger.exception('Erro ao registrar ponto pela tela pública')
             contexto['erro'] = 'Erro interno ao registrar o ponto. Tente novamente.'
 
-    return render(request, 'ponto/registro_ponto.html', contexto)
\ No newline at end of file
+    return render(request, 'ponto/registro_ponto.html', contexto)
+
+# ============================================================================
+# ESPELHO DE PONTO MENSAL (ponto/espelho.py)
+# ============================================================================
+
+from django.http import Http404, StreamingHttpResponse
+
+from tarefas.fila import enfileirar
+from .espelho import csv_espelhos, espelhos, nome_arquivo_espelho, periodo_do_mes
+
+
+@login_required
+@user_passes_test(lambda u: u.is_superuser or u.is_staff)
+@ler_da_replica
+def espelho_ponto(request):
+    """
+    Espelho de Ponto do mês (?mes=AAAA-MM, padrão: mês anterior) de todos os
+    profissionais ativos ou de um estabelecimento (?estabelecimento=ID).
+    CSV (?formato=csv) sai em streaming; PDF vai pra fila de tarefas.
+    """
+    try:
+        mes = datetime.strptime(request.GET.get('mes', ''), '%Y-%m').date()
+    except ValueError:
+        mes = timezone.now().date().replace(day=1) - timedelta(days=1)
+    data_inicio, data_fim = periodo_do_mes(mes.year, mes.month)
+    estabelecimento_id = request.GET.get('estabelecimento') or None
+    if estabelecimento_id:
+        if not estabelecimento_id.isdigit():
+            raise Http404('Estabelecimento inválido.')
+        estabelecimento_id = get_object_or_404(Estabelecimento, id=estabelecimento_id).pk
+
+    if request.GET.get('formato') == 'pdf':
+        tarefa = enfileirar(
+            'espelho_ponto_pdf',
+            {
+                'data_inicio': data_inicio.isoformat(),
+                'data_fim': data_fim.isoformat(),
+                'estabelecimento_id': estabelecimento_id,
+                'usuario': request.user.get_full_name() or request.user.username,
+            },
+            usuario=request.user,
+            reaproveitar_concluida=data_fim < timezone.now().date(),
+        )
+        return redirect('tarefas:acompanhar_tarefa', tarefa_id=tarefa.pk)
+
+    response = StreamingHttpResponse(
+        csv_espelhos(espelhos(data_inicio, data_fim, estabelecimento_id=estabelecimento_id)),
+        content_type='text/csv; charset=utf-8',
+    )
+    nome_arquivo = nome_arquivo_espelho(data_inicio, 'csv', estabelecimento_id)
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
+    return response
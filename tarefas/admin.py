@@ -0,0 +1,18 @@
+from django.contrib import admin
+
+from .models import Tarefa
+
+
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tipo', 'status', 'progresso', 'solicitado_por', 'criado_em', 'concluido_em', 'expira_em']
+    list_filter = ['status', 'tipo']
+    search_fields = ['chave', 'nome_arquivo']
+    readonly_fields = [
+        'tipo', 'parametros', 'chave', 'progresso', 'mensagem', 'erro', 'tentativas',
+        'arquivo', 'nome_arquivo', 'tipo_conteudo', 'tamanho', 'solicitado_por',
+        'criado_em', 'iniciado_em', 'atualizado_em', 'concluido_em', 'expira_em',
+    ]
+
+    def has_add_permission(self, request):
+        return False
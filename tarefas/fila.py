@@ -0,0 +1,226 @@
+# tarefas/fila.py
+"""
+Fila de tarefas em banco.
+
+- enfileirar(): cria a tarefa, ou devolve a que já existe pros mesmos
+  parâmetros (mesma chave) e ainda está na fila, rodando ou — se o pedido
+  permitir — concluída e não expirada. Pedido repetido (clique duplo,
+  recarregar a página) não gera PDF de novo;
+- reservar_proxima(): pega a tarefa pendente mais antiga com
+  SELECT ... FOR UPDATE SKIP LOCKED (onde o banco suporta) e confirma a
+  reserva com um UPDATE condicionado ao status — dois workers nunca
+  executam a mesma tarefa, nem no SQLite;
+- executar(): roda o executor do tipo (tarefas/tipos.py) — que devolve os
+  bytes ou um iterável de pedaços em bytes —, grava o arquivo
+  no armazenamento das tarefas (settings.TAREFAS_DIRETORIO) e marca a
+  validade (settings.TAREFAS_VALIDADE_HORAS);
+- liberar_travadas(): tarefa em execução sem sinal de vida (atualizado_em,
+  renovado a cada atualização de progresso) há mais de
+  settings.TAREFAS_TEMPO_MAXIMO segundos — o worker morreu no meio — volta
+  pra fila, até settings.TAREFAS_MAX_TENTATIVAS. Tarefa longa que continua
+  avançando não é tocada;
+- limpar_expiradas(): apaga arquivos e tarefas vencidos.
+
+Quem decide se um pedido vai pra fila é a view, com acima_do_limite().
+"""
+import hashlib
+import json
+import logging
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from timeflow.db_router import lendo_da_replica
+
+from .models import Tarefa
+from .tipos import EXECUTORES
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre sinais de vida enquanto o arquivo é gravado em pedaços.
+INTERVALO_BATIMENTO = 60
+
+
+def _configuracao(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+def acima_do_limite(data_inicio, data_fim):
+    """True se o período passa de settings.TAREFAS_LIMITE_DIAS dias."""
+    return (data_fim - data_inicio).days + 1 > _configuracao('TAREFAS_LIMITE_DIAS', 93)
+
+
+def chave_tarefa(tipo, parametros, usuario_id=None):
+    texto = json.dumps([tipo, parametros, usuario_id], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def enfileirar(tipo, parametros, usuario=None, reaproveitar_concluida=True):
+    """
+    Tarefa pros parâmetros (nova ou reaproveitada). `reaproveitar_concluida`
+    = False quando o resultado pode ter mudado (período que inclui hoje):
+    aí só junta com tarefa que ainda não terminou.
+    """
+    if tipo not in EXECUTORES:
+        raise ValueError(f'Tipo de tarefa desconhecido: {tipo}')
+
+    usuario_id = usuario.pk if usuario is not None else None
+    chave = chave_tarefa(tipo, parametros, usuario_id)
+    status_validos = [Tarefa.PENDENTE, Tarefa.EXECUTANDO]
+    if reaproveitar_concluida:
+        status_validos.append(Tarefa.CONCLUIDA)
+
+    # No default mesmo se a view lê da réplica (timeflow/db_router.py): a
+    # tarefa criada há um segundo pode não ter chegado lá.
+    existente = (
+        Tarefa.objects.using(DEFAULT_DB_ALIAS)
+        .filter(chave=chave, status__in=status_validos)
+        .exclude(expira_em__lte=timezone.now())
+        .order_by('-criado_em')
+        .first()
+    )
+    if existente is not None:
+        return existente
+
+    return Tarefa.objects.create(
+        tipo=tipo,
+        parametros=parametros,
+        chave=chave,
+        solicitado_por_id=usuario_id,
+        mensagem='Na fila',
+    )
+
+
+def reservar_proxima():
+    """Reserva a tarefa pendente mais antiga pra este worker (ou None)."""
+    while True:
+        with transaction.atomic():
+            pendentes = Tarefa.objects.filter(status=Tarefa.PENDENTE).order_by('criado_em')
+            if connection.features.has_select_for_update_skip_locked:
+                pendentes = pendentes.select_for_update(skip_locked=True)
+            tarefa = pendentes.first()
+            if tarefa is None:
+                return None
+            agora = timezone.now()
+            reservada = Tarefa.objects.filter(pk=tarefa.pk, status=Tarefa.PENDENTE).update(
+                status=Tarefa.EXECUTANDO,
+                iniciado_em=agora,
+                atualizado_em=agora,
+                tentativas=tarefa.tentativas + 1,
+                progresso=0,
+                mensagem='Iniciando',
+            )
+        if reservada:
+            tarefa.refresh_from_db()
+            return tarefa
+        # Outro worker reservou entre a leitura e o UPDATE: tenta a próxima.
+
+
+def _atualizar(tarefa, **campos):
+    # using() não passa pelo roteador: o progresso não conta como gravação
+    # que tiraria o executor da réplica.
+    Tarefa.objects.using(DEFAULT_DB_ALIAS).filter(pk=tarefa.pk).update(atualizado_em=timezone.now(), **campos)
+
+
+def _progresso(tarefa):
+    def atualizar(percentual, mensagem=''):
+        percentual = max(0, min(99, int(percentual)))
+        _atualizar(tarefa, progresso=percentual, mensagem=mensagem[:200])
+    return atualizar
+
+
+def _gravar_arquivo(tarefa, nome_arquivo, conteudo):
+    """Grava o resultado no armazenamento da tarefa; devolve o tamanho em bytes."""
+    if isinstance(conteudo, (bytes, bytearray)):
+        tarefa.arquivo.save(nome_arquivo, ContentFile(conteudo), save=False)
+        return len(conteudo)
+    # Executor que devolve pedaços (AEJ): vão pra um temporário em disco em
+    # vez de juntar o arquivo inteiro na memória. Os pedaços são gerados
+    # aqui, sem chamadas de progresso — o sinal de vida vai junto.
+    ultimo_batimento = time.monotonic()
+    with tempfile.TemporaryFile() as temporario:
+        for pedaco in conteudo:
+            temporario.write(pedaco)
+            if time.monotonic() - ultimo_batimento >= INTERVALO_BATIMENTO:
+                _atualizar(tarefa)
+                ultimo_batimento = time.monotonic()
+        tamanho = temporario.tell()
+        temporario.seek(0)
+        tarefa.arquivo.save(nome_arquivo, File(temporario), save=False)
+    return tamanho
+
+
+def executar(tarefa):
+    """Roda a tarefa já reservada e grava o resultado (ou o erro)."""
+    try:
+        # Relatórios e arquivos grandes: leitura na réplica, se houver.
+        with lendo_da_replica():
+            nome_arquivo, conteudo, tipo_conteudo = EXECUTORES[tarefa.tipo](tarefa.parametros, _progresso(tarefa))
+            tamanho = _gravar_arquivo(tarefa, nome_arquivo, conteudo)
+    except Exception as e:
+        logger.exception('Erro na tarefa %s', tarefa.pk)
+        tarefa.status = Tarefa.ERRO
+        tarefa.erro = str(e)
+        tarefa.mensagem = 'Erro ao gerar o arquivo'
+        tarefa.concluido_em = timezone.now()
+        tarefa.expira_em = tarefa.concluido_em + timedelta(hours=_configuracao('TAREFAS_VALIDADE_HORAS', 24))
+        tarefa.save(update_fields=['status', 'erro', 'mensagem', 'concluido_em', 'expira_em'])
+        return tarefa
+
+    agora = timezone.now()
+    tarefa.status = Tarefa.CONCLUIDA
+    tarefa.progresso = 100
+    tarefa.mensagem = 'Pronto para baixar'
+    tarefa.erro = ''
+    tarefa.nome_arquivo = nome_arquivo
+    tarefa.tipo_conteudo = tipo_conteudo
+    tarefa.tamanho = tamanho
+    tarefa.concluido_em = agora
+    tarefa.expira_em = agora + timedelta(hours=_configuracao('TAREFAS_VALIDADE_HORAS', 24))
+    tarefa.save()
+    return tarefa
+
+
+def processar_proxima():
+    """Reserva e executa uma tarefa; None se a fila está vazia."""
+    tarefa = reservar_proxima()
+    if tarefa is None:
+        return None
+    return executar(tarefa)
+
+
+def liberar_travadas():
+    """Devolve pra fila (ou marca erro) as tarefas em execução sem sinal de vida."""
+    limite = timezone.now() - timedelta(seconds=_configuracao('TAREFAS_TEMPO_MAXIMO', 1800))
+    travadas = Tarefa.objects.filter(status=Tarefa.EXECUTANDO).filter(
+        Q(atualizado_em__lt=limite) | Q(atualizado_em__isnull=True, iniciado_em__lt=limite)
+    )
+    maximo = _configuracao('TAREFAS_MAX_TENTATIVAS', 3)
+    devolvidas = travadas.filter(tentativas__lt=maximo).update(
+        status=Tarefa.PENDENTE, mensagem='Na fila (nova tentativa)'
+    )
+    agora = timezone.now()
+    travadas.update(
+        status=Tarefa.ERRO,
+        erro='Tempo máximo de execução excedido',
+        mensagem='Erro ao gerar o arquivo',
+        concluido_em=agora,
+        expira_em=agora + timedelta(hours=_configuracao('TAREFAS_VALIDADE_HORAS', 24)),
+    )
+    return devolvidas
+
+
+def limpar_expiradas():
+    """Apaga as tarefas vencidas e seus arquivos. Retorna quantas."""
+    expiradas = list(Tarefa.objects.filter(expira_em__lte=timezone.now()))
+    for tarefa in expiradas:
+        if tarefa.arquivo:
+            tarefa.arquivo.delete(save=False)
+    Tarefa.objects.filter(pk__in=[tarefa.pk for tarefa in expiradas]).delete()
+    return len(expiradas)
@@ -0,0 +1,88 @@
+# tarefas/management/commands/processar_tarefas.py
+"""
+Worker da fila de tarefas (tarefas/fila.py). Rode um ou mais processos
+destes ao lado do servidor web (systemd, supervisor...) — cada tarefa é
+reservada por um worker só.
+
+Uso:
+    python manage.py processar_tarefas                 # fica rodando
+    python manage.py processar_tarefas --uma-vez       # esvazia a fila e sai (cron)
+    python manage.py processar_tarefas --intervalo 10
+    python manage.py processar_tarefas --dry-run       # só lista a fila
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tarefas.fila import liberar_travadas, limpar_expiradas, processar_proxima
+from tarefas.models import Tarefa
+
+INTERVALO_MANUTENCAO = 300  # segundos entre limpezas de expiradas/travadas
+
+
+class Command(BaseCommand):
+    help = 'Executa as tarefas em segundo plano (relatórios em PDF, AFD) da fila no banco.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--uma-vez',
+            action='store_true',
+            help='Processa o que estiver na fila e sai, em vez de ficar esperando.',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5,
+            help='Segundos de espera quando a fila está vazia (padrão: 5).',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Só mostra as tarefas na fila e em execução, sem executar nada.',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            fila = Tarefa.objects.filter(status__in=[Tarefa.PENDENTE, Tarefa.EXECUTANDO]).order_by('criado_em')
+            for tarefa in fila:
+                self.stdout.write(
+                    f'#{tarefa.pk} {tarefa.tipo} {tarefa.status} {tarefa.progresso}% '
+                    f'criada {tarefa.criado_em:%d/%m/%Y %H:%M} {tarefa.parametros}'
+                )
+            self.stdout.write(f'{len(fila)} tarefa(s) na fila ou em execução.')
+            self.stdout.write(self.style.WARNING('Nenhuma tarefa executada (--dry-run).'))
+            return
+
+        ultima_manutencao = None
+        processadas = 0
+        while True:
+            agora = time.monotonic()
+            if ultima_manutencao is None or agora - ultima_manutencao >= INTERVALO_MANUTENCAO:
+                devolvidas = liberar_travadas()
+                removidas = limpar_expiradas()
+                if devolvidas or removidas:
+                    self.stdout.write(f'{devolvidas} tarefa(s) travada(s) devolvida(s), {removidas} expirada(s) removida(s).')
+                ultima_manutencao = agora
+
+            inicio = time.monotonic()
+            tarefa = processar_proxima()
+            if tarefa is None:
+                if options['uma_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+
+            processadas += 1
+            duracao = time.monotonic() - inicio
+            if tarefa.status == Tarefa.CONCLUIDA:
+                self.stdout.write(self.style.SUCCESS(
+                    f'[{timezone.now():%H:%M:%S}] #{tarefa.pk} {tarefa.tipo}: {tarefa.nome_arquivo} '
+                    f'({tarefa.tamanho} bytes, {duracao:.1f}s)'
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f'[{timezone.now():%H:%M:%S}] #{tarefa.pk} {tarefa.tipo}: {tarefa.erro}'
+                ))
+
+        self.stdout.write(self.style.SUCCESS(f'{processadas} tarefa(s) processada(s).'))
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:44
+
+import django.db.models.deletion
+import tarefas.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('relatorio_profissional_pdf', 'Relatório do profissional (PDF)'), ('relatorio_consolidado_pdf', 'Relatório consolidado (PDF)'), ('afd', 'Arquivo Fonte de Dados (AFD)')], max_length=50)),
+                ('parametros', models.JSONField(default=dict)),
+                ('chave', models.CharField(db_index=True, max_length=64)),
+                ('status', models.CharField(choices=[('PENDENTE', 'Na fila'), ('EXECUTANDO', 'Em execução'), ('CONCLUIDA', 'Concluída'), ('ERRO', 'Erro')], default='PENDENTE', max_length=12)),
+                ('progresso', models.PositiveSmallIntegerField(default=0)),
+                ('mensagem', models.CharField(blank=True, max_length=200)),
+                ('erro', models.TextField(blank=True)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('arquivo', models.FileField(blank=True, storage=tarefas.models.armazenamento_tarefas, upload_to='%Y/%m/')),
+                ('nome_arquivo', models.CharField(blank=True, max_length=200)),
+                ('tipo_conteudo', models.CharField(blank=True, max_length=100)),
+                ('tamanho', models.PositiveBigIntegerField(default=0)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+                ('expira_em', models.DateTimeField(blank=True, null=True)),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tarefa',
+                'verbose_name_plural': 'Tarefas',
+                'ordering': ['-criado_em'],
+                'indexes': [models.Index(fields=['status', 'criado_em'], name='tarefas_tar_status_116136_idx')],
+            },
+        ),
+    ]
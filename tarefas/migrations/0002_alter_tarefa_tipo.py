@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tarefas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tarefa',
+            name='tipo',
+            field=models.CharField(choices=[('relatorio_profissional_pdf', 'Relatório do profissional (PDF)'), ('relatorio_consolidado_pdf', 'Relatório consolidado (PDF)'), ('afd', 'Arquivo Fonte de Dados (AFD)'), ('espelho_ponto_pdf', 'Espelho de Ponto (PDF)')], max_length=50),
+        ),
+    ]
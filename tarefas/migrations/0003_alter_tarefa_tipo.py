@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tarefas', '0002_alter_tarefa_tipo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tarefa',
+            name='tipo',
+            field=models.CharField(choices=[('relatorio_profissional_pdf', 'Relatório do profissional (PDF)'), ('relatorio_consolidado_pdf', 'Relatório consolidado (PDF)'), ('afd', 'Arquivo Fonte de Dados (AFD)'), ('aej', 'Arquivo Eletrônico de Jornada (AEJ)'), ('espelho_ponto_pdf', 'Espelho de Ponto (PDF)')], max_length=50),
+        ),
+    ]
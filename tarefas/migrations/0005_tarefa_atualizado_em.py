@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tarefas', '0004_alter_tarefa_tipo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarefa',
+            name='atualizado_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,85 @@
+# tarefas/models.py
+"""
+Fila de tarefas em banco (sem broker externo): relatórios e arquivos
+pesados são gerados por um worker (`python manage.py processar_tarefas`)
+em vez de dentro do request. Ver tarefas/fila.py.
+"""
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.utils import timezone
+
+
+def armazenamento_tarefas():
+    """Arquivos gerados ficam fora do MEDIA_ROOT — só saem pela view de
+    download, que confere quem pediu."""
+    return FileSystemStorage(location=settings.TAREFAS_DIRETORIO)
+
+
+class Tarefa(models.Model):
+    PENDENTE = 'PENDENTE'
+    EXECUTANDO = 'EXECUTANDO'
+    CONCLUIDA = 'CONCLUIDA'
+    ERRO = 'ERRO'
+    STATUS = [
+        (PENDENTE, 'Na fila'),
+        (EXECUTANDO, 'Em execução'),
+        (CONCLUIDA, 'Concluída'),
+        (ERRO, 'Erro'),
+    ]
+
+    TIPOS = [
+        ('relatorio_profissional_pdf', 'Relatório do profissional (PDF)'),
+        ('relatorio_consolidado_pdf', 'Relatório consolidado (PDF)'),
+        ('afd', 'Arquivo Fonte de Dados (AFD)'),
+        ('aej', 'Arquivo Eletrônico de Jornada (AEJ)'),
+        ('espelho_ponto_pdf', 'Espelho de Ponto (PDF)'),
+        ('exportacao_xlsx', 'Exportação de marcações (XLSX)'),
+        ('relatorios_estabelecimento_zip', 'Relatórios do estabelecimento (ZIP de PDFs)'),
+    ]
+
+    tipo = models.CharField(max_length=50, choices=TIPOS)
+    parametros = models.JSONField(default=dict)
+    # sha256 de tipo + parâmetros + quem pediu: pedido repetido reaproveita a tarefa.
+    chave = models.CharField(max_length=64, db_index=True)
+
+    status = models.CharField(max_length=12, choices=STATUS, default=PENDENTE)
+    progresso = models.PositiveSmallIntegerField(default=0)
+    mensagem = models.CharField(max_length=200, blank=True)
+    erro = models.TextField(blank=True)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+
+    arquivo = models.FileField(upload_to='%Y/%m/', storage=armazenamento_tarefas, blank=True)
+    nome_arquivo = models.CharField(max_length=200, blank=True)
+    tipo_conteudo = models.CharField(max_length=100, blank=True)
+    tamanho = models.PositiveBigIntegerField(default=0)
+
+    solicitado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    # Sinal de vida do worker: renovado a cada atualização de progresso.
+    # Sem renovação por TAREFAS_TEMPO_MAXIMO, a tarefa é dada como travada.
+    atualizado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+    expira_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Tarefa'
+        verbose_name_plural = 'Tarefas'
+        ordering = ['-criado_em']
+        indexes = [
+            models.Index(fields=['status', 'criado_em']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def expirada(self):
+        return self.expira_em is not None and self.expira_em <= timezone.now()
+
+    @property
+    def disponivel(self):
+        return self.status == self.CONCLUIDA and bool(self.arquivo) and not self.expirada
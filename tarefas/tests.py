@@ -0,0 +1,76 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import criar_estabelecimento
+
+from .fila import _progresso, liberar_travadas
+from .models import Tarefa
+
+
+@override_settings(TAREFAS_TEMPO_MAXIMO=600, TAREFAS_MAX_TENTATIVAS=3)
+class LiberarTravadasTests(TestCase):
+    """tarefas/fila.py:liberar_travadas — vale o último sinal de vida, não o início."""
+
+    def executando(self, iniciada_ha, atualizada_ha, tentativas=1):
+        agora = timezone.now()
+        return Tarefa.objects.create(
+            tipo='afd', chave='x', status=Tarefa.EXECUTANDO, tentativas=tentativas,
+            iniciado_em=agora - iniciada_ha,
+            atualizado_em=agora - atualizada_ha if atualizada_ha is not None else None,
+        )
+
+    def test_tarefa_longa_que_avanca_nao_e_liberada(self):
+        tarefa = self.executando(timedelta(hours=2), timedelta(minutes=1))
+        self.assertEqual(liberar_travadas(), 0)
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, Tarefa.EXECUTANDO)
+
+    def test_progresso_renova_o_sinal_de_vida(self):
+        tarefa = self.executando(timedelta(hours=2), timedelta(hours=1))
+        _progresso(tarefa)(50, 'Metade')
+        self.assertEqual(liberar_travadas(), 0)
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.progresso, tarefa.status), (50, Tarefa.EXECUTANDO))
+
+    def test_sem_sinal_de_vida_volta_pra_fila_ou_vira_erro(self):
+        parada = self.executando(timedelta(hours=2), timedelta(minutes=20))
+        antiga = self.executando(timedelta(hours=2), None)
+        esgotada = self.executando(timedelta(hours=2), timedelta(minutes=20), tentativas=3)
+        self.assertEqual(liberar_travadas(), 2)
+        for tarefa in (parada, antiga, esgotada):
+            tarefa.refresh_from_db()
+        self.assertEqual(parada.status, Tarefa.PENDENTE)
+        self.assertEqual(antiga.status, Tarefa.PENDENTE)
+        self.assertEqual(esgotada.status, Tarefa.ERRO)
+
+
+class RelatoriosEstabelecimentoTests(TestCase):
+    """O zip de PDFs do estabelecimento vai pra fila; o pool de processos não roda no request."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        self.estabelecimento = criar_estabelecimento()
+        self.client.force_login(self.admin)
+
+    def test_view_enfileira_e_mostra_a_tarefa(self):
+        url = reverse('core:relatorios_estabelecimento_pdf', args=[self.estabelecimento.pk])
+        with mock.patch('core.lote_pdf.ProcessPoolExecutor') as pool:
+            resposta = self.client.get(url, {'data_inicio': '2020-01-01', 'data_fim': '2024-12-31'})
+        pool.assert_not_called()
+
+        tarefa = Tarefa.objects.get()
+        self.assertRedirects(resposta, reverse('tarefas:acompanhar_tarefa', args=[tarefa.pk]),
+                             fetch_redirect_response=False)
+        self.assertEqual(tarefa.tipo, 'relatorios_estabelecimento_zip')
+        self.assertEqual(tarefa.parametros['estabelecimento_id'], self.estabelecimento.pk)
+        self.assertEqual((tarefa.parametros['data_inicio'], tarefa.parametros['data_fim']),
+                         ('2020-01-01', '2024-12-31'))
+
+        # Pedido repetido junta com a mesma tarefa.
+        self.client.get(url, {'data_inicio': '2020-01-01', 'data_fim': '2024-12-31'})
+        self.assertEqual(Tarefa.objects.count(), 1)
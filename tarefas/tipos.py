@@ -0,0 +1,144 @@
+# tarefas/tipos.py
+"""
+O que cada tipo de tarefa executa. Cada função recebe os parâmetros
+gravados na tarefa (JSON) e a função de progresso, e devolve
+(nome_arquivo, conteudo_bytes, tipo_conteudo) — conteudo pode ser um
+iterável de pedaços em bytes, gravado aos poucos (AEJ, exportação XLSX).
+
+As funções de geração são as mesmas que as views usam para períodos
+curtos (core/documentos.py, afd/gerador.py, ponto/espelho.py, core/exportacao.py) — a fila só muda onde rodam.
+Os PDFs de um estabelecimento inteiro (core/lote_pdf.py) só rodam aqui.
+"""
+from datetime import datetime
+
+
+def _data(valor):
+    return datetime.strptime(valor, '%Y-%m-%d').date()
+
+
+def relatorio_profissional_pdf(parametros, progresso):
+    from core.documentos import pdf_relatorio_profissional
+    from usuarios.models import Profissional
+
+    profissional = Profissional.objects.get(pk=parametros['profissional_id'])
+    nome_arquivo, conteudo = pdf_relatorio_profissional(
+        profissional,
+        _data(parametros['data_inicio']),
+        _data(parametros['data_fim']),
+        parametros['usuario'],
+        progresso=progresso,
+    )
+    return nome_arquivo, conteudo, 'application/pdf'
+
+
+def relatorio_consolidado_pdf(parametros, progresso):
+    from core.documentos import contexto_relatorio_consolidado, pdf_relatorio_consolidado
+    from usuarios.models import Profissional
+
+    profissional = Profissional.objects.get(pk=parametros['profissional_id'])
+    progresso(10, 'Buscando marcações')
+    contexto = contexto_relatorio_consolidado(
+        profissional,
+        _data(parametros['data_inicio']),
+        _data(parametros['data_fim']),
+        mes=parametros.get('mes'),
+        ano=parametros.get('ano'),
+    )
+    nome_arquivo, conteudo = pdf_relatorio_consolidado(contexto, parametros['usuario'], progresso=progresso)
+    return nome_arquivo, conteudo, 'application/pdf'
+
+
+def afd(parametros, progresso):
+    from afd.gerador import gerar_afd
+
+    progresso(10, 'Buscando marcações e eventos')
+    nome_arquivo, conteudo = gerar_afd(_data(parametros['data_inicio']), _data(parametros['data_fim']))
+    progresso(90, 'Gravando o arquivo')
+    return nome_arquivo, conteudo.encode('iso-8859-1', errors='replace'), 'text/plain; charset=iso-8859-1'
+
+
+def aej(parametros, progresso):
+    from afd.gerador_aej import gerar_aej, nome_arquivo_aej
+
+    estabelecimento_id = parametros.get('estabelecimento_id')
+    progresso(10, 'Gerando vínculos, marcações e jornada')
+    pedacos = gerar_aej(
+        _data(parametros['data_inicio']), _data(parametros['data_fim']), estabelecimento_id=estabelecimento_id,
+    )
+    conteudo = (pedaco.encode('iso-8859-1', errors='replace') for pedaco in pedacos)
+    return nome_arquivo_aej(estabelecimento_id), conteudo, 'text/plain; charset=iso-8859-1'
+
+
+def espelho_ponto_pdf(parametros, progresso):
+    from ponto.espelho import espelhos, nome_arquivo_espelho, pdf_espelhos
+
+    data_inicio = _data(parametros['data_inicio'])
+    data_fim = _data(parametros['data_fim'])
+    estabelecimento_id = parametros.get('estabelecimento_id')
+    progresso(10, 'Buscando marcações e ajustes')
+    conteudo = pdf_espelhos(
+        espelhos(data_inicio, data_fim, estabelecimento_id=estabelecimento_id),
+        data_inicio, data_fim, parametros['usuario'],
+    )
+    return nome_arquivo_espelho(data_inicio, 'pdf', estabelecimento_id), conteudo, 'application/pdf'
+
+
+def relatorios_estabelecimento_zip(parametros, progresso):
+    from core.lote_pdf import nome_arquivo_zip_lote, profissionais_do_estabelecimento, renderizar_lote, zip_lote
+    from estabelecimentos.models import Estabelecimento
+
+    estabelecimento = Estabelecimento.objects.get(pk=parametros['estabelecimento_id'])
+    data_inicio = _data(parametros['data_inicio'])
+    data_fim = _data(parametros['data_fim'])
+    profissionais = list(profissionais_do_estabelecimento(estabelecimento.pk))
+    progresso(5, 'Buscando marcações')
+
+    def documentos():
+        # O pool de processos (core/lote_pdf.py) vive só aqui, no worker.
+        for feitos, documento in enumerate(
+            renderizar_lote(profissionais, data_inicio, data_fim, parametros['usuario']), 1
+        ):
+            yield documento
+            progresso(5 + 90 * feitos // len(profissionais), f'{feitos} de {len(profissionais)} PDFs')
+
+    return (
+        nome_arquivo_zip_lote(estabelecimento, data_inicio, data_fim), zip_lote(documentos()),
+        'application/zip',
+    )
+
+
+def exportacao_xlsx(parametros, progresso):
+    from core.exportacao import (
+        marcacoes_arquivadas_filtradas, nome_arquivo_exportacao, registros_filtrados, xlsx_registros,
+    )
+
+    filtros = {
+        'data_inicio': _data(parametros['data_inicio']) if parametros.get('data_inicio') else None,
+        'data_fim': _data(parametros['data_fim']) if parametros.get('data_fim') else None,
+        'estabelecimento_id': parametros.get('estabelecimento_id'),
+        'profissional_id': parametros.get('profissional_id'),
+    }
+    progresso(10, 'Gerando a planilha')
+
+    def pedacos(arquivo):
+        with arquivo:
+            while pedaco := arquivo.read(64 * 1024):
+                yield pedaco
+
+    conteudo = pedacos(xlsx_registros(registros_filtrados(**filtros), marcacoes_arquivadas_filtradas(**filtros)))
+    progresso(90, 'Gravando o arquivo')
+    return (
+        nome_arquivo_exportacao('xlsx', **filtros), conteudo,
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+
+EXECUTORES = {
+    'relatorio_profissional_pdf': relatorio_profissional_pdf,
+    'relatorio_consolidado_pdf': relatorio_consolidado_pdf,
+    'afd': afd,
+    'aej': aej,
+    'espelho_ponto_pdf': espelho_ponto_pdf,
+    'exportacao_xlsx': exportacao_xlsx,
+    'relatorios_estabelecimento_zip': relatorios_estabelecimento_zip,
+}
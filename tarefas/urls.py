@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+app_name = 'tarefas'
+
+urlpatterns = [
+    path('<int:tarefa_id>/', views.acompanhar_tarefa, name='acompanhar_tarefa'),
+    path('<int:tarefa_id>/status/', views.status_tarefa, name='status_tarefa'),
+    path('<int:tarefa_id>/baixar/', views.baixar_tarefa, name='baixar_tarefa'),
+]
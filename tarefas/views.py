@@ -0,0 +1,60 @@
+# tarefas/views.py
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+
+from .models import Tarefa
+
+
+def _tarefa_do_usuario(request, tarefa_id):
+    """Só quem pediu (ou superusuário) vê a tarefa e baixa o arquivo."""
+    tarefa = get_object_or_404(Tarefa, pk=tarefa_id)
+    if not request.user.is_superuser and tarefa.solicitado_por_id != request.user.pk:
+        raise Http404
+    return tarefa
+
+
+def _situacao(tarefa):
+    return {
+        'id': tarefa.pk,
+        'tipo': tarefa.tipo,
+        'descricao': tarefa.get_tipo_display(),
+        'status': tarefa.status,
+        'status_descricao': tarefa.get_status_display(),
+        'progresso': tarefa.progresso,
+        'mensagem': tarefa.mensagem,
+        'disponivel': tarefa.disponivel,
+        'expira_em': tarefa.expira_em.strftime('%d/%m/%Y %H:%M') if tarefa.expira_em else None,
+        'url_download': reverse('tarefas:baixar_tarefa', args=[tarefa.pk]) if tarefa.disponivel else None,
+    }
+
+
+@login_required
+def acompanhar_tarefa(request, tarefa_id):
+    """Página com o andamento da tarefa; atualiza sozinha até ficar pronta."""
+    tarefa = _tarefa_do_usuario(request, tarefa_id)
+    return render(request, 'tarefas/acompanhar_tarefa.html', {
+        'tarefa': tarefa,
+        'situacao': _situacao(tarefa),
+    })
+
+
+@login_required
+def status_tarefa(request, tarefa_id):
+    return JsonResponse(_situacao(_tarefa_do_usuario(request, tarefa_id)))
+
+
+@login_required
+def baixar_tarefa(request, tarefa_id):
+    tarefa = _tarefa_do_usuario(request, tarefa_id)
+    if tarefa.expirada:
+        return HttpResponse('Arquivo expirado. Gere o relatório novamente.', status=410)
+    if not tarefa.disponivel:
+        return redirect('tarefas:acompanhar_tarefa', tarefa_id=tarefa.pk)
+    return FileResponse(
+        tarefa.arquivo.open('rb'),
+        as_attachment=True,
+        filename=tarefa.nome_arquivo,
+        content_type=tarefa.tipo_conteudo,
+    )
@@ -0,0 +1,30 @@
+# timeflow/cache.py
+"""
+Cache do Django por processo ou compartilhado.
+
+O dashboard (core/cache_painel.py), o índice de ocupação
+(ponto/ocupacao.py) e os calendários (municipio/calendario.py) invalidam o
+que guardam incrementando contadores de versão no cache `default`. Com um
+cache compartilhado (Redis, Memcached) o incremento feito por um worker vale
+pra todos. Com um cache por processo (LocMemCache, o padrão, ou
+DummyCache) cada worker só vê os próprios incrementos — então, nesse caso,
+esses módulos não guardam nada por mais de CACHE_VALIDADE_LOCAL segundos.
+"""
+from django.conf import settings
+
+# Backends que guardam o cache dentro do próprio processo (ou não guardam).
+CACHES_POR_PROCESSO = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_por_processo():
+    return settings.CACHES.get('default', {}).get('BACKEND', '') in CACHES_POR_PROCESSO
+
+
+def validade_local():
+    """Segundos que um valor dependente de versão vale, ou None (sem limite) com cache compartilhado."""
+    if cache_por_processo():
+        return getattr(settings, 'CACHE_VALIDADE_LOCAL', 60)
+    return None
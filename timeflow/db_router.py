@@ -0,0 +1,174 @@
+# timeflow/db_router.py
+"""
+Réplicas de leitura.
+
+Relatórios, dashboard, histórico e exportações (as views marcadas com
+@ler_da_replica) leem de uma das réplicas de settings.REPLICAS_LEITURA;
+todo o resto — batidas de ponto, alocação de NSR, ajustes, login — lê e
+grava no `default`. Sem réplica configurada (DB_REPLICAS vazio) nada muda.
+
+Regras do RoteadorReplicas:
+
+- gravação sempre no `default`;
+- leitura na réplica só dentro de uma view @ler_da_replica (ou de um bloco
+  `with lendo_da_replica()`), e mesmo assim vai pro `default`:
+  - dentro de transaction.atomic() no `default` (select_for_update,
+    reconstruções: o que se lê ali é base pra gravar);
+  - depois da primeira gravação no mesmo request/bloco;
+  - por REPLICA_JANELA_POS_ESCRITA segundos depois de o usuário gravar
+    alguma coisa (ReplicaMiddleware marca no cache) — quem acabou de fazer
+    um ajuste e abre o histórico vê o ajuste, mesmo com a réplica atrasada.
+
+A janela é por usuário autenticado. Endpoints anônimos que precisam ler o
+que acabaram de gravar (o histórico do app logo depois da batida) não são
+marcados e ficam no `default`.
+
+Testando local com dois arquivos SQLite: copie o banco
+(`sqlite3 db.sqlite3 ".backup db_replica.sqlite3"`) e rode com
+DB_REPLICAS=db_replica.sqlite3 — o que for gravado depois da cópia só
+aparece nas views da réplica quando copiar de novo, como uma réplica
+atrasada.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Réplica escolhida pro request/bloco atual (None = tudo no default).
+_replica = ContextVar('timeflow_replica', default=None)
+# Houve gravação no request/bloco atual.
+_escreveu = ContextVar('timeflow_escreveu', default=False)
+
+
+def replicas():
+    return list(getattr(settings, 'REPLICAS_LEITURA', []))
+
+
+def janela_pos_escrita():
+    return getattr(settings, 'REPLICA_JANELA_POS_ESCRITA', 10)
+
+
+def _chave_escrita(usuario):
+    return f'replica:escrita:{usuario.pk}'
+
+
+def _usuario(request):
+    usuario = getattr(request, 'user', None)
+    return usuario if usuario is not None and usuario.is_authenticated else None
+
+
+def gravou_recentemente(request):
+    """True se o usuário do request gravou algo nos últimos REPLICA_JANELA_POS_ESCRITA segundos."""
+    usuario = _usuario(request)
+    return usuario is not None and cache.get(_chave_escrita(usuario)) is not None
+
+
+def usando_replica():
+    """Alias da réplica que as leituras usariam agora (None = default)."""
+    alias = _replica.get()
+    if alias is None or _escreveu.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return None
+    return alias
+
+
+@contextmanager
+def lendo_da_replica(alias=None):
+    """
+    Leituras do bloco vão pra `alias` (ou uma réplica sorteada), com as
+    mesmas exceções do roteador. Sem réplica configurada, não faz nada.
+    """
+    alias = alias or (random.choice(replicas()) if replicas() else None)
+    if alias is None:
+        yield None
+        return
+    token_replica = _replica.set(alias)
+    token_escreveu = _escreveu.set(False)
+    try:
+        yield alias
+    finally:
+        escreveu = _escreveu.get()
+        _escreveu.reset(token_escreveu)
+        _replica.reset(token_replica)
+        if escreveu:
+            _escreveu.set(True)
+
+
+def _na_replica(conteudo, alias):
+    # StreamingHttpResponse consulta o banco enquanto o conteúdo é
+    # consumido, depois que a view já retornou. Um bloco por pedaço: o
+    # servidor pode consumir cada pedaço num contexto diferente (ASGI).
+    pedacos = iter(conteudo)
+    while True:
+        with lendo_da_replica(alias):
+            pedaco = next(pedacos, None)
+        if pedaco is None:
+            return
+        yield pedaco
+
+
+def ler_da_replica(view):
+    """
+    Decorator de view: as leituras vão pra uma réplica, salvo se o usuário
+    gravou algo há pouco (ou se o request não é GET/HEAD). Em views do DRF
+    (@api_view), use logo acima da função, abaixo dos decorators do DRF —
+    assim o usuário do JWT já está autenticado.
+    """
+    @wraps(view)
+    def _view(request, *args, **kwargs):
+        if not replicas() or request.method not in ('GET', 'HEAD') or gravou_recentemente(request):
+            return view(request, *args, **kwargs)
+        with lendo_da_replica() as alias:
+            resposta = view(request, *args, **kwargs)
+        if getattr(resposta, 'streaming', False):
+            resposta.streaming_content = _na_replica(resposta.streaming_content, alias)
+        return resposta
+    return _view
+
+
+class RoteadorReplicas:
+    """Ver o docstring do módulo."""
+
+    def db_for_read(self, model, **hints):
+        return usando_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _escreveu.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bancos = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in bancos and obj2._state.db in bancos:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # As réplicas recebem o schema pela replicação.
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    Marca no cache, por REPLICA_JANELA_POS_ESCRITA segundos, o usuário cujo
+    request gravou no banco — nesse tempo as views @ler_da_replica leem do
+    default pra ele. Vai depois do AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _escreveu.set(False)
+        try:
+            resposta = self.get_response(request)
+            usuario = _usuario(request)
+            if _escreveu.get() and usuario is not None and replicas():
+                cache.set(_chave_escrita(usuario), 1, janela_pos_escrita())
+        finally:
+            _escreveu.reset(token)
+        return resposta
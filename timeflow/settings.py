@@ -53,6 +53,7 @@ INSTALLED_APPS = [
     'ponto',
     'core',
     'afd',
+    'tarefas',
 ]
 
 # Custom User Model
@@ -61,10 +62,12 @@ AUTH_USER_MODEL = 'auth.User'
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.OrcamentoConsultasMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'timeflow.db_router.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -144,6 +147,24 @@ DATABASES = {
     }
 }
 
+# Réplicas de leitura (timeflow/db_router.py): relatórios, dashboard,
+# histórico e exportações leem de uma delas; batidas, NSR e o que precisa
+# ler o que acabou de gravar ficam no default. DB_REPLICAS = hosts das
+# réplicas do MySQL, separados por vírgula (mesmo banco/usuário/senha do
+# default) — ou, com SQLite, caminhos de cópias do arquivo. Vazio = sem
+# réplica. Depois de gravar, o usuário lê do default por
+# REPLICA_JANELA_POS_ESCRITA segundos: deixe acima do atraso de replicação.
+# A janela fica no cache default: com réplica, ele precisa ser compartilhado
+# entre os processos (o `manage.py check` recusa LocMem/Dummy — core/checks.py).
+DB_REPLICAS = config('DB_REPLICAS', default='', cast=Csv())
+REPLICAS_LEITURA = []
+for _numero, _replica in enumerate(DB_REPLICAS, 1):
+    _campo = 'NAME' if DATABASES['default']['ENGINE'].endswith('sqlite3') else 'HOST'
+    DATABASES[f'replica{_numero}'] = {**DATABASES['default'], _campo: _replica, 'TEST': {'MIRROR': 'default'}}
+    REPLICAS_LEITURA.append(f'replica{_numero}')
+DATABASE_ROUTERS = ['timeflow.db_router.RoteadorReplicas']
+REPLICA_JANELA_POS_ESCRITA = config('REPLICA_JANELA_POS_ESCRITA', default=10, cast=int)
+
 
 
 # Password validation
@@ -198,3 +219,82 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_REDIRECT_URL = '/'  # ✅ Para onde ir após login bem-sucedido
 LOGOUT_REDIRECT_URL = '/'  # ✅ Para onde ir após logout
 
+# Recalcula atraso/saída antecipada dos registros já gravados quando o
+# horário, a tolerância ou a jornada de um profissional muda (ponto/signals.py).
+# Desligado por padrão — use o comando `recalcular_tolerancia`.
+# PONTO_RECALCULAR_TOLERANCIA_DIAS = 0 recalcula o histórico inteiro.
+PONTO_RECALCULAR_TOLERANCIA_AUTOMATICO = config('PONTO_RECALCULAR_TOLERANCIA_AUTOMATICO', default=False, cast=bool)
+PONTO_RECALCULAR_TOLERANCIA_DIAS = config('PONTO_RECALCULAR_TOLERANCIA_DIAS', default=90, cast=int)
+
+# Cache do Django. Os calendários (municipio/calendario.py), o índice de
+# ocupação (ponto/ocupacao.py) e o cache do dashboard (core/cache_painel.py)
+# guardam aqui os contadores de versão que invalidam os dados entre
+# processos — com vários workers use um backend compartilhado, ex.:
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# CACHE_LOCATION=redis://127.0.0.1:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='timeflow'),
+    }
+}
+
+# Com o cache por processo (LocMemCache/DummyCache), a versão trocada num
+# worker não chega aos outros: dashboard, ocupação e calendários guardam o
+# que dependem dela por no máximo CACHE_VALIDADE_LOCAL segundos
+# (timeflow/cache.py). Com cache compartilhado, não se aplica.
+CACHE_VALIDADE_LOCAL = config('CACHE_VALIDADE_LOCAL', default=60, cast=int)
+
+# Validade (segundos) de cada seção do dashboard em cache. A invalidação é
+# feita pelos signals (core/signals.py); isto só limita a vida das chaves.
+PAINEL_CACHE_TIMEOUT = config('PAINEL_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Fila de tarefas em segundo plano (tarefas/) — rode o worker com
+# `python manage.py processar_tarefas`. Relatórios em PDF com período acima
+# de TAREFAS_LIMITE_DIAS dias e AFD com mais de TAREFAS_LIMITE_REGISTROS_AFD
+# marcações vão pra fila em vez de serem gerados dentro do request.
+# Os arquivos gerados ficam em TAREFAS_DIRETORIO (fora do MEDIA_ROOT, só
+# saem pela view de download) por TAREFAS_VALIDADE_HORAS horas.
+TAREFAS_DIRETORIO = config('TAREFAS_DIRETORIO', default=os.path.join(BASE_DIR, 'arquivos_tarefas'))
+TAREFAS_VALIDADE_HORAS = config('TAREFAS_VALIDADE_HORAS', default=24, cast=int)
+TAREFAS_LIMITE_DIAS = config('TAREFAS_LIMITE_DIAS', default=93, cast=int)
+TAREFAS_LIMITE_REGISTROS_AFD = config('TAREFAS_LIMITE_REGISTROS_AFD', default=20000, cast=int)
+# Tarefa "em execução" sem atualizar o progresso há mais que isso (segundos)
+# é considerada travada (worker morreu) e volta pra fila, até
+# TAREFAS_MAX_TENTATIVAS vezes.
+TAREFAS_TEMPO_MAXIMO = config('TAREFAS_TEMPO_MAXIMO', default=1800, cast=int)
+TAREFAS_MAX_TENTATIVAS = config('TAREFAS_MAX_TENTATIVAS', default=3, cast=int)
+
+# Relatórios em PDF de um estabelecimento inteiro (core/lote_pdf.py): número
+# de processos que geram os PDFs em paralelo. 0 = um por CPU.
+PDF_LOTE_PROCESSOS = config('PDF_LOTE_PROCESSOS', default=0, cast=int)
+
+# PDFs de relatório de períodos fechados guardados em disco (core/cache_pdf.py),
+# com os usados há mais tempo saindo quando passa de PDF_CACHE_LIMITE_MB.
+# 0 desliga o cache.
+PDF_CACHE_DIRETORIO = config('PDF_CACHE_DIRETORIO', default=os.path.join(BASE_DIR, 'cache_pdf'))
+PDF_CACHE_LIMITE_MB = config('PDF_CACHE_LIMITE_MB', default=500, cast=int)
+
+# Arquivamento de marcações antigas (ponto/arquivamento.py, comando
+# `arquivar_marcacoes`): meses com mais de ARQUIVO_MARCACOES_HORIZONTE_MESES
+# saem do banco pra arquivos comprimidos em ARQUIVO_MARCACOES_DIRETORIO —
+# guarde esse diretório com o mesmo cuidado (e backup) do banco: depois do
+# arquivamento, ele é a única cópia dessas marcações.
+ARQUIVO_MARCACOES_DIRETORIO = config(
+    'ARQUIVO_MARCACOES_DIRETORIO', default=os.path.join(BASE_DIR, 'arquivo_marcacoes')
+)
+ARQUIVO_MARCACOES_HORIZONTE_MESES = config('ARQUIVO_MARCACOES_HORIZONTE_MESES', default=24, cast=int)
+
+# MySQL: a tabela de marcações é particionada por mês (ponto/particionamento.py);
+# o comando `particionar_registros` (cron mensal) deixa partições criadas
+# até este número de meses à frente. Sem efeito em outros bancos.
+REGISTROPONTO_PARTICOES_A_FRENTE = config('REGISTROPONTO_PARTICOES_A_FRENTE', default=3, cast=int)
+
+# Contagem de consultas por request (core/middleware.py): Server-Timing e
+# aviso no log (logger core.consultas) quando a mesma consulta se repete
+# CONSULTAS_REPETICOES_ALERTA vezes (N+1) ou a URL passa do orçamento de
+# core/consultas.py. Com CONSULTAS_ORCAMENTO_ESTRITO, passar do orçamento
+# vira erro — bom no desenvolvimento. Os testes usam core/testing.py.
+MONITORAR_CONSULTAS = config('MONITORAR_CONSULTAS', default=DEBUG, cast=bool)
+CONSULTAS_REPETICOES_ALERTA = config('CONSULTAS_REPETICOES_ALERTA', default=3, cast=int)
+CONSULTAS_ORCAMENTO_ESTRITO = config('CONSULTAS_ORCAMENTO_ESTRITO', default=False, cast=bool)
@@ -23,6 +23,7 @@ urlpatterns = [
     # Logout
     path('sair/', auth_views.LogoutView.as_view(next_page='/'), name='logout'),
     path('afd/', include('afd.urls')),
+    path('tarefas/', include('tarefas.urls')),
 ]
 
 if settings.DEBUG:
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Profissional, AreaAtuacao
+from .models import Profissional, AreaAtuacao, Escala, Jornada, JornadaDia
 
 @admin.register(Profissional)
 class ProfissionalAdmin(admin.ModelAdmin):
@@ -12,7 +12,7 @@ class ProfissionalAdmin(admin.ModelAdmin):
         'ativo',
         'criado_em'
     ]
-    list_filter = ['ativo', 'profissao', 'estabelecimento']
+    list_filter = ['ativo', 'profissao', 'estabelecimento', 'escala', 'jornada']
     search_fields = ['nome', 'cpf']
     list_editable = ['ativo', 'estabelecimento', 'tolerancia_minutos']
     
@@ -29,11 +29,13 @@ class ProfissionalAdmin(admin.ModelAdmin):
                 'estabelecimento',
                 'carga_horaria_diaria',
                 'carga_horaria_semanal',
+                'escala',
                 'ativo'
             ]
         }),
         ('Horários e Tolerância', {
             'fields': [
+                'jornada',
                 'horario_entrada',
                 'horario_saida',
                 'tolerancia_minutos'
@@ -62,4 +64,24 @@ class ProfissionalAdmin(admin.ModelAdmin):
 @admin.register(AreaAtuacao)
 class AreaAtuacaoAdmin(admin.ModelAdmin):
     list_display = ['profissao']
-    search_fields = ['profissao']
\ No newline at end of file
+    search_fields = ['profissao']
+
+
+@admin.register(Escala)
+class EscalaAdmin(admin.ModelAdmin):
+    list_display = ['nome', 'padrao', 'horas_plantao', 'data_ancora', 'ativo']
+    list_filter = ['ativo']
+    search_fields = ['nome']
+
+
+class JornadaDiaInline(admin.TabularInline):
+    model = JornadaDia
+    extra = 0
+    max_num = 7
+
+
+@admin.register(Jornada)
+class JornadaAdmin(admin.ModelAdmin):
+    list_display = ['nome', 'atualizado_em']
+    search_fields = ['nome']
+    inlines = [JornadaDiaInline]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:20
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Escala',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=50, unique=True, verbose_name='Nome')),
+                ('padrao', models.CharField(help_text="Um caractere por dia do ciclo: 1 = plantão, 0 = folga. Ex: 12x36 = '10', 24x72 = '1000'.", max_length=31, verbose_name='Padrão do ciclo')),
+                ('horas_plantao', models.DurationField(default=datetime.timedelta(seconds=43200), verbose_name='Duração do plantão')),
+                ('data_ancora', models.DateField(help_text='Um dia em que o ciclo começa (primeiro caractere do padrão).', verbose_name='Data-âncora')),
+                ('ativo', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name': 'Escala',
+                'verbose_name_plural': 'Escalas',
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.AddField(
+            model_name='profissional',
+            name='email',
+            field=models.EmailField(blank=True, max_length=254, null=True, verbose_name='E-mail'),
+        ),
+        migrations.AddField(
+            model_name='profissional',
+            name='usuario',
+            field=models.OneToOneField(blank=True, help_text='Conta de login vinculada a este profissional (usada em "Meu Perfil" e no app mobile).', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profissional', to=settings.AUTH_USER_MODEL, verbose_name='Usuário do sistema'),
+        ),
+        migrations.AddField(
+            model_name='profissional',
+            name='escala',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profissionais', to='usuarios.escala', verbose_name='Escala'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0002_escala'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Jornada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=50, unique=True, verbose_name='Nome')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Jornada',
+                'verbose_name_plural': 'Jornadas',
+                'ordering': ['nome'],
+            },
+        ),
+        migrations.AddField(
+            model_name='profissional',
+            name='jornada',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profissionais', to='usuarios.jornada', verbose_name='Jornada'),
+        ),
+        migrations.CreateModel(
+            name='JornadaDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia_semana', models.PositiveSmallIntegerField(choices=[(0, 'Segunda-feira'), (1, 'Terça-feira'), (2, 'Quarta-feira'), (3, 'Quinta-feira'), (4, 'Sexta-feira'), (5, 'Sábado'), (6, 'Domingo')], verbose_name='Dia da semana')),
+                ('entrada', models.TimeField(verbose_name='Entrada')),
+                ('saida', models.TimeField(help_text='Se for menor que a entrada, a saída é no dia seguinte (turno noturno).', verbose_name='Saída')),
+                ('intervalo_minutos', models.PositiveIntegerField(default=0, verbose_name='Intervalo (minutos)')),
+                ('jornada', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dias', to='usuarios.jornada')),
+            ],
+            options={
+                'verbose_name': 'Dia da jornada',
+                'verbose_name_plural': 'Dias da jornada',
+                'ordering': ['jornada', 'dia_semana'],
+                'unique_together': {('jornada', 'dia_semana')},
+            },
+        ),
+    ]
@@ -1,3 +1,6 @@
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.conf import settings
 from estabelecimentos.models import Estabelecimento
@@ -14,6 +17,146 @@ class AreaAtuacao(models.Model):
         return str(self.profissao)
 
 
+class Escala(models.Model):
+    """
+    Escala de plantão em ciclo fixo (12x36, 24x72, 12x60...).
+
+    O padrão é uma sequência de '1' (dia de plantão) e '0' (folga), um
+    caractere por dia do ciclo, começando na data_ancora:
+    - 12x36 -> padrao '10',   horas_plantao 12h
+    - 24x72 -> padrao '1000', horas_plantao 24h
+    - 24x48 -> padrao '100',  horas_plantao 24h
+
+    Equipes que revezam na mesma escala (A/B) são escalas separadas com
+    datas-âncora diferentes. O plantão é atribuído ao dia em que começa,
+    mesmo que termine no dia seguinte (mesma regra do banco de horas).
+    Escala não olha dia útil nem feriado: plantão é plantão.
+
+    Os cálculos de período (dias_de_plantao, horas_previstas) são
+    aritméticos sobre o ciclo — não percorrem os dias do período.
+    """
+    nome = models.CharField('Nome', max_length=50, unique=True)
+    padrao = models.CharField(
+        'Padrão do ciclo',
+        max_length=31,
+        help_text="Um caractere por dia do ciclo: 1 = plantão, 0 = folga. Ex: 12x36 = '10', 24x72 = '1000'."
+    )
+    horas_plantao = models.DurationField(
+        'Duração do plantão',
+        default=timedelta(hours=12),
+    )
+    data_ancora = models.DateField(
+        'Data-âncora',
+        help_text='Um dia em que o ciclo começa (primeiro caractere do padrão).'
+    )
+    ativo = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name = 'Escala'
+        verbose_name_plural = 'Escalas'
+        ordering = ['nome']
+
+    def __str__(self):
+        return self.nome
+
+    def clean(self):
+        if not self.padrao or set(self.padrao) - {'0', '1'}:
+            raise ValidationError({'padrao': "Use apenas '1' (plantão) e '0' (folga)."})
+        if '1' not in self.padrao:
+            raise ValidationError({'padrao': 'O ciclo precisa ter pelo menos um dia de plantão.'})
+        if self.horas_plantao and self.horas_plantao > timedelta(hours=24):
+            raise ValidationError({'horas_plantao': 'Um plantão não pode passar de 24 horas.'})
+
+    @property
+    def ciclo_dias(self):
+        return len(self.padrao)
+
+    def _plantoes_antes(self, indice):
+        """Quantos dias de plantão existem do índice 0 (âncora) até indice - 1.
+        Funciona com índices negativos (datas antes da âncora)."""
+        ciclos, resto = divmod(indice, self.ciclo_dias)
+        return ciclos * self.padrao.count('1') + self.padrao[:resto].count('1')
+
+    def em_plantao(self, dia):
+        return self.padrao[(dia - self.data_ancora).days % self.ciclo_dias] == '1'
+
+    def dias_de_plantao(self, data_inicio, data_fim):
+        """Número de dias de plantão entre data_inicio e data_fim (inclusive)."""
+        if data_fim < data_inicio:
+            return 0
+        inicio = (data_inicio - self.data_ancora).days
+        fim = (data_fim - self.data_ancora).days
+        return self._plantoes_antes(fim + 1) - self._plantoes_antes(inicio)
+
+    def horas_previstas(self, data_inicio, data_fim):
+        return self.horas_plantao * self.dias_de_plantao(data_inicio, data_fim)
+
+
+class Jornada(models.Model):
+    """
+    Jornada semanal: horário de entrada e saída (e intervalo) por dia da
+    semana. Dia sem JornadaDia é folga.
+
+    Usada no cálculo de atraso/saída antecipada de cada marcação — ver
+    ponto/jornada.py, que "compila" a jornada numa tabela por minuto da
+    semana. Sem jornada, vale horario_entrada/horario_saida do profissional
+    em todos os dias.
+    """
+    nome = models.CharField('Nome', max_length=50, unique=True)
+    atualizado_em = models.DateTimeField('Atualizado em', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Jornada'
+        verbose_name_plural = 'Jornadas'
+        ordering = ['nome']
+
+    def __str__(self):
+        return self.nome
+
+
+class JornadaDia(models.Model):
+    DIAS_SEMANA = [
+        (0, 'Segunda-feira'),
+        (1, 'Terça-feira'),
+        (2, 'Quarta-feira'),
+        (3, 'Quinta-feira'),
+        (4, 'Sexta-feira'),
+        (5, 'Sábado'),
+        (6, 'Domingo'),
+    ]
+
+    jornada = models.ForeignKey(Jornada, on_delete=models.CASCADE, related_name='dias')
+    dia_semana = models.PositiveSmallIntegerField('Dia da semana', choices=DIAS_SEMANA)
+    entrada = models.TimeField('Entrada')
+    saida = models.TimeField(
+        'Saída',
+        help_text='Se for menor que a entrada, a saída é no dia seguinte (turno noturno).'
+    )
+    intervalo_minutos = models.PositiveIntegerField('Intervalo (minutos)', default=0)
+
+    class Meta:
+        verbose_name = 'Dia da jornada'
+        verbose_name_plural = 'Dias da jornada'
+        ordering = ['jornada', 'dia_semana']
+        unique_together = ['jornada', 'dia_semana']
+
+    def __str__(self):
+        return f"{self.jornada} - {self.get_dia_semana_display()}"
+
+    @property
+    def vira_o_dia(self):
+        return self.saida <= self.entrada
+
+    @property
+    def carga(self):
+        """Horas previstas no dia, já descontado o intervalo."""
+        inicio = timedelta(hours=self.entrada.hour, minutes=self.entrada.minute)
+        fim = timedelta(hours=self.saida.hour, minutes=self.saida.minute)
+        if self.vira_o_dia:
+            fim += timedelta(days=1)
+        return max(fim - inicio - timedelta(minutes=self.intervalo_minutos), timedelta())
+
+
 class Profissional(models.Model):
     # Dados básicos
     nome = models.CharField(max_length=50)
@@ -75,6 +218,28 @@ class Profissional(models.Model):
     carga_horaria_diaria = models.DurationField(null=True, blank=True)
     carga_horaria_semanal = models.DurationField(null=True, blank=True)
 
+    # Escala de plantão (12x36, 24x72...). Sem escala, vale a carga diária
+    # nos dias úteis — ver ponto/escalas.py.
+    escala = models.ForeignKey(
+        Escala,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='profissionais',
+        verbose_name='Escala'
+    )
+
+    # Jornada semanal (horário por dia da semana). Sem jornada, valem os
+    # horários fixos abaixo em todos os dias.
+    jornada = models.ForeignKey(
+        Jornada,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='profissionais',
+        verbose_name='Jornada'
+    )
+
     # Horários fixos
     horario_entrada = models.TimeField(null=True, blank=True, verbose_name='Horário de Entrada')
     horario_saida = models.TimeField(null=True, blank=True, verbose_name='Horário de Saída')
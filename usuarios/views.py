@@ -87,7 +87,9 @@ def listar_profissionais(request):
             Q(cpf__icontains=busca)
         )
     
-    profissionais = profissionais.order_by('-ativo', 'nome')
+    profissionais = profissionais.select_related(
+        'profissao', 'estabelecimento__municipio'
+    ).order_by('-ativo', 'nome')
     
     paginator = Paginator(profissionais, 20)
     page = request.GET.get('page', 1)